@@ -0,0 +1,213 @@
+# anel_frames.py
+import time
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pool_reconhecimento import FrameCompartilhado
+
+_ALINHAMENTO = 64
+
+
+class FrameIncompativel(Exception):
+    """A câmera entregou um frame com forma diferente da dos slots do anel."""
+
+    def __init__(self, frame):
+        super().__init__(f"Frame {frame.shape} incompatível com o anel")
+        self.frame = frame
+
+
+class FrameAnel:
+    """Frame publicado no anel: view somente leitura do slot, com número de sequência e horário de captura.
+
+    Enquanto não for liberado o slot fica reservado e não é sobrescrito pela captura.
+    """
+
+    def __init__(self, anel, indice, seq, timestamp):
+        self.anel = anel
+        self.indice = indice
+        self.seq = seq
+        self.timestamp = timestamp
+        self.imagem = anel._views_leitura[indice]
+        self._liberado = False
+
+    @property
+    def descritor(self):
+        """Descritor para entregar o slot a outro processo sem cópia."""
+        return FrameCompartilhado(self.anel.nome, self.anel.forma, self.anel.dtype.str, self.anel._deslocamento(self.indice))
+
+    def valido(self):
+        return not self._liberado and int(self.anel._seqs[self.indice]) == self.seq
+
+    def liberar(self):
+        if not self._liberado:
+            self._liberado = True
+            self.anel._liberar(self.indice)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.liberar()
+
+
+class AnelFrames:
+    """Anel de tamanho fixo com slots de frame pré-alocados em memória compartilhada, um por câmera.
+
+    A captura escreve diretamente no próximo slot livre (cap.read(image=slot)) e publica o frame com um
+    número de sequência crescente. O cabeçalho do bloco guarda a sequência e o horário de cada slot,
+    de modo que outros processos possam anexar o mesmo bloco e validar o que estão lendo.
+    """
+
+    def __init__(self, forma, n_slots=4, dtype=np.uint8):
+        self.forma = tuple(forma)
+        self.dtype = np.dtype(dtype)
+        self.n_slots = n_slots
+        self.bytes_slot = int(np.prod(self.forma)) * self.dtype.itemsize
+        self._inicio_slots = _ALINHAMENTO * ((16 * n_slots + _ALINHAMENTO - 1) // _ALINHAMENTO)
+        self._passo = _ALINHAMENTO * ((self.bytes_slot + _ALINHAMENTO - 1) // _ALINHAMENTO)
+        self._shm = shared_memory.SharedMemory(create=True, size=self._inicio_slots + self._passo * n_slots)
+        self.nome = self._shm.name
+
+        # Cabeçalho: seq (int64) e timestamp (float64) de cada slot
+        self._seqs = np.ndarray((n_slots,), dtype=np.int64, buffer=self._shm.buf, offset=0)
+        self._timestamps = np.ndarray((n_slots,), dtype=np.float64, buffer=self._shm.buf, offset=8 * n_slots)
+        self._seqs[:] = -1
+        self._timestamps[:] = 0.0
+        self._views_escrita = [
+            np.ndarray(self.forma, dtype=self.dtype, buffer=self._shm.buf, offset=self._deslocamento(i))
+            for i in range(n_slots)
+        ]
+        self._views_leitura = []
+        for view in self._views_escrita:
+            leitura = view.view()
+            leitura.flags.writeable = False
+            self._views_leitura.append(leitura)
+
+        self._lock = threading.Lock()
+        self._reservas = [0] * n_slots
+        self._seq = 0
+        self._ultimo = None
+        self._proximo = 0
+        self._fechado = False
+
+    def _deslocamento(self, indice):
+        return self._inicio_slots + indice * self._passo
+
+    def compativel(self, frame):
+        return frame is not None and frame.shape == self.forma and frame.dtype == self.dtype
+
+    def slot_livre(self):
+        """Retorna (indice, view gravável) do próximo slot que não está reservado nem é o último publicado."""
+        with self._lock:
+            if self._fechado:
+                return None, None
+            for _ in range(self.n_slots):
+                indice = self._proximo
+                self._proximo = (self._proximo + 1) % self.n_slots
+                if self._reservas[indice] == 0 and indice != self._ultimo:
+                    # Invalida o slot antes de reescrevê-lo para que leitores percebam a troca
+                    self._seqs[indice] = -1
+                    return indice, self._views_escrita[indice]
+        return None, None
+
+    def publicar(self, indice, timestamp=None):
+        """Publica o slot recém-escrito como o frame mais recente e retorna sua sequência."""
+        with self._lock:
+            self._seq += 1
+            self._timestamps[indice] = timestamp if timestamp is not None else time.time()
+            self._seqs[indice] = self._seq
+            self._ultimo = indice
+            return self._seq
+
+    def ler_camera(self, cap):
+        """Lê o próximo frame da câmera diretamente em um slot livre e o publica.
+
+        Retorna (ret, seq) como cap.read(): seq é None quando nenhum slot estava livre e o frame foi
+        descartado. Lança FrameIncompativel se a câmera mudou de resolução.
+        """
+        indice, slot = self.slot_livre()
+        if slot is None:
+            return cap.grab(), None  # Mantém o buffer da câmera andando mesmo sem slot disponível
+        ret, frame = cap.read(image=slot)
+        if not ret or frame is None:
+            return False, None
+        if not np.shares_memory(frame, slot):
+            # O backend alocou outro buffer; copia se couber no slot
+            if not self.compativel(frame):
+                raise FrameIncompativel(frame)
+            slot[...] = frame
+        return True, self.publicar(indice)
+
+    def adquirir(self, seq=None):
+        """Reserva e retorna o frame de sequência `seq` (ou o mais recente, se ele já foi sobrescrito)."""
+        with self._lock:
+            if self._fechado or self._ultimo is None:
+                return None
+            indice = self._ultimo
+            if seq is not None:
+                encontrados = np.flatnonzero(self._seqs == seq)
+                if len(encontrados):
+                    indice = int(encontrados[0])
+            self._reservas[indice] += 1
+            return FrameAnel(self, indice, int(self._seqs[indice]), float(self._timestamps[indice]))
+
+    def ultima_sequencia(self):
+        with self._lock:
+            return self._seq
+
+    def _liberar(self, indice):
+        with self._lock:
+            self._reservas[indice] -= 1
+            pode_fechar = self._fechado and not any(self._reservas)
+        if pode_fechar:
+            self._liberar_memoria()
+
+    def fechar(self):
+        """Encerra o anel; a memória é liberada assim que o último frame reservado for devolvido."""
+        with self._lock:
+            if self._fechado:
+                return
+            self._fechado = True
+            pode_fechar = not any(self._reservas)
+        if pode_fechar:
+            self._liberar_memoria()
+
+    def _liberar_memoria(self):
+        self._views_escrita = []
+        self._views_leitura = []
+        self._seqs = np.full(self.n_slots, -1, dtype=np.int64)
+        self._timestamps = np.zeros(self.n_slots, dtype=np.float64)
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            self._shm.close()
+        except BufferError:
+            # Ainda existe alguma view viva; o mapeamento é desfeito quando ela for coletada
+            pass
+
+
+def ler_frame(cap, anel=None, n_slots=4):
+    """Lê um frame da câmera para o anel, criando-o no primeiro frame ou quando a resolução muda.
+
+    Retorna (ret, anel, seq); seq é None se o frame foi descartado por falta de slot livre.
+    """
+    if anel is not None:
+        try:
+            ret, seq = anel.ler_camera(cap)
+            return ret, anel, seq
+        except FrameIncompativel as e:
+            anel.fechar()
+            frame = e.frame
+    else:
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            return False, None, None
+
+    anel = AnelFrames(frame.shape, n_slots=n_slots, dtype=frame.dtype)
+    indice, slot = anel.slot_livre()
+    slot[...] = frame
+    return True, anel, anel.publicar(indice)
@@ -1,6 +1,6 @@
 # app.py
 import os
-from flask import Flask, render_template, jsonify, request, redirect, url_for, send_from_directory
+from flask import Flask, render_template, jsonify, request, redirect, url_for, send_from_directory, Response, stream_with_context
 from flask_socketio import SocketIO, emit
 import cv2
 import base64
@@ -8,15 +8,23 @@ import numpy as np
 import os
 import json
 import glob
+import csv
+import io
+import itertools
 from dotenv import load_dotenv
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from cadastro import (
     cadastrar_aluno, listar_alunos, editar_aluno,
-    excluir_aluno, listar_cameras_disponiveis, obter_responsavel_por_aluno
+    excluir_aluno, listar_cameras_disponiveis, estatisticas_banco,
+    listar_sessoes_presenca, exportar_sessoes_presenca, COLUNAS_SESSAO,
+    listar_resumo_diario, listar_resumo_aluno, listar_resumo_locais, listar_atrasos
 )
-from reconhecimento import ReconhecimentoFacial
+from registro_presencas import descrever_local
+from reconhecimento import ReconhecimentoFacial, SLOTS_ANEL
+from anel_frames import ler_frame
 from smtp_service import send_email, is_configured as is_email_configured, smtp_service
+from caixa_saida import caixa_saida
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -133,56 +141,21 @@ def debug_token():
         }), 500
 
 def callback_mensagens(mensagens):
+    # Só repassa os logs à interface; os e-mails de alerta saem do despachante de notificações
     for mensagem in mensagens:
         socketio.emit('log', {'mensagem': mensagem})
-        # Enviar email para alertas
-        if mensagem.startswith('ALERTA:'):
-            # Espera formato: "ALERTA: Aluno {id} ausente ..."
-            try:
-                partes = mensagem.split('Aluno')
-                if len(partes) > 1:
-                    resto = partes[1].strip()
-                    id_str = ''
-                    for ch in resto:
-                        if ch.isdigit():
-                            id_str += ch
-                        else:
-                            break
-                    if id_str:
-                        responsavel = obter_responsavel_por_aluno(int(id_str))
-                        if responsavel and 'email' in responsavel:
-                            # Cria o conteúdo HTML do e-mail
-                            html_content = f"""
-                            <html>
-                                <body>
-                                    <p>Prezado Responsável,</p>
-                                    <p>O aluno {id_str} está ausente há 2 verificações consecutivas.</p>
-                                    <p>Por favor, entre em contato com a instituição para mais informações.</p>
-                                    <br>
-                                    <p>Atenciosamente,<br>Sistema de Monitoramento de Presença</p>
-                                </body>
-                            </html>
-                            """
-                            
-                            result = send_email(
-                                to_email=responsavel['email'],
-                                subject='Alerta de Monitoramento - Ausência de Aluno',
-                                body_text=mensagem,
-                                html_content=html_content.strip()
-                            )
-                            if not result.get('success'):
-                                print(f"Erro ao enviar e-mail: {result.get('error')}")
-                            else:
-                                print(f"E-mail de alerta enviado para {responsavel['email']}")
-            except Exception as e:
-                print(f"Erro ao processar alerta: {e}")
 
-def callback_frame(frame_base64, camera_id=0):
-    socketio.emit('camera_frame', {
+def _evento_frame(frame_jpeg, camera_id):
+    # Cabeçalho pequeno em JSON; os bytes do JPEG seguem como anexo binário do Socket.IO (sem base64)
+    return {
         'camera_id': camera_id,
-        'frame': frame_base64,
-        'timestamp': datetime.now().isoformat()
-    })
+        'timestamp': datetime.now().isoformat(),
+        'formato': 'jpeg',
+        'frame': bytes(frame_jpeg)
+    }
+
+def callback_frame(frame_jpeg, camera_id=0):
+    socketio.emit('camera_frame', _evento_frame(frame_jpeg, camera_id))
 
 reconhecimento.definir_callback_mensagens(callback_mensagens)
 reconhecimento.definir_callback_frame(callback_frame)
@@ -251,6 +224,7 @@ def handle_start_monitoring(data):
     # Inicia a thread de monitoramento
     def monitor_camera():
         cap = None
+        anel = None
         try:
             if is_test_mode:
                 # Modo teste: usa vídeo do arquivo
@@ -284,9 +258,9 @@ def handle_start_monitoring(data):
                     socketio.emit('error', {'message': f'Não foi possível abrir a câmera {camera_id}'}, room=client_sid)
                     return
             
-            frame_count = 0
             while camera_states.get(camera_id, {}).get('running', False):
-                ret, frame = cap.read()
+                # Decodifica direto no anel de frames da câmera (slots pré-alocados em memória compartilhada)
+                ret, anel, seq = ler_frame(cap, anel, n_slots=SLOTS_ANEL)
                 if not ret:
                     # Se for vídeo, volta para o início
                     if is_test_mode:
@@ -294,29 +268,30 @@ def handle_start_monitoring(data):
                         continue
                     else:
                         break
+                if seq is None:
+                    continue
                 
-                # Processa reconhecimento facial a cada 5 segundos (aproximadamente)
-                if frame_count % 150 == 0:  # ~5 segundos a 30 FPS
-                    # Coloca o frame na fila de processamento do reconhecimento
-                    if not reconhecimento.frame_queue.full():
-                        reconhecimento.frame_queue.put(frame.copy())
-                
-                # Converte o frame para base64 para exibição
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                frame_base64 = base64.b64encode(buffer).decode('utf-8')
+                with anel.adquirir(seq) as frame_anel:
+                    # Miniatura para detecção de movimento (agenda o reconhecimento conforme a cena muda)
+                    reconhecimento.registrar_movimento(camera_id, frame_anel.imagem, frame_anel.timestamp)
+                    
+                    # Publica o frame na caixa da câmera; o reconhecimento decide quando processar.
+                    # Entrega apenas a referência ao slot do anel (sem cópia do frame)
+                    reconhecimento.caixa_frames.publicar(camera_id, (anel, seq), frame_anel.timestamp)
+                    
+                    # Codifica o frame em JPEG para exibição
+                    ok, buffer = cv2.imencode('.jpg', frame_anel.imagem, [cv2.IMWRITE_JPEG_QUALITY, 80])
+                if not ok:
+                    continue
+                frame_jpeg = buffer.tobytes()
                 
                 # Atualiza o estado da câmera
-                camera_states[camera_id]['last_frame'] = frame_base64
+                camera_states[camera_id]['last_frame'] = frame_jpeg
                 camera_states[camera_id]['last_update'] = datetime.now()
                 
                 # Envia o frame via WebSocket usando socketio.emit com room
-                socketio.emit('camera_frame', {
-                    'camera_id': camera_id,
-                    'frame': frame_base64,
-                    'timestamp': datetime.now().isoformat()
-                }, room=client_sid)
+                socketio.emit('camera_frame', _evento_frame(frame_jpeg, camera_id), room=client_sid)
                 
-                frame_count += 1
                 # Pequena pausa para não sobrecarregar
                 socketio.sleep(0.03)  # ~30 FPS
                 
@@ -328,6 +303,9 @@ def handle_start_monitoring(data):
         finally:
             if cap and cap.isOpened():
                 cap.release()
+            reconhecimento.remover_camera(camera_id)
+            if anel is not None:
+                anel.fechar()
             camera_states[camera_id]['running'] = False
     
     # Inicia a thread de monitoramento
@@ -391,6 +369,36 @@ def get_cameras():
         print(f"Erro ao listar câmeras: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/cameras/regioes')
+def get_regioes_cameras():
+    """Regiões de interesse de todas as câmeras"""
+    return jsonify({'success': True, 'regioes': reconhecimento.regioes.todas()})
+
+@app.route('/api/cameras/<int:camera_id>/regioes', methods=['GET'])
+def get_regioes_camera(camera_id):
+    return jsonify({'success': True, 'camera_id': camera_id, 'regioes': reconhecimento.regioes.obter(camera_id)})
+
+@app.route('/api/cameras/<int:camera_id>/regioes', methods=['PUT'])
+def update_regioes_camera(camera_id):
+    """Define as regiões de interesse (retângulos/polígonos em coordenadas 0-1) da câmera"""
+    data = request.get_json(silent=True) or {}
+    try:
+        regioes = reconhecimento.regioes.definir(camera_id, data.get('regioes', []))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except OSError as e:
+        return jsonify({'success': False, 'error': f'Erro ao salvar regiões: {str(e)}'}), 500
+    return jsonify({'success': True, 'camera_id': camera_id, 'regioes': regioes})
+
+@app.route('/api/cameras/<int:camera_id>/regioes', methods=['DELETE'])
+def delete_regioes_camera(camera_id):
+    """Remove as regiões da câmera (volta a detectar no frame inteiro)"""
+    try:
+        removidas = reconhecimento.regioes.remover(camera_id)
+    except OSError as e:
+        return jsonify({'success': False, 'error': f'Erro ao salvar regiões: {str(e)}'}), 500
+    return jsonify({'success': True, 'removidas': removidas})
+
 @app.route('/debug/alunos')
 def debug_alunos():
     """Endpoint de debug para verificar alunos no banco"""
@@ -506,8 +514,8 @@ def create_aluno():
         if frame is None:
              return jsonify({'success': False, 'error': 'Imagem inválida ou corrompida.'})
 
-        cadastrar_aluno(id_aluno, nome, frame, resp_telefone=resp_telefone, resp_email=resp_email)
-        reconhecimento.carregar_codificacoes_referencia()
+        codificacao = cadastrar_aluno(id_aluno, nome, frame, resp_telefone=resp_telefone, resp_email=resp_email)
+        reconhecimento.adicionar_aluno(id_aluno, codificacao, resp_telefone=resp_telefone, resp_email=resp_email)
         return jsonify({'success': True})
     except (ValueError, TypeError) as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -533,8 +541,12 @@ def update_aluno(id_aluno):
             if frame is None:
                 return jsonify({'success': False, 'error': 'A nova imagem é inválida ou corrompida.'})
         
-        editar_aluno(id_aluno, nome, frame, resp_telefone=resp_telefone, resp_email=resp_email)
-        reconhecimento.carregar_codificacoes_referencia()
+        codificacao = editar_aluno(id_aluno, nome, frame, resp_telefone=resp_telefone, resp_email=resp_email)
+        if codificacao is not None:
+            # Só a troca de foto altera a galeria; os contatos vão junto para o cache
+            reconhecimento.adicionar_aluno(id_aluno, codificacao, resp_telefone=resp_telefone, resp_email=resp_email)
+        elif resp_telefone is not None or resp_email is not None:
+            reconhecimento.atualizar_responsavel(id_aluno, resp_telefone=resp_telefone, resp_email=resp_email)
         return jsonify({'success': True})
     except ValueError as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -545,13 +557,196 @@ def update_aluno(id_aluno):
 def delete_aluno(id_aluno):
     try:
         excluir_aluno(id_aluno)
-        reconhecimento.carregar_codificacoes_referencia()
+        reconhecimento.remover_aluno(id_aluno)
         return jsonify({'success': True})
     except ValueError as e:
         return jsonify({'success': False, 'error': str(e)})
     except Exception as e:
         return jsonify({'success': False, 'error': f'Erro inesperado: {str(e)}'})
 
+# Presenças (sessões de presença)
+PRESENCAS_LIMITE_PADRAO = 100
+PRESENCAS_LIMITE_MAXIMO = 1000
+
+def _filtros_presencas(args):
+    """Filtros de /api/presencas: inicio/fim (ISO 8601), id_aluno e camera (ou local). ValueError se inválidos."""
+    filtros = {}
+    for nome in ('inicio', 'fim'):
+        if args.get(nome):
+            try:
+                filtros[nome] = datetime.fromisoformat(args[nome])
+            except ValueError:
+                raise ValueError(f"'{nome}' deve ser uma data/hora ISO 8601 (ex.: 2024-03-04T08:00)")
+    if args.get('id_aluno'):
+        if not args['id_aluno'].isdigit():
+            raise ValueError("'id_aluno' deve ser numérico")
+        filtros['id_aluno'] = int(args['id_aluno'])
+    if args.get('camera'):
+        filtros['local'] = descrever_local(args['camera'])
+    elif args.get('local'):
+        filtros['local'] = args['local']
+    return filtros
+
+def _cursor_presencas(sessao):
+    """Cursor opaco da paginação: a chave (inicio, id_sessao) da última sessão da página."""
+    chave = f"{sessao['inicio'].isoformat()}|{sessao['id_sessao']}"
+    return base64.urlsafe_b64encode(chave.encode()).decode()
+
+def _ler_cursor_presencas(cursor):
+    try:
+        inicio, id_sessao = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(inicio), int(id_sessao)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("'cursor' inválido")
+
+def _serializar_sessao(sessao):
+    return {
+        'id_sessao': sessao['id_sessao'],
+        'id_aluno': sessao['id_aluno'],
+        'local': sessao['local'],
+        'inicio': sessao['inicio'].isoformat(),
+        'fim': sessao['fim'].isoformat(),
+        'duracao_segundos': int((sessao['fim'] - sessao['inicio']).total_seconds()),
+        'deteccoes': sessao['deteccoes'],
+    }
+
+@app.route('/api/presencas')
+def get_presencas():
+    """Sessões de presença filtradas por período, aluno e câmera, paginadas por cursor (`proximo`)."""
+    try:
+        filtros = _filtros_presencas(request.args)
+        limite = min(max(int(request.args.get('limite', PRESENCAS_LIMITE_PADRAO)), 1), PRESENCAS_LIMITE_MAXIMO)
+        apos = _ler_cursor_presencas(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        # Uma linha a mais indica se há próxima página sem precisar de COUNT
+        sessoes = listar_sessoes_presenca(apos=apos, limite=limite + 1, **filtros)
+    except Exception as e:
+        print(f"[ERRO /api/presencas] {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    proximo = _cursor_presencas(sessoes[limite - 1]) if len(sessoes) > limite else None
+    return jsonify({'success': True, 'sessoes': [_serializar_sessao(s) for s in sessoes[:limite]], 'proximo': proximo})
+
+def _linhas_csv(linhas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS_SESSAO)
+    for linha in linhas:
+        escritor.writerow(linha)
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _linhas_ndjson(linhas):
+    pedaco = []
+    for linha in linhas:
+        sessao = dict(zip(COLUNAS_SESSAO, linha))
+        pedaco.append(json.dumps(_serializar_sessao(sessao), ensure_ascii=False))
+        if len(pedaco) >= 500:
+            yield "\n".join(pedaco) + "\n"
+            pedaco = []
+    if pedaco:
+        yield "\n".join(pedaco) + "\n"
+
+@app.route('/api/presencas/exportar')
+def exportar_presencas():
+    """Exporta as sessões filtradas em CSV ou NDJSON (`formato`), transmitidas à medida que são lidas do banco.
+
+    Com `arquivo=1` inclui as sessões arquivadas. A memória usada não depende do tamanho do período.
+    """
+    try:
+        filtros = _filtros_presencas(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    formato = request.args.get('formato', 'csv')
+    if formato not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'error': "'formato' deve ser 'csv' ou 'ndjson'"}), 400
+
+    linhas = exportar_sessoes_presenca(incluir_arquivo=request.args.get('arquivo') == '1', **filtros)
+    try:
+        # A conexão é aberta na primeira linha: lida aqui, uma falha no banco ainda vira resposta de erro
+        primeira = next(linhas, None)
+    except Exception as e:
+        print(f"[ERRO /api/presencas/exportar] {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    if primeira is not None:
+        linhas = itertools.chain([primeira], linhas)
+    if formato == 'csv':
+        corpo, tipo = _linhas_csv(linhas), 'text/csv; charset=utf-8'
+    else:
+        corpo, tipo = _linhas_ndjson(linhas), 'application/x-ndjson; charset=utf-8'
+    nome = f"presencas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+    return Response(stream_with_context(corpo), mimetype=tipo,
+                    headers={'Content-Disposition': f'attachment; filename="{nome}"'})
+
+# Painéis de presença, servidos pelos resumos diários (sem ler as sessões)
+RESUMO_DIAS_MAXIMO = 366
+
+def _periodo_resumo(args):
+    """(inicio, fim) em dias, dos parâmetros `inicio`/`fim` (AAAA-MM-DD); padrão: os últimos 30 dias."""
+    try:
+        fim = date.fromisoformat(args['fim']) if args.get('fim') else date.today()
+        inicio = date.fromisoformat(args['inicio']) if args.get('inicio') else fim - timedelta(days=29)
+    except ValueError:
+        raise ValueError("'inicio' e 'fim' devem ser datas no formato AAAA-MM-DD")
+    if inicio > fim:
+        raise ValueError("'inicio' deve ser anterior a 'fim'")
+    if (fim - inicio).days >= RESUMO_DIAS_MAXIMO:
+        raise ValueError(f"O período pode ter no máximo {RESUMO_DIAS_MAXIMO} dias")
+    return inicio, fim
+
+def _dia_resumo(args):
+    try:
+        return date.fromisoformat(args['dia']) if args.get('dia') else date.today()
+    except ValueError:
+        raise ValueError("'dia' deve ser uma data no formato AAAA-MM-DD")
+
+def _serializar_resumo(linha):
+    return {chave: valor.isoformat() if isinstance(valor, (date, datetime)) else valor for chave, valor in linha.items()}
+
+def _resposta_resumo(consulta, chave, parametros, completar=None):
+    try:
+        argumentos = parametros(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        linhas = consulta(*argumentos)
+    except Exception as e:
+        print(f"[ERRO {request.path}] {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    linhas = [_serializar_resumo(linha) for linha in linhas]
+    if completar:
+        for linha in linhas:
+            completar(linha)
+    return jsonify({'success': True, chave: linhas})
+
+def _taxa_presenca(dia):
+    cadastrados = dia['alunos_cadastrados']
+    dia['taxa_presenca'] = round(dia['alunos_presentes'] / cadastrados, 4) if cadastrados else None
+
+@app.route('/api/presencas/resumo/diario')
+def get_resumo_diario():
+    """Alunos presentes, cadastrados, taxa de presença e atrasos de cada dia do período."""
+    return _resposta_resumo(listar_resumo_diario, 'dias', _periodo_resumo, _taxa_presenca)
+
+@app.route('/api/presencas/resumo/alunos/<int:id_aluno>')
+def get_resumo_aluno(id_aluno):
+    """Chegada, saída, sessões e tempo presente do aluno em cada dia do período."""
+    return _resposta_resumo(listar_resumo_aluno, 'dias', lambda args: (id_aluno,) + _periodo_resumo(args))
+
+@app.route('/api/presencas/resumo/locais')
+def get_resumo_locais():
+    """Alunos distintos, sessões e tempo de presença de cada câmera no dia."""
+    return _resposta_resumo(listar_resumo_locais, 'locais', lambda args: (_dia_resumo(args),))
+
+@app.route('/api/presencas/resumo/atrasos')
+def get_resumo_atrasos():
+    """Alunos que chegaram depois do horário de entrada no dia."""
+    return _resposta_resumo(listar_atrasos, 'atrasos', lambda args: (_dia_resumo(args),))
+
 @app.route('/api/monitoramento/start', methods=['POST'])
 def start_monitoring_pt():
     return start_monitoring()
@@ -585,6 +780,14 @@ def start_monitoring():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/monitoring/metricas')
+def monitoring_metricas():
+    """Atraso dos frames, latência captura→decisão do reconhecimento, uso do banco e caixa de saída de e-mails (segundos)."""
+    metricas = reconhecimento.obter_metricas()
+    metricas['banco'] = estatisticas_banco()
+    metricas['email'] = caixa_saida.estatisticas()
+    return jsonify(metricas)
+
 @app.route('/api/monitoring/stop', methods=['POST'])
 def stop_monitoring():
     try:
@@ -604,4 +807,5 @@ def stop_monitoring():
         return jsonify({'success': False, 'error': str(e)})
 
 if __name__ == '__main__':
+    caixa_saida.iniciar()  # reenvia os e-mails que ficaram pendentes na execução anterior
     socketio.run(app, debug=True, host='0.0.0.0', port=5000, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga da galeria: codificações em JSON (TEXT) contra o formato binário float32.
+
+Simula as linhas devolvidas pelo banco nos dois formatos e mede o volume transferido e o tempo
+para montar a GaleriaFacial a partir delas.
+
+Uso:
+    python benchmarks/benchmark_codificacoes.py --alunos 10000 --repeticoes 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from galeria import GaleriaFacial, codificacao_para_bytes, matriz_de_bytes
+
+
+def carregar_json(linhas):
+    """Caminho antigo: json.loads por linha, np.array por codificação e empilhamento na galeria."""
+    ids, codificacoes = [], []
+    for id_aluno, texto in linhas:
+        codificacoes.append(np.array(json.loads(texto)))
+        ids.append(str(id_aluno))
+    return GaleriaFacial(ids, codificacoes)
+
+
+def carregar_binario(linhas):
+    """Caminho novo: um único np.frombuffer sobre os buffers concatenados."""
+    ids = [str(id_aluno) for id_aluno, _buffer in linhas]
+    return GaleriaFacial(ids, matriz_de_bytes([buffer for _id, buffer in linhas]))
+
+
+def medir(funcao, linhas, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(linhas)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga das codificações faciais')
+    parser.add_argument('--alunos', type=int, default=10000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Mesma escala das codificações do face_recognition; tolist() reproduz o JSON gravado pelo cadastro
+    codificacoes = rng.normal(0.0, 0.1, (args.alunos, 128))
+    linhas_json = [(i, json.dumps(c.tolist())) for i, c in enumerate(codificacoes)]
+    linhas_binarias = [(i, codificacao_para_bytes(c)) for i, c in enumerate(codificacoes)]
+
+    bytes_json = sum(len(texto.encode('utf-8')) for _id, texto in linhas_json)
+    bytes_binario = sum(len(buffer) for _id, buffer in linhas_binarias)
+    ms_json = medir(carregar_json, linhas_json, args.repeticoes)
+    ms_binario = medir(carregar_binario, linhas_binarias, args.repeticoes)
+
+    print(f"Galeria: {args.alunos} alunos (melhor de {args.repeticoes} execuções)")
+    print(f"{'formato':<12}{'MB transferidos':>18}{'bytes/aluno':>14}{'carga (ms)':>13}")
+    print(f"{'json':<12}{bytes_json / 1e6:>18.2f}{bytes_json / args.alunos:>14.0f}{ms_json:>13.1f}")
+    print(f"{'binário':<12}{bytes_binario / 1e6:>18.2f}{bytes_binario / args.alunos:>14.0f}{ms_binario:>13.1f}")
+    print(f"Redução: {bytes_json / bytes_binario:.1f}x no volume, {ms_json / ms_binario:.1f}x no tempo de carga")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark do diário da caixa de saída: uma transação (fsync) por e-mail contra gravações agrupadas.
+
+Mede o tempo para tornar duráveis N alertas enfileirados de uma vez e quantas transações isso custou.
+
+Uso:
+    python benchmarks/benchmark_diario_emails.py --emails 2000
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caixa_saida import EmailPendente
+from diario_emails import DiarioEmails
+
+
+def medir(emails, agrupado):
+    with tempfile.TemporaryDirectory() as diretorio:
+        diario = DiarioEmails(os.path.join(diretorio, 'caixa_saida.db'))
+        diario.abrir()
+        gravados = threading.Semaphore(0)
+        inicio = time.perf_counter()
+        for n in range(1, emails + 1):
+            diario.registrar(EmailPendente(n, 'resp@email.com', f'Alerta {n}', 'Corpo'),
+                             ao_gravar=lambda _email: gravados.release())
+            if not agrupado:
+                diario.descarregar()  # caminho ingênuo: commit (e fsync) antes de devolver o controle
+        enfileirar = time.perf_counter() - inicio
+        for _ in range(emails):
+            gravados.acquire()
+        total = time.perf_counter() - inicio
+        lotes = diario.estatisticas()['lotes']
+        diario.fechar()
+    return enfileirar, total, lotes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do diário da caixa de saída')
+    parser.add_argument('--emails', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{args.emails} alertas enfileirados de uma vez")
+    print(f"{'modo':<22}{'enfileirar (ms)':>17}{'duráveis (ms)':>16}{'transações':>12}")
+    for nome, agrupado in (('uma por e-mail', False), ('agrupado (50 ms/500)', True)):
+        enfileirar, total, lotes = medir(args.emails, agrupado)
+        print(f"{nome:<22}{enfileirar * 1000:>17.1f}{total * 1000:>16.1f}{lotes:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark do envio de frames da câmera pelo Socket.IO: JPEG em base64 dentro do JSON contra anexo binário.
+
+Mede, por espectador, os bytes que saem no WebSocket e o tempo de CPU do servidor para montar o pacote
+(base64 + serialização do Socket.IO), sem o imencode, que é igual nos dois modos.
+
+O frame é sintético (640x480, gradiente com ruído), no tamanho que o reconhecimento envia à interface.
+
+Uso:
+    python benchmarks/benchmark_frames_binarios.py --frames 2000 --fps 30
+"""
+import os
+import sys
+import time
+import base64
+import argparse
+from datetime import datetime
+
+import cv2
+import numpy as np
+from socketio import packet
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def frame_sintetico(largura=640, altura=480):
+    rng = np.random.default_rng(42)
+    x = np.linspace(0, 255, largura, dtype=np.float32)
+    y = np.linspace(0, 255, altura, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, (x + y) / 2, y + 0 * x], axis=2)
+    ruido = rng.normal(0, 12, (altura, largura, 3))
+    return np.clip(base + ruido, 0, 255).astype(np.uint8)
+
+
+def pacote_base64(frame_jpeg):
+    dados = {
+        'camera_id': 0,
+        'frame': base64.b64encode(frame_jpeg).decode('utf-8'),
+        'timestamp': datetime.now().isoformat()
+    }
+    return [packet.Packet(packet.EVENT, data=['camera_frame', dados], namespace='/').encode()]
+
+
+def pacote_binario(frame_jpeg):
+    dados = {
+        'camera_id': 0,
+        'timestamp': datetime.now().isoformat(),
+        'formato': 'jpeg',
+        'frame': frame_jpeg
+    }
+    return packet.Packet(packet.EVENT, data=['camera_frame', dados], namespace='/').encode()
+
+
+def bytes_no_fio(mensagens):
+    # Cada mensagem vira um frame WebSocket; texto ganha o prefixo '4' do Engine.IO, binário vai cru
+    total = 0
+    for mensagem in mensagens:
+        total += len(mensagem.encode('utf-8')) + 1 if isinstance(mensagem, str) else len(mensagem)
+    return total
+
+
+def medir(montar, frame_jpeg, frames):
+    mensagens = montar(frame_jpeg)
+    inicio = time.process_time()
+    for _ in range(frames):
+        montar(frame_jpeg)
+    return (time.process_time() - inicio) / frames, bytes_no_fio(mensagens), len(mensagens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do envio de frames binários')
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--qualidade', type=int, default=80)
+    args = parser.parse_args()
+
+    _, buffer = cv2.imencode('.jpg', frame_sintetico(), [cv2.IMWRITE_JPEG_QUALITY, args.qualidade])
+    frame_jpeg = buffer.tobytes()
+
+    print(f"JPEG 640x480 q{args.qualidade}: {len(frame_jpeg) / 1024:.1f} KB; {args.frames} frames; {args.fps} fps")
+    print(f"{'modo':<16}{'msgs':>6}{'KB/frame':>10}{'KB/s/espect.':>14}{'CPU µs/frame':>14}{'CPU %/espect.':>15}")
+    for nome, montar in (('base64 JSON', pacote_base64), ('binário', pacote_binario)):
+        cpu, tamanho, mensagens = medir(montar, frame_jpeg, args.frames)
+        print(f"{nome:<16}{mensagens:>6}{tamanho / 1024:>10.1f}{tamanho * args.fps / 1024:>14.0f}"
+              f"{cpu * 1e6:>14.0f}{cpu * args.fps * 100:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark de recall/latência do índice aproximado contra a varredura exata da galeria.
+
+Uso:
+    python benchmarks/benchmark_indice.py --alunos 50000 --consultas 500 --sondagens 4 8 16
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from galeria import GaleriaFacial
+from indice_aproximado import IndiceAproximado
+
+
+def gerar_codificacoes(n, dimensao=128, grupos=500, semente=0):
+    """Gera codificações sintéticas agrupadas, com escala semelhante às do face_recognition."""
+    rng = np.random.default_rng(semente)
+    centros = rng.normal(0.0, 0.09, (grupos, dimensao))
+    rotulos = rng.integers(0, grupos, n)
+    return (centros[rotulos] + rng.normal(0.0, 0.04, (n, dimensao))).astype(np.float32)
+
+
+def medir(comparador, consultas):
+    inicio = time.perf_counter()
+    resultados = [comparador.comparar(consulta[None, :])[0] for consulta in consultas]
+    return resultados, (time.perf_counter() - inicio) / len(consultas) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do índice aproximado de codificações faciais')
+    parser.add_argument('--alunos', type=int, default=50000)
+    parser.add_argument('--consultas', type=int, default=500)
+    parser.add_argument('--listas', type=int, default=None, help='Número de listas do IVF (padrão: raiz de N)')
+    parser.add_argument('--sondagens', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--ruido', type=float, default=0.02, help='Ruído somado às consultas')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    codificacoes = gerar_codificacoes(args.alunos)
+    alvos = rng.choice(args.alunos, args.consultas, replace=False)
+    consultas = codificacoes[alvos] + rng.normal(0.0, args.ruido, (args.consultas, codificacoes.shape[1])).astype(np.float32)
+
+    galeria = GaleriaFacial(range(args.alunos), codificacoes)
+    exatos, ms_exato = medir(galeria, consultas)
+    print(f"Galeria: {args.alunos} alunos, {args.consultas} consultas")
+    print(f"{'método':<28}{'recall@1':>10}{'ms/consulta':>14}{'aceleração':>12}")
+    print(f"{'exato':<28}{1.0:>10.3f}{ms_exato:>14.3f}{1.0:>11.1f}x")
+
+    inicio = time.perf_counter()
+    indice = IndiceAproximado(galeria, n_listas=args.listas)
+    print(f"(treino do índice com {indice.n_listas} listas: {time.perf_counter() - inicio:.2f}s)")
+
+    for sondagens in args.sondagens:
+        indice.n_sondagens = sondagens
+        aproximados, ms = medir(indice, consultas)
+        recall = np.mean([a.indice == e.indice for a, e in zip(aproximados, exatos)])
+        print(f"{f'aproximado (sondagens={sondagens})':<28}{recall:>10.3f}{ms:>14.3f}{ms_exato / ms:>11.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,14 @@ import json
 import mysql.connector
 from mysql.connector import Error
 import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from galeria import MODELO_CODIFICACAO, TAMANHO_BINARIO, codificacao_para_bytes, matriz_de_bytes
+from metricas import JanelaMetricas
 
 # --- CONFIGURAÇÃO DO BANCO DE DADOS ---
 DB_CONFIG = {
@@ -14,8 +22,189 @@ DB_CONFIG = {
     'password': 'root',
     'database': 'mydb'
 }
+# Conexões mantidas abertas e reaproveitadas entre chamadas
+POOL_TAMANHO = int(os.getenv('MYSQL_POOL_TAMANHO', '5'))
+# Espera máxima por uma conexão livre quando todas estão em uso (s)
+POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', '10'))
+# Conexões ociosas há mais que isso são verificadas (ping) antes de serem entregues (s)
+POOL_VERIFICACAO = float(os.getenv('MYSQL_POOL_VERIFICACAO', '30'))
+# Horário de entrada (HH:MM); a primeira chegada do dia depois dele conta como atraso nos resumos diários
+HORARIO_ENTRADA = os.getenv('PRESENCAS_HORARIO_ENTRADA', '07:30')
+
+
+class _ConexaoPool:
+    """Conexão emprestada do pool; `close()` a devolve em vez de encerrá-la."""
+
+    def __init__(self, pool, conexao, operacao):
+        self._pool = pool
+        self.conexao = conexao
+        self.operacao = operacao
+        self.inicio = time.perf_counter()
+        self._devolvida = False
+
+    def __getattr__(self, nome):
+        return getattr(self.conexao, nome)
+
+    def close(self):
+        if not self._devolvida:
+            self._devolvida = True
+            self._pool.devolver(self)
+
+
+class PoolConexoes:
+    """Pool limitado de conexões MySQL com verificação de saúde e reconexão.
+
+    No máximo `tamanho` conexões existem ao mesmo tempo; quem pede uma conexão com todas em uso
+    espera até `timeout` segundos. Conexões ociosas há mais de `intervalo_verificacao` recebem um
+    ping antes de serem entregues e são reabertas se o servidor as derrubou. As devolvidas com
+    transação pendente sofrem rollback; as quebradas são descartadas.
+    """
+
+    def __init__(self, config, tamanho=5, timeout=10.0, intervalo_verificacao=30.0):
+        self.config = dict(config)
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self.intervalo_verificacao = intervalo_verificacao
+        self._vagas = threading.BoundedSemaphore(tamanho)
+        self._lock = threading.Lock()
+        self._livres = []  # (conexão, horário da devolução); a mais recente é reaproveitada primeiro
+        self._em_uso = 0
+        self.contadores = {'abertas': 0, 'fechadas': 0, 'reconexoes': 0, 'reaproveitadas': 0, 'esgotado': 0}
+        self.espera = JanelaMetricas()  # tempo até obter uma conexão (s)
+        self.latencias = {}  # operação -> JanelaMetricas do tempo com a conexão emprestada (s)
+
+    def _abrir(self):
+        try:
+            conexao = mysql.connector.connect(**self.config)
+        except Error as e:
+            raise RuntimeError(f"Erro ao conectar ao MySQL: {str(e)}")
+        with self._lock:
+            self.contadores['abertas'] += 1
+        return conexao
+
+    def _fechar(self, conexao):
+        try:
+            conexao.close()
+        except Exception:
+            pass
+        with self._lock:
+            self.contadores['fechadas'] += 1
+
+    def _saudavel(self, conexao, ociosa_desde):
+        if time.monotonic() - ociosa_desde < self.intervalo_verificacao:
+            return True
+        try:
+            conexao.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def obter(self, operacao=None):
+        inicio = time.perf_counter()
+        if not self._vagas.acquire(timeout=self.timeout):
+            with self._lock:
+                self.contadores['esgotado'] += 1
+            raise RuntimeError(f"Erro ao conectar ao MySQL: nenhuma conexão livre no pool após {self.timeout}s.")
+        try:
+            conexao = None
+            while conexao is None:
+                with self._lock:
+                    livre = self._livres.pop() if self._livres else None
+                if livre is None:
+                    conexao = self._abrir()
+                elif self._saudavel(*livre):
+                    conexao = livre[0]
+                    with self._lock:
+                        self.contadores['reaproveitadas'] += 1
+                else:
+                    # O servidor derrubou a conexão ociosa (wait_timeout, reinício): descarta e tenta a próxima
+                    self._fechar(livre[0])
+                    with self._lock:
+                        self.contadores['reconexoes'] += 1
+        except BaseException:
+            self._vagas.release()
+            raise
+        with self._lock:
+            self._em_uso += 1
+        self.espera.registrar(time.perf_counter() - inicio)
+        return _ConexaoPool(self, conexao, operacao)
+
+    def devolver(self, emprestada):
+        conexao = emprestada.conexao
+        duracao = time.perf_counter() - emprestada.inicio
+        try:
+            if getattr(conexao, 'in_transaction', False) is True:
+                conexao.rollback()
+            reaproveitar = conexao.is_connected() is not False
+        except Exception:
+            reaproveitar = False
+        with self._lock:
+            self._em_uso -= 1
+            if emprestada.operacao is not None:
+                janela = self.latencias.get(emprestada.operacao)
+                if janela is None:
+                    janela = self.latencias[emprestada.operacao] = JanelaMetricas()
+            else:
+                janela = None
+            if reaproveitar:
+                self._livres.append((conexao, time.monotonic()))
+        if janela is not None:
+            janela.registrar(duracao)
+        if not reaproveitar:
+            self._fechar(conexao)
+        self._vagas.release()
+
+    @contextmanager
+    def conexao_dedicada(self):
+        """Conexão própria, fora do limite do pool, fechada ao sair do bloco.
+
+        Para leituras longas (cursor sem buffer) que não devem segurar uma vaga do pool; RuntimeError
+        se o banco estiver inacessível.
+        """
+        conexao = self._abrir()
+        try:
+            yield conexao
+        finally:
+            self._fechar(conexao)
+
+    def fechar_todas(self):
+        """Fecha as conexões ociosas (as emprestadas são fechadas ao serem devolvidas)."""
+        with self._lock:
+            livres, self._livres = self._livres, []
+        for conexao, _ociosa_desde in livres:
+            self._fechar(conexao)
+
+    def estatisticas(self):
+        with self._lock:
+            resumo = {
+                'tamanho': self.tamanho,
+                'em_uso': self._em_uso,
+                'livres': len(self._livres),
+                **self.contadores,
+            }
+            latencias = dict(self.latencias)
+        resumo['espera'] = self.espera.resumo()
+        resumo['operacoes'] = {operacao: janela.resumo() for operacao, janela in latencias.items()}
+        return resumo
+
+
+_pool = PoolConexoes(DB_CONFIG, POOL_TAMANHO, POOL_TIMEOUT, POOL_VERIFICACAO)
+
 
 def conectar_mysql():
+    """Empresta uma conexão do pool; `close()` a devolve.
+
+    O tempo de uso é registrado sob o nome da função que pediu a conexão.
+    """
+    return _pool.obter(operacao=sys._getframe(1).f_code.co_name)
+
+
+def estatisticas_banco():
+    """Métricas do pool de conexões: uso, abertura/fechamento de conexões e latência por operação."""
+    return _pool.estatisticas()
+
+
+def criar_banco_se_nao_existir():
     try:
         conn_init = mysql.connector.connect(
             host=DB_CONFIG['host'],
@@ -26,8 +215,6 @@ def conectar_mysql():
         cursor_init.execute(f"CREATE DATABASE IF NOT EXISTS `{DB_CONFIG['database']}` DEFAULT CHARACTER SET utf8;")
         cursor_init.close()
         conn_init.close()
-        conn = mysql.connector.connect(**DB_CONFIG)
-        return conn
     except Error as e:
         raise RuntimeError(f"Erro ao conectar ao MySQL: {str(e)}")
 
@@ -37,7 +224,9 @@ def criar_tabelas_se_nao_existir(conn):
     CREATE TABLE IF NOT EXISTS alunos (
         Id INT NOT NULL,
         Nome VARCHAR(90) NOT NULL,
-        codificacao_facial TEXT NOT NULL,
+        codificacao_facial TEXT NULL,
+        codificacao_binaria VARBINARY(512) NULL,
+        modelo_codificacao VARCHAR(40) NULL,
         PRIMARY KEY (Id)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
     ''')
@@ -54,6 +243,86 @@ def criar_tabelas_se_nao_existir(conn):
             ON DELETE CASCADE ON UPDATE CASCADE
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
     ''')
+    # Presença guardada como intervalos (primeira e última detecção do aluno no local), não uma linha por
+    # detecção. A chave única começa por (id_aluno, inicio) e serve às consultas por aluno e período; as
+    # consultas por sala usam (local, inicio) e as só por período, ou sem filtro, (inicio, id_sessao), que é
+    # também a ordem das páginas da listagem. Sessões não atravessam a meia-noite
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sessoes_presenca (
+        id_sessao BIGINT NOT NULL AUTO_INCREMENT,
+        id_aluno INT NOT NULL,
+        local VARCHAR(90) NOT NULL,
+        inicio DATETIME NOT NULL,
+        fim DATETIME NOT NULL,
+        deteccoes INT NOT NULL DEFAULT 1,
+        PRIMARY KEY (id_sessao),
+        UNIQUE KEY uq_sessao_aluno_inicio (id_aluno, inicio, local),
+        INDEX idx_sessao_local_inicio (local, inicio),
+        INDEX idx_sessao_inicio (inicio, id_sessao),
+        CONSTRAINT fk_sessoes_alunos FOREIGN KEY (id_aluno)
+            REFERENCES alunos (Id)
+            ON DELETE CASCADE ON UPDATE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+    ''')
+    # Sessões antigas, movidas por arquivar_sessoes_presenca (sem chave estrangeira: o histórico fica
+    # mesmo se o aluno for excluído)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sessoes_presenca_arquivo (
+        id_sessao BIGINT NOT NULL,
+        id_aluno INT NOT NULL,
+        local VARCHAR(90) NOT NULL,
+        inicio DATETIME NOT NULL,
+        fim DATETIME NOT NULL,
+        deteccoes INT NOT NULL DEFAULT 1,
+        PRIMARY KEY (id_sessao),
+        INDEX idx_arquivo_aluno_inicio (id_aluno, inicio),
+        INDEX idx_arquivo_local_inicio (local, inicio),
+        INDEX idx_arquivo_inicio (inicio, id_sessao)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+    ''')
+    # Tabelas criadas antes do índice por período
+    for tabela, indice in (('sessoes_presenca', 'idx_sessao_inicio'),
+                           ('sessoes_presenca_arquivo', 'idx_arquivo_inicio')):
+        if indice not in _indices_tabela(cursor, tabela):
+            cursor.execute(f"ALTER TABLE {tabela} ADD INDEX {indice} (inicio, id_sessao)")
+    # Resumos diários mantidos a partir das sessões (atualizar_resumos_diarios), para os painéis não
+    # lerem as sessões a cada consulta
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS resumo_diario_aluno (
+        dia DATE NOT NULL,
+        id_aluno INT NOT NULL,
+        primeira_chegada DATETIME NOT NULL,
+        ultima_saida DATETIME NOT NULL,
+        sessoes INT NOT NULL,
+        segundos INT NOT NULL,
+        PRIMARY KEY (dia, id_aluno),
+        INDEX idx_resumo_aluno_dia (id_aluno, dia)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS resumo_diario_local (
+        dia DATE NOT NULL,
+        local VARCHAR(90) NOT NULL,
+        alunos INT NOT NULL,
+        sessoes INT NOT NULL,
+        segundos INT NOT NULL,
+        primeira_chegada DATETIME NOT NULL,
+        ultima_saida DATETIME NOT NULL,
+        PRIMARY KEY (dia, local)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS resumo_diario (
+        dia DATE NOT NULL,
+        alunos_presentes INT NOT NULL,
+        alunos_cadastrados INT NULL,
+        atrasados INT NOT NULL,
+        PRIMARY KEY (dia)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+    ''')
+    # alunos_cadastrados NULL = desconhecido (dia reconstruído do histórico sem resumo anterior)
+    if not _colunas_tabela(cursor, 'resumo_diario').get('alunos_cadastrados', True):
+        cursor.execute("ALTER TABLE resumo_diario MODIFY alunos_cadastrados INT NULL")
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS responsavel (
         id_responsavel INT NOT NULL AUTO_INCREMENT,
@@ -67,15 +336,119 @@ def criar_tabelas_se_nao_existir(conn):
             ON DELETE CASCADE ON UPDATE CASCADE
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
     ''')
+    # Contador de alterações da galeria (inclusões, exclusões e trocas de foto); permite saber se o
+    # snapshot local das codificações ainda vale sem ler a tabela de alunos
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS versao_galeria (
+        id TINYINT NOT NULL,
+        versao BIGINT NOT NULL,
+        PRIMARY KEY (id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+    ''')
+    cursor.execute("INSERT IGNORE INTO versao_galeria (id, versao) VALUES (1, 0)")
     conn.commit()
     cursor.close()
 
+def _incrementar_versao_galeria(cursor):
+    """Marca a galeria como alterada; deve rodar na mesma transação da alteração."""
+    cursor.execute("UPDATE versao_galeria SET versao = versao + 1 WHERE id = 1")
+
+def obter_versao_galeria():
+    """Valor atual do contador de alterações da galeria."""
+    conn = conectar_mysql()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT versao FROM versao_galeria WHERE id = 1")
+        linha = cursor.fetchone()
+        return int(linha[0]) if linha else 0
+    finally:
+        cursor.close()
+        conn.close()
+
+def _colunas_tabela(cursor, tabela):
+    """Colunas da tabela -> True se a coluna aceita NULL."""
+    cursor.execute(
+        "SELECT COLUMN_NAME, IS_NULLABLE FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (tabela,)
+    )
+    return {linha[0].lower(): linha[1] == 'YES' for linha in cursor.fetchall()}
+
+def _indices_tabela(cursor, tabela):
+    cursor.execute(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (tabela,)
+    )
+    return {linha[0].lower() for linha in cursor.fetchall()}
+
+def migrar_codificacoes_binarias(conn, tamanho_lote=500):
+    """Converte as codificações em JSON (TEXT) para a coluna binária, em lotes.
+
+    Cria as colunas novas se a tabela for anterior a elas. Cada lote é confirmado separadamente e
+    percorrido pela chave primária, então a migração pode ser interrompida e retomada. O JSON de cada
+    linha convertida é apagado; linhas com JSON inválido ficam como estão. Retorna o total convertido.
+    """
+    cursor = conn.cursor()
+    try:
+        colunas = _colunas_tabela(cursor, 'alunos')
+        if 'codificacao_binaria' not in colunas:
+            cursor.execute("ALTER TABLE alunos ADD COLUMN codificacao_binaria VARBINARY(512) NULL")
+        if 'modelo_codificacao' not in colunas:
+            cursor.execute("ALTER TABLE alunos ADD COLUMN modelo_codificacao VARCHAR(40) NULL")
+        if not colunas.get('codificacao_facial', True):
+            # Só em tabelas anteriores à migração: o ALTER bloqueia a tabela de alunos
+            cursor.execute("ALTER TABLE alunos MODIFY codificacao_facial TEXT NULL")
+
+        convertidos, ultimo_id = 0, None
+        while True:
+            if ultimo_id is None:
+                cursor.execute(
+                    "SELECT Id, codificacao_facial FROM alunos WHERE codificacao_binaria IS NULL "
+                    "AND codificacao_facial IS NOT NULL ORDER BY Id LIMIT %s", (tamanho_lote,)
+                )
+            else:
+                cursor.execute(
+                    "SELECT Id, codificacao_facial FROM alunos WHERE codificacao_binaria IS NULL "
+                    "AND codificacao_facial IS NOT NULL AND Id > %s ORDER BY Id LIMIT %s", (ultimo_id, tamanho_lote)
+                )
+            linhas = cursor.fetchall()
+            if not linhas:
+                break
+            ultimo_id = linhas[-1][0]
+
+            atualizacoes = []
+            for id_aluno, texto in linhas:
+                try:
+                    atualizacoes.append((codificacao_para_bytes(json.loads(texto)), MODELO_CODIFICACAO, id_aluno))
+                except (json.JSONDecodeError, TypeError, ValueError) as e:
+                    print(f"[AVISO] Codificação facial do aluno {id_aluno} não pôde ser migrada: {e}")
+            if atualizacoes:
+                cursor.executemany(
+                    "UPDATE alunos SET codificacao_binaria = %s, modelo_codificacao = %s, "
+                    "codificacao_facial = NULL WHERE Id = %s", atualizacoes
+                )
+                _incrementar_versao_galeria(cursor)
+            conn.commit()
+            convertidos += len(atualizacoes)
+
+        if convertidos:
+            print(f"[INFO] {convertidos} codificação(ões) facial(is) migrada(s) para o formato binário.")
+        return convertidos
+    finally:
+        cursor.close()
+
+# Criação do banco, das tabelas e migrações: uma única vez, na importação do módulo
+conn_tmp = None
 try:
+    criar_banco_se_nao_existir()
     conn_tmp = conectar_mysql()
     criar_tabelas_se_nao_existir(conn_tmp)
-    conn_tmp.close()
-except RuntimeError as e:
+    migrar_codificacoes_binarias(conn_tmp)
+except (RuntimeError, Error) as e:
     print(f"ERRO CRÍTICO: Não foi possível inicializar o banco de dados. Verifique a configuração em `cadastro.py`. Detalhes: {e}")
+finally:
+    if conn_tmp is not None:
+        conn_tmp.close()
 
 
 def listar_cameras_disponiveis():
@@ -134,10 +507,9 @@ def cadastrar_aluno(id_aluno, nome, frame, resp_telefone=None, resp_email=None):
     conn = conectar_mysql()
     cursor = conn.cursor()
     try:
-        codificacao_json = json.dumps(codificacao_facial)
         cursor.execute(
-            "INSERT INTO alunos (Id, Nome, codificacao_facial) VALUES (%s, %s, %s)",
-            (id_aluno, nome, codificacao_json)
+            "INSERT INTO alunos (Id, Nome, codificacao_binaria, modelo_codificacao) VALUES (%s, %s, %s, %s)",
+            (id_aluno, nome, codificacao_para_bytes(codificacao_facial), MODELO_CODIFICACAO)
         )
         # Se dados do responsável forem informados, cria o vínculo 1:1
         if resp_telefone and resp_email:
@@ -145,7 +517,9 @@ def cadastrar_aluno(id_aluno, nome, frame, resp_telefone=None, resp_email=None):
                 "INSERT INTO responsavel (id_aluno, telefone, email) VALUES (%s, %s, %s)",
                 (id_aluno, resp_telefone, resp_email)
             )
+        _incrementar_versao_galeria(cursor)
         conn.commit()
+        return codificacao_facial
     except mysql.connector.IntegrityError:
         conn.rollback()
         raise ValueError(f"O ID '{id_aluno}' já existe no sistema.")
@@ -154,12 +528,13 @@ def cadastrar_aluno(id_aluno, nome, frame, resp_telefone=None, resp_email=None):
         conn.close()
 
 def listar_alunos():
+    """Lista os alunos com os dados do responsável (sem as codificações faciais; veja listar_codificacoes)."""
     conn = conectar_mysql()
     cursor = conn.cursor(dictionary=True)
     try:
         cursor.execute(
             """
-            SELECT a.Id, a.Nome, a.codificacao_facial,
+            SELECT a.Id, a.Nome,
                    r.telefone AS resp_telefone, r.email AS resp_email
             FROM alunos a
             LEFT JOIN responsavel r ON r.id_aluno = a.Id
@@ -167,24 +542,8 @@ def listar_alunos():
             """
         )
         alunos = cursor.fetchall()
-        
-        # Processa cada aluno, tratando possíveis erros na codificação facial
-        alunos_processados = []
-        for aluno in alunos:
-            try:
-                # Tenta fazer parse da codificação facial (pode falhar se estiver corrompida)
-                if aluno.get('codificacao_facial'):
-                    aluno['codificacao_facial'] = json.loads(aluno['codificacao_facial'])
-                alunos_processados.append(aluno)
-            except (json.JSONDecodeError, TypeError) as e:
-                # Se houver erro ao fazer parse, mantém o aluno mas loga o erro
-                print(f"[AVISO] Erro ao processar codificação facial do aluno {aluno.get('Id')}: {e}")
-                # Remove a codificação facial corrompida para evitar problemas
-                aluno['codificacao_facial'] = None
-                alunos_processados.append(aluno)
-        
-        print(f"[CADASTRO] Listados {len(alunos_processados)} aluno(s) do banco de dados")
-        return alunos_processados
+        print(f"[CADASTRO] Listados {len(alunos)} aluno(s) do banco de dados")
+        return alunos
     except Exception as e:
         print(f"[ERRO] Erro ao listar alunos: {e}")
         raise
@@ -192,12 +551,59 @@ def listar_alunos():
         cursor.close()
         conn.close()
 
+def listar_codificacoes():
+    """Retorna (ids, matriz float32 (N, 128), responsaveis) com as codificações de todos os alunos.
+
+    A matriz é montada de uma vez a partir dos buffers binários. Linhas ainda não migradas são lidas
+    do JSON; codificações de outro modelo ou corrompidas são ignoradas com aviso. `responsaveis` mapeia
+    o ID (str) dos alunos que têm responsável para {'telefone', 'email'}.
+    """
+    conn = conectar_mysql()
+    cursor = conn.cursor()
+    try:
+        # O JSON só é transferido para as linhas que ainda não têm a versão binária
+        cursor.execute(
+            """
+            SELECT a.Id, a.codificacao_binaria, a.modelo_codificacao,
+                   CASE WHEN a.codificacao_binaria IS NULL THEN a.codificacao_facial END,
+                   r.telefone, r.email
+            FROM alunos a
+            LEFT JOIN responsavel r ON r.id_aluno = a.Id
+            ORDER BY a.Id
+            """
+        )
+        ids, buffers, responsaveis = [], [], {}
+        for id_aluno, binaria, modelo, texto, telefone, email in cursor.fetchall():
+            if telefone is not None or email is not None:
+                responsaveis[str(id_aluno)] = {'telefone': telefone, 'email': email}
+            try:
+                if binaria is not None:
+                    if modelo != MODELO_CODIFICACAO:
+                        print(f"[AVISO] Codificação do aluno {id_aluno} gerada por outro modelo ({modelo}), ignorando.")
+                        continue
+                    buffer = bytes(binaria)
+                    if len(buffer) != TAMANHO_BINARIO:
+                        raise ValueError(f"{len(buffer)} bytes, esperado {TAMANHO_BINARIO}")
+                else:
+                    buffer = codificacao_para_bytes(json.loads(texto))
+            except (json.JSONDecodeError, TypeError, ValueError) as e:
+                print(f"[AVISO] Codificação facial inválida para o aluno {id_aluno}, ignorando: {e}")
+                continue
+            ids.append(str(id_aluno))
+            buffers.append(buffer)
+        return ids, matriz_de_bytes(buffers), responsaveis
+    finally:
+        cursor.close()
+        conn.close()
+
 def editar_aluno(id_aluno, novo_nome, frame=None, resp_telefone=None, resp_email=None):
+    """Atualiza o aluno; retorna a nova codificação facial quando uma foto é enviada (senão None)."""
     if not novo_nome:
         raise ValueError("O novo nome é obrigatório.")
         
     conn = conectar_mysql()
     cursor = conn.cursor()
+    codificacao = None
     try:
         if frame is not None:
             # Valida imagem antes de processar
@@ -214,8 +620,9 @@ def editar_aluno(id_aluno, novo_nome, frame=None, resp_telefone=None, resp_email
                 raise RuntimeError("Nenhum rosto detectado na nova imagem.")
             
             cursor.execute(
-                "UPDATE alunos SET Nome = %s, codificacao_facial = %s WHERE Id = %s",
-                (novo_nome, json.dumps(codificacao), id_aluno)
+                "UPDATE alunos SET Nome = %s, codificacao_binaria = %s, modelo_codificacao = %s, "
+                "codificacao_facial = NULL WHERE Id = %s",
+                (novo_nome, codificacao_para_bytes(codificacao), MODELO_CODIFICACAO, id_aluno)
             )
         else:
             cursor.execute(
@@ -257,7 +664,11 @@ def editar_aluno(id_aluno, novo_nome, frame=None, resp_telefone=None, resp_email
                     )
                 # Se apenas um dos campos vier sem existir registro, ignora para manter consistência
 
+        # Só a foto faz parte do snapshot da galeria; nome e responsável não
+        if codificacao is not None:
+            _incrementar_versao_galeria(cursor)
         conn.commit()
+        return codificacao
     finally:
         cursor.close()
         conn.close()
@@ -269,11 +680,356 @@ def excluir_aluno(id_aluno):
         cursor.execute("DELETE FROM alunos WHERE Id = %s", (id_aluno,))
         if cursor.rowcount == 0:
             raise ValueError(f"Aluno com ID {id_aluno} não encontrado para exclusão.")
+        _incrementar_versao_galeria(cursor)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def gravar_sessoes_presenca(sessoes):
+    """Grava sessões de presença [(id_aluno, local, inicio, fim, deteccoes)] num único comando.
+
+    Uma sessão já gravada (mesmo aluno, início e local) só tem o fim e as detecções atualizados, então
+    regravar a mesma sessão, ou uma versão mais antiga dela, não duplica nem encurta nada. Sessões de
+    alunos já excluídos são descartadas pela chave estrangeira (IGNORE) sem perder o resto do lote.
+    Retorna o número de linhas afetadas.
+    """
+    if not sessoes:
+        return 0
+    conn = conectar_mysql()
+    cursor = conn.cursor()
+    try:
+        valores = ", ".join(["(%s, %s, %s, %s, %s)"] * len(sessoes))
+        cursor.execute(
+            f"INSERT IGNORE INTO sessoes_presenca (id_aluno, local, inicio, fim, deteccoes) VALUES {valores} "
+            "ON DUPLICATE KEY UPDATE fim = GREATEST(fim, VALUES(fim)), "
+            "deteccoes = GREATEST(deteccoes, VALUES(deteccoes))",
+            [valor for sessao in sessoes for valor in sessao]
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+        conn.close()
+
+def listar_alunos_no_local(local, inicio, fim):
+    """IDs dos alunos com presença em `local` entre `inicio` e `fim` (datetimes).
+
+    Como nenhuma sessão atravessa a meia-noite, basta ler no índice (local, inicio) as sessões iniciadas
+    desde o começo do dia de `inicio`; o custo não cresce com o histórico.
+    """
+    conn = conectar_mysql()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT DISTINCT id_aluno FROM sessoes_presenca WHERE local = %s AND inicio >= %s AND inicio < %s "
+            "AND fim >= %s ORDER BY id_aluno",
+            (local, inicio.replace(hour=0, minute=0, second=0, microsecond=0), fim, inicio)
+        )
+        return [linha[0] for linha in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+COLUNAS_SESSAO = ('id_sessao', 'id_aluno', 'local', 'inicio', 'fim', 'deteccoes')
+
+def _filtros_sessoes(inicio=None, fim=None, id_aluno=None, local=None):
+    """Cláusula WHERE e parâmetros das sessões que se sobrepõem a [inicio, fim)."""
+    condicoes, parametros = [], []
+    if id_aluno is not None:
+        condicoes.append("id_aluno = %s")
+        parametros.append(id_aluno)
+    if local is not None:
+        condicoes.append("local = %s")
+        parametros.append(local)
+    if inicio is not None:
+        # Sessões não atravessam a meia-noite: o limite pelo dia mantém a leitura dentro do índice
+        condicoes.append("inicio >= %s AND fim >= %s")
+        parametros.extend([inicio.replace(hour=0, minute=0, second=0, microsecond=0), inicio])
+    if fim is not None:
+        condicoes.append("inicio < %s")
+        parametros.append(fim)
+    return (" WHERE " + " AND ".join(condicoes)) if condicoes else "", parametros
+
+def listar_sessoes_presenca(inicio=None, fim=None, id_aluno=None, local=None, apos=None, limite=100):
+    """Página de sessões de presença em ordem de (inicio, id_sessao), como dicionários.
+
+    `apos` é a chave (inicio, id_sessao) da última sessão da página anterior: a página seguinte
+    continua a partir dela pelo índice (paginação por chave), sem OFFSET, então o custo de cada
+    página não cresce com a posição no histórico.
+    """
+    where, parametros = _filtros_sessoes(inicio, fim, id_aluno, local)
+    if apos is not None:
+        where += (" AND " if where else " WHERE ") + "(inicio > %s OR (inicio = %s AND id_sessao > %s))"
+        parametros.extend([apos[0], apos[0], apos[1]])
+    conn = conectar_mysql()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"SELECT {', '.join(COLUNAS_SESSAO)} FROM sessoes_presenca{where} "
+            "ORDER BY inicio, id_sessao LIMIT %s", parametros + [limite]
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+def exportar_sessoes_presenca(inicio=None, fim=None, id_aluno=None, local=None, incluir_arquivo=False,
+                              tamanho_lote=1000):
+    """Iterador das sessões de presença (tuplas na ordem de COLUNAS_SESSAO) que não carrega o resultado inteiro.
+
+    Usa uma conexão própria, fora do pool, com cursor sem buffer: as linhas vêm do servidor
+    `tamanho_lote` por vez, à medida que são consumidas, e uma exportação longa não segura uma conexão
+    do pool. A conexão só é aberta quando a primeira linha é pedida (RuntimeError nesse momento se o
+    banco estiver inacessível) e é fechada quando o iterador termina ou é descartado; um iterador nunca
+    consumido não abre conexão. Com `incluir_arquivo`, as sessões arquivadas vêm antes.
+    """
+    where, parametros = _filtros_sessoes(inicio, fim, id_aluno, local)
+    tabelas = (['sessoes_presenca_arquivo'] if incluir_arquivo else []) + ['sessoes_presenca']
+    with _pool.conexao_dedicada() as conexao:
+        for tabela in tabelas:
+            cursor = conexao.cursor(buffered=False)
+            try:
+                cursor.execute(
+                    f"SELECT {', '.join(COLUNAS_SESSAO)} FROM {tabela}{where} ORDER BY inicio, id_sessao", parametros
+                )
+                while True:
+                    linhas = cursor.fetchmany(tamanho_lote)
+                    if not linhas:
+                        break
+                    for linha in linhas:
+                        yield linha
+            finally:
+                try:
+                    cursor.close()
+                except Error:
+                    pass  # exportação interrompida com linhas não lidas: a conexão é descartada abaixo
+
+def _horario_entrada(dia):
+    horas, minutos = (int(parte) for parte in HORARIO_ENTRADA.split(':'))
+    return datetime(dia.year, dia.month, dia.day, horas, minutos)
+
+def _recalcular_dia(cursor, dia, ids_alunos=None, locais=None, origem='sessoes_presenca', parametros_origem=(),
+                    contar_cadastrados=True):
+    """Refaz os resumos de `dia` a partir das sessões; só dos alunos/locais dados, se houver.
+
+    Recalcular (em vez de somar diferenças) torna a atualização idempotente: a mesma sessão regravada
+    várias vezes enquanto está aberta não é contada de novo. Com `contar_cadastrados`, o total de alunos
+    cadastrados agora é gravado como o do dia (a última atualização é a do fechamento do dia); sem ele, o
+    valor já gravado é mantido, e um dia sem resumo anterior fica com NULL.
+    """
+    inicio, fim = datetime(dia.year, dia.month, dia.day), datetime(dia.year, dia.month, dia.day) + timedelta(days=1)
+    filtro_alunos, filtro_locais, parametros_alunos, parametros_locais = "", "", [], []
+    if ids_alunos is not None:
+        filtro_alunos = f" AND id_aluno IN ({', '.join(['%s'] * len(ids_alunos))})"
+        parametros_alunos = list(ids_alunos)
+    if locais is not None:
+        filtro_locais = f" AND local IN ({', '.join(['%s'] * len(locais))})"
+        parametros_locais = list(locais)
+
+    if ids_alunos is None or ids_alunos:
+        cursor.execute(
+            "INSERT INTO resumo_diario_aluno (dia, id_aluno, primeira_chegada, ultima_saida, sessoes, segundos) "
+            "SELECT %s, id_aluno, MIN(inicio), MAX(fim), COUNT(*), SUM(TIMESTAMPDIFF(SECOND, inicio, fim)) "
+            f"FROM {origem} WHERE inicio >= %s AND inicio < %s{filtro_alunos} GROUP BY id_aluno "
+            "ON DUPLICATE KEY UPDATE primeira_chegada = VALUES(primeira_chegada), ultima_saida = VALUES(ultima_saida), "
+            "sessoes = VALUES(sessoes), segundos = VALUES(segundos)",
+            [dia] + list(parametros_origem) + [inicio, fim] + parametros_alunos
+        )
+    if locais is None or locais:
+        cursor.execute(
+            "INSERT INTO resumo_diario_local (dia, local, alunos, sessoes, segundos, primeira_chegada, ultima_saida) "
+            "SELECT %s, local, COUNT(DISTINCT id_aluno), COUNT(*), SUM(TIMESTAMPDIFF(SECOND, inicio, fim)), "
+            f"MIN(inicio), MAX(fim) FROM {origem} WHERE inicio >= %s AND inicio < %s{filtro_locais} GROUP BY local "
+            "ON DUPLICATE KEY UPDATE alunos = VALUES(alunos), sessoes = VALUES(sessoes), segundos = VALUES(segundos), "
+            "primeira_chegada = VALUES(primeira_chegada), ultima_saida = VALUES(ultima_saida)",
+            [dia] + list(parametros_origem) + [inicio, fim] + parametros_locais
+        )
+    if contar_cadastrados:
+        cadastrados = "(SELECT COUNT(*) FROM alunos)"
+        atualizar_cadastrados = "alunos_cadastrados = VALUES(alunos_cadastrados), "
+    else:
+        cadastrados, atualizar_cadastrados = "NULL", ""
+    cursor.execute(
+        "INSERT INTO resumo_diario (dia, alunos_presentes, alunos_cadastrados, atrasados) "
+        f"SELECT %s, COUNT(*), {cadastrados}, COALESCE(SUM(primeira_chegada > %s), 0) "
+        "FROM resumo_diario_aluno WHERE dia = %s "
+        "ON DUPLICATE KEY UPDATE alunos_presentes = VALUES(alunos_presentes), "
+        f"{atualizar_cadastrados}atrasados = VALUES(atrasados)",
+        (dia, _horario_entrada(dia), dia)
+    )
+
+def atualizar_resumos_diarios(chaves):
+    """Atualiza os resumos diários dos grupos tocados por sessões gravadas.
+
+    `chaves` são tuplas (dia, id_aluno, local); cada dia é recalculado só para os seus alunos e locais,
+    numa transação. Retorna o número de dias atualizados.
+    """
+    por_dia = {}
+    for dia, id_aluno, local in chaves:
+        ids_alunos, locais = por_dia.setdefault(dia, (set(), set()))
+        ids_alunos.add(id_aluno)
+        locais.add(local)
+    if not por_dia:
+        return 0
+    conn = conectar_mysql()
+    cursor = conn.cursor()
+    try:
+        for dia in sorted(por_dia):
+            ids_alunos, locais = por_dia[dia]
+            _recalcular_dia(cursor, dia, sorted(ids_alunos), sorted(locais))
+            conn.commit()
+        return len(por_dia)
+    finally:
+        cursor.close()
+        conn.close()
+
+def reconstruir_resumos_diarios(dia):
+    """Refaz todos os resumos de `dia` a partir das sessões atuais e arquivadas (carga do histórico).
+
+    O total de alunos cadastrados não é recalculado: o de hoje não vale para um dia passado. Fica o valor
+    gravado quando o dia foi resumido, ou NULL (taxa de presença desconhecida) se ele não tinha resumo.
+    """
+    # Limites do dia dentro de cada ramo da união, para as duas tabelas serem lidas pelo índice de inicio
+    comeco = datetime(dia.year, dia.month, dia.day)
+    limites = (comeco, comeco + timedelta(days=1))
+    conn = conectar_mysql()
+    cursor = conn.cursor()
+    try:
+        origem = ("(SELECT id_aluno, local, inicio, fim FROM sessoes_presenca WHERE inicio >= %s AND inicio < %s "
+                  "UNION ALL SELECT id_aluno, local, inicio, fim FROM sessoes_presenca_arquivo "
+                  "WHERE inicio >= %s AND inicio < %s) AS sessoes")
+        _recalcular_dia(cursor, dia, origem=origem, parametros_origem=limites * 2, contar_cadastrados=False)
         conn.commit()
     finally:
         cursor.close()
         conn.close()
 
+def intervalo_sessoes_presenca():
+    """(primeiro dia, último dia) com sessões, atuais ou arquivadas; (None, None) sem nenhuma."""
+    conn = conectar_mysql()
+    cursor = conn.cursor()
+    try:
+        extremos = []
+        for tabela in ('sessoes_presenca_arquivo', 'sessoes_presenca'):
+            cursor.execute(f"SELECT MIN(inicio), MAX(inicio) FROM {tabela}")
+            primeiro, ultimo = cursor.fetchone()
+            if primeiro is not None:
+                extremos.extend([primeiro, ultimo])
+        if not extremos:
+            return None, None
+        return min(extremos).date(), max(extremos).date()
+    finally:
+        cursor.close()
+        conn.close()
+
+def listar_resumo_diario(inicio, fim):
+    """Resumo geral de cada dia entre `inicio` e `fim` (dates, inclusive)."""
+    conn = conectar_mysql()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT dia, alunos_presentes, alunos_cadastrados, atrasados FROM resumo_diario "
+            "WHERE dia >= %s AND dia <= %s ORDER BY dia", (inicio, fim)
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+def listar_resumo_aluno(id_aluno, inicio, fim):
+    """Resumo diário do aluno entre `inicio` e `fim` (dates, inclusive)."""
+    conn = conectar_mysql()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT dia, primeira_chegada, ultima_saida, sessoes, segundos FROM resumo_diario_aluno "
+            "WHERE id_aluno = %s AND dia >= %s AND dia <= %s ORDER BY dia", (id_aluno, inicio, fim)
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+def listar_resumo_locais(dia):
+    """Resumo de cada local (câmera) no dia."""
+    conn = conectar_mysql()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT local, alunos, sessoes, segundos, primeira_chegada, ultima_saida FROM resumo_diario_local "
+            "WHERE dia = %s ORDER BY local", (dia,)
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+def listar_atrasos(dia):
+    """Alunos cuja primeira chegada no dia foi depois do horário de entrada, do mais atrasado ao menos."""
+    conn = conectar_mysql()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT id_aluno, primeira_chegada FROM resumo_diario_aluno WHERE dia = %s AND primeira_chegada > %s "
+            "ORDER BY primeira_chegada DESC", (dia, _horario_entrada(dia))
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+def arquivar_sessoes_presenca(antes_de, tamanho_lote=1000):
+    """Move para `sessoes_presenca_arquivo` as sessões encerradas antes de `antes_de`, em lotes.
+
+    Cada lote é copiado e apagado na mesma transação, percorrendo a chave primária, então o
+    arquivamento pode ser interrompido e retomado. Retorna o total de sessões movidas.
+    """
+    conn = conectar_mysql()
+    cursor = conn.cursor()
+    try:
+        movidas = 0
+        while True:
+            cursor.execute(
+                "SELECT id_sessao FROM sessoes_presenca WHERE fim < %s ORDER BY id_sessao LIMIT %s",
+                (antes_de, tamanho_lote)
+            )
+            ids = [linha[0] for linha in cursor.fetchall()]
+            if not ids:
+                break
+            marcadores = ", ".join(["%s"] * len(ids))
+            cursor.execute(
+                "INSERT IGNORE INTO sessoes_presenca_arquivo (id_sessao, id_aluno, local, inicio, fim, deteccoes) "
+                f"SELECT id_sessao, id_aluno, local, inicio, fim, deteccoes FROM sessoes_presenca "
+                f"WHERE id_sessao IN ({marcadores})", ids
+            )
+            cursor.execute(f"DELETE FROM sessoes_presenca WHERE id_sessao IN ({marcadores})", ids)
+            conn.commit()
+            movidas += len(ids)
+            if len(ids) < tamanho_lote:
+                break
+        if movidas:
+            print(f"[INFO] {movidas} sessão(ões) de presença arquivada(s).")
+        return movidas
+    finally:
+        cursor.close()
+        conn.close()
+
+def listar_responsaveis():
+    """Retorna {id do aluno (str): {'telefone', 'email'}} com os contatos de todos os responsáveis."""
+    conn = conectar_mysql()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id_aluno, telefone, email FROM responsavel")
+        return {
+            str(id_aluno): {'telefone': telefone, 'email': email}
+            for id_aluno, telefone, email in cursor.fetchall()
+            if telefone is not None or email is not None
+        }
+    finally:
+        cursor.close()
+        conn.close()
+
 def obter_responsavel_por_aluno(id_aluno):
     """Retorna dict com telefone e email do responsável do aluno, ou None se não existir."""
     conn = conectar_mysql()
@@ -0,0 +1,64 @@
+# caixa_frames.py
+import time
+import threading
+
+
+class CaixaUltimoFrame:
+    """Caixa de "último frame" por câmera, com variável de condição e horário de captura.
+
+    Cada câmera ocupa um único slot que é sobrescrito a cada frame: publicar nunca bloqueia nem
+    acumula frames antigos. O consumidor dorme na condição até existir um frame capturado depois
+    do prazo informado, sem polling.
+    """
+
+    def __init__(self):
+        self._condicao = threading.Condition()
+        self._slots = {}  # camera_id -> (item, timestamp, consumido)
+
+    def publicar(self, camera_id, item, timestamp=None):
+        """Substitui o frame mais recente da câmera e acorda quem estiver aguardando."""
+        with self._condicao:
+            self._slots[camera_id] = (item, timestamp if timestamp is not None else time.time(), False)
+            self._condicao.notify_all()
+
+    def remover(self, camera_id):
+        with self._condicao:
+            self._slots.pop(camera_id, None)
+
+    def despertar(self):
+        """Acorda os consumidores (ex.: ao parar o monitoramento) para que reavaliem seu estado."""
+        with self._condicao:
+            self._condicao.notify_all()
+
+    def _escolher(self, apos):
+        """Política de escolha do próximo frame: o mais recente entre os não consumidos."""
+        candidato = None
+        for camera_id, (item, timestamp, consumido) in self._slots.items():
+            if consumido or (apos is not None and timestamp < apos):
+                continue
+            if candidato is None or timestamp > candidato[2]:
+                candidato = (camera_id, item, timestamp)
+        return candidato
+
+    def aguardar(self, apos=None, timeout=None):
+        """Bloqueia até haver um frame não consumido capturado em `apos` ou depois.
+
+        Retorna (camera_id, item, timestamp) do frame mais recente nessa condição e o marca como
+        consumido, ou None se o timeout expirar.
+        """
+        limite = time.monotonic() + timeout if timeout is not None else None
+        with self._condicao:
+            while True:
+                candidato = self._escolher(apos)
+                if candidato is not None:
+                    camera_id, item, timestamp = candidato
+                    self._slots[camera_id] = (item, timestamp, True)
+                    return candidato
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return None
+                self._condicao.wait(restante)
+
+    def vazia(self):
+        with self._condicao:
+            return self._escolher(None) is None
@@ -0,0 +1,344 @@
+# caixa_saida.py
+import heapq
+import itertools
+import os
+import random
+import smtplib
+import threading
+import time
+
+from diario_emails import ENVIADO, FALHOU, PENDENTE, DiarioEmails
+from metricas import JanelaMetricas
+from smtp_service import SMTP_OCIOSIDADE_MAXIMA, SessaoSMTP, smtp_service
+
+# Threads de envio; cada uma mantém sua própria sessão SMTP autenticada
+EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', '2'))
+# Tentativas de um e-mail antes de desistir (falhas temporárias: 4xx, conexão, timeout)
+EMAIL_MAX_TENTATIVAS = int(os.getenv('EMAIL_MAX_TENTATIVAS', '5'))
+# Espera antes da 2ª tentativa; dobra a cada falha até EMAIL_ESPERA_MAXIMA (segundos)
+EMAIL_ESPERA_INICIAL = float(os.getenv('EMAIL_ESPERA_INICIAL', '5'))
+EMAIL_ESPERA_MAXIMA = float(os.getenv('EMAIL_ESPERA_MAXIMA', '600'))
+# Envios por minuto aceitos por provedor (servidor SMTP); 0 = sem limite
+EMAIL_ENVIOS_POR_MINUTO = float(os.getenv('EMAIL_ENVIOS_POR_MINUTO', '30'))
+# E-mails aguardando envio; com a fila cheia, novos e-mails são recusados
+EMAIL_TAMANHO_FILA = int(os.getenv('EMAIL_TAMANHO_FILA', '1000'))
+# Diário SQLite da caixa de saída; pendentes são reenviados ao reiniciar. Vazio desativa
+EMAIL_ARQUIVO_DIARIO = os.getenv('EMAIL_ARQUIVO_DIARIO', '.caixa_saida.db')
+# Gravações no diário acumuladas por até este tempo e gravadas numa transação (ms)
+EMAIL_INTERVALO_GRAVACAO_MS = float(os.getenv('EMAIL_INTERVALO_GRAVACAO_MS', '50'))
+# Dias que e-mails enviados ou descartados permanecem no diário
+EMAIL_RETENCAO_DIAS = float(os.getenv('EMAIL_RETENCAO_DIAS', '7'))
+
+
+class LimiteTaxa:
+    """Balde de fichas: até `rajada` envios seguidos, repostos à razão de `por_minuto` por minuto."""
+
+    def __init__(self, por_minuto, rajada=5):
+        self.taxa = por_minuto / 60.0
+        self.capacidade = float(max(1, rajada))
+        self._fichas = self.capacidade
+        self._atualizado = None
+        self._lock = threading.Lock()
+
+    def reservar(self, agora=None):
+        """Consome uma ficha e retorna 0, ou retorna quanto esperar (s) até haver uma, sem consumir."""
+        if self.taxa <= 0:
+            return 0.0
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            if self._atualizado is not None:
+                self._fichas = min(self.capacidade, self._fichas + (agora - self._atualizado) * self.taxa)
+            self._atualizado = agora
+            if self._fichas >= 1.0:
+                self._fichas -= 1.0
+                return 0.0
+            return (1.0 - self._fichas) / self.taxa
+
+
+class EmailPendente:
+    __slots__ = ('id', 'destinatario', 'assunto', 'texto', 'html', 'tentativas', 'enfileirado_em', 'ultimo_erro')
+
+    def __init__(self, id_email, destinatario, assunto, texto, html=None):
+        self.id = id_email
+        self.destinatario = destinatario
+        self.assunto = assunto
+        self.texto = texto
+        self.html = html
+        self.tentativas = 0
+        self.enfileirado_em = time.monotonic()
+        self.ultimo_erro = None
+
+
+def falha_temporaria(erro):
+    """True se vale tentar de novo: respostas 4xx, queda de conexão ou timeout."""
+    if isinstance(erro, smtplib.SMTPRecipientsRefused):
+        return all(400 <= codigo < 500 for codigo, _mensagem in erro.recipients.values())
+    if isinstance(erro, smtplib.SMTPResponseException):
+        return 400 <= erro.smtp_code < 500
+    if isinstance(erro, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(erro, OSError)
+
+
+class CaixaSaidaEmail:
+    """Fila de e-mails enviados em segundo plano por threads com sessões SMTP reaproveitadas.
+
+    `enfileirar` só registra a mensagem e retorna; os workers entregam na ordem em que ficam prontas.
+    Falhas temporárias voltam para a fila com espera exponencial (com variação aleatória, para que
+    várias mensagens não voltem juntas); erros permanentes (5xx, autenticação) são descartados na hora.
+    Cada provedor tem seu limite de envios por minuto, compartilhado por todos os workers.
+
+    Com um `diario` (DiarioEmails), cada e-mail só fica elegível depois de gravado, cada envio ou
+    desistência é registrado e os pendentes de uma execução anterior voltam à fila em `iniciar`. A
+    entrega é pelo menos uma vez: um e-mail aceito pelo servidor pouco antes de uma queda pode ser
+    reenviado.
+    """
+
+    def __init__(self, servico, workers=EMAIL_WORKERS, max_tentativas=EMAIL_MAX_TENTATIVAS,
+                 espera_inicial=EMAIL_ESPERA_INICIAL, espera_maxima=EMAIL_ESPERA_MAXIMA,
+                 envios_por_minuto=EMAIL_ENVIOS_POR_MINUTO, tamanho_maximo=EMAIL_TAMANHO_FILA,
+                 ociosidade_sessao=SMTP_OCIOSIDADE_MAXIMA, diario=None):
+        self.servico = servico
+        self.diario = diario
+        self.workers = max(1, workers)
+        self.max_tentativas = max(1, max_tentativas)
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.envios_por_minuto = envios_por_minuto
+        self.tamanho_maximo = tamanho_maximo
+        self.ociosidade_sessao = ociosidade_sessao
+        self._condicao = threading.Condition()
+        self._fila = []  # heap de (pronto_em, sequência, EmailPendente)
+        self._sequencia = itertools.count(1)
+        self._limites = {}  # provedor -> LimiteTaxa
+        self._threads = []
+        self._ativa = False
+        self._em_envio = 0
+        self._nao_gravados = 0  # enfileirados cuja gravação no diário ainda não terminou
+        self.enfileirados = 0
+        self.enviados = 0
+        self.falhas = 0
+        self.novas_tentativas = 0
+        self.recusados = 0
+        self.sessoes_abertas = 0
+        self.espera_fila = JanelaMetricas()
+        self.latencia_envio = JanelaMetricas()
+
+    def iniciar(self):
+        """Abre o diário, devolve à fila os e-mails pendentes e inicia os workers."""
+        with self._condicao:
+            if self._ativa:
+                return
+            self._ativa = True
+            if self.diario is not None:
+                self._restaurar()
+            self._threads = [threading.Thread(target=self._executar, name=f'caixa-saida-{i}', daemon=True)
+                             for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _restaurar(self):
+        # Chamado com a condição adquirida, antes de haver workers
+        self._sequencia = itertools.count(self.diario.abrir() + 1)
+        pendentes = self.diario.pendentes()
+        agora, relogio = time.monotonic(), time.time()
+        for registro in pendentes:
+            email = EmailPendente(registro['id'], registro['destinatario'], registro['assunto'],
+                                  registro['texto'], registro['html'])
+            email.tentativas = registro['tentativas']
+            email.ultimo_erro = registro['ultimo_erro']
+            # Mantém a espera de nova tentativa que estava agendada antes de reiniciar
+            pronto_em = agora + max(0.0, registro['proxima_tentativa'] - relogio)
+            heapq.heappush(self._fila, (pronto_em, email.id, email))
+        if pendentes:
+            print(f"[INFO] {len(pendentes)} e-mail(s) pendente(s) recuperado(s) do diário da caixa de saída.")
+
+    def encerrar(self, timeout=5.0):
+        """Para os workers; com diário, os e-mails ainda na fila são reenviados na próxima execução."""
+        with self._condicao:
+            self._ativa = False
+            self._condicao.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.diario is not None:
+            self.diario.fechar()
+        with self._condicao:
+            self._fila = []
+
+    def enfileirar(self, to_email, subject, body_text, html_content=None):
+        """Coloca o e-mail na fila e retorna seu número, ou None se a fila estiver cheia.
+
+        Com diário, o e-mail entra na fila de envio assim que sua gravação é confirmada; quem chama
+        não espera por ela.
+        """
+        self.iniciar()
+        with self._condicao:
+            if len(self._fila) + self._nao_gravados >= self.tamanho_maximo:
+                self.recusados += 1
+                print(f"[AVISO] Caixa de saída cheia ({self.tamanho_maximo}); e-mail para {to_email} descartado.")
+                return None
+            email = EmailPendente(next(self._sequencia), to_email, subject, body_text, html_content)
+            self.enfileirados += 1
+            if self.diario is None:
+                heapq.heappush(self._fila, (time.monotonic(), email.id, email))
+                self._condicao.notify_all()
+                return email.id
+            self._nao_gravados += 1
+        self.diario.registrar(email, ao_gravar=self._liberar)
+        return email.id
+
+    def _liberar(self, email):
+        # Gravação do e-mail confirmada pelo diário: já pode ser enviado
+        with self._condicao:
+            self._nao_gravados -= 1
+            heapq.heappush(self._fila, (time.monotonic(), email.id, email))
+            self._condicao.notify_all()
+
+    def _registrar_estado(self, email, estado, proxima_tentativa=None):
+        if self.diario is not None:
+            self.diario.atualizar(email.id, estado, email.tentativas, proxima_tentativa, email.ultimo_erro)
+
+    def aguardar_vazia(self, timeout=None):
+        """Espera até não haver e-mail na fila nem em envio; False se o timeout acabar antes."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._condicao:
+            while self._fila or self._em_envio or self._nao_gravados:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._condicao.wait(restante)
+            return True
+
+    def _limite(self, provedor):
+        with self._condicao:
+            limite = self._limites.get(provedor)
+            if limite is None:
+                limite = self._limites[provedor] = LimiteTaxa(self.envios_por_minuto)
+            return limite
+
+    def _proximo(self, timeout):
+        # Retira o primeiro e-mail pronto, esperando no máximo `timeout`; None se nada ficou pronto
+        with self._condicao:
+            limite = time.monotonic() + timeout
+            while self._ativa:
+                agora = time.monotonic()
+                if self._fila and self._fila[0][0] <= agora:
+                    self._em_envio += 1
+                    return heapq.heappop(self._fila)[2]
+                if agora >= limite:
+                    return None
+                proximo = self._fila[0][0] if self._fila else limite
+                self._condicao.wait(min(proximo, limite) - agora)
+            return None
+
+    def _aguardar_vez(self, provedor):
+        # Bloqueia o worker (não quem enfileirou) até o provedor aceitar mais um envio
+        limite = self._limite(provedor)
+        while True:
+            espera = limite.reservar()
+            if espera <= 0:
+                return True
+            with self._condicao:
+                if not self._ativa:
+                    return False
+                self._condicao.wait(espera)
+
+    def _executar(self):
+        sessao = SessaoSMTP(self.servico, self.ociosidade_sessao)
+        try:
+            while True:
+                email = self._proximo(timeout=1.0)
+                if email is None:
+                    with self._condicao:
+                        if not self._ativa:
+                            return
+                    sessao.fechar_se_ociosa()
+                    continue
+                aberturas = sessao.aberturas
+                try:
+                    self._entregar(email, sessao)
+                finally:
+                    with self._condicao:
+                        self.sessoes_abertas += sessao.aberturas - aberturas
+                        self._em_envio -= 1
+                        self._condicao.notify_all()
+        finally:
+            sessao.fechar()
+
+    def _entregar(self, email, sessao):
+        if not self.servico.configurado():
+            email.ultimo_erro = 'SMTP não configurado'
+            self._registrar_estado(email, FALHOU)
+            with self._condicao:
+                self.falhas += 1
+            print(f"[ERRO] E-mail para {email.destinatario} descartado: SMTP não configurado.")
+            return
+        if not self._aguardar_vez(self.servico.provedor):
+            # Encerrando: devolve para a fila sem contar tentativa
+            with self._condicao:
+                heapq.heappush(self._fila, (time.monotonic(), email.id, email))
+            return
+
+        email.tentativas += 1
+        inicio = time.monotonic()
+        try:
+            sessao.enviar(self.servico.montar_mensagem(email.destinatario, email.assunto, email.texto, email.html))
+        except Exception as e:
+            email.ultimo_erro = str(e)
+            if falha_temporaria(e) and email.tentativas < self.max_tentativas:
+                base = min(self.espera_maxima, self.espera_inicial * 2 ** (email.tentativas - 1))
+                espera = base / 2 + random.uniform(0, base / 2)
+                self._registrar_estado(email, PENDENTE, proxima_tentativa=time.time() + espera)
+                with self._condicao:
+                    self.novas_tentativas += 1
+                    heapq.heappush(self._fila, (time.monotonic() + espera, email.id, email))
+                print(f"[AVISO] Falha temporária ao enviar e-mail para {email.destinatario} "
+                      f"(tentativa {email.tentativas}): {e}. Nova tentativa em {espera:.0f}s.")
+            else:
+                self._registrar_estado(email, FALHOU)
+                with self._condicao:
+                    self.falhas += 1
+                print(f"[ERRO] E-mail para {email.destinatario} descartado após {email.tentativas} "
+                      f"tentativa(s): {e}")
+            return
+
+        self._registrar_estado(email, ENVIADO)
+        agora = time.monotonic()
+        self.latencia_envio.registrar(agora - inicio)
+        self.espera_fila.registrar(agora - email.enfileirado_em)
+        with self._condicao:
+            self.enviados += 1
+        print(f"[EMAIL] E-mail '{email.assunto}' enviado para {email.destinatario}")
+
+    def estatisticas(self):
+        """Contadores da fila, sessões SMTP abertas e tempos (s) de espera total e de envio."""
+        with self._condicao:
+            resumo = {
+                'pendentes': len(self._fila) + self._nao_gravados,
+                'em_envio': self._em_envio,
+                'enfileirados': self.enfileirados,
+                'enviados': self.enviados,
+                'falhas': self.falhas,
+                'novas_tentativas': self.novas_tentativas,
+                'recusados': self.recusados,
+                'sessoes_abertas': self.sessoes_abertas,
+            }
+        resumo['espera_fila'] = self.espera_fila.resumo()
+        resumo['latencia_envio'] = self.latencia_envio.resumo()
+        if self.diario is not None:
+            resumo['diario'] = self.diario.estatisticas()
+        return resumo
+
+
+# Caixa de saída global; os workers (e a recuperação do diário) começam em iniciar() ou no primeiro e-mail
+caixa_saida = CaixaSaidaEmail(
+    smtp_service,
+    diario=DiarioEmails(EMAIL_ARQUIVO_DIARIO, intervalo=EMAIL_INTERVALO_GRAVACAO_MS / 1000,
+                        retencao_dias=EMAIL_RETENCAO_DIAS) if EMAIL_ARQUIVO_DIARIO else None,
+)
+
+
+def enfileirar_email(to_email, subject, body_text, html_content=None):
+    """Enfileira o e-mail para envio em segundo plano e retorna na hora (número do e-mail ou None)."""
+    return caixa_saida.enfileirar(to_email, subject, body_text, html_content)
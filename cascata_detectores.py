@@ -0,0 +1,255 @@
+# cascata_detectores.py
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+from regioes_interesse import caixas_recorte, contem, contornos
+
+# Um estágio da cascata: `detectar(piramide)` retorna locais (top, right, bottom, left) no `nivel` da
+# pirâmide ('reduzido' ou 'completo') de onde as codificações devem ser extraídas.
+EstagioDeteccao = namedtuple('EstagioDeteccao', ['nome', 'nivel', 'detectar'])
+
+# Resultado de uma passada pela cascata; estagio/nivel são None quando nenhum estágio encontrou faces
+ResultadoDeteccao = namedtuple('ResultadoDeteccao', ['locais', 'estagio', 'nivel', 'tentados'])
+
+
+class PiramideImagem:
+    """Representações de um frame BGR preparadas sob demanda e reaproveitadas por todos os estágios.
+
+    O frame é reduzido uma única vez e cada conversão de cor é feita no máximo uma vez por nível.
+    Com pool de processos, cada imagem RGB é copiada uma única vez para a memória compartilhada.
+    Com regiões de interesse (coordenadas normalizadas) os detectores recebem só os recortes que as
+    cobrem, convertidos individualmente.
+    """
+
+    def __init__(self, frame, escala=0.5, pool=None, regioes=None):
+        self.frame = frame
+        self.escala = escala
+        self.pool = pool
+        self.regioes = regioes or []
+        self._cache = {}
+
+    def _obter(self, chave, criar):
+        valor = self._cache.get(chave)
+        if valor is None:
+            valor = self._cache[chave] = criar()
+        return valor
+
+    @property
+    def bgr_reduzido(self):
+        if self.escala >= 1.0:
+            return self.frame
+        return self._obter('bgr_reduzido', lambda: cv2.resize(self.frame, (0, 0), fx=self.escala, fy=self.escala,
+                                                              interpolation=cv2.INTER_AREA))
+
+    @property
+    def cinza_reduzido(self):
+        return self._obter('cinza_reduzido', lambda: cv2.cvtColor(self.bgr_reduzido, cv2.COLOR_BGR2GRAY))
+
+    def rgb(self, nivel):
+        """Imagem RGB do nível (ndarray, ou descritor de memória compartilhada quando há pool)."""
+        def criar():
+            origem = self.bgr_reduzido if nivel == 'reduzido' else self.frame
+            imagem = cv2.cvtColor(origem, cv2.COLOR_BGR2RGB)
+            return self.pool.compartilhar(imagem, chave=nivel) if self.pool else imagem
+        return self._obter('rgb_' + nivel, criar)
+
+    def _bgr(self, nivel):
+        return self.bgr_reduzido if nivel == 'reduzido' else self.frame
+
+    def recortes(self, nivel):
+        """Caixas (x0, y0, x1, y1) do nível que cobrem as regiões de interesse."""
+        def criar():
+            altura, largura = self._bgr(nivel).shape[:2]
+            return caixas_recorte(self.regioes, largura, altura)
+        return self._obter('recortes_' + nivel, criar)
+
+    def contem(self, nivel, local):
+        """True se o centro da face (top, right, bottom, left) do nível cai dentro de alguma região."""
+        def criar():
+            altura, largura = self._bgr(nivel).shape[:2]
+            return contornos(self.regioes, largura, altura)
+        top, right, bottom, left = local
+        return contem(self._obter('contornos_' + nivel, criar), (left + right) / 2.0, (top + bottom) / 2.0)
+
+    def rgb_recorte(self, nivel, indice):
+        """Recorte RGB `indice` do nível, convertido só na área do recorte."""
+        def criar():
+            x0, y0, x1, y1 = self.recortes(nivel)[indice]
+            if 'rgb_' + nivel in self._cache and not self.pool:
+                # O nível inteiro já foi convertido: o recorte é só uma view
+                return self._cache['rgb_' + nivel][y0:y1, x0:x1]
+            imagem = cv2.cvtColor(self._bgr(nivel)[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+            return self.pool.compartilhar(imagem, chave=f'{nivel}_{indice}') if self.pool else imagem
+        return self._obter(f'rgb_{nivel}_{indice}', criar)
+
+    def cinza_recorte(self, indice):
+        x0, y0, x1, y1 = self.recortes('reduzido')[indice]
+        return self.cinza_reduzido[y0:y1, x0:x1]
+
+
+def detectar_em_recortes(piramide, nivel, detector, cor='rgb'):
+    """Executa `detector(imagem)` no nível inteiro ou, havendo regiões de interesse, em cada recorte.
+
+    Os locais (top, right, bottom, left) voltam nas coordenadas do nível; faces com centro fora das
+    regiões são descartadas. `cor` 'cinza' usa a imagem em tons de cinza (apenas nível reduzido).
+    """
+    if not piramide.regioes:
+        return list(detector(piramide.rgb(nivel) if cor == 'rgb' else piramide.cinza_reduzido))
+
+    locais = []
+    for indice, (x0, y0, _x1, _y1) in enumerate(piramide.recortes(nivel)):
+        imagem = piramide.rgb_recorte(nivel, indice) if cor == 'rgb' else piramide.cinza_recorte(indice)
+        for top, right, bottom, left in detector(imagem):
+            locais.append((top + y0, right + x0, bottom + y0, left + x0))
+    return [local for local in locais if piramide.contem(nivel, local)]
+
+
+class _EstatisticaEstagio:
+    __slots__ = ('tentativas', 'acertos', 'latencia', 'pulos')
+
+    def __init__(self):
+        self.tentativas = 0.0
+        self.acertos = 0.0
+        self.latencia = None  # média móvel exponencial (s)
+        self.pulos = 0
+
+
+class CascataDetectores:
+    """Cadeia de detectores que aprende, por câmera, quais estágios valem a pena.
+
+    Para cada câmera e estágio registra taxa de acerto e latência (com esquecimento exponencial).
+    Estágios com amostras suficientes são reordenados pelo custo esperado por acerto (latência / taxa)
+    e os que quase nunca encontram faces são pulados, voltando a ser testados periodicamente. Um
+    orçamento de tempo por frame impede que um estágio comece se a latência estimada não couber.
+    Estágios do nível completo não rodam quando a pirâmide não reduziu o frame.
+    """
+
+    def __init__(self, estagios, orcamento=None, min_tentativas=20, taxa_minima=0.05,
+                 periodo_exploracao=20, esquecimento=0.98, suavizacao_latencia=0.2):
+        self.estagios = list(estagios)
+        self.orcamento = orcamento
+        self.min_tentativas = min_tentativas
+        self.taxa_minima = taxa_minima
+        self.periodo_exploracao = periodo_exploracao
+        self.esquecimento = esquecimento
+        self.suavizacao_latencia = suavizacao_latencia
+        self._lock = threading.Lock()
+        self._cameras = {}  # camera_id -> {'frames': n, 'estagios': {nome: _EstatisticaEstagio}}
+
+    def _estado(self, camera_id):
+        estado = self._cameras.get(camera_id)
+        if estado is None:
+            estado = self._cameras[camera_id] = {
+                'frames': 0,
+                'estagios': {estagio.nome: _EstatisticaEstagio() for estagio in self.estagios},
+            }
+        return estado
+
+    def _maduro(self, estatistica):
+        return estatistica.tentativas >= self.min_tentativas
+
+    @staticmethod
+    def _taxa(estatistica):
+        # Suavização de Laplace para não zerar a taxa de estágios com poucos acertos
+        return (estatistica.acertos + 1.0) / (estatistica.tentativas + 2.0)
+
+    def ordem(self, camera_id):
+        """Estágios na ordem em que serão tentados para a câmera e os que serão pulados neste frame."""
+        with self._lock:
+            estado = self._estado(camera_id)
+            estatisticas = estado['estagios']
+            explorar = self.periodo_exploracao and estado['frames'] % self.periodo_exploracao == 0
+
+            # Estágios maduros trocam de posição entre si pelo custo esperado; os demais mantêm a
+            # posição configurada até juntarem amostras suficientes
+            maduros = [e for e in self.estagios if self._maduro(estatisticas[e.nome])]
+            maduros.sort(key=lambda e: estatisticas[e.nome].latencia / self._taxa(estatisticas[e.nome]))
+            fila_maduros = iter(maduros)
+            ordenados = [next(fila_maduros) if self._maduro(estatisticas[e.nome]) else e for e in self.estagios]
+
+            def raro(estatistica):
+                return self._maduro(estatistica) and estatistica.acertos / estatistica.tentativas < self.taxa_minima
+
+            # Só pula quando outro estágio comprovadamente encontra faces nesta câmera; numa cena
+            # vazia todos têm taxa zero e nenhum deve ser descartado
+            algum_util = any(self._maduro(e) and not raro(e) for e in estatisticas.values())
+            ativos, pulados = [], []
+            for estagio in ordenados:
+                if algum_util and raro(estatisticas[estagio.nome]):
+                    pulados.append(estagio)
+                else:
+                    ativos.append(estagio)
+            if explorar:
+                # De tempos em tempos os estágios pulados voltam (no fim da fila) para reavaliação
+                return ativos + pulados, []
+            return ativos, pulados
+
+    def _registrar(self, camera_id, estagio, acertou, latencia):
+        with self._lock:
+            estatistica = self._estado(camera_id)['estagios'][estagio.nome]
+            estatistica.tentativas = estatistica.tentativas * self.esquecimento + 1.0
+            estatistica.acertos = estatistica.acertos * self.esquecimento + (1.0 if acertou else 0.0)
+            if estatistica.latencia is None:
+                estatistica.latencia = latencia
+            else:
+                estatistica.latencia += self.suavizacao_latencia * (latencia - estatistica.latencia)
+
+    def detectar(self, piramide, camera_id=0):
+        """Executa os estágios na ordem aprendida até um deles encontrar faces ou o orçamento acabar."""
+        ativos, pulados = self.ordem(camera_id)
+        inicio = time.perf_counter()
+        tentados = []
+        resultado = ResultadoDeteccao([], None, None, tentados)
+
+        for estagio in ativos:
+            if estagio.nivel == 'completo' and piramide.bgr_reduzido is piramide.frame:
+                # Sem redução (escala >= 1) o nível completo é a própria imagem do reduzido: o estágio só
+                # repetiria uma varredura dos estágios reduzidos
+                continue
+            decorrido = time.perf_counter() - inicio
+            if self.orcamento is not None and tentados:
+                with self._lock:
+                    estimada = self._estado(camera_id)['estagios'][estagio.nome].latencia or 0.0
+                if decorrido + estimada > self.orcamento:
+                    print(f"[DEBUG] Orçamento de detecção esgotado antes de '{estagio.nome}' "
+                          f"({decorrido * 1000:.0f} ms + {estimada * 1000:.0f} ms estimados).")
+                    break
+
+            inicio_estagio = time.perf_counter()
+            locais = list(estagio.detectar(piramide))
+            latencia = time.perf_counter() - inicio_estagio
+            self._registrar(camera_id, estagio, bool(locais), latencia)
+            tentados.append(estagio.nome)
+            print(f"[DEBUG] Estágio '{estagio.nome}': {len(locais)} face(s) em {latencia * 1000:.0f} ms")
+            if locais:
+                resultado = ResultadoDeteccao(locais, estagio.nome, estagio.nivel, tentados)
+                break
+
+        with self._lock:
+            estado = self._estado(camera_id)
+            estado['frames'] += 1
+            for estagio in pulados:
+                estado['estagios'][estagio.nome].pulos += 1
+        return resultado
+
+    def estatisticas(self):
+        """Taxa de acerto, latência média (ms) e pulos de cada estágio, por câmera."""
+        with self._lock:
+            resumo = {}
+            for camera_id, estado in self._cameras.items():
+                resumo[str(camera_id)] = {
+                    'frames': estado['frames'],
+                    'estagios': {
+                        nome: {
+                            'tentativas': round(e.tentativas, 1),
+                            'taxa_acerto': round(e.acertos / e.tentativas, 3) if e.tentativas else None,
+                            'latencia_ms': round(e.latencia * 1000, 1) if e.latencia is not None else None,
+                            'pulos': e.pulos,
+                        }
+                        for nome, e in estado['estagios'].items()
+                    },
+                }
+            return resumo
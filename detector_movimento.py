@@ -0,0 +1,52 @@
+# detector_movimento.py
+import time
+
+import cv2
+import numpy as np
+
+
+class DetectorMovimento:
+    """Detector de mudança de cena barato, executado na thread de captura de cada câmera.
+
+    Cada frame é reduzido a uma miniatura em tons de cinza e comparado com um modelo de fundo
+    (média móvel). Se a fração de pixels que mudaram passar de `limiar_fracao` o frame conta como
+    movimento; mudanças lentas de iluminação são absorvidas pelo fundo.
+    """
+
+    def __init__(self, tamanho=(64, 48), limiar_pixel=25, limiar_fracao=0.01, aprendizado=0.05):
+        self.tamanho = tamanho
+        self.limiar_pixel = limiar_pixel
+        self.limiar_fracao = limiar_fracao
+        self.aprendizado = aprendizado
+        self._fundo = None
+        self.fracao = 0.0
+        self.ultimo_movimento = None  # horário do último frame com movimento
+
+    def miniatura(self, frame):
+        pequeno = cv2.resize(frame, self.tamanho, interpolation=cv2.INTER_AREA)
+        if pequeno.ndim == 3:
+            pequeno = cv2.cvtColor(pequeno, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(pequeno, (3, 3), 0)
+
+    def atualizar(self, frame, timestamp=None):
+        """Atualiza o modelo de fundo com o frame e retorna True se houve movimento."""
+        timestamp = time.time() if timestamp is None else timestamp
+        miniatura = self.miniatura(frame)
+        if self._fundo is None or self._fundo.shape != miniatura.shape:
+            # Primeiro frame (ou resolução nova): tudo é novidade
+            self._fundo = miniatura.astype(np.float32)
+            self.fracao = 1.0
+            self.ultimo_movimento = timestamp
+            return True
+
+        diferenca = cv2.absdiff(miniatura, cv2.convertScaleAbs(self._fundo))
+        self.fracao = float(np.count_nonzero(diferenca > self.limiar_pixel)) / diferenca.size
+        cv2.accumulateWeighted(miniatura, self._fundo, self.aprendizado)
+        if self.fracao >= self.limiar_fracao:
+            self.ultimo_movimento = timestamp
+            return True
+        return False
+
+    def estatico_desde(self, timestamp):
+        """True se nenhum movimento foi visto depois de `timestamp`."""
+        return self.ultimo_movimento is not None and self.ultimo_movimento < timestamp
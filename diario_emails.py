@@ -0,0 +1,197 @@
+# diario_emails.py
+import sqlite3
+import threading
+import time
+
+from metricas import JanelaMetricas
+
+PENDENTE = 'pendente'
+ENVIADO = 'enviado'
+FALHOU = 'falhou'
+
+
+class DiarioEmails:
+    """Registro durável da caixa de saída em SQLite (modo WAL).
+
+    Todo e-mail é gravado antes de poder ser enviado, e cada mudança de estado (envio, nova tentativa,
+    desistência) também fica registrada. As gravações são agrupadas: uma thread junta o que chegou em
+    `intervalo` segundos (até `tamanho_lote` registros) numa única transação, então mil alertas custam
+    um fsync e não mil. Quem enfileira não espera a gravação; o e-mail só fica elegível para envio
+    quando `ao_gravar` é chamado com ele, depois do commit.
+    """
+
+    def __init__(self, caminho, intervalo=0.05, tamanho_lote=500, retencao_dias=7):
+        self.caminho = str(caminho)
+        self.intervalo = intervalo
+        self.tamanho_lote = tamanho_lote
+        self.retencao_dias = retencao_dias
+        self._conexao = None
+        self._condicao = threading.Condition()
+        self._pendentes = []  # (tipo, dados, callback) ainda não gravados
+        self._gravando = False
+        self._thread = None
+        self._aberto = False
+        self.lotes = 0
+        self.registros = 0
+        self.tempo_gravacao = JanelaMetricas()
+
+    def abrir(self):
+        """Abre (criando se preciso) o banco e descarta registros finalizados mais antigos que a retenção.
+
+        Returns:
+            Maior id já usado, para a numeração dos novos e-mails continuar dali
+        """
+        with self._condicao:
+            if self._aberto:
+                return self._maior_id()
+            self._conexao = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+            self._conexao.execute('PRAGMA journal_mode=WAL')
+            # FULL: cada commit (um por lote) chega ao disco antes de o e-mail ser liberado
+            self._conexao.execute('PRAGMA synchronous=FULL')
+            self._conexao.execute('''
+                CREATE TABLE IF NOT EXISTS emails (
+                    id INTEGER PRIMARY KEY,
+                    destinatario TEXT NOT NULL,
+                    assunto TEXT NOT NULL,
+                    texto TEXT NOT NULL,
+                    html TEXT,
+                    estado TEXT NOT NULL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    proxima_tentativa REAL NOT NULL,
+                    ultimo_erro TEXT,
+                    criado_em REAL NOT NULL,
+                    atualizado_em REAL NOT NULL
+                )''')
+            self._conexao.execute('CREATE INDEX IF NOT EXISTS idx_emails_estado ON emails (estado)')
+            if self.retencao_dias:
+                limite = time.time() - self.retencao_dias * 86400
+                self._conexao.execute('DELETE FROM emails WHERE estado != ? AND atualizado_em < ?',
+                                      (PENDENTE, limite))
+            self._aberto = True
+            self._thread = threading.Thread(target=self._executar, name='diario-emails', daemon=True)
+            self._thread.start()
+            return self._maior_id()
+
+    def _maior_id(self):
+        return self._conexao.execute('SELECT COALESCE(MAX(id), 0) FROM emails').fetchone()[0]
+
+    def pendentes(self):
+        """E-mails que não foram enviados nem descartados, como dicts, na ordem de criação."""
+        with self._condicao:
+            self._condicao.wait_for(lambda: not self._gravando)
+            cursor = self._conexao.execute(
+                'SELECT id, destinatario, assunto, texto, html, tentativas, proxima_tentativa, ultimo_erro '
+                'FROM emails WHERE estado = ? ORDER BY id', (PENDENTE,))
+            colunas = [descricao[0] for descricao in cursor.description]
+            return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+    def registrar(self, email, ao_gravar=None):
+        """Agenda a gravação de um e-mail novo; `ao_gravar(email)` é chamado depois do commit."""
+        agora = time.time()
+        dados = (email.id, email.destinatario, email.assunto, email.texto, email.html, PENDENTE,
+                 email.tentativas, agora, email.ultimo_erro, agora, agora)
+        self._agendar(('inserir', dados, (lambda: ao_gravar(email)) if ao_gravar else None))
+
+    def atualizar(self, id_email, estado, tentativas, proxima_tentativa=None, erro=None):
+        """Agenda a gravação do novo estado de um e-mail (`proxima_tentativa` em hora de parede)."""
+        agora = time.time()
+        dados = (estado, tentativas, proxima_tentativa or agora, erro, agora, id_email)
+        self._agendar(('atualizar', dados, None))
+
+    def _agendar(self, item):
+        with self._condicao:
+            self._pendentes.append(item)
+            aberto = self._aberto
+            if aberto and (len(self._pendentes) == 1 or len(self._pendentes) >= self.tamanho_lote):
+                self._condicao.notify_all()
+        if not aberto:
+            # Sem a thread de gravação (diário fechado): trata o registro agora
+            self.descarregar()
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                self._condicao.wait_for(lambda: self._pendentes or not self._aberto)
+                if not self._pendentes:
+                    return
+                # Chegou o primeiro registro: espera o intervalo (ou o lote encher) para juntar os seguintes
+                self._condicao.wait_for(lambda: len(self._pendentes) >= self.tamanho_lote or not self._aberto,
+                                        timeout=self.intervalo)
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava agora, numa transação, tudo o que está pendente."""
+        with self._condicao:
+            self._condicao.wait_for(lambda: not self._gravando)
+            lote, self._pendentes = self._pendentes, []
+            if not lote:
+                return
+            fechado = self._conexao is None
+            if not fechado:
+                self._gravando = True
+        if fechado:
+            # Diário fechado: nada é gravado, mas os e-mails ainda são liberados para envio (e quem espera
+            # a fila esvaziar não fica preso)
+            print(f"[AVISO] Diário de e-mails fechado; {len(lote)} registro(s) não gravado(s).")
+            for _tipo, _dados, callback in lote:
+                if callback is not None:
+                    callback()
+            return
+        callbacks = []
+        try:
+            inicio = time.perf_counter()
+            inserir = [dados for tipo, dados, _cb in lote if tipo == 'inserir']
+            atualizar = [dados for tipo, dados, _cb in lote if tipo == 'atualizar']
+            try:
+                self._conexao.execute('BEGIN')
+                if inserir:
+                    self._conexao.executemany(
+                        'INSERT OR REPLACE INTO emails (id, destinatario, assunto, texto, html, estado, tentativas, '
+                        'proxima_tentativa, ultimo_erro, criado_em, atualizado_em) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', inserir)
+                if atualizar:
+                    self._conexao.executemany(
+                        'UPDATE emails SET estado = ?, tentativas = ?, proxima_tentativa = ?, ultimo_erro = ?, '
+                        'atualizado_em = ? WHERE id = ?', atualizar)
+                self._conexao.execute('COMMIT')
+            except sqlite3.Error as e:
+                try:
+                    self._conexao.execute('ROLLBACK')
+                except sqlite3.Error:
+                    pass
+                # Sem disco não há durabilidade, mas o alerta ainda deve sair: libera o envio mesmo assim
+                print(f"[ERRO] Falha ao gravar {len(lote)} registro(s) no diário de e-mails: {e}")
+            self.tempo_gravacao.registrar(time.perf_counter() - inicio)
+            callbacks = [cb for _tipo, _dados, cb in lote if cb is not None]
+            with self._condicao:
+                self.lotes += 1
+                self.registros += len(lote)
+        finally:
+            with self._condicao:
+                self._gravando = False
+                self._condicao.notify_all()
+        for callback in callbacks:
+            callback()
+
+    def fechar(self):
+        """Grava o que falta e fecha o banco."""
+        with self._condicao:
+            if not self._aberto:
+                return
+            self._aberto = False
+            self._condicao.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self.descarregar()
+        with self._condicao:
+            self._conexao.close()
+            self._conexao = None
+
+    def estatisticas(self):
+        with self._condicao:
+            return {
+                'lotes': self.lotes,
+                'registros': self.registros,
+                'aguardando_gravacao': len(self._pendentes),
+                'tempo_gravacao': self.tempo_gravacao.resumo(),
+            }
@@ -0,0 +1,86 @@
+# escala_dinamica.py
+import math
+import threading
+
+import numpy as np
+
+# Menor face (altura em pixels) que o detector HOG do dlib encontra sem upsample
+TAMANHO_MINIMO_HOG = 80
+
+
+class PoliticaEscala:
+    """Escolhe, por câmera, a escala de trabalho da detecção a partir dos tamanhos de face observados.
+
+    Mantém um histograma (bins logarítmicos, com esquecimento) da altura das faces detectadas em
+    pixels do frame original. A escala é a que leva o percentil baixo das faces para um pouco acima
+    do mínimo do HOG; faces menores que `tamanho_minimo_face` não precisam ser detectadas, então a
+    escala nunca passa do necessário para elas. Sem amostras suficientes usa `largura_inicial`.
+    Faces que só os estágios de fallback encontram entram no histograma e fazem a escala subir.
+    """
+
+    def __init__(self, tamanho_minimo_face=80, largura_inicial=640, percentil=10, margem=1.25,
+                 min_amostras=20, passo=0.125, escala_minima=0.125, esquecimento=0.99):
+        self.tamanho_minimo_face = tamanho_minimo_face
+        self.largura_inicial = largura_inicial
+        self.percentil = percentil
+        self.margem = margem
+        self.min_amostras = min_amostras
+        self.passo = passo
+        self.escala_minima = escala_minima
+        self.esquecimento = esquecimento
+        self._bordas = np.geomspace(8, 8192, 61)
+        self._lock = threading.Lock()
+        self._histogramas = {}  # camera_id -> contagens por bin
+        self._escalas = {}  # camera_id -> última escala escolhida
+
+    @property
+    def escala_maxima(self):
+        return min(1.0, TAMANHO_MINIMO_HOG / float(self.tamanho_minimo_face))
+
+    def registrar(self, camera_id, alturas):
+        """Acrescenta ao histograma da câmera as alturas (pixels do frame original) das faces detectadas."""
+        if len(alturas) == 0:
+            return
+        contagens, _ = np.histogram(np.clip(alturas, self._bordas[0], self._bordas[-1]), bins=self._bordas)
+        with self._lock:
+            histograma = self._histogramas.get(camera_id)
+            if histograma is None:
+                histograma = self._histogramas[camera_id] = np.zeros(len(self._bordas) - 1)
+            histograma *= self.esquecimento
+            histograma += contagens
+
+    def percentil_altura(self, camera_id):
+        """Altura no percentil configurado (limite inferior do bin), ou None sem amostras suficientes."""
+        with self._lock:
+            histograma = self._histogramas.get(camera_id)
+            if histograma is None or histograma.sum() < self.min_amostras:
+                return None
+            acumulado = np.cumsum(histograma) / histograma.sum()
+        indice = int(np.searchsorted(acumulado, self.percentil / 100.0))
+        return float(self._bordas[min(indice, len(self._bordas) - 2)])
+
+    def escala(self, camera_id, largura):
+        """Fator de redução do frame (<= 1) para a câmera, arredondado para cima em múltiplos de `passo`."""
+        altura = self.percentil_altura(camera_id)
+        if altura is None:
+            alvo = self.largura_inicial / float(largura)
+        else:
+            alvo = TAMANHO_MINIMO_HOG * self.margem / altura
+        alvo = min(max(alvo, self.escala_minima), self.escala_maxima)
+        # Degraus discretos evitam trocar a resolução (e invalidar caches) a cada frame
+        escala = min(self.escala_maxima, math.ceil(alvo / self.passo - 1e-9) * self.passo)
+        self._escalas[camera_id] = escala
+        return escala
+
+    def estatisticas(self):
+        with self._lock:
+            cameras = {camera_id: float(h.sum()) for camera_id, h in self._histogramas.items()}
+            escalas = dict(self._escalas)
+        return {
+            str(camera_id): {
+                'escala': escalas.get(camera_id),
+                'amostras': round(cameras.get(camera_id, 0.0), 1),
+                'altura_percentil': self.percentil_altura(camera_id),
+            }
+            for camera_id in set(cameras) | set(escalas)
+        }
@@ -0,0 +1,118 @@
+# escalonador.py
+import time
+
+from caixa_frames import CaixaUltimoFrame
+
+
+class PipelineCamera:
+    """Estado de escalonamento de uma câmera."""
+
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.prazo = 0.0  # frames capturados antes disso ainda não são elegíveis
+        self.ultima_atividade = None
+        self.pendentes = 0  # frames publicados desde o último atendimento
+        self.descartados = 0  # frames sobrescritos sem serem processados
+        self.atendimentos = 0
+        self.ultimo_atendimento = None
+
+
+class EscalonadorCameras(CaixaUltimoFrame):
+    """Caixa de último frame com escalonamento justo entre câmeras por prazos ponderados.
+
+    Cada câmera tem um prazo: só frames capturados a partir dele são elegíveis. Entre as câmeras com
+    frame elegível, é atendida a de prazo mais antigo (EDF), o que dá a cada câmera sua vez mesmo
+    quando outra publica frames sem parar. Ao concluir, o próximo prazo é `intervalo / peso`
+    adiante; câmeras com atividade recente (movimento, faces) recebem `peso_ativo` e são atendidas
+    com mais frequência.
+    """
+
+    def __init__(self, peso_ativo=2.0, janela_atividade=10.0):
+        super().__init__()
+        self.peso_ativo = peso_ativo
+        self.janela_atividade = janela_atividade
+        self._pipelines = {}
+
+    def _pipeline(self, camera_id):
+        pipeline = self._pipelines.get(camera_id)
+        if pipeline is None:
+            pipeline = self._pipelines[camera_id] = PipelineCamera(camera_id)
+        return pipeline
+
+    def publicar(self, camera_id, item, timestamp=None):
+        with self._condicao:
+            pipeline = self._pipeline(camera_id)
+            anterior = self._slots.get(camera_id)
+            if anterior is not None and not anterior[2]:
+                pipeline.descartados += 1
+            pipeline.pendentes += 1
+        super().publicar(camera_id, item, timestamp)
+
+    def remover(self, camera_id):
+        with self._condicao:
+            self._pipelines.pop(camera_id, None)
+        super().remover(camera_id)
+
+    def registrar_atividade(self, camera_id, timestamp=None):
+        """Marca atividade recente na câmera, aumentando sua prioridade."""
+        with self._condicao:
+            self._pipeline(camera_id).ultima_atividade = time.time() if timestamp is None else timestamp
+
+    def peso(self, camera_id, agora=None):
+        agora = time.time() if agora is None else agora
+        with self._condicao:
+            atividade = self._pipeline(camera_id).ultima_atividade
+        if atividade is not None and agora - atividade <= self.janela_atividade:
+            return self.peso_ativo
+        return 1.0
+
+    def concluir(self, camera_id, timestamp, intervalo):
+        """Registra o atendimento do frame de `timestamp` e agenda o próximo prazo da câmera."""
+        peso = self.peso(camera_id, timestamp)
+        with self._condicao:
+            pipeline = self._pipeline(camera_id)
+            pipeline.prazo = timestamp + intervalo / peso
+
+    def _escolher(self, apos):
+        # Menor prazo entre as câmeras com frame elegível; `apos` ainda vale como limite global
+        candidato, prazo_candidato = None, None
+        for camera_id, (item, timestamp, consumido) in self._slots.items():
+            prazo = self._pipeline(camera_id).prazo
+            if consumido or timestamp < prazo or (apos is not None and timestamp < apos):
+                continue
+            if candidato is None or prazo < prazo_candidato:
+                candidato, prazo_candidato = (camera_id, item, timestamp), prazo
+        return candidato
+
+    def aguardar(self, apos=None, timeout=None):
+        entrada = super().aguardar(apos, timeout)
+        if entrada is not None:
+            with self._condicao:
+                pipeline = self._pipeline(entrada[0])
+                pipeline.pendentes = 0
+                pipeline.atendimentos += 1
+                pipeline.ultimo_atendimento = time.time()
+        return entrada
+
+    def vazia(self):
+        with self._condicao:
+            return all(consumido for _item, _timestamp, consumido in self._slots.values())
+
+    def estatisticas(self, agora=None):
+        """Profundidade (frames pendentes), atraso em relação ao prazo e contadores de cada câmera."""
+        agora = time.time() if agora is None else agora
+        with self._condicao:
+            resumo = {}
+            for camera_id, pipeline in self._pipelines.items():
+                slot = self._slots.get(camera_id)
+                aguardando = slot is not None and not slot[2] and slot[1] >= pipeline.prazo
+                atividade = pipeline.ultima_atividade
+                resumo[str(camera_id)] = {
+                    'profundidade': pipeline.pendentes,
+                    'atraso': round(max(0.0, agora - pipeline.prazo), 3) if aguardando else 0.0,
+                    'idade_frame': round(agora - slot[1], 3) if slot is not None else None,
+                    'descartados': pipeline.descartados,
+                    'atendimentos': pipeline.atendimentos,
+                    'ativa': atividade is not None and agora - atividade <= self.janela_atividade,
+                }
+            return resumo
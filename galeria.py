@@ -0,0 +1,128 @@
+# galeria.py
+from collections import namedtuple
+
+import numpy as np
+
+DIMENSAO_CODIFICACAO = 128
+
+# Formato das codificações no banco: DIMENSAO_CODIFICACAO float32 little-endian (512 bytes), com a
+# etiqueta do modelo que as gerou (codificações de modelos diferentes não são comparáveis)
+FORMATO_BINARIO = np.dtype('<f4')
+MODELO_CODIFICACAO = 'dlib_resnet_v1'
+TAMANHO_BINARIO = DIMENSAO_CODIFICACAO * FORMATO_BINARIO.itemsize
+
+
+def codificacao_para_bytes(codificacao):
+    """Serializa uma codificação no formato binário do banco."""
+    vetor = np.asarray(codificacao, dtype=FORMATO_BINARIO).reshape(-1)
+    if vetor.shape[0] != DIMENSAO_CODIFICACAO:
+        raise ValueError(f"Codificação com dimensão {vetor.shape[0]}, esperado {DIMENSAO_CODIFICACAO}.")
+    return vetor.tobytes()
+
+
+def matriz_de_bytes(buffers):
+    """Monta a matriz (N, 128) float32 a partir dos buffers binários lidos do banco, sem cópias por linha."""
+    if not buffers:
+        return np.empty((0, DIMENSAO_CODIFICACAO), dtype=np.float32)
+    if any(len(buffer) != TAMANHO_BINARIO for buffer in buffers):
+        raise ValueError(f"Codificação binária com tamanho diferente de {TAMANHO_BINARIO} bytes.")
+    matriz = np.frombuffer(b''.join(buffers), dtype=FORMATO_BINARIO).reshape(-1, DIMENSAO_CODIFICACAO)
+    return matriz.astype(np.float32, copy=False)
+
+# Resultado da comparação de uma face contra a galeria.
+# margem = distância do segundo candidato mais próximo menos a do melhor (inf se houver só um).
+Correspondencia = namedtuple('Correspondencia', ['indice', 'id_aluno', 'distancia', 'margem', 'reconhecido'])
+
+
+class GaleriaFacial:
+    """Galeria imutável com todas as codificações de referência em uma matriz float32 (N, 128) contígua.
+
+    As normas ao quadrado de cada referência são pré-calculadas, de modo que a distância euclidiana
+    de todas as faces de um frame contra a galeria inteira sai de uma única multiplicação de matrizes.
+    """
+
+    def __init__(self, ids=None, codificacoes=None):
+        self.ids = tuple(str(i) for i in (ids if ids is not None else ()))
+        if codificacoes is not None and len(codificacoes) > 0:
+            matriz = np.atleast_2d(np.asarray(codificacoes, dtype=np.float32))
+        else:
+            matriz = np.empty((0, DIMENSAO_CODIFICACAO), dtype=np.float32)
+        if matriz.shape[0] != len(self.ids):
+            raise ValueError("Quantidade de IDs e de codificações não confere.")
+
+        self.matriz = np.ascontiguousarray(matriz)
+        self.normas_quadradas = np.einsum('ij,ij->i', self.matriz, self.matriz)
+        self.matriz.flags.writeable = False
+        self.normas_quadradas.flags.writeable = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    def posicao(self, id_aluno):
+        """Linha do aluno na matriz, ou None se ele não está na galeria."""
+        try:
+            return self.ids.index(str(id_aluno))
+        except ValueError:
+            return None
+
+    def com_aluno(self, id_aluno, codificacao):
+        """Nova galeria com a codificação do aluno incluída (ou substituída, se ele já existir).
+
+        A galeria atual não é alterada: quem ainda a estiver usando continua vendo a versão anterior.
+        """
+        codificacao = np.asarray(codificacao, dtype=np.float32).reshape(-1)
+        if codificacao.shape[0] != self.dimensao:
+            raise ValueError(f"Codificação com dimensão {codificacao.shape[0]}, esperado {self.dimensao}.")
+        posicao = self.posicao(id_aluno)
+        if posicao is None:
+            ids = self.ids + (str(id_aluno),)
+            matriz = np.vstack((self.matriz, codificacao[None, :]))
+        else:
+            ids = self.ids
+            matriz = self.matriz.copy()
+            matriz[posicao] = codificacao
+        return GaleriaFacial(ids, matriz)
+
+    def sem_aluno(self, id_aluno):
+        """Nova galeria sem o aluno (a própria galeria se ele não estiver nela)."""
+        posicao = self.posicao(id_aluno)
+        if posicao is None:
+            return self
+        return GaleriaFacial(self.ids[:posicao] + self.ids[posicao + 1:], np.delete(self.matriz, posicao, axis=0))
+
+    @property
+    def dimensao(self):
+        return self.matriz.shape[1]
+
+    def distancias(self, codificacoes_faces):
+        """Retorna a matriz (F, N) de distâncias euclidianas entre as faces e todas as referências."""
+        consultas = np.asarray(codificacoes_faces, dtype=np.float32).reshape(-1, self.dimensao)
+        normas_consultas = np.einsum('ij,ij->i', consultas, consultas)
+        # |a - b|² = |a|² + |b|² - 2 a·b, com clip para absorver o erro numérico do float32
+        quadrados = normas_consultas[:, None] + self.normas_quadradas[None, :] - 2.0 * (consultas @ self.matriz.T)
+        np.maximum(quadrados, 0.0, out=quadrados)
+        return np.sqrt(quadrados, out=quadrados)
+
+    def comparar(self, codificacoes_faces, tolerancia=0.6):
+        """Compara todas as faces de um frame com a galeria e retorna a melhor correspondência de cada uma."""
+        if len(codificacoes_faces) == 0:
+            return []
+        if len(self) == 0:
+            return [Correspondencia(None, None, float('inf'), float('inf'), False) for _ in codificacoes_faces]
+
+        distancias = self.distancias(codificacoes_faces)
+        linhas = np.arange(distancias.shape[0])
+        melhores = np.argmin(distancias, axis=1)
+        melhores_distancias = distancias[linhas, melhores]
+
+        if len(self) > 1:
+            # Segunda menor distância por linha sem ordenar a linha inteira
+            segundas = np.partition(distancias, 1, axis=1)[:, 1]
+            margens = segundas - melhores_distancias
+        else:
+            margens = np.full(distancias.shape[0], np.inf, dtype=np.float32)
+
+        resultado = []
+        for indice, distancia, margem in zip(melhores.tolist(), melhores_distancias.tolist(), margens.tolist()):
+            resultado.append(Correspondencia(indice, self.ids[indice], distancia, margem, distancia <= tolerancia))
+        return resultado
@@ -0,0 +1,144 @@
+# indice_aproximado.py
+import numpy as np
+
+from galeria import Correspondencia
+
+# Abaixo deste tamanho a varredura exata da galeria é mais rápida que qualquer índice
+TAMANHO_MINIMO_INDICE = 2000
+
+
+def _atribuir(matriz, centroides, tamanho_bloco=8192):
+    """Retorna o índice do centróide mais próximo de cada linha, processando em blocos para limitar memória."""
+    normas_centroides = np.einsum('ij,ij->i', centroides, centroides)
+    atribuicoes = np.empty(matriz.shape[0], dtype=np.int32)
+    for inicio in range(0, matriz.shape[0], tamanho_bloco):
+        bloco = matriz[inicio:inicio + tamanho_bloco]
+        # |b|² é constante por linha e não altera o argmin
+        atribuicoes[inicio:inicio + tamanho_bloco] = np.argmin(normas_centroides[None, :] - 2.0 * (bloco @ centroides.T), axis=1)
+    return atribuicoes
+
+
+def treinar_centroides(matriz, n_listas, iteracoes=10, amostra_por_lista=64, semente=0):
+    """K-means (Lloyd) em NumPy puro sobre uma amostra da galeria."""
+    rng = np.random.default_rng(semente)
+    n_amostra = min(matriz.shape[0], n_listas * amostra_por_lista)
+    amostra = matriz[rng.choice(matriz.shape[0], n_amostra, replace=False)]
+    centroides = amostra[rng.choice(n_amostra, n_listas, replace=False)].copy()
+
+    for _ in range(iteracoes):
+        atribuicoes = _atribuir(amostra, centroides)
+        somas = np.zeros_like(centroides)
+        np.add.at(somas, atribuicoes, amostra)
+        contagens = np.bincount(atribuicoes, minlength=n_listas)
+        vazias = contagens == 0
+        centroides[~vazias] = somas[~vazias] / contagens[~vazias, None]
+        # Listas vazias são reiniciadas em pontos aleatórios da amostra
+        if vazias.any():
+            centroides[vazias] = amostra[rng.choice(n_amostra, int(vazias.sum()), replace=False)]
+    return np.ascontiguousarray(centroides, dtype=np.float32)
+
+
+class IndiceAproximado:
+    """Índice IVF (listas invertidas) sobre uma GaleriaFacial, com reordenação exata dos candidatos.
+
+    As codificações são agrupadas por k-means em `n_listas` listas. Cada consulta visita apenas as
+    `n_sondagens` listas de centróide mais próximo e calcula a distância exata somente para os
+    alunos dessas listas. Expõe a mesma interface de comparação da galeria.
+    """
+
+    def __init__(self, galeria, n_listas=None, n_sondagens=8, centroides=None, iteracoes=10, semente=0):
+        self.galeria = galeria
+        self.ids = galeria.ids
+        self.n_sondagens = n_sondagens
+
+        if centroides is None:
+            if n_listas is None:
+                n_listas = max(1, int(np.sqrt(len(galeria))))
+            n_listas = min(n_listas, max(1, len(galeria)))
+            centroides = treinar_centroides(galeria.matriz, n_listas, iteracoes=iteracoes, semente=semente)
+        self.centroides = centroides
+        self.normas_centroides = np.einsum('ij,ij->i', centroides, centroides)
+
+        # Listas invertidas em formato compacto: codificações reordenadas por lista (cada lista é uma
+        # fatia contígua da matriz, sem cópias na consulta) + deslocamentos
+        atribuicoes = _atribuir(galeria.matriz, centroides) if len(galeria) else np.empty(0, dtype=np.int32)
+        self.membros = np.argsort(atribuicoes, kind='stable').astype(np.int32)
+        self.deslocamentos = np.concatenate(([0], np.cumsum(np.bincount(atribuicoes, minlength=len(centroides)))))
+        self.matriz_ordenada = np.ascontiguousarray(galeria.matriz[self.membros])
+        self.normas_ordenadas = galeria.normas_quadradas[self.membros]
+
+    def __len__(self):
+        return len(self.galeria)
+
+    @property
+    def n_listas(self):
+        return len(self.centroides)
+
+    def reconstruir(self, galeria):
+        """Cria um índice para uma nova versão da galeria reaproveitando os centróides já treinados.
+
+        Os centróides são retreinados quando a galeria cresce ou encolhe demais em relação ao treino.
+        """
+        n_ideal = max(1, int(np.sqrt(len(galeria))))
+        if self.n_listas / 2 <= n_ideal <= self.n_listas * 2 and galeria.dimensao == self.centroides.shape[1]:
+            return IndiceAproximado(galeria, n_sondagens=self.n_sondagens, centroides=self.centroides)
+        return IndiceAproximado(galeria, n_sondagens=self.n_sondagens)
+
+    def listas_proximas(self, codificacao):
+        """Listas cujos centróides são os mais próximos da codificação."""
+        distancias_centroides = self.normas_centroides - 2.0 * (self.centroides @ codificacao)
+        n_sondagens = min(self.n_sondagens, self.n_listas)
+        return np.argpartition(distancias_centroides, n_sondagens - 1)[:n_sondagens]
+
+    def comparar(self, codificacoes_faces, tolerancia=0.6):
+        """Retorna a melhor correspondência de cada face, com distância exata entre os candidatos."""
+        if len(codificacoes_faces) == 0:
+            return []
+        consultas = np.asarray(codificacoes_faces, dtype=np.float32).reshape(-1, self.galeria.dimensao)
+
+        resultado = []
+        for consulta in consultas:
+            norma_consulta = float(consulta @ consulta)
+            melhor, segunda, posicao_melhor = np.inf, np.inf, -1
+            for lista in self.listas_proximas(consulta):
+                inicio, fim = self.deslocamentos[lista], self.deslocamentos[lista + 1]
+                if inicio == fim:
+                    continue
+                quadrados = self.normas_ordenadas[inicio:fim] - 2.0 * (self.matriz_ordenada[inicio:fim] @ consulta)
+                if fim - inicio > 1:
+                    dois = np.argpartition(quadrados, 1)[:2]
+                    if quadrados[dois[1]] < quadrados[dois[0]]:
+                        dois = dois[::-1]
+                else:
+                    dois = [0]
+                for local in dois:
+                    valor = float(quadrados[local])
+                    if valor < melhor:
+                        melhor, segunda, posicao_melhor = valor, melhor, inicio + int(local)
+                    elif valor < segunda:
+                        segunda = valor
+
+            if posicao_melhor < 0:
+                resultado.append(Correspondencia(None, None, float('inf'), float('inf'), False))
+                continue
+            distancia = float(np.sqrt(max(melhor + norma_consulta, 0.0)))
+            margem = float(np.sqrt(max(segunda + norma_consulta, 0.0))) - distancia if segunda < np.inf else float('inf')
+            indice = int(self.membros[posicao_melhor])
+            resultado.append(Correspondencia(indice, self.ids[indice], distancia, margem, distancia <= tolerancia))
+        return resultado
+
+
+def construir_indice(galeria, tipo='exato', anterior=None, n_sondagens=8, centroides=None):
+    """Retorna o objeto de comparação configurado para a galeria.
+
+    Com tipo 'aproximado' e galeria grande o suficiente devolve um IndiceAproximado (reaproveitando os
+    centróides informados ou os do índice anterior, se houver); caso contrário devolve a própria
+    galeria (varredura exata).
+    """
+    if tipo != 'aproximado' or len(galeria) < TAMANHO_MINIMO_INDICE:
+        return galeria
+    if centroides is not None and centroides.shape[1:] == (galeria.dimensao,):
+        return IndiceAproximado(galeria, n_sondagens=n_sondagens, centroides=centroides)
+    if isinstance(anterior, IndiceAproximado):
+        return anterior.reconstruir(galeria)
+    return IndiceAproximado(galeria, n_sondagens=n_sondagens)
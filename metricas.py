@@ -0,0 +1,33 @@
+# metricas.py
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class JanelaMetricas:
+    """Estatísticas (média, p95, máximo) de uma medição sobre as últimas `tamanho` amostras."""
+
+    def __init__(self, tamanho=200):
+        self._amostras = deque(maxlen=tamanho)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def registrar(self, valor):
+        with self._lock:
+            self._amostras.append(valor)
+            self._total += 1
+
+    def resumo(self):
+        with self._lock:
+            amostras = np.array(self._amostras, dtype=np.float64)
+            total = self._total
+        if len(amostras) == 0:
+            return {'amostras': total, 'ultimo': None, 'media': None, 'p95': None, 'maximo': None}
+        return {
+            'amostras': total,
+            'ultimo': round(float(amostras[-1]), 4),
+            'media': round(float(amostras.mean()), 4),
+            'p95': round(float(np.percentile(amostras, 95)), 4),
+            'maximo': round(float(amostras.max()), 4),
+        }
@@ -0,0 +1,239 @@
+# notificacoes.py
+import os
+import threading
+import time
+from collections import namedtuple
+
+from caixa_saida import enfileirar_email
+
+AUSENCIA = 'ausencia'
+RETORNO = 'retorno'
+
+# Janela de resumo (s): alertas de um mesmo destinatário dentro dela saem num único e-mail. 0 = envio imediato
+JANELA_RESUMO = float(os.getenv('NOTIFICACOES_JANELA_RESUMO', '0'))
+# E-mail da secretaria/administração que recebe um resumo de todos os alertas de cada janela
+EMAIL_ADMINISTRADOR = os.getenv('NOTIFICACOES_EMAIL_ADMINISTRADOR', '')
+# 1 = só o resumo do administrador é enviado, sem e-mails aos responsáveis
+SOMENTE_ADMINISTRADOR = os.getenv('NOTIFICACOES_SOMENTE_ADMINISTRADOR', '0') == '1'
+
+# Alerta de presença de um aluno. `episodio` numera os períodos de ausência do aluno (o retorno leva o
+# número da ausência que encerra); `verificacoes` = verificações consecutivas de ausência; `momento` = datetime
+EventoAlerta = namedtuple('EventoAlerta', ['id_aluno', 'tipo', 'episodio', 'verificacoes', 'momento'])
+
+
+def montar_email(evento):
+    """Assunto, texto puro e HTML do e-mail de um alerta."""
+    id_aluno = evento.id_aluno
+    if evento.tipo == AUSENCIA:
+        assunto = f"Alerta de Ausência - Aluno {id_aluno}"
+        paragrafos = [
+            f"O aluno {id_aluno} está ausente há {evento.verificacoes} verificações consecutivas.",
+            "Por favor, entre em contato com a instituição para mais informações.",
+        ]
+    else:
+        assunto = f"Aluno {id_aluno} Retornou"
+        paragrafos = [f"O aluno {id_aluno} retornou após período de ausência."]
+
+    texto = "\n\n".join(["Prezado Responsável,"] + paragrafos +
+                        ["Atenciosamente,\nSistema de Monitoramento de Presença"])
+    html = "<html><body><p>Prezado Responsável,</p>" + "".join(f"<p>{p}</p>" for p in paragrafos) + \
+           "<br><p>Atenciosamente,<br>Sistema de Monitoramento de Presença</p></body></html>"
+    return assunto, texto, html
+
+
+def _descrever(evento):
+    horario = evento.momento.strftime("%H:%M:%S")
+    if evento.tipo == AUSENCIA:
+        return f"Aluno {evento.id_aluno}: ausente há {evento.verificacoes} verificações consecutivas ({horario})"
+    return f"Aluno {evento.id_aluno}: retornou após período de ausência ({horario})"
+
+
+def montar_resumo(eventos, administrador=False):
+    """Assunto, texto puro e HTML de um e-mail que lista vários alertas, em ordem cronológica."""
+    eventos = sorted(eventos, key=lambda evento: evento.momento)
+    alunos = len({evento.id_aluno for evento in eventos})
+    if administrador:
+        assunto = f"Resumo de alertas de presença - {len(eventos)} alerta(s), {alunos} aluno(s)"
+        saudacao, introducao = "Prezada Administração,", "Alertas de presença do período:"
+    else:
+        assunto = f"Alertas de presença - {alunos} aluno(s)"
+        saudacao, introducao = "Prezado Responsável,", "Foram registrados os seguintes alertas:"
+    linhas = [_descrever(evento) for evento in eventos]
+
+    texto = "\n\n".join([saudacao, introducao + "\n" + "\n".join(f"- {linha}" for linha in linhas),
+                         "Atenciosamente,\nSistema de Monitoramento de Presença"])
+    html = f"<html><body><p>{saudacao}</p><p>{introducao}</p><ul>" + \
+           "".join(f"<li>{linha}</li>" for linha in linhas) + \
+           "</ul><br><p>Atenciosamente,<br>Sistema de Monitoramento de Presença</p></body></html>"
+    return assunto, texto, html
+
+
+class DespachanteNotificacoes:
+    """Ponto único de envio dos alertas de presença aos responsáveis.
+
+    Recebe eventos estruturados (EventoAlerta) e enfileira no máximo um e-mail por chave
+    (aluno, tipo, episódio); repetições da mesma chave, ou de um episódio anterior, são descartadas.
+    O contato vem de `obter_responsavel(id_aluno)` (cache em memória), sem consulta ao banco.
+
+    Com `janela` > 0 os alertas são acumulados por destinatário e, ao fim da janela aberta pelo
+    primeiro deles, cada destinatário recebe um único e-mail com todos os seus alunos; quando uma turma
+    inteira sai de uma vez, são tantos e-mails quantos responsáveis distintos, e não um por aluno.
+    `email_administrador` recebe, por janela, um resumo com todos os alertas, ou, com `janela` 0, uma cópia
+    de cada alerta assim que ele chega (com `somente_administrador`, é o único e-mail enviado).
+    """
+
+    def __init__(self, obter_responsavel, janela=JANELA_RESUMO, email_administrador=EMAIL_ADMINISTRADOR,
+                 somente_administrador=SOMENTE_ADMINISTRADOR):
+        self.obter_responsavel = obter_responsavel
+        self.janela = janela
+        self.email_administrador = email_administrador
+        self.somente_administrador = somente_administrador and bool(email_administrador)
+        self._lock = threading.Lock()
+        self._condicao = threading.Condition(self._lock)
+        self._avisados = {}  # (id_aluno, tipo) -> último episódio avisado
+        self._resumos = {}  # destinatário -> eventos aguardando o fim da janela
+        self._resumo_administrador = []
+        self._fim_janela = None  # monotonic em que a janela aberta é descarregada
+        self._thread = None
+        self.recebidos = 0
+        self.enfileirados = 0
+        self.repetidos = 0
+        self.sem_contato = 0
+        self.falhas = 0
+        self.resumos = 0  # e-mails que agruparam mais de um alerta
+
+    @property
+    def agrupando(self):
+        return self.janela > 0
+
+    def publicar(self, evento):
+        """Trata um alerta; True se um e-mail foi enfileirado para ele (ou ele entrou no resumo da janela)."""
+        chave = (evento.id_aluno, evento.tipo)
+        with self._lock:
+            self.recebidos += 1
+            anterior = self._avisados.get(chave)
+            if anterior is not None and anterior >= evento.episodio:
+                self.repetidos += 1
+                return False
+            # Reserva a chave antes de enfileirar, para um evento concorrente igual ser descartado
+            self._avisados[chave] = evento.episodio
+
+        responsavel = self.obter_responsavel(evento.id_aluno)
+        destinatario = responsavel.get('email') if responsavel else None
+        if not destinatario and not self.somente_administrador:
+            with self._lock:
+                self.sem_contato += 1
+            print(f"[AVISO] Nenhum e-mail encontrado para o aluno {evento.id_aluno}")
+            if not self.email_administrador:
+                return False
+            # Sem contato do responsável, o alerta ainda entra no resumo do administrador (abaixo)
+
+        if self.agrupando:
+            self._acumular(evento, None if self.somente_administrador else destinatario)
+            return True
+
+        avisado = False
+        if destinatario and not self.somente_administrador:
+            assunto, texto, html = montar_email(evento)
+            avisado = self._enfileirar(destinatario, assunto, texto, html, [evento])
+            if avisado:
+                print(f"[EMAIL] E-mail de {evento.tipo} do aluno {evento.id_aluno} (episódio {evento.episodio}) "
+                      f"enfileirado para {destinatario}")
+        if self.email_administrador:
+            # Sem janela, o administrador recebe uma cópia de cada alerta; como no resumo, a chave só é
+            # liberada numa falha se essa cópia era o único e-mail do alerta
+            unico = self.somente_administrador or not destinatario
+            assunto, texto, html = montar_resumo([evento], administrador=True)
+            if self._enfileirar(self.email_administrador, assunto, texto, html, [evento] if unico else []):
+                avisado = avisado or unico
+        return avisado
+
+    def _enfileirar(self, destinatario, assunto, texto, html, eventos):
+        if enfileirar_email(to_email=destinatario, subject=assunto, body_text=texto, html_content=html) is not None:
+            with self._lock:
+                self.enfileirados += 1
+            return True
+        with self._lock:
+            self.falhas += 1
+            # Libera as chaves: um novo evento do mesmo episódio ainda pode ser avisado
+            for evento in eventos:
+                chave = (evento.id_aluno, evento.tipo)
+                if self._avisados.get(chave) == evento.episodio:
+                    del self._avisados[chave]
+        print(f"[ERRO] Falha ao enfileirar e-mail para {destinatario}")
+        return False
+
+    def _acumular(self, evento, destinatario):
+        with self._condicao:
+            if destinatario:
+                self._resumos.setdefault(destinatario, []).append(evento)
+            if self.email_administrador:
+                self._resumo_administrador.append(evento)
+            if self._fim_janela is None:
+                # O primeiro alerta abre a janela; os seguintes entram no mesmo resumo
+                self._fim_janela = time.monotonic() + self.janela
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._executar, name='resumo-notificacoes', daemon=True)
+                    self._thread.start()
+                self._condicao.notify_all()
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                if self._fim_janela is None:
+                    self._thread = None
+                    return
+                espera = self._fim_janela - time.monotonic()
+                if espera > 0:
+                    self._condicao.wait(espera)
+                    continue
+            self.descarregar()
+
+    def descarregar(self):
+        """Envia agora os resumos da janela aberta (um e-mail por destinatário e o do administrador)."""
+        with self._condicao:
+            resumos, self._resumos = self._resumos, {}
+            administrador, self._resumo_administrador = self._resumo_administrador, []
+            self._fim_janela = None
+
+        for destinatario, eventos in resumos.items():
+            if len(eventos) == 1:
+                assunto, texto, html = montar_email(eventos[0])
+            else:
+                assunto, texto, html = montar_resumo(eventos)
+            if self._enfileirar(destinatario, assunto, texto, html, eventos) and len(eventos) > 1:
+                with self._lock:
+                    self.resumos += 1
+        if administrador:
+            assunto, texto, html = montar_resumo(administrador, administrador=True)
+            # O aviso aos responsáveis não depende do resumo do administrador; só libera as chaves
+            # se ele era o único e-mail
+            eventos = administrador if self.somente_administrador else []
+            if self._enfileirar(self.email_administrador, assunto, texto, html, eventos):
+                with self._lock:
+                    self.resumos += 1
+        total = sum(len(eventos) for eventos in resumos.values())
+        if resumos or administrador:
+            print(f"[EMAIL] Resumo de alertas: {total or len(administrador)} alerta(s) em {len(resumos)} e-mail(s) "
+                  f"para responsáveis" + (" e 1 para a administração" if administrador else "") + ".")
+
+    def esquecer(self, id_aluno):
+        """Descarta o histórico de avisos do aluno (aluno removido)."""
+        id_aluno = str(id_aluno)
+        with self._lock:
+            for tipo in (AUSENCIA, RETORNO):
+                self._avisados.pop((id_aluno, tipo), None)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'recebidos': self.recebidos,
+                'enfileirados': self.enfileirados,
+                'repetidos': self.repetidos,
+                'sem_contato': self.sem_contato,
+                'falhas': self.falhas,
+                'resumos': self.resumos,
+                # Com administrador, a lista dele tem todos os alertas da janela
+                'aguardando_resumo': len(self._resumo_administrador) if self.email_administrador
+                else sum(len(eventos) for eventos in self._resumos.values()),
+            }
@@ -0,0 +1,151 @@
+# pool_reconhecimento.py
+import os
+import threading
+import multiprocessing as mp
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Descreve uma imagem que está em um bloco de memória compartilhada (nada de array serializado via pickle)
+FrameCompartilhado = namedtuple('FrameCompartilhado', ['nome_shm', 'forma', 'dtype', 'deslocamento'])
+
+# --- Lado do worker ---------------------------------------------------------------------------------
+
+_face_recognition = None
+_blocos_anexados = OrderedDict()
+_MAX_BLOCOS_ANEXADOS = 32
+
+
+def _inicializar_worker():
+    """Carrega os modelos do dlib uma única vez por processo."""
+    global _face_recognition
+    import face_recognition  # a importação instancia detector HOG, preditor de pontos e codificador
+    _face_recognition = face_recognition
+
+
+def _anexar(descritor):
+    """Retorna uma view da imagem descrita, reaproveitando blocos já anexados."""
+    shm = _blocos_anexados.get(descritor.nome_shm)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=descritor.nome_shm)
+        _blocos_anexados[descritor.nome_shm] = shm
+        while len(_blocos_anexados) > _MAX_BLOCOS_ANEXADOS:
+            _, antigo = _blocos_anexados.popitem(last=False)
+            antigo.close()
+    else:
+        _blocos_anexados.move_to_end(descritor.nome_shm)
+    return np.ndarray(descritor.forma, dtype=descritor.dtype, buffer=shm.buf, offset=descritor.deslocamento)
+
+
+def _localizar_no_worker(descritor, upsample):
+    return _face_recognition.face_locations(_anexar(descritor), model="hog", number_of_times_to_upsample=upsample)
+
+
+def _codificar_no_worker(descritor, locais):
+    return _face_recognition.face_encodings(_anexar(descritor), locais)
+
+
+# --- Lado do processo principal -----------------------------------------------------------------------
+
+class PoolReconhecimento:
+    """Pool de processos para detecção HOG e extração de codificações faciais.
+
+    As imagens são entregues aos workers por memória compartilhada: cada thread chamadora (uma por
+    câmera) tem seus próprios blocos, reaproveitados entre frames e que só crescem quando necessário.
+    """
+
+    def __init__(self, n_workers):
+        self.n_workers = n_workers
+        self._executor = self._criar_executor(n_workers)
+        self._local = threading.local()
+        self._blocos = []
+        self._lock_blocos = threading.Lock()
+        # Sobe todos os workers já (e com eles os modelos), antes que as threads de captura existam
+        for futuro in [self._executor.submit(os.getpid) for _ in range(n_workers)]:
+            futuro.result()
+        print(f"[POOL] {n_workers} worker(s) de reconhecimento iniciado(s).")
+
+    @staticmethod
+    def _criar_executor(n_workers):
+        # Workers nascem de um processo limpo (forkserver; spawn no Windows), nunca de um fork do processo
+        # principal, que já tem threads (SocketIO, caixa de saída, diário) e conexões MySQL abertas
+        if os.name == 'nt':
+            contexto = mp.get_context('spawn')
+        else:
+            contexto = mp.get_context('forkserver')
+            # O servidor de fork carrega só este módulo, e não a aplicação
+            contexto.set_forkserver_preload([__name__])
+        return ProcessPoolExecutor(max_workers=n_workers, mp_context=contexto, initializer=_inicializar_worker)
+
+    def compartilhar(self, imagem, chave='frame'):
+        """Copia a imagem para o bloco compartilhado (thread atual, chave) e retorna seu descritor.
+
+        O bloco permanece válido até a próxima chamada da mesma thread com a mesma chave.
+        """
+        imagem = np.ascontiguousarray(imagem)
+        blocos_thread = getattr(self._local, 'blocos', None)
+        if blocos_thread is None:
+            blocos_thread = self._local.blocos = {}
+        shm = blocos_thread.get(chave)
+        if shm is None or shm.size < imagem.nbytes:
+            if shm is not None:
+                with self._lock_blocos:
+                    self._blocos.remove(shm)
+                shm.close()
+                shm.unlink()
+            shm = shared_memory.SharedMemory(create=True, size=imagem.nbytes)
+            with self._lock_blocos:
+                self._blocos.append(shm)
+            blocos_thread[chave] = shm
+        destino = np.ndarray(imagem.shape, dtype=imagem.dtype, buffer=shm.buf)
+        destino[...] = imagem
+        return FrameCompartilhado(shm.name, imagem.shape, imagem.dtype.str, 0)
+
+    def _descritor(self, imagem):
+        if isinstance(imagem, FrameCompartilhado):
+            return imagem
+        return self.compartilhar(imagem)
+
+    def localizar_faces(self, imagem, upsample=0):
+        """Executa a detecção HOG em um worker."""
+        return self._executor.submit(_localizar_no_worker, self._descritor(imagem), upsample).result()
+
+    def codificar_faces(self, imagem, locais):
+        """Extrai as codificações das faces, dividindo as faces entre os workers."""
+        if not locais:
+            return []
+        descritor = self._descritor(imagem)
+        n_partes = min(self.n_workers, len(locais))
+        partes = [locais[i::n_partes] for i in range(n_partes)]
+        futuros = [self._executor.submit(_codificar_no_worker, descritor, parte) for parte in partes]
+        resultados = [futuro.result() for futuro in futuros]
+        # Recompõe a ordem original (a face i foi para a parte i % n_partes)
+        codificacoes = [None] * len(locais)
+        for indice_parte, codificacoes_parte in enumerate(resultados):
+            codificacoes[indice_parte::n_partes] = codificacoes_parte
+        return codificacoes
+
+    def encerrar(self):
+        self._executor.shutdown(wait=True)
+        with self._lock_blocos:
+            for shm in self._blocos:
+                shm.close()
+                shm.unlink()
+            self._blocos = []
+        print("[POOL] Workers de reconhecimento encerrados.")
+
+
+def criar_pool(n_workers):
+    """Cria o pool somente no processo principal e quando configurado (n_workers > 0).
+
+    Os workers importam de novo o módulo principal da aplicação; ali o pool não é criado.
+    """
+    if n_workers <= 0 or mp.parent_process() is not None or mp.current_process().name != 'MainProcess':
+        return None
+    try:
+        return PoolReconhecimento(n_workers)
+    except Exception as e:
+        print(f"[AVISO] Não foi possível iniciar o pool de reconhecimento, usando a thread local: {e}")
+        return None
@@ -0,0 +1,151 @@
+# rastreador_faces.py
+import itertools
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+def iou(caixa_a, caixa_b):
+    """Interseção sobre união de duas caixas (top, right, bottom, left)."""
+    top, right = max(caixa_a[0], caixa_b[0]), min(caixa_a[1], caixa_b[1])
+    bottom, left = min(caixa_a[2], caixa_b[2]), max(caixa_a[3], caixa_b[3])
+    intersecao = max(0, right - left) * max(0, bottom - top)
+    if intersecao == 0:
+        return 0.0
+    area_a = (caixa_a[1] - caixa_a[3]) * (caixa_a[2] - caixa_a[0])
+    area_b = (caixa_b[1] - caixa_b[3]) * (caixa_b[2] - caixa_b[0])
+    return intersecao / float(area_a + area_b - intersecao)
+
+
+class Trilha:
+    """Uma face acompanhada entre frames de uma câmera, com a identidade da última codificação."""
+
+    def __init__(self, id_trilha, caixa, agora):
+        self.id = id_trilha
+        self.caixa = caixa
+        self.id_aluno = None
+        self.distancia = None
+        self.codificada_em = None  # None = ainda não foi codificada
+        self.vista_em = agora
+        self.perdidos = 0  # frames consecutivos sem detecção associada
+
+
+class RastreadorFaces:
+    """Associa as faces detectadas em frames consecutivos de cada câmera por IoU das caixas.
+
+    Só trilhas novas (ou com identidade vencida) precisam ser codificadas; enquanto a trilha segue
+    viva a identidade confirmada é reaproveitada. Opcionalmente o deslocamento de cada trilha é
+    previsto por fluxo óptico (Lucas-Kanade) antes da associação, para tolerar movimentos rápidos.
+    """
+
+    def __init__(self, iou_minimo=0.3, max_perdidos=2, intervalo_reidentificacao=30.0,
+                 intervalo_desconhecido=5.0, fluxo_optico=False):
+        self.iou_minimo = iou_minimo
+        self.max_perdidos = max_perdidos
+        self.intervalo_reidentificacao = intervalo_reidentificacao
+        self.intervalo_desconhecido = intervalo_desconhecido
+        self.fluxo_optico = fluxo_optico
+        self._lock = threading.Lock()
+        self._cameras = {}  # camera_id -> {'trilhas': [Trilha], 'cinza': imagem anterior}
+        self._ids = itertools.count(1)
+
+    def _prever_com_fluxo(self, trilhas, anterior, cinza, escala):
+        """Desloca cada caixa pela mediana do fluxo óptico dos pontos de uma grade dentro dela."""
+        pontos, donos = [], []
+        for posicao, trilha in enumerate(trilhas):
+            top, right, bottom, left = (v * escala for v in trilha.caixa)
+            for y in np.linspace(top, bottom, 5)[1:-1]:
+                for x in np.linspace(left, right, 5)[1:-1]:
+                    pontos.append((x, y))
+                    donos.append(posicao)
+        if not pontos:
+            return
+        pontos = np.array(pontos, dtype=np.float32).reshape(-1, 1, 2)
+        novos, status, _erro = cv2.calcOpticalFlowPyrLK(anterior, cinza, pontos, None)
+        deslocamentos = (novos - pontos).reshape(-1, 2) / escala
+        donos = np.array(donos)
+        validos = status.reshape(-1) == 1
+        for posicao, trilha in enumerate(trilhas):
+            selecao = validos & (donos == posicao)
+            if selecao.any():
+                dx, dy = np.median(deslocamentos[selecao], axis=0)
+                top, right, bottom, left = trilha.caixa
+                trilha.caixa = (int(round(top + dy)), int(round(right + dx)), int(round(bottom + dy)), int(round(left + dx)))
+
+    def atualizar(self, camera_id, caixas, agora=None, cinza=None, escala=1.0):
+        """Associa as caixas do frame às trilhas da câmera e retorna a trilha de cada caixa, na mesma ordem.
+
+        `cinza` (imagem em tons de cinza do frame, em `escala` das coordenadas das caixas) só é usada
+        com fluxo óptico habilitado.
+        """
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            estado = self._cameras.setdefault(camera_id, {'trilhas': [], 'cinza': None})
+            trilhas = estado['trilhas']
+
+            if self.fluxo_optico and cinza is not None:
+                anterior = estado['cinza']
+                if anterior is not None and anterior.shape == cinza.shape and trilhas:
+                    self._prever_com_fluxo(trilhas, anterior, cinza, escala)
+                estado['cinza'] = cinza
+
+            # Associação gulosa pelos pares de maior IoU
+            pares = sorted(
+                ((iou(trilha.caixa, caixa), t, c) for t, trilha in enumerate(trilhas) for c, caixa in enumerate(caixas)),
+                reverse=True,
+            )
+            resultado = [None] * len(caixas)
+            usadas = set()
+            for valor, t, c in pares:
+                if valor < self.iou_minimo:
+                    break
+                if t in usadas or resultado[c] is not None:
+                    continue
+                usadas.add(t)
+                trilha = trilhas[t]
+                trilha.caixa, trilha.vista_em, trilha.perdidos = caixas[c], agora, 0
+                resultado[c] = trilha
+
+            sobreviventes = []
+            for t, trilha in enumerate(trilhas):
+                if t not in usadas:
+                    trilha.perdidos += 1
+                    if trilha.perdidos > self.max_perdidos:
+                        continue
+                sobreviventes.append(trilha)
+            for c, caixa in enumerate(caixas):
+                if resultado[c] is None:
+                    resultado[c] = Trilha(next(self._ids), caixa, agora)
+                    sobreviventes.append(resultado[c])
+            estado['trilhas'] = sobreviventes
+            return resultado
+
+    def precisa_codificar(self, trilha, agora=None):
+        """Trilhas novas sempre; identificadas a cada intervalo_reidentificacao; desconhecidas a cada intervalo_desconhecido."""
+        if trilha.codificada_em is None:
+            return True
+        agora = time.time() if agora is None else agora
+        intervalo = self.intervalo_reidentificacao if trilha.id_aluno is not None else self.intervalo_desconhecido
+        return agora - trilha.codificada_em >= intervalo
+
+    def identificar(self, trilha, id_aluno, distancia=None, agora=None):
+        trilha.id_aluno = id_aluno
+        trilha.distancia = distancia
+        trilha.codificada_em = time.time() if agora is None else agora
+
+    def invalidar_identidades(self):
+        """Força nova codificação de todas as trilhas (ex.: a galeria mudou)."""
+        with self._lock:
+            for estado in self._cameras.values():
+                for trilha in estado['trilhas']:
+                    trilha.codificada_em = None
+
+    def remover_camera(self, camera_id):
+        with self._lock:
+            self._cameras.pop(camera_id, None)
+
+    def trilhas(self, camera_id):
+        with self._lock:
+            return list(self._cameras.get(camera_id, {}).get('trilhas', []))
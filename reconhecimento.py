@@ -2,25 +2,85 @@
 import os
 import cv2
 import face_recognition
-import numpy as np
 from datetime import datetime
 import threading
 import time
-from queue import Queue
-import base64
-from cadastro import listar_alunos, obter_responsavel_por_aluno
-from smtp_service import send_email
+from concurrent.futures.process import BrokenProcessPool
+from cadastro import listar_codificacoes, listar_responsaveis, obter_versao_galeria
+from galeria import GaleriaFacial
+from indice_aproximado import IndiceAproximado, construir_indice
+from pool_reconhecimento import criar_pool
+from anel_frames import ler_frame
+from escalonador import EscalonadorCameras
+from metricas import JanelaMetricas
+from cascata_detectores import CascataDetectores, EstagioDeteccao, PiramideImagem, detectar_em_recortes
+from rastreador_faces import RastreadorFaces
+from detector_movimento import DetectorMovimento
+from regioes_interesse import RegioesInteresse
+from escala_dinamica import PoliticaEscala
+from snapshot_galeria import SnapshotGaleria, carregar_snapshot, salvar_snapshot
+from notificacoes import AUSENCIA, RETORNO, DespachanteNotificacoes, EventoAlerta
+from registro_presencas import RegistroPresencas
+
+TOLERANCIA_RECONHECIMENTO = float(os.getenv('RECONHECIMENTO_TOLERANCIA', '0.6'))
+# 'exato' (varredura completa) ou 'aproximado' (IVF para galerias com dezenas de milhares de alunos)
+TIPO_INDICE = os.getenv('RECONHECIMENTO_INDICE', 'exato')
+SONDAGENS_INDICE = int(os.getenv('RECONHECIMENTO_INDICE_SONDAGENS', '8'))
+# Processos dedicados à detecção/codificação (0 = tudo na thread de processamento)
+NUM_WORKERS = int(os.getenv('RECONHECIMENTO_WORKERS', '0'))
+# Slots pré-alocados no anel de frames de cada câmera
+SLOTS_ANEL = int(os.getenv('RECONHECIMENTO_SLOTS_ANEL', '4'))
+# Intervalo mínimo, em segundos, entre duas verificações de presença (atualização dos contadores de ausência)
+INTERVALO_VERIFICACAO = float(os.getenv('RECONHECIMENTO_INTERVALO', '5'))
+# Intervalo entre passadas de rastreamento; faces já identificadas não são recodificadas
+INTERVALO_RASTREIO = float(os.getenv('RECONHECIMENTO_INTERVALO_RASTREIO', '1'))
+# Segundos até reconfirmar a identidade de uma trilha já reconhecida
+INTERVALO_REIDENTIFICACAO = float(os.getenv('RECONHECIMENTO_REIDENTIFICACAO', '30'))
+FLUXO_OPTICO = os.getenv('RECONHECIMENTO_FLUXO_OPTICO', '0') == '1'
+# Cena sem movimento: o último resultado é reaproveitado e a detecção completa só roda a cada N segundos
+INTERVALO_OCIOSO = float(os.getenv('RECONHECIMENTO_INTERVALO_OCIOSO', '30'))
+# Fração da miniatura que precisa mudar para contar como movimento
+LIMIAR_MOVIMENTO = float(os.getenv('RECONHECIMENTO_LIMIAR_MOVIMENTO', '0.01'))
+# Menor face (altura em pixels do frame original) que precisa ser detectada
+TAMANHO_MINIMO_FACE = int(os.getenv('RECONHECIMENTO_TAMANHO_MINIMO_FACE', '80'))
+# Largura de trabalho da detecção enquanto a câmera ainda não tem tamanhos de face observados
+LARGURA_TRABALHO = int(os.getenv('RECONHECIMENTO_LARGURA_TRABALHO', '640'))
+# Câmeras com movimento ou faces recentes são atendidas com esta frequência relativa
+PESO_CAMERA_ATIVA = float(os.getenv('RECONHECIMENTO_PESO_CAMERA_ATIVA', '2'))
+# Arquivo com as regiões de interesse de cada câmera
+ARQUIVO_REGIOES = os.getenv('RECONHECIMENTO_ARQUIVO_REGIOES', '.regioes_cameras.json')
+# Diretório do snapshot local da galeria (matriz .npy mapeada em memória); vazio desativa
+DIRETORIO_GALERIA = os.getenv('RECONHECIMENTO_DIRETORIO_GALERIA', '.galeria')
+# Tempo máximo de detecção por frame, em ms (0 = sem limite); o primeiro estágio sempre executa
+ORCAMENTO_DETECCAO = float(os.getenv('RECONHECIMENTO_ORCAMENTO_DETECCAO_MS', '2000')) / 1000
 
 class ReconhecimentoFacial:
     def __init__(self):
-        self.codificacoes_referencia = []
-        self.nomes_referencia = []
+        self.galeria = GaleriaFacial()
+        self.indice = self.galeria  # GaleriaFacial (busca exata) ou IndiceAproximado
         self.ausencias_consecutivas = {}
         self.ultima_presenca = {}  # Para rastrear quando o aluno foi visto pela última vez
         self.email_enviado = {}  # Para rastrear se já foi enviado e-mail de ausência
+        self.episodios_ausencia = {}  # id_aluno -> número do episódio de ausência atual (ou do último)
         self.monitoramento_ativo = False
-        self.frame_queue = Queue(maxsize=5)  # Fila para comunicação entre threads
+        # Último frame de cada câmera, (anel, seq) ou ndarray, com escalonamento justo entre câmeras
+        self.caixa_frames = EscalonadorCameras(peso_ativo=PESO_CAMERA_ATIVA)
+        self.camera_presenca = {}  # id_aluno -> câmera em que foi identificado por último
+        self.metricas = {
+            'atraso_frame': JanelaMetricas(),  # idade do frame quando o processamento começa (s)
+            'latencia_decisao': JanelaMetricas(),  # da captura até a decisão de presença (s)
+        }
+        self.aneis = {}  # Anel de frames em memória compartilhada de cada câmera
         self.lock = threading.Lock()
+        self._lock_edicao = threading.Lock()  # serializa alterações da galeria (não bloqueia o reconhecimento)
+        self._versao_galeria = None  # contador do banco ao qual a galeria vigente corresponde (None = desconhecido)
+        # Contatos dos responsáveis, carregados com a galeria: id_aluno -> {'telefone', 'email'}. O dicionário
+        # nunca é alterado no lugar, só substituído, para ser lido sem lock pelos alertas
+        self.responsaveis = {}
+        # Único caminho dos alertas até os responsáveis: um e-mail por (aluno, tipo, episódio)
+        self.notificacoes = DespachanteNotificacoes(self.obter_responsavel)
+        # Presenças confirmadas, guardadas como sessões (primeira/última detecção) em `sessoes_presenca`
+        self.registro_presencas = RegistroPresencas()
         self.callback_mensagens = None
         self.callback_frame = None
         
@@ -29,6 +89,31 @@ class ReconhecimentoFacial:
         # Classificador Haar para fallback de detecção de rosto
         self._haar_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         
+        # Pool de processos para HOG e codificações (None quando RECONHECIMENTO_WORKERS=0 ou enquanto é recriado)
+        self.pool = criar_pool(NUM_WORKERS)
+        self._lock_pool = threading.Lock()
+        self._recriando_pool = None  # thread que sobe um pool novo depois de uma falha
+        self.falhas_pool = 0
+
+        # Regiões de interesse por câmera (detecção só dentro delas)
+        self.regioes = RegioesInteresse(ARQUIVO_REGIOES)
+
+        # Escala de trabalho por câmera, conforme os tamanhos de face observados
+        self.escalas = PoliticaEscala(tamanho_minimo_face=TAMANHO_MINIMO_FACE, largura_inicial=LARGURA_TRABALHO)
+
+        # Cascata de detectores com estatísticas por câmera
+        self.cascata = CascataDetectores(self._estagios_deteccao(), orcamento=ORCAMENTO_DETECCAO or None)
+
+        # Rastreamento de faces entre passadas: só trilhas novas ou vencidas são codificadas
+        self.rastreador = RastreadorFaces(intervalo_reidentificacao=INTERVALO_REIDENTIFICACAO,
+                                          intervalo_desconhecido=INTERVALO_VERIFICACAO, fluxo_optico=FLUXO_OPTICO)
+        self._indice_rastreado = None
+
+        # Detecção de movimento por câmera (thread de captura) e último resultado completo de cada câmera
+        self.detectores_movimento = {}
+        self._ultima_passada = {}  # camera_id -> (timestamp do frame, alunos identificados, concluido)
+        self.passadas = {'completas': 0, 'reaproveitadas': 0}
+        
     def definir_callback_mensagens(self, callback):
         self.callback_mensagens = callback
     
@@ -45,6 +130,117 @@ class ReconhecimentoFacial:
     
     def parar_monitoramento(self):
         self.monitoramento_ativo = False
+        self.caixa_frames.despertar()
+
+    def obter_metricas(self):
+        metricas = {nome: janela.resumo() for nome, janela in self.metricas.items()}
+        metricas['cascata'] = self.cascata.estatisticas()
+        metricas['escalas'] = self.escalas.estatisticas()
+        metricas['passadas'] = dict(self.passadas)
+        metricas['pool'] = {'ativo': self.pool is not None, 'falhas': self.falhas_pool}
+        metricas['cameras'] = self.caixa_frames.estatisticas()
+        metricas['notificacoes'] = self.notificacoes.estatisticas()
+        metricas['presencas'] = self.registro_presencas.estatisticas()
+        return metricas
+
+    def encerrar(self):
+        """Para o monitoramento, libera os workers de reconhecimento, envia os resumos de alertas pendentes
+        e grava as presenças ainda em memória."""
+        self.parar_monitoramento()
+        self.notificacoes.descarregar()
+        self.registro_presencas.encerrar()
+        recriando = self._recriando_pool
+        if recriando is not None:
+            recriando.join()
+        with self._lock_pool:
+            pool, self.pool = self.pool, None
+        if pool:
+            pool.encerrar()
+
+    def registrar_movimento(self, camera_id, frame, timestamp=None):
+        """Chamado pela thread de captura a cada frame; retorna True se a cena mudou."""
+        detector = self.detectores_movimento.get(camera_id)
+        if detector is None:
+            detector = self.detectores_movimento[camera_id] = DetectorMovimento(limiar_fracao=LIMIAR_MOVIMENTO)
+        if detector.atualizar(frame, timestamp):
+            self.caixa_frames.registrar_atividade(camera_id, detector.ultimo_movimento)
+            return True
+        return False
+
+    def remover_camera(self, camera_id):
+        self.caixa_frames.remover(camera_id)
+        self.rastreador.remover_camera(camera_id)
+        self.detectores_movimento.pop(camera_id, None)
+        self._ultima_passada.pop(camera_id, None)
+
+    def _pode_reaproveitar(self, camera_id, timestamp_captura):
+        """True se a cena da câmera não mudou desde a última passada completa e o keep-alive não venceu."""
+        detector = self.detectores_movimento.get(camera_id)
+        anterior = self._ultima_passada.get(camera_id)
+        if detector is None or anterior is None:
+            return False
+        return detector.estatico_desde(anterior[0]) and timestamp_captura - anterior[0] < INTERVALO_OCIOSO
+
+    def _identificar_com_pool(self, frame, camera_id):
+        """identificar_alunos; se um worker do pool morreu, refaz o frame na própria thread e recria o pool."""
+        try:
+            return self.identificar_alunos(frame, camera_id)
+        except BrokenProcessPool as e:
+            self._recriar_pool(e)
+            return self.identificar_alunos(frame, camera_id)
+
+    def _recriar_pool(self, erro):
+        """Descarta o pool quebrado e sobe outro em segundo plano; até lá a detecção roda na thread local."""
+        with self._lock_pool:
+            pool, self.pool = self.pool, None
+            if pool is None or self._recriando_pool is not None:
+                return
+            self.falhas_pool += 1
+            print(f"[ERRO] Pool de reconhecimento interrompido ({erro!r}); usando a thread local até recriá-lo.")
+
+            def recriar():
+                pool.encerrar()
+                novo = criar_pool(NUM_WORKERS)
+                with self._lock_pool:
+                    self.pool = novo
+                    self._recriando_pool = None
+                if novo:
+                    print("[INFO] Pool de reconhecimento recriado.")
+
+            self._recriando_pool = threading.Thread(target=recriar, name='recriar-pool', daemon=True)
+            self._recriando_pool.start()
+
+    def _localizar_faces(self, imagem_rgb, upsample):
+        if self.pool:
+            return self.pool.localizar_faces(imagem_rgb, upsample)
+        return face_recognition.face_locations(imagem_rgb, model="hog", number_of_times_to_upsample=upsample)
+
+    def _codificar_faces(self, imagem_rgb, locais):
+        if self.pool:
+            return self.pool.codificar_faces(imagem_rgb, locais)
+        return face_recognition.face_encodings(imagem_rgb, locais)
+
+    def _detectar_haar(self, cinza):
+        detected = self._haar_cascade.detectMultiScale(cinza, scaleFactor=1.05, minNeighbors=3, minSize=(40, 40))
+        # (x, y, w, h) -> (top, right, bottom, left)
+        return [(y, x + w, y + h, x) for (x, y, w, h) in detected]
+
+    def _estagios_deteccao(self):
+        """Estágios na ordem padrão: HOG reduzido, HOG reduzido com upsample, Haar reduzido e HOG no frame completo.
+
+        Cada estágio varre apenas os recortes das regiões de interesse da câmera, quando houver. Na escala 1.0
+        o HOG completo seria o mesmo que o reduzido com upsample, e a cascata não o executa.
+        """
+        return [
+            EstagioDeteccao('hog_reduzido', 'reduzido',
+                            lambda p: detectar_em_recortes(p, 'reduzido', lambda imagem: self._localizar_faces(imagem, 0))),
+            EstagioDeteccao('hog_reduzido_upsample', 'reduzido',
+                            lambda p: detectar_em_recortes(p, 'reduzido', lambda imagem: self._localizar_faces(imagem, 1))),
+            EstagioDeteccao('haar_reduzido', 'reduzido',
+                            lambda p: detectar_em_recortes(p, 'reduzido', self._detectar_haar, cor='cinza')),
+            EstagioDeteccao('hog_completo', 'completo',
+                            lambda p: detectar_em_recortes(p, 'completo', lambda imagem: self._localizar_faces(imagem, 1))),
+        ]
 
     def _capturar_frames(self, camera_id):
         """Thread que captura frames da câmera e os envia para o feed de vídeo E para a fila de processamento."""
@@ -64,21 +260,30 @@ class ReconhecimentoFacial:
 
         print(f"[MONITORAMENTO] Câmera {camera_id} aberta com sucesso.")
         
+        anel = None
         while self.monitoramento_ativo:
-            ret, frame = cap.read()
-            if not ret or frame is None:
+            # Decodifica direto em um slot pré-alocado do anel da câmera (sem alocação por frame)
+            ret, anel, seq = ler_frame(cap, anel, n_slots=SLOTS_ANEL)
+            if not ret:
                 print("[AVISO] Frame nulo ou inválido recebido da câmera.")
                 time.sleep(1)
                 continue
+            if seq is None:
+                continue
+            self.aneis[camera_id] = anel
+
+            frame_anel = anel.adquirir(seq)
+            if frame_anel is None:
+                continue
+            # Miniatura para detecção de movimento, antes de publicar o frame
+            self.registrar_movimento(camera_id, frame_anel.imagem, frame_anel.timestamp)
 
-            # --- CORREÇÃO ADICIONADA AQUI ---
-            # Coloca o frame original na fila para ser analisado pela outra thread.
-            if not self.frame_queue.full():
-                self.frame_queue.put(frame)
-            # --------------------------------
+            # Publica na caixa da câmera; a thread de processamento lê o slot diretamente do anel
+            self.caixa_frames.publicar(camera_id, (anel, seq), frame_anel.timestamp)
 
             # Codifica um frame REDUZIDO para enviar à interface (mais leve e fluido)
             try:
+                frame = frame_anel.imagem
                 h, w = frame.shape[:2]
                 target_w = 640
                 if w > target_w:
@@ -88,99 +293,174 @@ class ReconhecimentoFacial:
                     display_frame = frame
                 
                 ret_encode, buffer = cv2.imencode('.jpg', display_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                if ret_encode:
-                    frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                    if self.callback_frame:
-                        self.callback_frame(frame_base64)
+                if ret_encode and self.callback_frame:
+                    # Bytes do JPEG: a interface recebe o frame como anexo binário, sem base64
+                    self.callback_frame(buffer.tobytes(), camera_id)
             except Exception as e:
                 print(f"[AVISO] Falha ao codificar frame para UI: {e}")
+            finally:
+                frame_anel.liberar()
             
             # Alvo de ~20-24 FPS para feed da UI
             time.sleep(1 / 24)
 
         cap.release()
+        self.remover_camera(camera_id)
+        if anel is not None:
+            self.aneis.pop(camera_id, None)
+            anel.fechar()
         print(f"[MONITORAMENTO] Câmera {camera_id} liberada.")
 
     def _processar_frames(self):
-        """Thread que pega frames da fila, processa o reconhecimento e envia os logs."""
-        ultima_verificacao = 0
+        """Thread que aguarda frames na caixa, processa o reconhecimento e envia os logs."""
+        proxima_decisao = 0  # prazo da próxima atualização dos contadores de presença/ausência
+        vistos = set()  # alunos identificados pelo rastreamento desde a última decisão
         print("[PROCESSAMENTO] Thread de processamento iniciada. Aguardando para iniciar verificações.")
 
         while self.monitoramento_ativo:
-            time.sleep(1) 
+            # Dorme até alguma câmera ter um frame capturado depois do seu prazo; entre várias, o
+            # escalonador entrega a de prazo mais antigo (o timeout só serve para reavaliar monitoramento_ativo)
+            entrada = self.caixa_frames.aguardar(timeout=0.5)
+            if entrada is None or not self.monitoramento_ativo:
+                continue
+            
+            camera_id, item, timestamp_captura = entrada
+
+            # Itens do anel viram uma view somente leitura do slot, reservada durante o processamento
+            frame_anel = None
+            if isinstance(item, tuple):
+                anel, seq = item
+                frame_anel = anel.adquirir(seq)
+                if frame_anel is None:
+                    continue
+                frame = frame_anel.imagem
+                timestamp_captura = frame_anel.timestamp
+            else:
+                frame = item
 
-            if self.frame_queue.empty():
+            inicio = time.time()
+            atraso = inicio - timestamp_captura
+            self.metricas['atraso_frame'].registrar(atraso)
+            print(f"[PROCESSAMENTO] Processando frame da câmera {camera_id} ({atraso * 1000:.0f} ms após a captura)...")
+            decidir = timestamp_captura >= proxima_decisao
+            try:
+                if self._pode_reaproveitar(camera_id, timestamp_captura):
+                    # Cena estática desde a última passada completa: o resultado continua valendo
+                    _ts, identificados, concluido = self._ultima_passada[camera_id]
+                    identificados, mensagens = set(identificados), []
+                    self.passadas['reaproveitadas'] += 1
+                else:
+                    identificados, mensagens, concluido = self._identificar_com_pool(frame, camera_id)
+                    self._ultima_passada[camera_id] = (timestamp_captura, frozenset(identificados), concluido)
+                    self.passadas['completas'] += 1
+            except Exception as e:
+                # Um frame com erro não pode encerrar a thread: o reconhecimento pararia até reiniciar a aplicação
+                print(f"[ERRO] Falha ao processar frame da câmera {camera_id}: {e!r}")
+                self.caixa_frames.concluir(camera_id, timestamp_captura, INTERVALO_RASTREIO)
+                continue
+            finally:
+                if frame_anel is not None:
+                    frame_anel.liberar()
+            # Próximo prazo da câmera (mais curto se ela teve atividade recente)
+            if identificados:
+                self.caixa_frames.registrar_atividade(camera_id, timestamp_captura)
+                for id_aluno in identificados:
+                    self.camera_presenca[id_aluno] = camera_id
+            self.caixa_frames.concluir(camera_id, timestamp_captura, INTERVALO_RASTREIO)
+
+            if not decidir:
+                # Passada só de rastreamento: acumula quem foi visto até a próxima decisão
+                vistos.update(identificados)
+                self.metricas['latencia_decisao'].registrar(time.time() - timestamp_captura)
                 continue
+            alunos_presentes, mensagens = self._registrar_presenca(identificados | vistos, mensagens, concluido)
+            vistos = set()
+            proxima_decisao = timestamp_captura + INTERVALO_VERIFICACAO
+            print(f"[PROCESSAMENTO] Verificação concluída. Mensagens geradas: {mensagens}")
+
+            if self.callback_mensagens and mensagens:
+                print("[PROCESSAMENTO] Enviando mensagens para a interface.")
+                self.callback_mensagens(mensagens)
             
-            # Processa a cada 5 segundos para respostas mais rápidas
-            if time.time() - ultima_verificacao >= 5:
-                print(f"[PROCESSAMENTO] Timer de 5s atingido. Processando um frame...")
-                frame = self.frame_queue.get()
-                
-                # Limpa a fila para não processar frames antigos e pegar sempre o mais recente
-                while not self.frame_queue.empty():
-                    try:
-                        self.frame_queue.get_nowait()
-                    except Exception:
-                        break
+            # Latência fim a fim: da captura do frame até a decisão de presença/ausência
+            latencia = time.time() - timestamp_captura
+            self.metricas['latencia_decisao'].registrar(latencia)
+            print(f"[PROCESSAMENTO] Decisão tomada {latencia * 1000:.0f} ms após a captura.")
 
-                alunos_presentes, mensagens = self.verificar_presenca(frame)
-                print(f"[PROCESSAMENTO] Verificação concluída. Mensagens geradas: {mensagens}")
+    def _ler_galeria(self):
+        """Retorna (SnapshotGaleria, responsaveis, do_banco).
 
-                with self.lock:
-                    # Primeiro, verifica os alunos que estavam ausentes e agora estão presentes
-                    for id_aluno in list(self.ausencias_consecutivas.keys()):
-                        if id_aluno in alunos_presentes and self.ausencias_consecutivas.get(id_aluno, 0) >= 2:
-                            # Aluno que estava ausente e agora está presente
-                            mensagens.append(f"ALERTA: Aluno {id_aluno} retornou após {self.ausencias_consecutivas[id_aluno]} verificações de ausência.")
-                            self.ausencias_consecutivas[id_aluno] = 0
-                            self.ultima_presenca[id_aluno] = datetime.now()
-                            
-                            # Envia e-mail de retorno se um e-mail de ausência foi enviado anteriormente
-                            if self.email_enviado.get(id_aluno, False):
-                                self._enviar_email_retorno(id_aluno)
-                                self.email_enviado[id_aluno] = False
-                    
-                    # Atualiza o status de presença/ausência
-                    for id_aluno in self.nomes_referencia:
-                        nome_aluno_str = str(id_aluno)
-                        if nome_aluno_str in alunos_presentes:
-                            # Se o aluno estava ausente e agora está presente
-                            if self.ausencias_consecutivas.get(nome_aluno_str, 0) > 0:
-                                mensagens.append(f"ALERTA: Aluno {nome_aluno_str} retornou após {self.ausencias_consecutivas[nome_aluno_str]} verificações de ausência.")
-                                if self.email_enviado.get(nome_aluno_str, False):
-                                    self._enviar_email_retorno(nome_aluno_str)
-                                    self.email_enviado[nome_aluno_str] = False
-                            self.ausencias_consecutivas[nome_aluno_str] = 0
-                            self.ultima_presenca[nome_aluno_str] = datetime.now()
-                        else:
-                            # Incrementa o contador de ausências
-                            self.ausencias_consecutivas[nome_aluno_str] = self.ausencias_consecutivas.get(nome_aluno_str, 0) + 1
-                            
-                            # Verifica se é necessário enviar e-mail de ausência
-                            if self.ausencias_consecutivas[nome_aluno_str] == 2:  # Após 2 verificações ausentes
-                                mensagens.append(f"ALERTA: Aluno {nome_aluno_str} ausente há {self.ausencias_consecutivas[nome_aluno_str]} verificações.")
-                                self._enviar_email_ausencia(nome_aluno_str)
-                                self.email_enviado[nome_aluno_str] = True
-                
-                if self.callback_mensagens and mensagens:
-                    print("[PROCESSAMENTO] Enviando mensagens para a interface.")
-                    self.callback_mensagens(mensagens)
-                
-                ultima_verificacao = time.time()
+        Usa o snapshot local quando ele corresponde ao contador de alterações do banco (ou quando o
+        banco não responde); só então as codificações são lidas do banco. Os contatos dos responsáveis
+        não ficam no snapshot: com ele, são lidos à parte (consulta leve, sem as codificações) e, com o
+        banco fora do ar, fica valendo o cache atual.
+        """
+        if not DIRETORIO_GALERIA:
+            nomes, matriz, responsaveis = listar_codificacoes()
+            return SnapshotGaleria(None, GaleriaFacial(nomes, matriz), None), responsaveis, True
+
+        snapshot = carregar_snapshot(DIRETORIO_GALERIA)
+        try:
+            versao = obter_versao_galeria()
+        except Exception as e:
+            if snapshot is None:
+                raise
+            print(f"[AVISO] Versão da galeria indisponível no banco ({e}); usando o snapshot local "
+                  f"(versão {snapshot.versao}) e os contatos já em memória.")
+            return snapshot._replace(versao=None), self.responsaveis, False
+        if snapshot is not None and snapshot.versao == versao:
+            print(f"[INFO] Galeria carregada do snapshot local (versão {versao}, {len(snapshot.galeria)} aluno(s)).")
+            return snapshot, listar_responsaveis(), False
+        nomes, matriz, responsaveis = listar_codificacoes()
+        return SnapshotGaleria(versao, GaleriaFacial(nomes, matriz), None), responsaveis, True
+
+    def _salvar_snapshot(self, versao, galeria, indice):
+        centroides = indice.centroides if isinstance(indice, IndiceAproximado) else None
+        try:
+            salvar_snapshot(DIRETORIO_GALERIA, versao, galeria, centroides)
+        except OSError as e:
+            print(f"[AVISO] Não foi possível gravar o snapshot da galeria em {DIRETORIO_GALERIA}: {e}")
+
+    def _atualizar_snapshot(self):
+        """Regrava o snapshot após uma alteração incremental. Deve ser chamado com self._lock_edicao adquirido.
+
+        Só grava se o contador do banco avançou exatamente uma vez desde a versão vigente, ou seja, se a
+        única alteração foi a que acabou de ser aplicada; do contrário a versão passa a ser desconhecida
+        e a próxima inicialização relê o banco.
+        """
+        anterior, self._versao_galeria = self._versao_galeria, None
+        if not DIRETORIO_GALERIA or anterior is None:
+            return
+        try:
+            versao = obter_versao_galeria()
+        except Exception as e:
+            print(f"[AVISO] Versão da galeria indisponível no banco, snapshot não atualizado: {e}")
+            return
+        if versao == anterior + 1:
+            self._salvar_snapshot(versao, self.galeria, self.indice)
+            self._versao_galeria = versao
 
     def carregar_codificacoes_referencia(self):
         try:
-            alunos = listar_alunos()
+            (versao, galeria, centroides), responsaveis, do_banco = self._ler_galeria()
+            # Índice montado fora do lock para não bloquear o reconhecimento
+            indice = construir_indice(galeria, TIPO_INDICE, anterior=self.indice, n_sondagens=SONDAGENS_INDICE,
+                                      centroides=centroides)
+            if do_banco and versao is not None:
+                self._salvar_snapshot(versao, galeria, indice)
+            self.responsaveis = responsaveis
             with self.lock:
-                # Inicializa os dicionários de rastreamento para cada aluno
-                for aluno in alunos:
-                    aluno_id = str(aluno['Id'])
-                    self.ultima_presenca[aluno_id] = None
-                    self.email_enviado[aluno_id] = False
-                self.codificacoes_referencia = [np.array(aluno['codificacao_facial']) for aluno in alunos]
-                self.nomes_referencia = [str(aluno['Id']) for aluno in alunos]
-                self.ausencias_consecutivas = {str(aluno['Id']): 0 for aluno in alunos}
+                # Inicializa os dicionários de rastreamento dos alunos novos, preservando os contadores
+                # de quem já estava cadastrado
+                for aluno_id in galeria.ids:
+                    self.ultima_presenca.setdefault(aluno_id, None)
+                    self.email_enviado.setdefault(aluno_id, False)
+                self.galeria = galeria
+                self.indice = indice
+                self.ausencias_consecutivas = {
+                    aluno_id: self.ausencias_consecutivas.get(aluno_id, 0) for aluno_id in galeria.ids
+                }
+            self._versao_galeria = versao
             print("[INFO] Codificações de referência recarregadas.")
         except Exception as e:
             msg = f"Erro ao carregar codificações: {e}"
@@ -188,235 +468,229 @@ class ReconhecimentoFacial:
             if self.callback_mensagens:
                 self.callback_mensagens([msg])
 
-    def _enviar_email_ausencia(self, id_aluno):
-        """Envia um e-mail de notificação de ausência para o responsável do aluno."""
-        try:
-            # Converter para string para evitar problemas com tipos
-            id_aluno_str = str(id_aluno)
-            responsavel = obter_responsavel_por_aluno(id_aluno_str)
-            
-            if not responsavel or 'email' not in responsavel or not responsavel['email']:
-                print(f"[AVISO] Nenhum e-mail encontrado para o aluno {id_aluno_str}")
-                return False
-                
-            assunto = f"Alerta de Ausência - Aluno {id_aluno_str}"
-            mensagem = f"""
-            <html>
-                <body>
-                    <p>Prezado Responsável,</p>
-                    <p>O aluno {id_aluno_str} está ausente há 2 verificações consecutivas.</p>
-                    <p>Por favor, entre em contato com a instituição para mais informações.</p>
-                    <br>
-                    <p>Atenciosamente,<br>Sistema de Monitoramento de Presença</p>
-                </body>
-            </html>
-            """
-            
-            # Envia o e-mail usando o SMTP Service
-            resultado = send_email(
-                to_email=responsavel['email'],
-                subject=assunto,
-                body_text=mensagem.strip()
-            )
-            
-            if resultado.get('success', False):
-                print(f"[EMAIL] E-mail de ausência enviado para {responsavel['email']}")
-                return True
-            else:
-                print(f"[ERRO] Falha ao enviar e-mail para {responsavel['email']}: {resultado.get('message', 'Erro desconhecido')}")
-                return False
-                
-        except Exception as e:
-            print(f"[ERRO] Ao tentar enviar e-mail de ausência: {str(e)}")
-            return False
+    def _publicar_galeria(self, galeria):
+        """Torna `galeria` a versão vigente.
 
-    def _enviar_email_retorno(self, id_aluno):
-        """Envia um e-mail de notificação de retorno do aluno."""
-        try:
-            # Verifica se o ID do aluno está no dicionário de e-mails enviados
-            if id_aluno not in self.email_enviado or not self.email_enviado[id_aluno]:
-                print(f"[INFO] Nenhum e-mail de ausência anterior para o aluno {id_aluno}, ignorando retorno")
-                return False
-                
-            id_aluno_str = str(id_aluno)
-            responsavel = obter_responsavel_por_aluno(id_aluno_str)
-            
-            if not responsavel or 'email' not in responsavel or not responsavel['email']:
-                print(f"[AVISO] Nenhum e-mail encontrado para o aluno {id_aluno_str}")
-                return False
-                
-            assunto = f"Aluno {id_aluno_str} Retornou"
-            mensagem = f"""
-            <html>
-                <body>
-                    <p>Prezado Responsável,</p>
-                    <p>O aluno {id_aluno_str} retornou após período de ausência.</p>
-                    <br>
-                    <p>Atenciosamente,<br>Sistema de Monitoramento de Presença</p>
-                </body>
-            </html>
-            """
-            
-            # Envia o e-mail usando o SMTP Service
-            resultado = send_email(
-                to_email=responsavel['email'],
-                subject=assunto,
-                body_text=mensagem.strip()
-            )
-            
-            if resultado.get('success', False):
-                print(f"[EMAIL] E-mail de retorno enviado para {responsavel['email']}")
-                return True
-            else:
-                print(f"[ERRO] Falha ao enviar e-mail de retorno para {responsavel['email']}: {resultado.get('message', 'Erro desconhecido')}")
-                return False
-                
-        except Exception as e:
-            print(f"[ERRO] Ao tentar enviar e-mail de retorno: {str(e)}")
-            return False
-    
-    def verificar_presenca(self, frame):
+        O índice é montado fora do lock; sob o lock só as referências são trocadas, de modo que o
+        reconhecimento nunca espera por uma atualização. Uma passada que já obteve o índice anterior
+        termina a comparação com ele. Deve ser chamado com self._lock_edicao adquirido.
+        """
+        indice = construir_indice(galeria, TIPO_INDICE, anterior=self.indice, n_sondagens=SONDAGENS_INDICE)
+        with self.lock:
+            self.galeria = galeria
+            self.indice = indice
+
+    def obter_responsavel(self, id_aluno):
+        """Contato do responsável pelo aluno ({'telefone', 'email'}) ou None, sem consultar o banco."""
+        return self.responsaveis.get(str(id_aluno))
+
+    def _mesclar_responsavel(self, id_aluno, resp_telefone, resp_email):
+        # Mesma regra do cadastro/edição: campos informados atualizam um responsável existente; um
+        # responsável novo só é criado com telefone e e-mail
+        atual = self.responsaveis.get(id_aluno)
+        if atual is not None:
+            novo = dict(atual)
+            if resp_telefone is not None:
+                novo['telefone'] = resp_telefone
+            if resp_email is not None:
+                novo['email'] = resp_email
+        elif resp_telefone and resp_email:
+            novo = {'telefone': resp_telefone, 'email': resp_email}
+        else:
+            return
+        responsaveis = dict(self.responsaveis)
+        responsaveis[id_aluno] = novo
+        self.responsaveis = responsaveis
+
+    def atualizar_responsavel(self, id_aluno, resp_telefone=None, resp_email=None):
+        """Aplica ao cache de contatos uma edição do responsável já gravada no banco.
+
+        Contatos não fazem parte do snapshot, então ele não é regravado.
+        """
+        id_aluno = str(id_aluno)
+        with self._lock_edicao:
+            self._mesclar_responsavel(id_aluno, resp_telefone, resp_email)
+
+    def adicionar_aluno(self, id_aluno, codificacao, resp_telefone=None, resp_email=None):
+        """Inclui o aluno na galeria, ou substitui sua codificação se ele já estiver nela.
+
+        Só a linha do aluno muda; os contadores de presença dos demais (e os dele, numa troca de
+        foto) são preservados. Os dados do responsável informados vão para o cache de contatos.
+        """
+        id_aluno = str(id_aluno)
+        with self._lock_edicao:
+            self._publicar_galeria(self.galeria.com_aluno(id_aluno, codificacao))
+            self._mesclar_responsavel(id_aluno, resp_telefone, resp_email)
+            self._atualizar_snapshot()
+            with self.lock:
+                self.ausencias_consecutivas.setdefault(id_aluno, 0)
+                self.ultima_presenca.setdefault(id_aluno, None)
+                self.email_enviado.setdefault(id_aluno, False)
+        print(f"[INFO] Galeria atualizada: aluno {id_aluno} ({len(self.galeria)} aluno(s) cadastrado(s)).")
+
+    def remover_aluno(self, id_aluno):
+        """Retira o aluno da galeria e descarta seus contadores de presença."""
+        id_aluno = str(id_aluno)
+        with self._lock_edicao:
+            self._publicar_galeria(self.galeria.sem_aluno(id_aluno))
+            if id_aluno in self.responsaveis:
+                self.responsaveis = {k: v for k, v in self.responsaveis.items() if k != id_aluno}
+            self._atualizar_snapshot()
+            with self.lock:
+                self.ausencias_consecutivas.pop(id_aluno, None)
+                self.ultima_presenca.pop(id_aluno, None)
+                self.email_enviado.pop(id_aluno, None)
+                self.episodios_ausencia.pop(id_aluno, None)
+                self.camera_presenca.pop(id_aluno, None)
+            self.notificacoes.esquecer(id_aluno)
+        print(f"[INFO] Galeria atualizada: aluno {id_aluno} removido ({len(self.galeria)} aluno(s) cadastrado(s)).")
+
+    def identificar_alunos(self, frame, camera_id=0):
+        """Detecta e acompanha as faces do frame e retorna (alunos identificados, mensagens, concluido).
+
+        Só as trilhas novas ou com identidade vencida são codificadas e comparadas com a galeria; as
+        demais herdam a identidade confirmada anteriormente. `concluido` é False quando não foi possível
+        decidir nada sobre o frame (frame inválido, galeria vazia, nenhum rosto ou falha na codificação).
+        """
         alunos_presentes = set()
         mensagens = []
-        agora = datetime.now()
-        timestamp = agora.strftime("%H:%M:%S")
+        agora = time.time()
+        timestamp = datetime.fromtimestamp(agora).strftime("%H:%M:%S")
         
         # Debug: Verificar se o frame é válido
         if frame is None or frame.size == 0:
             mensagens.append(f"[{timestamp}] Frame inválido ou vazio.")
-            return list(alunos_presentes), mensagens
+            return alunos_presentes, mensagens, False
         
         print(f"[DEBUG] Frame shape: {frame.shape}")
         
-        # Redimensionar frame para melhor performance
-        frame_pequeno = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-        rgb_frame_pequeno = cv2.cvtColor(frame_pequeno, cv2.COLOR_BGR2RGB)
+        # Pirâmide compartilhada pelos estágios: redução (escala escolhida pelos tamanhos de face da
+        # câmera) e conversões de cor feitas uma única vez
+        escala = self.escalas.escala(camera_id, frame.shape[1])
+        piramide = PiramideImagem(frame, escala=escala, pool=self.pool, regioes=self.regioes.obter(camera_id))
 
         with self.lock:
-            codificacoes_ref = self.codificacoes_referencia
-            nomes_ref = self.nomes_referencia
+            indice = self.indice
 
-        print(f"[DEBUG] Alunos cadastrados: {len(codificacoes_ref) if codificacoes_ref else 0}")
+        print(f"[DEBUG] Alunos cadastrados: {len(indice)}")
         
-        if not codificacoes_ref:
+        if len(indice) == 0:
             mensagens.append(f"[{timestamp}] Nenhum aluno cadastrado para verificar.")
-            return list(alunos_presentes), mensagens
+            return alunos_presentes, mensagens, False
+
+        if indice is not self._indice_rastreado:
+            # Galeria nova: identidades das trilhas precisam ser confirmadas de novo
+            self.rastreador.invalidar_identidades()
+            self._indice_rastreado = indice
             
-        # Detectar faces no frame (pipeline com fallbacks)
-        print("[DEBUG] Iniciando detecção de faces (HOG, upsample=0)...")
-        locais_faces = face_recognition.face_locations(rgb_frame_pequeno, model="hog", number_of_times_to_upsample=0)
-        print(f"[DEBUG] Faces detectadas (upsample=0): {len(locais_faces)}")
+        # Detectar faces no frame (cascata adaptativa por câmera)
+        deteccao = self.cascata.detectar(piramide, camera_id)
+        locais_faces = deteccao.locais
 
-        usar_full_frame = False
+        # Trilhas em coordenadas do frame completo, independente do nível em que a face foi detectada
+        fator = 1.0 / piramide.escala if deteccao.nivel == 'reduzido' else 1.0
+        caixas = [tuple(int(round(v * fator)) for v in local) for local in locais_faces]
+        self.escalas.registrar(camera_id, [bottom - top for top, _right, bottom, _left in caixas])
+        trilhas = self.rastreador.atualizar(
+            camera_id, caixas, agora,
+            cinza=piramide.cinza_reduzido if self.rastreador.fluxo_optico else None, escala=piramide.escala,
+        )
 
-        # Se não detectou, tentar com upsample=1 no frame reduzido
         if not locais_faces:
-            print("[DEBUG] Tentando detecção com upsample=1 (reduzido)...")
-            locais_faces = face_recognition.face_locations(rgb_frame_pequeno, model="hog", number_of_times_to_upsample=1)
-            print(f"[DEBUG] Faces detectadas (upsample=1 reduzido): {len(locais_faces)}")
+            # Frame processado sem rostos: a verificação vale (sala vazia conta como ausência de todos)
+            mensagens.append(f"[{timestamp}] Nenhum rosto detectado no frame.")
+            return alunos_presentes, mensagens, True
 
-        # Fallback 1: usar Haar Cascade no frame reduzido
-        if not locais_faces:
-            print("[DEBUG] Fallback para Haar Cascade (reduzido)...")
-            gray_small = cv2.cvtColor(frame_pequeno, cv2.COLOR_BGR2GRAY)
-            detected = self._haar_cascade.detectMultiScale(gray_small, scaleFactor=1.05, minNeighbors=3, minSize=(40, 40))
-            print(f"[DEBUG] Haar detections (reduzido): {len(detected)}")
-            if len(detected) > 0:
-                locais_faces = []
-                for (x, y, w, h) in detected:
-                    top = y
-                    right = x + w
-                    bottom = y + h
-                    left = x
-                    locais_faces.append((top, right, bottom, left))
-
-        # Fallback 2: tentar no frame em tamanho real com HOG
-        if not locais_faces:
-            print("[DEBUG] Tentando detecção no frame completo (HOG, upsample=1)...")
-            rgb_full = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            locais_full = face_recognition.face_locations(rgb_full, model="hog", number_of_times_to_upsample=1)
-            print(f"[DEBUG] Faces detectadas no frame completo: {len(locais_full)}")
-            if locais_full:
-                usar_full_frame = True
-                locais_faces = locais_full
+        pendentes = [i for i, trilha in enumerate(trilhas) if self.rastreador.precisa_codificar(trilha, agora)]
+        print(f"[DEBUG] Trilhas: {len(trilhas)} ({len(pendentes)} a codificar, estágio {deteccao.estagio})")
 
-        if not locais_faces:
-            mensagens.append(f"[{timestamp}] Nenhum rosto detectado no frame.")
-            return list(alunos_presentes), mensagens
-        
-        # Extrair codificações das faces detectadas
-        print("[DEBUG] Extraindo codificações faciais...")
-        if usar_full_frame:
-            rgb_for_enc = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            codificacoes_faces = face_recognition.face_encodings(rgb_for_enc, locais_faces)
-        else:
-            codificacoes_faces = face_recognition.face_encodings(rgb_frame_pequeno, locais_faces)
-        print(f"[DEBUG] Codificações extraídas: {len(codificacoes_faces)}")
+        if pendentes:
+            # Extrair codificações das faces pendentes, no mesmo nível da pirâmide em que foram encontradas
+            codificacoes_faces = self._codificar_faces(piramide.rgb(deteccao.nivel), [locais_faces[i] for i in pendentes])
+            print(f"[DEBUG] Codificações extraídas: {len(codificacoes_faces)}")
+
+            if not codificacoes_faces and all(trilha.codificada_em is None for trilha in trilhas):
+                mensagens.append(f"[{timestamp}] Falha ao extrair codificações faciais.")
+                return alunos_presentes, mensagens, False
+
+            # Todas as faces pendentes contra a galeria inteira em uma única operação matricial
+            correspondencias = indice.comparar(codificacoes_faces, tolerancia=TOLERANCIA_RECONHECIMENTO)
+            for i, correspondencia in zip(pendentes, correspondencias):
+                print(f"[DEBUG] Face {i+1}/{len(trilhas)}: mais próximo {correspondencia.id_aluno} "
+                      f"(distância: {correspondencia.distancia:.3f}, margem: {correspondencia.margem:.3f})")
+                if correspondencia.reconhecido:
+                    print(f"[DEBUG] Match encontrado: {correspondencia.id_aluno} (distância: {correspondencia.distancia:.3f})")
+                    self.rastreador.identificar(trilhas[i], correspondencia.id_aluno, correspondencia.distancia, agora)
+                else:
+                    print(f"[DEBUG] Rosto não reconhecido. Mais próximo: {correspondencia.id_aluno} (distância: {correspondencia.distancia:.3f})")
+                    mensagens.append(f"[{timestamp}] Rosto não reconhecido detectado.")
+                    self.rastreador.identificar(trilhas[i], None, correspondencia.distancia, agora)
+
+        alunos_presentes.update(trilha.id_aluno for trilha in trilhas if trilha.id_aluno is not None)
+        return alunos_presentes, mensagens, True
+
+    def verificar_presenca(self, frame, camera_id=0, vistos=()):
+        """Identifica os alunos do frame e atualiza os contadores de presença/ausência.
+
+        `vistos` são alunos já identificados pelo rastreamento desde a última verificação.
+        """
+        alunos_presentes, mensagens, concluido = self.identificar_alunos(frame, camera_id)
+        for id_aluno in alunos_presentes:
+            self.camera_presenca[id_aluno] = camera_id
+        return self._registrar_presenca(alunos_presentes | set(vistos), mensagens, concluido)
+
+    def _registrar_presenca(self, alunos_presentes, mensagens, concluido):
+        """Atualiza os contadores de presença/ausência com o resultado de uma verificação.
 
-        if not codificacoes_faces:
-            mensagens.append(f"[{timestamp}] Falha ao extrair codificações faciais.")
+        Cada presença estende a sessão do aluno no local (registro_presencas). Na 2ª verificação consecutiva sem
+        o aluno começa um episódio de ausência; o alerta de ausência e, se ela foi avisada, o de retorno vão
+        para o despachante de notificações como eventos do episódio.
+        """
+        if not concluido and not alunos_presentes:
             return list(alunos_presentes), mensagens
+        agora = datetime.now()
+        timestamp = agora.strftime("%H:%M:%S")
+        presentes = {str(aluno) for aluno in alunos_presentes}
+        eventos = []
+
+        for nome_identificado in sorted(presentes):
+            camera = self.camera_presenca.get(nome_identificado)
+            local = f" (câmera {camera})" if camera is not None else ""
+            mensagens.append(f"[{timestamp}] Presença confirmada: Aluno {nome_identificado}{local}")
+            self.registro_presencas.registrar(nome_identificado, camera, agora)
 
-        # Verificar presenças
-        for i, codificacao in enumerate(codificacoes_faces):
-            print(f"[DEBUG] Comparando face {i+1}/{len(codificacoes_faces)}...")
-            matches = face_recognition.compare_faces(codificacoes_ref, codificacao, tolerance=0.6)
-            face_distances = face_recognition.face_distance(codificacoes_ref, codificacao)
-            
-            print(f"[DEBUG] Matches: {matches}")
-            print(f"[DEBUG] Distâncias: {face_distances}")
-            
-            if True in matches:
-                indice_match = matches.index(True)
-                nome_identificado = nomes_ref[indice_match]
-                distancia = face_distances[indice_match]
-                print(f"[DEBUG] Match encontrado: {nome_identificado} (distância: {distancia:.3f})")
-                
-                if nome_identificado not in alunos_presentes:
-                    alunos_presentes.add(nome_identificado)
-                    mensagens.append(f"[{timestamp}] Presença confirmada: Aluno {nome_identificado}")
-                    
-                    # Verifica se é um retorno após ausência
-                    if nome_identificado in self.ausencias_consecutivas and self.ausencias_consecutivas[nome_identificado] >= 2:
-                        mensagens.append(f"[{timestamp}] ALERTA: Aluno {nome_identificado} retornou após {self.ausencias_consecutivas[nome_identificado]} verificações de ausência.")
-                        self._enviar_email_retorno(nome_identificado)
-                        self.email_enviado[nome_identificado] = False  # Reseta o status de e-mail enviado
-                    
-                    # Reseta o contador de ausências
-                    with self.lock:
-                        self.ausencias_consecutivas[nome_identificado] = 0
-                        self.ultima_presenca[nome_identificado] = agora
-            else:
-                # Encontrar a menor distância para debug
-                if len(face_distances) > 0:
-                    min_distance = min(face_distances)
-                    min_index = list(face_distances).index(min_distance)
-                    closest_name = nomes_ref[min_index]
-                    print(f"[DEBUG] Rosto não reconhecido. Mais próximo: {closest_name} (distância: {min_distance:.3f})")
-                mensagens.append(f"[{timestamp}] Rosto não reconhecido detectado.")
-        
-        # Verificar ausências
         with self.lock:
-            for aluno in self.nomes_referencia:
+            for aluno_str in presentes:
+                ausencias = self.ausencias_consecutivas.get(aluno_str, 0)
+                if ausencias >= 2:
+                    mensagens.append(f"[{timestamp}] ALERTA: Aluno {aluno_str} retornou após {ausencias} verificações de ausência.")
+                    if self.email_enviado.get(aluno_str, False):
+                        eventos.append(EventoAlerta(aluno_str, RETORNO, self.episodios_ausencia.get(aluno_str, 0),
+                                                    ausencias, agora))
+                self.email_enviado[aluno_str] = False
+                self.ausencias_consecutivas[aluno_str] = 0
+                self.ultima_presenca[aluno_str] = agora
+
+            # Verificar ausências
+            for aluno in self.galeria.ids:
                 aluno_str = str(aluno)
-                if aluno_str not in self.ausencias_consecutivas:
-                    self.ausencias_consecutivas[aluno_str] = 0
-                if aluno_str not in alunos_presentes:
-                    self.ausencias_consecutivas[aluno_str] = self.ausencias_consecutivas.get(aluno_str, 0) + 1
-                else:
-                    self.ausencias_consecutivas[aluno_str] = 0
-                
-                if self.ausencias_consecutivas[aluno_str] == 2:
-                    mensagens.append(f"[{timestamp}] ALERTA: Aluno {aluno} ausente há {self.ausencias_consecutivas[aluno_str]} verificações consecutivas.")
-                    if not self.email_enviado.get(aluno_str, False):
-                        if self._enviar_email_ausencia(aluno_str):
-                            self.email_enviado[aluno_str] = True
-                        if not self.email_enviado.get(aluno, False):
-                            if self._enviar_email_ausencia(aluno):
-                                self.email_enviado[aluno] = True
-                    
+                if aluno_str in presentes:
+                    continue
+                ausencias = self.ausencias_consecutivas[aluno_str] = self.ausencias_consecutivas.get(aluno_str, 0) + 1
+                if ausencias == 2:
+                    episodio = self.episodios_ausencia[aluno_str] = self.episodios_ausencia.get(aluno_str, 0) + 1
+                    mensagens.append(f"[{timestamp}] ALERTA: Aluno {aluno_str} ausente há {ausencias} verificações consecutivas.")
+                    eventos.append(EventoAlerta(aluno_str, AUSENCIA, episodio, ausencias, agora))
                     # Atualiza a última verificação de presença
-                    if aluno not in self.ultima_presenca:
-                        self.ultima_presenca[aluno] = agora
-        
-        return list(alunos_presentes), mensagens
\ No newline at end of file
+                    if aluno_str not in self.ultima_presenca:
+                        self.ultima_presenca[aluno_str] = agora
+
+        # Fora do lock: o despachante só lê o cache de contatos e enfileira o e-mail
+        for evento in eventos:
+            avisado = self.notificacoes.publicar(evento)
+            if evento.tipo == AUSENCIA and avisado:
+                with self.lock:
+                    if self.episodios_ausencia.get(evento.id_aluno) == evento.episodio:
+                        self.email_enviado[evento.id_aluno] = True
+
+        return list(alunos_presentes), mensagens
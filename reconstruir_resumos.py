@@ -0,0 +1,48 @@
+# reconstruir_resumos.py
+"""
+Recalcula os resumos diários de presença a partir das sessões gravadas (atuais e arquivadas).
+
+Usado para a carga inicial do histórico e para refazer um período depois de uma mudança (por exemplo,
+no horário de entrada). Cada dia é recalculado numa transação; interromper e repetir é seguro. O total de
+alunos cadastrados de cada dia não é refeito (não há histórico dele): dias sem resumo anterior ficam sem
+taxa de presença.
+
+Uso:
+    python reconstruir_resumos.py                      # todo o histórico
+    python reconstruir_resumos.py --desde 2024-02-01 --ate 2024-06-30
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from cadastro import intervalo_sessoes_presenca, reconstruir_resumos_diarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recalcula os resumos diários de presença')
+    parser.add_argument('--desde', type=date.fromisoformat, help='primeiro dia (AAAA-MM-DD); padrão: a sessão mais antiga')
+    parser.add_argument('--ate', type=date.fromisoformat, help='último dia (AAAA-MM-DD); padrão: a sessão mais recente')
+    args = parser.parse_args()
+
+    desde, ate = args.desde, args.ate
+    if desde is None or ate is None:
+        primeiro, ultimo = intervalo_sessoes_presenca()
+        if primeiro is None:
+            print("[INFO] Nenhuma sessão de presença gravada; nada a recalcular.")
+            return
+        desde, ate = desde or primeiro, ate or ultimo
+
+    inicio = time.perf_counter()
+    dia, dias = desde, 0
+    while dia <= ate:
+        reconstruir_resumos_diarios(dia)
+        dias += 1
+        if dias % 30 == 0:
+            print(f"[INFO] {dias} dia(s) recalculado(s), até {dia.isoformat()}")
+        dia += timedelta(days=1)
+    print(f"[INFO] Resumos de {dias} dia(s) recalculados ({desde.isoformat()} a {ate.isoformat()}) "
+          f"em {time.perf_counter() - inicio:.1f}s.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# regioes_interesse.py
+import json
+import os
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Regiões em coordenadas normalizadas (0 a 1, relativas à largura/altura do frame), de modo que valem
+# para qualquer resolução da câmera:
+#   {"tipo": "retangulo", "x": 0.1, "y": 0.2, "largura": 0.5, "altura": 0.6}
+#   {"tipo": "poligono", "pontos": [[0.1, 0.1], [0.9, 0.1], [0.5, 0.9]]}
+
+
+def _coordenada(valor, campo):
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"Coordenada inválida em '{campo}': {valor!r}")
+    if not 0.0 <= valor <= 1.0:
+        raise ValueError(f"Coordenada fora do intervalo [0, 1] em '{campo}': {valor}")
+    return valor
+
+
+def validar_regioes(regioes):
+    """Valida e normaliza a lista de regiões; lança ValueError com a descrição do problema."""
+    if not isinstance(regioes, list):
+        raise ValueError("As regiões devem ser uma lista.")
+    normalizadas = []
+    for regiao in regioes:
+        if not isinstance(regiao, dict):
+            raise ValueError("Cada região deve ser um objeto.")
+        tipo = regiao.get('tipo')
+        if tipo == 'retangulo':
+            x, y = _coordenada(regiao.get('x'), 'x'), _coordenada(regiao.get('y'), 'y')
+            largura, altura = _coordenada(regiao.get('largura'), 'largura'), _coordenada(regiao.get('altura'), 'altura')
+            if largura <= 0 or altura <= 0 or x + largura > 1.0 or y + altura > 1.0:
+                raise ValueError("Retângulo vazio ou fora do frame.")
+            normalizadas.append({'tipo': 'retangulo', 'x': x, 'y': y, 'largura': largura, 'altura': altura})
+        elif tipo == 'poligono':
+            pontos = regiao.get('pontos')
+            if not isinstance(pontos, list) or len(pontos) < 3:
+                raise ValueError("Polígono precisa de pelo menos 3 pontos.")
+            try:
+                pontos = [[_coordenada(px, 'pontos'), _coordenada(py, 'pontos')] for px, py in pontos]
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Pontos do polígono inválidos: {e}")
+            normalizadas.append({'tipo': 'poligono', 'pontos': pontos})
+        else:
+            raise ValueError(f"Tipo de região desconhecido: {tipo!r} (use 'retangulo' ou 'poligono').")
+    return normalizadas
+
+
+def _pontos(regiao):
+    if regiao['tipo'] == 'retangulo':
+        x, y, largura, altura = regiao['x'], regiao['y'], regiao['largura'], regiao['altura']
+        return [[x, y], [x + largura, y], [x + largura, y + altura], [x, y + altura]]
+    return regiao['pontos']
+
+
+def contornos(regioes, largura, altura):
+    """Contornos das regiões em pixels de uma imagem largura x altura (formato do OpenCV)."""
+    escala = np.array([largura, altura], dtype=np.float32)
+    return [(np.array(_pontos(regiao), dtype=np.float32) * escala).reshape(-1, 1, 2) for regiao in regioes]
+
+
+def caixas_recorte(regioes, largura, altura, margem=16):
+    """Retângulos (x0, y0, x1, y1) em pixels que cobrem as regiões, com margem e fundidos quando se tocam.
+
+    A margem deixa entrar faces que estão só parcialmente dentro da região.
+    """
+    caixas = []
+    for contorno in contornos(regioes, largura, altura):
+        pontos = contorno.reshape(-1, 2)
+        x0, y0 = np.floor(pontos.min(axis=0)).astype(int) - margem
+        x1, y1 = np.ceil(pontos.max(axis=0)).astype(int) + margem
+        caixas.append([max(0, int(x0)), max(0, int(y0)), min(largura, int(x1)), min(altura, int(y1))])
+
+    # Funde caixas sobrepostas para que nenhuma área seja varrida duas vezes
+    fundiu = True
+    while fundiu:
+        fundiu = False
+        for i in range(len(caixas)):
+            for j in range(i + 1, len(caixas)):
+                a, b = caixas[i], caixas[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    caixas[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del caixas[j]
+                    fundiu = True
+                    break
+            if fundiu:
+                break
+    return [tuple(caixa) for caixa in caixas if caixa[2] > caixa[0] and caixa[3] > caixa[1]]
+
+
+def contem(contornos_regioes, x, y):
+    """True se o ponto (em pixels) está dentro de alguma região."""
+    return any(cv2.pointPolygonTest(contorno, (float(x), float(y)), False) >= 0 for contorno in contornos_regioes)
+
+
+class RegioesInteresse:
+    """Regiões de interesse de cada câmera, persistidas em um arquivo JSON."""
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._lock = threading.Lock()
+        self._regioes = {}
+        self.carregar()
+
+    def carregar(self):
+        regioes = {}
+        if self.caminho.exists():
+            try:
+                with open(self.caminho, 'r') as f:
+                    for camera_id, lista in json.load(f).items():
+                        regioes[str(camera_id)] = validar_regioes(lista)
+            except (OSError, ValueError) as e:
+                print(f"[AVISO] Não foi possível carregar as regiões de interesse de {self.caminho}: {e}")
+        with self._lock:
+            self._regioes = regioes
+
+    def _salvar(self):
+        # Grava em arquivo temporário e troca de uma vez, para nunca deixar o JSON pela metade
+        temporario = self.caminho.with_name(self.caminho.name + '.tmp')
+        with open(temporario, 'w') as f:
+            json.dump(self._regioes, f, indent=2)
+        os.replace(temporario, self.caminho)
+
+    def obter(self, camera_id):
+        """Regiões da câmera (lista vazia = frame inteiro)."""
+        with self._lock:
+            return self._regioes.get(str(camera_id), [])
+
+    def todas(self):
+        with self._lock:
+            return dict(self._regioes)
+
+    def definir(self, camera_id, regioes):
+        regioes = validar_regioes(regioes)
+        with self._lock:
+            if regioes:
+                self._regioes[str(camera_id)] = regioes
+            else:
+                self._regioes.pop(str(camera_id), None)
+            self._salvar()
+        return regioes
+
+    def remover(self, camera_id):
+        with self._lock:
+            existia = self._regioes.pop(str(camera_id), None) is not None
+            if existia:
+                self._salvar()
+        return existia
@@ -0,0 +1,339 @@
+# registro_presencas.py
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from cadastro import arquivar_sessoes_presenca, atualizar_resumos_diarios, gravar_sessoes_presenca
+from metricas import JanelaMetricas
+
+# Intervalo entre as gravações das sessões novas, estendidas e encerradas (s)
+PRESENCAS_INTERVALO_GRAVACAO = float(os.getenv('PRESENCAS_INTERVALO_GRAVACAO', '5'))
+# Sessões por comando; com tantas sessões novas acumuladas a gravação não espera o intervalo
+PRESENCAS_TAMANHO_LOTE = int(os.getenv('PRESENCAS_TAMANHO_LOTE', '500'))
+# Uma sessão aberta só é regravada quando o fim avançou pelo menos isso desde a última gravação (s)
+PRESENCAS_INTERVALO_MINIMO = float(os.getenv('PRESENCAS_INTERVALO_MINIMO', '60'))
+# Tempo sem detecção do aluno no local que encerra a sessão (s)
+PRESENCAS_INTERVALO_FECHAMENTO = float(os.getenv('PRESENCAS_INTERVALO_FECHAMENTO', '300'))
+# Sessões encerradas há mais que isso vão para sessoes_presenca_arquivo, uma vez por dia. 0 desativa
+PRESENCAS_RETENCAO_DIAS = int(os.getenv('PRESENCAS_RETENCAO_DIAS', '180'))
+# Arquivo onde as sessões ficam enquanto o banco estiver inacessível
+PRESENCAS_ARQUIVO_PENDENTES = os.getenv('PRESENCAS_ARQUIVO_PENDENTES', '.presencas_pendentes.jsonl')
+
+INTERVALO_ARQUIVAMENTO = 24 * 3600
+
+
+def descrever_local(camera_id):
+    """Valor da coluna `local` (VARCHAR(90)) para a câmera."""
+    return 'desconhecido' if camera_id is None else f'camera {camera_id}'[:90]
+
+
+class SessaoPresenca:
+    """Intervalo em que um aluno foi visto continuamente num local."""
+
+    __slots__ = ('id_aluno', 'local', 'inicio', 'fim', 'deteccoes', 'gravada')
+
+    def __init__(self, id_aluno, local, inicio):
+        self.id_aluno = id_aluno
+        self.local = local
+        self.inicio = inicio
+        self.fim = inicio
+        self.deteccoes = 1
+        self.gravada = None  # (fim, deteccoes) da última gravação
+
+    def linha(self):
+        self.gravada = (self.fim, self.deteccoes)
+        return (self.id_aluno, self.local, self.inicio, self.fim, self.deteccoes)
+
+
+class RegistroPresencas:
+    """Grava as presenças confirmadas como sessões (aluno, local, início, fim) na tabela `sessoes_presenca`.
+
+    Cada detecção estende em memória a sessão aberta do aluno no local; passado `intervalo_fechamento`
+    sem detecção (ou virado o dia) a sessão é encerrada e uma detecção seguinte abre outra. Uma thread
+    grava a cada `intervalo_gravacao`, com um único comando de várias linhas, as sessões novas, as
+    encerradas e as abertas cujo fim avançou `intervalo_minimo`, e em seguida recalcula os resumos diários
+    dos alunos e locais dessas sessões. Com o banco fora do ar, o lote vai para `arquivo_pendentes` (JSON
+    por linha) e é regravado, antes dos novos, assim que o banco voltar; como a gravação de uma sessão é
+    idempotente, regravá-la não duplica nada.
+    """
+
+    def __init__(self, arquivo_pendentes=PRESENCAS_ARQUIVO_PENDENTES, intervalo_gravacao=PRESENCAS_INTERVALO_GRAVACAO,
+                 tamanho_lote=PRESENCAS_TAMANHO_LOTE, intervalo_minimo=PRESENCAS_INTERVALO_MINIMO,
+                 intervalo_fechamento=PRESENCAS_INTERVALO_FECHAMENTO, retencao_dias=PRESENCAS_RETENCAO_DIAS):
+        self.arquivo_pendentes = arquivo_pendentes
+        self.intervalo_gravacao = intervalo_gravacao
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_fechamento = intervalo_fechamento
+        self.retencao_dias = retencao_dias
+        self._condicao = threading.Condition()
+        self._lock_gravacao = threading.Lock()  # uma gravação (e um acesso ao arquivo) por vez
+        self._abertas = {}  # (id_aluno, local) -> SessaoPresenca
+        self._encerradas = []  # sessões encerradas por uma detecção nova, aguardando a gravação
+        self._novas = 0  # sessões abertas desde a última gravação
+        self._resumos_pendentes = set()  # (dia, id_aluno, local) gravados cujos resumos faltam atualizar
+        self._thread = None
+        self._ativo = False
+        self._proximo_arquivamento = 0.0  # monotonic
+        self.deteccoes = 0
+        self.coalescidas = 0
+        self.sessoes = 0
+        self.fechadas = 0
+        self.gravadas = 0
+        self.comandos = 0
+        self.falhas = 0
+        self.derramadas = 0
+        self.perdidas = 0
+        self.arquivadas = 0
+        self.resumos = 0
+        self.falhas_resumo = 0
+        self.pendentes_arquivo = self._contar_arquivo()
+        self.latencia_gravacao = JanelaMetricas()
+
+    def _contar_arquivo(self):
+        if not self.arquivo_pendentes or not os.path.exists(self.arquivo_pendentes):
+            return 0
+        with open(self.arquivo_pendentes, 'r', encoding='utf-8') as f:
+            return sum(1 for linha in f if linha.strip())
+
+    def iniciar(self):
+        """Inicia a thread de gravação (que também regrava o que ficou no arquivo de pendentes)."""
+        with self._condicao:
+            if self._ativo:
+                return
+            self._ativo = True
+            self._thread = threading.Thread(target=self._executar, name='registro-presencas', daemon=True)
+            self._thread.start()
+
+    def encerrar(self, timeout=10.0):
+        """Para a thread e grava (ou guarda no arquivo) todas as sessões, encerrando as abertas."""
+        with self._condicao:
+            self._ativo = False
+            self._condicao.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.descarregar(encerrar_todas=True)
+
+    def _continua(self, sessao, momento):
+        # A sessão ainda vale em `momento`: sem lacuna maior que o intervalo de fechamento e no mesmo dia
+        return (momento - sessao.fim).total_seconds() <= self.intervalo_fechamento and \
+            momento.date() == sessao.inicio.date()
+
+    def registrar(self, id_aluno, camera_id=None, momento=None):
+        """Soma a detecção à sessão do aluno no local; True se ela abriu uma sessão nova."""
+        try:
+            id_aluno = int(id_aluno)
+        except (TypeError, ValueError):
+            return False  # identificação fora do cadastro
+        momento = momento or datetime.now()
+        chave = (id_aluno, descrever_local(camera_id))
+        with self._condicao:
+            self.deteccoes += 1
+            sessao = self._abertas.get(chave)
+            if sessao is not None:
+                if self._continua(sessao, momento):
+                    # Detecções atrasadas (de outra thread) não fazem o fim recuar
+                    sessao.fim = max(sessao.fim, momento)
+                    sessao.deteccoes += 1
+                    self.coalescidas += 1
+                    return False
+                self._encerradas.append(self._abertas.pop(chave))
+                self.fechadas += 1
+            self._abertas[chave] = SessaoPresenca(chave[0], chave[1], momento)
+            self.sessoes += 1
+            self._novas += 1
+            if self._novas >= self.tamanho_lote:
+                self._condicao.notify_all()
+        self.iniciar()
+        return True
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                while self._ativo and not self._abertas and not self._encerradas and not self.pendentes_arquivo:
+                    self._condicao.wait()
+                if not self._ativo:
+                    return  # encerrar() faz a última gravação
+                prazo = time.monotonic() + self.intervalo_gravacao
+                while self._ativo and self._novas < self.tamanho_lote:
+                    restante = prazo - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._condicao.wait(restante)
+            self.descarregar()
+            if self.retencao_dias > 0 and time.monotonic() >= self._proximo_arquivamento:
+                self.arquivar()
+
+    def _selecionar(self, agora, encerrar_todas):
+        # Sessões a gravar; as que passaram do intervalo de fechamento saem da memória
+        linhas = [sessao.linha() for sessao in self._encerradas]
+        self._encerradas = []
+        self._novas = 0
+        for chave, sessao in list(self._abertas.items()):
+            if encerrar_todas or not self._continua(sessao, agora):
+                del self._abertas[chave]
+                self.fechadas += 1
+                if sessao.gravada != (sessao.fim, sessao.deteccoes):
+                    linhas.append(sessao.linha())
+            elif sessao.gravada is None or (sessao.fim - sessao.gravada[0]).total_seconds() >= self.intervalo_minimo:
+                linhas.append(sessao.linha())
+        return linhas
+
+    def descarregar(self, agora=None, encerrar_todas=False):
+        """Grava agora as sessões pendentes (depois do que estiver no arquivo de pendentes).
+
+        `agora` é a referência para encerrar as sessões sem detecção recente (padrão: o relógio).
+        """
+        agora = agora or datetime.now()
+        with self._lock_gravacao:
+            with self._condicao:
+                linhas = self._selecionar(agora, encerrar_todas)
+
+            # O que foi guardado durante a queda do banco vai antes, preservando a ordem
+            if self.pendentes_arquivo and not self._regravar_arquivo():
+                self._derramar(linhas)
+            else:
+                restantes = self._gravar(linhas)
+                if restantes:
+                    self._derramar(restantes)
+            self._atualizar_resumos()
+
+    def _atualizar_resumos(self):
+        # Chamado com _lock_gravacao; se falhar, as chaves ficam para a próxima gravação
+        if not self._resumos_pendentes:
+            return
+        try:
+            dias = atualizar_resumos_diarios(self._resumos_pendentes)
+        except Exception as e:
+            with self._condicao:
+                self.falhas_resumo += 1
+            print(f"[AVISO] Não foi possível atualizar os resumos diários de presença: {e}")
+            return
+        self._resumos_pendentes = set()
+        with self._condicao:
+            self.resumos += dias
+
+    def arquivar(self, agora=None):
+        """Move para `sessoes_presenca_arquivo` as sessões encerradas há mais de `retencao_dias`."""
+        self._proximo_arquivamento = time.monotonic() + INTERVALO_ARQUIVAMENTO
+        limite = (agora or datetime.now()) - timedelta(days=self.retencao_dias)
+        try:
+            movidas = arquivar_sessoes_presenca(limite)
+        except Exception as e:
+            self._proximo_arquivamento = time.monotonic() + self.intervalo_gravacao
+            print(f"[AVISO] Não foi possível arquivar as sessões de presença: {e}")
+            return 0
+        with self._condicao:
+            self.arquivadas += movidas
+        return movidas
+
+    def _gravar(self, linhas):
+        # Um comando de várias linhas por lote; retorna as linhas que não puderam ser gravadas
+        for inicio in range(0, len(linhas), self.tamanho_lote):
+            lote = linhas[inicio:inicio + self.tamanho_lote]
+            comeco = time.perf_counter()
+            try:
+                gravar_sessoes_presenca(lote)
+            except Exception as e:
+                with self._condicao:
+                    self.falhas += 1
+                print(f"[AVISO] Não foi possível gravar {len(linhas) - inicio} sessão(ões) de presença no banco: {e}")
+                return linhas[inicio:]
+            self.latencia_gravacao.registrar(time.perf_counter() - comeco)
+            self._resumos_pendentes.update((linha[2].date(), linha[0], linha[1]) for linha in lote)
+            with self._condicao:
+                self.comandos += 1
+                self.gravadas += len(lote)
+        return []
+
+    @staticmethod
+    def _serializar(linha):
+        id_aluno, local, inicio, fim, deteccoes = linha
+        return json.dumps([id_aluno, local, inicio.isoformat(), fim.isoformat(), deteccoes]) + '\n'
+
+    def _derramar(self, linhas):
+        if not linhas:
+            return
+        if not self.arquivo_pendentes:
+            with self._condicao:
+                self.perdidas += len(linhas)
+            print(f"[ERRO] {len(linhas)} sessão(ões) de presença descartada(s): banco inacessível e sem arquivo de pendentes.")
+            return
+        try:
+            with open(self.arquivo_pendentes, 'a', encoding='utf-8') as f:
+                for linha in linhas:
+                    f.write(self._serializar(linha))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            with self._condicao:
+                self.perdidas += len(linhas)
+            print(f"[ERRO] {len(linhas)} sessão(ões) de presença descartada(s): falha ao gravar {self.arquivo_pendentes}: {e}")
+            return
+        with self._condicao:
+            self.derramadas += len(linhas)
+            self.pendentes_arquivo += len(linhas)
+        print(f"[AVISO] {len(linhas)} sessão(ões) de presença guardada(s) em {self.arquivo_pendentes} até o banco voltar.")
+
+    def _regravar_arquivo(self):
+        # True se o arquivo de pendentes foi todo gravado no banco (e removido)
+        try:
+            with open(self.arquivo_pendentes, 'r', encoding='utf-8') as f:
+                linhas = []
+                for texto in f:
+                    if texto.strip():
+                        id_aluno, local, inicio, fim, deteccoes = json.loads(texto)
+                        linhas.append((id_aluno, local, datetime.fromisoformat(inicio), datetime.fromisoformat(fim),
+                                       deteccoes))
+        except FileNotFoundError:
+            linhas = []
+        except (OSError, ValueError) as e:
+            print(f"[ERRO] Arquivo de presenças pendentes ilegível ({self.arquivo_pendentes}): {e}")
+            return False
+
+        restantes = self._gravar(linhas)
+        if restantes:
+            # Reescreve só o que faltou (troca atômica)
+            temporario = self.arquivo_pendentes + '.tmp'
+            with open(temporario, 'w', encoding='utf-8') as f:
+                for linha in restantes:
+                    f.write(self._serializar(linha))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.arquivo_pendentes)
+            with self._condicao:
+                self.pendentes_arquivo = len(restantes)
+            return False
+
+        if os.path.exists(self.arquivo_pendentes):
+            os.remove(self.arquivo_pendentes)
+        with self._condicao:
+            self.pendentes_arquivo = 0
+        if linhas:
+            print(f"[INFO] {len(linhas)} sessão(ões) de presença pendente(s) gravada(s) no banco.")
+        return True
+
+    def estatisticas(self):
+        """Detecções recebidas, sessões abertas/encerradas, linhas e comandos gravados, falhas e pendências."""
+        with self._condicao:
+            resumo = {
+                'deteccoes': self.deteccoes,
+                'coalescidas': self.coalescidas,
+                'sessoes': self.sessoes,
+                'abertas': len(self._abertas),
+                'fechadas': self.fechadas,
+                'gravadas': self.gravadas,
+                'comandos': self.comandos,
+                'falhas': self.falhas,
+                'derramadas': self.derramadas,
+                'perdidas': self.perdidas,
+                'arquivadas': self.arquivadas,
+                'resumos': self.resumos,
+                'falhas_resumo': self.falhas_resumo,
+                'pendentes_arquivo': self.pendentes_arquivo,
+            }
+        resumo['latencia_gravacao'] = self.latencia_gravacao.resumo()
+        return resumo
@@ -1,6 +1,7 @@
 import os
 import smtplib
 import json
+import time
 from pathlib import Path
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -9,6 +10,11 @@ from typing import Dict, Any
 # Caminho para o arquivo de configuração
 CONFIG_FILE = Path('email_config.json')
 
+# Tempo máximo de espera por uma resposta do servidor SMTP (segundos)
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '15'))
+# Sessões ociosas há mais que isso são encerradas antes de o servidor derrubá-las (segundos)
+SMTP_OCIOSIDADE_MAXIMA = float(os.getenv('SMTP_OCIOSIDADE_MAXIMA', '60'))
+
 # Carrega as configurações do arquivo JSON
 def load_config() -> dict:
     """Carrega as configurações do arquivo JSON"""
@@ -33,15 +39,68 @@ class SMTPService:
         self.smtp_password = self.config.get('SMTP_PASSWORD', '')
         self.sender_email = self.config.get('SMTP_SENDER_EMAIL', self.smtp_username)
         self.sender_name = self.config.get('SMTP_SENDER_NAME', 'Sistema de Monitoramento')
+        self.timeout = float(self.config.get('SMTP_TIMEOUT', SMTP_TIMEOUT))
+        # STARTTLS é exigido por padrão; só servidores locais de teste/relay devem desativá-lo
+        self.starttls = bool(self.config.get('SMTP_STARTTLS', True))
         
         print("Configurações de e-mail carregadas:")
         print(f"- Servidor: {self.smtp_server}:{self.smtp_port}")
         print(f"- Usuário: {self.smtp_username}")
 
+    @property
+    def provedor(self) -> str:
+        """Servidor SMTP em uso; o limite de envios por minuto é aplicado por provedor."""
+        return self.smtp_server.lower()
+
+    def configurado(self) -> bool:
+        return bool(self.smtp_username and self.smtp_password)
+
+    def chave_sessao(self) -> tuple:
+        """Identifica a configuração de uma sessão aberta; se mudar, a sessão precisa ser refeita."""
+        return (self.smtp_server, self.smtp_port, self.smtp_username, self.smtp_password, self.starttls)
+
+    def montar_mensagem(self, to_email: str, subject: str, body_text: str, html_content: str = None) -> MIMEMultipart:
+        """Monta a mensagem com o corpo em texto puro e, opcionalmente, a versão HTML"""
+        msg = MIMEMultipart('alternative' if html_content else 'mixed')
+        msg['From'] = f'"{self.sender_name}" <{self.sender_email}>'
+        msg['To'] = to_email
+        msg['Subject'] = subject
+
+        # Adiciona o corpo da mensagem em texto puro
+        msg.attach(MIMEText(body_text, 'plain', 'utf-8'))
+        if html_content:
+            # Se houver conteúdo HTML, adiciona ambas as versões (texto e HTML)
+            msg.attach(MIMEText(html_content, 'html', 'utf-8'))
+        return msg
+
+    def abrir_sessao(self) -> smtplib.SMTP:
+        """
+        Abre uma conexão SMTP autenticada, com timeout em todas as operações de rede
+
+        Returns:
+            Conexão pronta para send_message; quem abre é responsável por encerrá-la
+        """
+        if self.smtp_port == 465:
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.starttls and self.smtp_port != 465:
+                server.starttls()
+            if self.configurado():
+                server.login(self.smtp_username, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
     def send_email(self, to_email: str, subject: str, body_text: str, html_content: str = None) -> Dict[str, Any]:
         """
-        Envia um e-mail usando SMTP
-        
+        Envia um e-mail usando SMTP, aguardando a resposta do servidor
+
+        Usado pelo teste de envio da interface; alertas do monitoramento passam pela caixa de saída
+        (caixa_saida.enfileirar_email), que não bloqueia quem chama.
+
         Args:
             to_email: E-mail do destinatário
             subject: Assunto do e-mail
@@ -51,35 +110,15 @@ class SMTPService:
         Returns:
             Dict com status e mensagem
         """
-        if not all([self.smtp_username, self.smtp_password]):
+        if not self.configurado():
             return {
                 'success': False,
                 'error': 'Configuração de e-mail não encontrada. Configure SMTP_USERNAME e SMTP_PASSWORD.'
             }
 
         try:
-            # Cria a mensagem
-            msg = MIMEMultipart('alternative' if html_content else 'mixed')
-            msg['From'] = f'"{self.sender_name}" <{self.sender_email}>'
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Adiciona o corpo da mensagem em texto puro
-            part1 = MIMEText(body_text, 'plain', 'utf-8')
-            
-            if html_content:
-                # Se houver conteúdo HTML, adiciona ambas as versões (texto e HTML)
-                part2 = MIMEText(html_content, 'html', 'utf-8')
-                msg.attach(part1)
-                msg.attach(part2)
-            else:
-                # Se não houver HTML, usa apenas o texto simples
-                msg.attach(part1)
-            
-            # Conecta e envia o e-mail
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
+            msg = self.montar_mensagem(to_email, subject, body_text, html_content)
+            with self.abrir_sessao() as server:
                 server.send_message(msg)
             
             return {'success': True, 'message': 'E-mail enviado com sucesso'}
@@ -96,6 +135,71 @@ class SMTPService:
                 'error': f'Erro inesperado: {str(e)}'
             }
 
+
+class SessaoSMTP:
+    """
+    Conexão SMTP autenticada reaproveitada entre envios
+
+    Cada worker da caixa de saída tem a sua (smtplib não é thread-safe). A conexão é aberta no
+    primeiro envio, refeita quando a configuração do serviço muda e encerrada depois de
+    `ociosidade_maxima` segundos sem uso.
+    """
+
+    def __init__(self, servico: SMTPService, ociosidade_maxima: float = SMTP_OCIOSIDADE_MAXIMA):
+        self.servico = servico
+        self.ociosidade_maxima = ociosidade_maxima
+        self.aberturas = 0
+        self._conexao = None
+        self._chave = None
+        self._ultimo_uso = 0.0
+
+    @property
+    def aberta(self) -> bool:
+        return self._conexao is not None
+
+    def _abrir(self):
+        self._chave = self.servico.chave_sessao()
+        self._conexao = self.servico.abrir_sessao()
+        self._ultimo_uso = time.monotonic()
+        self.aberturas += 1
+
+    def enviar(self, msg) -> None:
+        """Envia a mensagem pela sessão, abrindo-a se preciso; erros do servidor são propagados"""
+        if self._conexao is not None and (self._chave != self.servico.chave_sessao()
+                                          or time.monotonic() - self._ultimo_uso > self.ociosidade_maxima):
+            self.fechar()
+        reaproveitada = self._conexao is not None
+        if not reaproveitada:
+            self._abrir()
+        try:
+            try:
+                self._conexao.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                if not reaproveitada:
+                    raise
+                # O servidor encerrou a sessão ociosa: nada foi aceito, reabre e tenta uma vez
+                self.fechar()
+                self._abrir()
+                self._conexao.send_message(msg)
+        except Exception:
+            # Depois de um erro o estado da transação é incerto; a próxima mensagem abre outra sessão
+            self.fechar()
+            raise
+        self._ultimo_uso = time.monotonic()
+
+    def fechar_se_ociosa(self) -> None:
+        if self._conexao is not None and time.monotonic() - self._ultimo_uso > self.ociosidade_maxima:
+            self.fechar()
+
+    def fechar(self) -> None:
+        conexao, self._conexao = self._conexao, None
+        if conexao is None:
+            return
+        try:
+            conexao.quit()
+        except Exception:
+            conexao.close()
+
 # Instância global do serviço SMTP
 smtp_service = SMTPService()
 
@@ -0,0 +1,88 @@
+# snapshot_galeria.py
+import json
+import os
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from galeria import MODELO_CODIFICACAO, GaleriaFacial
+
+FORMATO_SNAPSHOT = 2
+ARQUIVO_METADADOS = 'galeria.json'
+
+# versao = contador de alterações do banco (versao_galeria) ao qual o snapshot corresponde;
+# centroides = centróides do índice aproximado, ou None. Contatos dos responsáveis não entram no
+# snapshot (dado pessoal em disco): são sempre lidos do banco
+SnapshotGaleria = namedtuple('SnapshotGaleria', ['versao', 'galeria', 'centroides'])
+
+
+def _gravar_atomico(caminho, escrever):
+    # Grava em arquivo temporário e troca de uma vez, para nunca deixar um arquivo pela metade
+    temporario = caminho.with_name(caminho.name + '.tmp')
+    with open(temporario, 'wb') as f:
+        escrever(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+def salvar_snapshot(diretorio, versao, galeria, centroides=None):
+    """Grava a galeria (matriz .npy + metadados JSON com os IDs) correspondente à `versao` do banco.
+
+    A matriz vai para um arquivo com a versão no nome e os metadados são trocados por último, então
+    um leitor nunca vê metadados apontando para uma matriz incompleta. Processos que ainda mapeiam
+    uma versão antiga continuam com as páginas dela mesmo depois que o arquivo é removido.
+    """
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+
+    arquivo_matriz = f'galeria-{versao}.npy'
+    _gravar_atomico(diretorio / arquivo_matriz, lambda f: np.save(f, np.ascontiguousarray(galeria.matriz)))
+    arquivo_centroides = None
+    if centroides is not None:
+        arquivo_centroides = f'centroides-{versao}.npy'
+        _gravar_atomico(diretorio / arquivo_centroides, lambda f: np.save(f, centroides))
+
+    metadados = {
+        'formato': FORMATO_SNAPSHOT,
+        'versao': versao,
+        'modelo': MODELO_CODIFICACAO,
+        'dimensao': galeria.dimensao,
+        'matriz': arquivo_matriz,
+        'centroides': arquivo_centroides,
+        'ids': list(galeria.ids),
+    }
+    _gravar_atomico(diretorio / ARQUIVO_METADADOS, lambda f: f.write(json.dumps(metadados).encode('utf-8')))
+
+    for antigo in list(diretorio.glob('galeria-*.npy')) + list(diretorio.glob('centroides-*.npy')):
+        if antigo.name not in (arquivo_matriz, arquivo_centroides):
+            try:
+                antigo.unlink()
+            except OSError:
+                pass  # ainda aberto por outro processo (Windows); sai na próxima gravação
+
+
+def carregar_snapshot(diretorio):
+    """Lê o snapshot com a matriz mapeada em memória (mmap), ou None se ausente ou incompatível."""
+    diretorio = Path(diretorio)
+    caminho = diretorio / ARQUIVO_METADADOS
+    if not caminho.exists():
+        return None
+    try:
+        with open(caminho, 'r') as f:
+            metadados = json.load(f)
+        if metadados.get('formato') != FORMATO_SNAPSHOT or metadados.get('modelo') != MODELO_CODIFICACAO:
+            print(f"[AVISO] Snapshot da galeria em {diretorio} tem formato/modelo diferente, ignorando.")
+            return None
+        matriz = np.load(diretorio / metadados['matriz'], mmap_mode='r')
+        if matriz.dtype != np.float32 or matriz.shape != (len(metadados['ids']), metadados['dimensao']):
+            print(f"[AVISO] Snapshot da galeria em {diretorio} está inconsistente, ignorando.")
+            return None
+        centroides = None
+        if metadados.get('centroides'):
+            centroides = np.load(diretorio / metadados['centroides'])
+        return SnapshotGaleria(int(metadados['versao']), GaleriaFacial(metadados['ids'], matriz), centroides)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"[AVISO] Não foi possível carregar o snapshot da galeria de {diretorio}: {e}")
+        return None
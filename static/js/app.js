@@ -513,44 +513,97 @@ document.addEventListener('DOMContentLoaded', () => {
 
 // mostrarAlerta já está definida no topo do arquivo
 
+// Converte o frame recebido em Blob JPEG: anexo binário do Socket.IO (ArrayBuffer)
+// ou, vindo de servidores antigos, string base64
+function frameParaBlob(frameData) {
+    if (frameData instanceof ArrayBuffer || ArrayBuffer.isView(frameData)) {
+        return new Blob([frameData], { type: 'image/jpeg' });
+    }
+    if (typeof frameData !== 'string' || !frameData) return null;
+    const base64 = frameData.startsWith('data:image/') ? frameData.slice(frameData.indexOf(',') + 1) : frameData;
+    const caracteres = atob(base64);
+    const bytes = new Uint8Array(caracteres.length);
+    for (let i = 0; i < caracteres.length; i++) bytes[i] = caracteres.charCodeAt(i);
+    return new Blob([bytes], { type: 'image/jpeg' });
+}
+
+// Remove mensagens de erro/loading quando um frame é exibido
+function limparEstadoCamera() {
+    const container = document.getElementById('cameraContainer');
+    if (container) {
+        const errorElements = container.querySelectorAll('.camera-error, .camera-loading');
+        errorElements.forEach(el => el.remove());
+    }
+}
+
 // Atualiza um frame de forma segura com tratamento de erros
 function updateFrameSafely(element, frameData, cameraId) {
     try {
-        // Usa requestAnimationFrame para suavizar a atualização
+        // Descarta o frame se o anterior deste elemento ainda está sendo decodificado
+        if (element.dataset.decodificando === '1') return;
+
+        const blob = frameParaBlob(frameData);
+        if (!blob) return;
+        element.dataset.decodificando = '1';
+
+        // Canvas: decodifica fora da thread principal com createImageBitmap
+        if (element.tagName === 'CANVAS' && typeof window.createImageBitmap === 'function') {
+            createImageBitmap(blob)
+                .then((bitmap) => {
+                    if (element.width !== bitmap.width) element.width = bitmap.width;
+                    if (element.height !== bitmap.height) element.height = bitmap.height;
+                    element.getContext('2d').drawImage(bitmap, 0, 0);
+                    if (bitmap.close) bitmap.close();
+                    limparEstadoCamera();
+                })
+                .catch(() => {
+                    console.error('Erro ao decodificar o frame da câmera:', cameraId);
+                })
+                .finally(() => {
+                    element.dataset.decodificando = '';
+                });
+            return;
+        }
+
+        // Imagem: ObjectURL do Blob, revogando a URL anterior só depois que a nova carregar
+        const url = URL.createObjectURL(blob);
         requestAnimationFrame(() => {
             try {
                 // Verifica se o elemento ainda está no DOM
                 if (!document.body.contains(element)) {
                     console.log('Elemento da câmera não encontrado no DOM');
+                    URL.revokeObjectURL(url);
+                    element.dataset.decodificando = '';
                     return;
                 }
-                
-                // Atualiza a fonte da imagem
-                element.src = `data:image/jpeg;base64,${frameData}`;
-                
+
+                const urlAnterior = element.dataset.frameUrl;
+                element.dataset.frameUrl = url;
+
                 // Configura tratamento de erros
                 element.onerror = () => {
                     console.error('Erro ao carregar o frame da câmera:', cameraId);
+                    element.dataset.decodificando = '';
                     element.src = '';
                     mostrarEstadoCamera(false, `Erro ao carregar o vídeo da câmera ${cameraId}`);
                 };
-                
+
                 // Quando a imagem carrega com sucesso
                 element.onload = () => {
-                    // Remove qualquer mensagem de erro/loading
-                    const container = document.getElementById('cameraContainer');
-                    if (container) {
-                        const errorElements = container.querySelectorAll('.camera-error, .camera-loading');
-                        errorElements.forEach(el => el.remove());
-                    }
+                    element.dataset.decodificando = '';
+                    if (urlAnterior) URL.revokeObjectURL(urlAnterior);
+                    limparEstadoCamera();
                 };
-                
+
+                element.src = url;
             } catch (e) {
+                element.dataset.decodificando = '';
                 console.error('Erro ao atualizar o frame da câmera:', e);
                 mostrarEstadoCamera(false, 'Erro ao exibir o vídeo da câmera');
             }
         });
     } catch (e) {
+        element.dataset.decodificando = '';
         console.error('Erro ao agendar atualização do frame:', e);
     }
 }
@@ -849,7 +902,8 @@ socket.on('camera_frame', (data) => {
         // Debug: Log apenas uma vez a cada 60 frames para não sobrecarregar o console
         if (!window.frameCounter) window.frameCounter = 0;
         if (window.frameCounter++ % 60 === 0) {
-            console.log('Recebendo frames da câmera:', data.camera_id, 'Tamanho do frame:', data.frame ? data.frame.length + ' bytes' : 'vazio');
+            const tamanho = data.frame ? (data.frame.byteLength !== undefined ? data.frame.byteLength : data.frame.length) : 0;
+            console.log('Recebendo frames da câmera:', data.camera_id, 'Tamanho do frame:', tamanho ? tamanho + ' bytes' : 'vazio');
         }
         
         const cameraId = data.camera_id;
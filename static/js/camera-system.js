@@ -292,28 +292,30 @@ const CameraSystem = (() => {
         showCameraStatus('Modo de teste ativo', 'info');
     }
     
-    // Create camera display element (single IMG fed by backend frames)
+    // Create camera display element fed by backend frames.
+    // A CANVAS drawn through createImageBitmap (JPEG decoded off the main thread); IMG + ObjectURL as fallback
     function createCameraDisplay() {
         if (!cameraContainer) return;
         cameraContainer.innerHTML = '';
-        const img = document.createElement('img');
-        img.id = 'cameraFeed';
-        img.className = 'w-100 h-auto';
-        img.alt = 'Feed da câmera (frames processados)';
-        img.style.maxHeight = '400px';
-        img.style.objectFit = 'contain';
-        img.style.backgroundColor = '#000';
+        const useCanvas = typeof window.createImageBitmap === 'function';
+        const display = document.createElement(useCanvas ? 'canvas' : 'img');
+        display.id = 'cameraFeed';
+        display.className = 'w-100 h-auto';
+        display.style.maxHeight = '400px';
+        display.style.objectFit = 'contain';
+        display.style.backgroundColor = '#000';
 
-        img.onerror = (error) => {
-            console.error('Erro na imagem do feed:', error);
-            showCameraStatus('Erro na exibição do frame recebido', 'error');
-        };
-
-        img.onload = () => {
-            // Frame carregado com sucesso
-        };
+        if (useCanvas) {
+            display.setAttribute('aria-label', 'Feed da câmera (frames processados)');
+        } else {
+            display.alt = 'Feed da câmera (frames processados)';
+            display.onerror = (error) => {
+                console.error('Erro na imagem do feed:', error);
+                showCameraStatus('Erro na exibição do frame recebido', 'error');
+            };
+        }
 
-        cameraContainer.appendChild(img);
+        cameraContainer.appendChild(display);
     }
     
     // Create test camera display
@@ -419,56 +421,93 @@ const CameraSystem = (() => {
     let lastFrameAt = 0;
     let previousObjectUrl = null;
     let firstFrameLogged = false;
+    let decodingFrame = false;
+
+    // JPEG bytes arrive as a Socket.IO binary attachment (ArrayBuffer in the browser).
+    // Base64 strings are still accepted from older servers
+    function frameToBlob(frame) {
+        if (frame instanceof ArrayBuffer || ArrayBuffer.isView(frame)) {
+            return new Blob([frame], { type: 'image/jpeg' });
+        }
+        if (typeof frame !== 'string') return null;
+
+        let frameData = frame;
+        // Strip any data URL prefix if present
+        if (frameData.startsWith('data:image/')) {
+            frameData = frameData.slice(frameData.indexOf(',') + 1);
+        }
+        frameData = frameData.replace(/\s/g, '');
+        if (!frameData || frameData.length % 4 === 1) {
+            console.warn('Frame base64 inválido (padding incorreto)');
+            return null;
+        }
+        frameData += '='.repeat((4 - frameData.length % 4) % 4);
+        const byteChars = atob(frameData);
+        const bytes = new Uint8Array(byteChars.length);
+        for (let i = 0; i < byteChars.length; i++) bytes[i] = byteChars.charCodeAt(i);
+        return new Blob([bytes], { type: 'image/jpeg' });
+    }
+
+    function logFirstFrame() {
+        if (!firstFrameLogged) {
+            console.log('[CameraSystem] Primeiro frame recebido e exibido');
+            firstFrameLogged = true;
+        }
+    }
+
+    function drawFrameOnCanvas(canvas, blob) {
+        // Frames arriving while the previous one is still decoding are dropped
+        decodingFrame = true;
+        createImageBitmap(blob)
+            .then((bitmap) => {
+                if (canvas.width !== bitmap.width) canvas.width = bitmap.width;
+                if (canvas.height !== bitmap.height) canvas.height = bitmap.height;
+                canvas.getContext('2d').drawImage(bitmap, 0, 0);
+                if (bitmap.close) bitmap.close();
+                logFirstFrame();
+            })
+            .catch((error) => {
+                console.error('Falha ao decodificar frame', error);
+            })
+            .finally(() => {
+                decodingFrame = false;
+            });
+    }
+
+    function drawFrameOnImage(imgElement, blob) {
+        const objectUrl = URL.createObjectURL(blob);
+
+        // Revoke previous URL only after new image has loaded to avoid flicker/black frames
+        const oldUrl = previousObjectUrl;
+        previousObjectUrl = objectUrl;
+        imgElement.onload = () => {
+            logFirstFrame();
+            if (oldUrl) URL.revokeObjectURL(oldUrl);
+        };
+        imgElement.onerror = (e) => {
+            console.error('Falha ao carregar frame', e);
+        };
+        imgElement.src = objectUrl;
+    }
+
     function updateCameraFrame(data) {
-        const imgElement = document.getElementById('cameraFeed');
-        if (!imgElement || !data || !data.frame) return;
+        const display = document.getElementById('cameraFeed');
+        if (!display || !data || !data.frame) return;
         
         try {
             // Throttle UI updates to avoid flicker and decode pressure (max ~15 FPS)
             const now = Date.now();
-            if (now - lastFrameAt < 66) return;
+            if (now - lastFrameAt < 66 || decodingFrame) return;
             lastFrameAt = now;
 
-            let frameData = data.frame;
-            // Strip any data URL prefix if present
-            if (frameData.startsWith('data:image/')) {
-                const idx = frameData.indexOf(',');
-                frameData = frameData.slice(idx + 1);
-            }
-            // Remove whitespace/newlines
-            frameData = frameData.replace(/\s/g, '');
-            // Normalize Base64 padding to multiple of 4
-            const pad = frameData.length % 4;
-            if (pad === 2) frameData += '==';
-            else if (pad === 3) frameData += '=';
-            else if (pad === 1) {
-                // Invalid base64 length, skip this frame
-                console.warn('Frame base64 inválido (padding incorreto)');
-                return;
-            }
-            if (!frameData) return;
+            const blob = frameToBlob(data.frame);
+            if (!blob) return;
 
-            // Convert base64 to Blob and use ObjectURL (more robust than data URLs for rapid updates)
-            const byteChars = atob(frameData);
-            const byteNumbers = new Uint8Array(byteChars.length);
-            for (let i = 0; i < byteChars.length; i++) byteNumbers[i] = byteChars.charCodeAt(i);
-            const blob = new Blob([byteNumbers], { type: 'image/jpeg' });
-            const objectUrl = URL.createObjectURL(blob);
-
-            // Revoke previous URL only after new image has loaded to avoid flicker/black frames
-            const oldUrl = previousObjectUrl;
-            previousObjectUrl = objectUrl;
-            imgElement.onload = () => {
-                if (!firstFrameLogged) {
-                    console.log('[CameraSystem] Primeiro frame recebido e exibido');
-                    firstFrameLogged = true;
-                }
-                if (oldUrl) URL.revokeObjectURL(oldUrl);
-            };
-            imgElement.onerror = (e) => {
-                console.error('Falha ao carregar frame', e);
-            };
-            imgElement.src = objectUrl;
+            if (display.tagName === 'CANVAS' && typeof window.createImageBitmap === 'function') {
+                drawFrameOnCanvas(display, blob);
+            } else {
+                drawFrameOnImage(display, blob);
+            }
         } catch (error) {
             console.error('Error updating camera frame:', error);
         }
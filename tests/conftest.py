@@ -82,7 +82,9 @@ def test_database():
         CREATE TABLE IF NOT EXISTS alunos (
             Id INT NOT NULL,
             Nome VARCHAR(90) NOT NULL,
-            codificacao_facial TEXT NOT NULL,
+            codificacao_facial TEXT NULL,
+            codificacao_binaria VARBINARY(512) NULL,
+            modelo_codificacao VARCHAR(40) NULL,
             PRIMARY KEY (Id)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
         ''')
@@ -173,10 +175,37 @@ def mock_email_service():
         mock_send.return_value = {'success': True, 'message': 'Email enviado com sucesso'}
         yield mock_send
 
+@pytest.fixture
+def servidor_smtp():
+    """Servidor SMTP local para os testes de envio"""
+    from tests.servidor_smtp import ServidorSMTPTeste
+    servidor = ServidorSMTPTeste().iniciar()
+    yield servidor
+    servidor.parar()
+
+@pytest.fixture
+def servico_smtp_local(servidor_smtp):
+    """SMTPService apontando para o servidor SMTP local (sem STARTTLS)"""
+    from smtp_service import SMTPService
+    config = {
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': servidor_smtp.porta,
+        'SMTP_USERNAME': 'usuario@teste.com',
+        'SMTP_PASSWORD': 'senha',
+        'SMTP_TIMEOUT': 2,
+        'SMTP_STARTTLS': False,
+    }
+    with patch('smtp_service.load_config', return_value=config):
+        yield SMTPService()
+
 @pytest.fixture
 def reconhecimento_instance():
     """Cria uma instância do ReconhecimentoFacial para testes"""
-    with patch('reconhecimento.listar_alunos', return_value=[]):
+    with patch('reconhecimento.listar_codificacoes', return_value=([], np.empty((0, 128), dtype=np.float32), {})), \
+         patch('reconhecimento.DIRETORIO_GALERIA', ''), \
+         patch('reconhecimento.RegistroPresencas'), \
+         patch('notificacoes.enfileirar_email', return_value=1):
+        # Alertas não chegam à caixa de saída global (diário em disco e workers SMTP reais)
         instance = ReconhecimentoFacial()
         yield instance
 
@@ -192,8 +192,9 @@ class MockDataGenerator:
             },
             'camera_frame': {
                 'camera_id': 0,
-                'frame': base64.b64encode(b'fake_frame_data').decode('utf-8'),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now().isoformat(),
+                'formato': 'jpeg',
+                'frame': b'\xff\xd8fake_frame_data\xff\xd9'
             }
         }
     
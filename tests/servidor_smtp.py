@@ -0,0 +1,99 @@
+"""
+Servidor SMTP local mínimo para os testes de envio de e-mail
+"""
+import socketserver
+import threading
+import time
+
+
+class _SessaoSMTP(socketserver.StreamRequestHandler):
+    """Atende uma conexão: EHLO/HELO, AUTH PLAIN, MAIL, RCPT, DATA, RSET, NOOP e QUIT"""
+
+    def _responder(self, linha):
+        self.wfile.write((linha + '\r\n').encode('ascii'))
+
+    def handle(self):
+        servidor = self.server.controle
+        with servidor.lock:
+            servidor.conexoes += 1
+        time.sleep(servidor.atraso_saudacao)
+        self._responder('220 localhost ESMTP teste')
+        remetente, destinatarios = None, []
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            comando = linha.decode('ascii', 'replace').strip()
+            verbo = comando.split(' ', 1)[0].upper()
+            if verbo == 'EHLO':
+                self._responder('250-localhost')
+                self._responder('250 AUTH PLAIN')
+            elif verbo == 'HELO':
+                self._responder('250 localhost')
+            elif verbo == 'AUTH':
+                with servidor.lock:
+                    servidor.autenticacoes += 1
+                self._responder('235 Autenticado')
+            elif verbo == 'MAIL':
+                remetente, destinatarios = comando, []
+                self._responder('250 OK')
+            elif verbo == 'RCPT':
+                destinatarios.append(comando.split(':', 1)[1].strip(' <>'))
+                self._responder('250 OK')
+            elif verbo == 'DATA':
+                self._responder('354 Fim com <CRLF>.<CRLF>')
+                linhas = []
+                while True:
+                    linha = self.rfile.readline()
+                    if not linha or linha in (b'.\r\n', b'.\n'):
+                        break
+                    linhas.append(linha)
+                with servidor.lock:
+                    resposta = servidor.respostas.pop(0) if servidor.respostas else '250 OK'
+                    if resposta.startswith('250'):
+                        servidor.mensagens.append((destinatarios, b''.join(linhas)))
+                self._responder(resposta)
+                if servidor.desconectar_apos_mensagem:
+                    return
+            elif verbo in ('RSET', 'NOOP'):
+                self._responder('250 OK')
+            elif verbo == 'QUIT':
+                self._responder('221 Tchau')
+                return
+            else:
+                self._responder('502 Comando desconhecido')
+
+
+class _Servidor(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ServidorSMTPTeste:
+    """
+    Servidor SMTP em 127.0.0.1 (porta livre) que guarda as mensagens recebidas
+
+    `respostas` define, em ordem, o código devolvido a cada DATA (ex.: '451 Tente depois');
+    depois de esgotada, todas as mensagens são aceitas.
+    """
+
+    def __init__(self, atraso_saudacao=0.0, desconectar_apos_mensagem=False):
+        self.atraso_saudacao = atraso_saudacao
+        self.desconectar_apos_mensagem = desconectar_apos_mensagem
+        self.respostas = []
+        self.mensagens = []
+        self.conexoes = 0
+        self.autenticacoes = 0
+        self.lock = threading.Lock()
+        self._servidor = _Servidor(('127.0.0.1', 0), _SessaoSMTP)
+        self._servidor.controle = self
+        self.porta = self._servidor.server_address[1]
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
@@ -0,0 +1,113 @@
+"""
+Testes unitários para o módulo anel_frames.py
+"""
+import pytest
+import numpy as np
+from unittest.mock import Mock
+
+from anel_frames import AnelFrames, ler_frame
+from pool_reconhecimento import FrameCompartilhado
+
+
+def _camera_falsa(forma=(48, 64, 3)):
+    """Câmera que escreve no buffer recebido em cap.read(image=...), como o OpenCV"""
+    cap = Mock()
+    contador = {'n': 0}
+
+    def read(image=None):
+        contador['n'] += 1
+        if image is None:
+            image = np.empty(forma, dtype=np.uint8)
+        image[...] = contador['n']
+        return True, image
+
+    cap.read.side_effect = read
+    cap.grab.return_value = True
+    return cap
+
+
+class TestAnelFrames:
+    """Testes para o anel de frames em memória compartilhada"""
+
+    def test_leitura_direta_no_slot(self):
+        """Testa que a câmera decodifica direto no slot e o consumidor recebe view somente leitura"""
+        cap = _camera_falsa()
+        ret, anel, seq = ler_frame(cap)
+        ret, anel, seq = ler_frame(cap, anel)
+
+        with anel.adquirir(seq) as frame:
+            assert ret and seq == 2
+            assert frame.imagem[0, 0, 0] == 2
+            assert not frame.imagem.flags.writeable
+            with pytest.raises(ValueError):
+                frame.imagem[0, 0, 0] = 0
+        anel.fechar()
+
+    def test_slot_reservado_nao_e_sobrescrito(self):
+        """Testa que a captura pula slots reservados por consumidores"""
+        cap = _camera_falsa()
+        ret, anel, seq = ler_frame(cap, n_slots=3)
+        reservado = anel.adquirir(seq)
+
+        for _ in range(10):
+            ler_frame(cap, anel)
+
+        assert reservado.valido()
+        assert reservado.imagem[0, 0, 0] == 1
+        reservado.liberar()
+        assert anel.ultima_sequencia() == 11
+        anel.fechar()
+
+    def test_adquirir_sequencia_sobrescrita_retorna_mais_recente(self):
+        """Testa que uma sequência já reciclada devolve o frame mais novo"""
+        cap = _camera_falsa()
+        ret, anel, primeira = ler_frame(cap, n_slots=2)
+        for _ in range(3):
+            ret, anel, ultima = ler_frame(cap, anel)
+
+        with anel.adquirir(primeira) as frame:
+            assert frame.seq == ultima
+        anel.fechar()
+
+    def test_sem_slot_livre_descarta_frame(self):
+        """Testa que, com todos os slots reservados, o frame é descartado sem bloquear"""
+        cap = _camera_falsa()
+        ret, anel, seq = ler_frame(cap, n_slots=2)
+        primeiro = anel.adquirir(seq)
+        ret, anel, seq = ler_frame(cap, anel)
+        segundo = anel.adquirir(seq)
+
+        ret, anel, seq = ler_frame(cap, anel)
+
+        assert ret and seq is None
+        cap.grab.assert_called()
+        primeiro.liberar()
+        segundo.liberar()
+        anel.fechar()
+
+    def test_mudanca_de_resolucao_recria_anel(self):
+        """Testa que uma nova resolução gera um novo anel"""
+        anel = AnelFrames((10, 10, 3))
+        cap = Mock()
+        cap.read.return_value = (True, np.ones((20, 20, 3), dtype=np.uint8))
+
+        ret, novo, seq = ler_frame(cap, anel)
+
+        assert novo is not anel
+        assert novo.forma == (20, 20, 3)
+        novo.fechar()
+
+    def test_descritor_para_outro_processo(self):
+        """Testa que o descritor do slot aponta para os mesmos bytes"""
+        from multiprocessing import shared_memory
+        cap = _camera_falsa()
+        ret, anel, seq = ler_frame(cap)
+        with anel.adquirir(seq) as frame:
+            descritor = frame.descritor
+            assert isinstance(descritor, FrameCompartilhado)
+            shm = shared_memory.SharedMemory(name=descritor.nome_shm)
+            copia = np.ndarray(descritor.forma, dtype=descritor.dtype, buffer=shm.buf, offset=descritor.deslocamento)
+            np.testing.assert_array_equal(copia, frame.imagem)
+            del copia
+            shm.close()
+        anel.fechar()
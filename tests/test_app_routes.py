@@ -98,10 +98,10 @@ class TestCadastroAluno:
     """Testes para cadastro de alunos via API"""
     
     @patch('app.cadastrar_aluno')
-    @patch('app.reconhecimento.carregar_codificacoes_referencia')
-    def test_create_aluno_sucesso(self, mock_carregar, mock_cadastrar, test_client, base64_image):
+    @patch('app.reconhecimento.adicionar_aluno')
+    def test_create_aluno_sucesso(self, mock_adicionar, mock_cadastrar, test_client, base64_image):
         """Testa cadastro bem-sucedido de aluno"""
-        mock_cadastrar.return_value = None
+        mock_cadastrar.return_value = [0.1] * 128
         
         data = {
             'id': 12345,
@@ -120,7 +120,8 @@ class TestCadastroAluno:
         assert response.status_code == 200
         assert data_response['success'] == True
         mock_cadastrar.assert_called_once()
-        mock_carregar.assert_called_once()
+        mock_adicionar.assert_called_once_with(12345, [0.1] * 128, resp_telefone='11999999999',
+                                               resp_email='joao@email.com')
     
     def test_create_aluno_dados_incompletos(self, test_client):
         """Testa cadastro com dados incompletos"""
@@ -184,10 +185,10 @@ class TestEdicaoAluno:
     """Testes para edição de alunos via API"""
     
     @patch('app.editar_aluno')
-    @patch('app.reconhecimento.carregar_codificacoes_referencia')
-    def test_update_aluno_sucesso(self, mock_carregar, mock_editar, test_client, base64_image):
+    @patch('app.reconhecimento.adicionar_aluno')
+    def test_update_aluno_sucesso(self, mock_adicionar, mock_editar, test_client, base64_image):
         """Testa edição bem-sucedida de aluno"""
-        mock_editar.return_value = None
+        mock_editar.return_value = [0.2] * 128
         
         data = {
             'nome': 'João Silva Editado',
@@ -208,9 +209,13 @@ class TestEdicaoAluno:
                                           mock_editar.call_args[0][2],
                                           resp_telefone='11888888888',
                                           resp_email='joao.novo@email.com')
+        mock_adicionar.assert_called_once_with(12345, [0.2] * 128, resp_telefone='11888888888',
+                                               resp_email='joao.novo@email.com')
     
     @patch('app.editar_aluno')
-    def test_update_aluno_sem_foto(self, mock_editar, test_client):
+    @patch('app.reconhecimento.adicionar_aluno')
+    @patch('app.reconhecimento.atualizar_responsavel')
+    def test_update_aluno_sem_foto(self, mock_responsavel, mock_adicionar, mock_editar, test_client):
         """Testa edição sem alterar foto"""
         mock_editar.return_value = None
         
@@ -230,6 +235,8 @@ class TestEdicaoAluno:
         mock_editar.assert_called_once_with(12345, 'João Silva Editado', None,
                                           resp_telefone='11888888888',
                                           resp_email=None)
+        mock_adicionar.assert_not_called()
+        mock_responsavel.assert_called_once_with(12345, resp_telefone='11888888888', resp_email=None)
     
     def test_update_aluno_nome_vazio(self, test_client):
         """Testa edição com nome vazio"""
@@ -250,8 +257,8 @@ class TestExclusaoAluno:
     """Testes para exclusão de alunos via API"""
     
     @patch('app.excluir_aluno')
-    @patch('app.reconhecimento.carregar_codificacoes_referencia')
-    def test_delete_aluno_sucesso(self, mock_carregar, mock_excluir, test_client):
+    @patch('app.reconhecimento.remover_aluno')
+    def test_delete_aluno_sucesso(self, mock_remover, mock_excluir, test_client):
         """Testa exclusão bem-sucedida de aluno"""
         mock_excluir.return_value = None
         
@@ -261,7 +268,7 @@ class TestExclusaoAluno:
         assert response.status_code == 200
         assert data['success'] == True
         mock_excluir.assert_called_once_with(12345)
-        mock_carregar.assert_called_once()
+        mock_remover.assert_called_once_with(12345)
     
     @patch('app.excluir_aluno')
     def test_delete_aluno_inexistente(self, mock_excluir, test_client):
@@ -276,6 +283,181 @@ class TestExclusaoAluno:
         assert 'Aluno não encontrado' in data['error']
 
 
+class TestRegioesCameras:
+    """Testes para as rotas de regiões de interesse"""
+    
+    def test_definir_e_consultar_regioes(self, test_client, tmp_path):
+        """Testa PUT/GET/DELETE das regiões de uma câmera"""
+        from regioes_interesse import RegioesInteresse
+        regioes = [{'tipo': 'retangulo', 'x': 0.1, 'y': 0.1, 'largura': 0.5, 'altura': 0.5}]
+        with patch('app.reconhecimento.regioes', RegioesInteresse(tmp_path / 'regioes.json')):
+            response = test_client.put('/api/cameras/1/regioes', json={'regioes': regioes})
+            assert response.status_code == 200
+            
+            data = json.loads(test_client.get('/api/cameras/1/regioes').data)
+            assert data['regioes'] == regioes
+            
+            data = json.loads(test_client.delete('/api/cameras/1/regioes').data)
+            assert data['removidas'] == True
+            assert json.loads(test_client.get('/api/cameras/regioes').data)['regioes'] == {}
+    
+    def test_regioes_invalidas(self, test_client, tmp_path):
+        """Testa rejeição de regiões inválidas"""
+        from regioes_interesse import RegioesInteresse
+        with patch('app.reconhecimento.regioes', RegioesInteresse(tmp_path / 'regioes.json')):
+            response = test_client.put('/api/cameras/1/regioes', json={'regioes': [{'tipo': 'circulo'}]})
+            assert response.status_code == 400
+            assert json.loads(response.data)['success'] == False
+
+
+class TestPresencas:
+    """Testes para a consulta e a exportação das sessões de presença"""
+
+    def _sessao(self, id_sessao, minuto=0):
+        from datetime import datetime
+        return {'id_sessao': id_sessao, 'id_aluno': 7, 'local': 'camera 1',
+                'inicio': datetime(2024, 3, 4, 8, minuto), 'fim': datetime(2024, 3, 4, 8, minuto + 30), 'deteccoes': 12}
+
+    @patch('app.listar_sessoes_presenca')
+    def test_paginacao_por_cursor(self, mock_listar, test_client):
+        """Testa filtros, limite e o cursor da próxima página"""
+        from datetime import datetime
+        mock_listar.return_value = [self._sessao(1), self._sessao(2, 5), self._sessao(3, 10)]
+
+        response = test_client.get('/api/presencas?inicio=2024-03-04T08:00&id_aluno=7&camera=1&limite=2')
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert [s['id_sessao'] for s in data['sessoes']] == [1, 2]
+        assert data['sessoes'][0]['duracao_segundos'] == 1800
+        _, kwargs = mock_listar.call_args
+        assert kwargs == {'apos': None, 'limite': 3, 'inicio': datetime(2024, 3, 4, 8, 0), 'id_aluno': 7,
+                          'local': 'camera 1'}
+
+        mock_listar.return_value = [self._sessao(3, 10)]
+        data = json.loads(test_client.get(f"/api/presencas?limite=2&cursor={data['proximo']}").data)
+
+        assert mock_listar.call_args[1]['apos'] == (datetime(2024, 3, 4, 8, 5), 2)
+        assert data['proximo'] is None
+
+    def test_filtros_invalidos(self, test_client):
+        """Testa a rejeição de datas, alunos e cursores inválidos"""
+        for consulta in ('inicio=ontem', 'id_aluno=abc', 'cursor=xyz'):
+            response = test_client.get(f'/api/presencas?{consulta}')
+            assert response.status_code == 400
+            assert json.loads(response.data)['success'] == False
+        assert test_client.get('/api/presencas/exportar?formato=xml').status_code == 400
+
+    @patch('app.exportar_sessoes_presenca')
+    def test_exportacao_csv_transmitida(self, mock_exportar, test_client):
+        """Testa que o CSV é gerado em pedaços a partir do iterador do banco"""
+        from datetime import datetime
+        consumidas = []
+
+        def linhas():
+            for n in range(5000):
+                consumidas.append(n)
+                yield (n, 7, 'camera 1', datetime(2024, 3, 4, 8, 0), datetime(2024, 3, 4, 8, 30), 12)
+        mock_exportar.return_value = linhas()
+
+        response = test_client.get('/api/presencas/exportar?formato=csv&arquivo=1', buffered=False)
+
+        assert response.is_streamed
+        # Só o primeiro pedaço foi gerado: o resto é lido do banco à medida que o corpo é consumido
+        assert 0 < len(consumidas) < 5000
+        pedacos = list(response.response)
+        assert len(pedacos) > 1
+        texto = ''.join(p.decode() if isinstance(p, bytes) else p for p in pedacos).splitlines()
+        assert texto[0] == 'id_sessao,id_aluno,local,inicio,fim,deteccoes'
+        assert texto[1] == '0,7,camera 1,2024-03-04 08:00:00,2024-03-04 08:30:00,12'
+        assert len(texto) == 5001
+        assert mock_exportar.call_args[1]['incluir_arquivo'] is True
+        assert 'attachment' in response.headers['Content-Disposition']
+
+    @patch('app.exportar_sessoes_presenca')
+    def test_exportacao_ndjson(self, mock_exportar, test_client):
+        """Testa o formato NDJSON (um objeto JSON por linha)"""
+        from datetime import datetime
+        mock_exportar.return_value = iter([(1, 7, 'camera 1', datetime(2024, 3, 4, 8, 0), datetime(2024, 3, 4, 8, 1), 3)])
+
+        response = test_client.get('/api/presencas/exportar?formato=ndjson&local=Sala 2')
+
+        linhas = response.data.decode().splitlines()
+        assert response.mimetype == 'application/x-ndjson'
+        assert json.loads(linhas[0])['duracao_segundos'] == 60
+        assert mock_exportar.call_args[1]['local'] == 'Sala 2'
+
+    @patch('app.exportar_sessoes_presenca')
+    def test_exportacao_sem_banco(self, mock_exportar, test_client):
+        """Testa que a falha de conexão (na primeira linha) é informada antes de começar a transmissão"""
+        def linhas():
+            raise RuntimeError('Erro ao conectar ao MySQL')
+            yield
+
+        mock_exportar.return_value = linhas()
+        response = test_client.get('/api/presencas/exportar')
+        assert response.status_code == 500
+
+    @patch('app.exportar_sessoes_presenca', return_value=iter([]))
+    def test_exportacao_vazia(self, mock_exportar, test_client):
+        """Testa que um período sem sessões gera só o cabeçalho do CSV"""
+        response = test_client.get('/api/presencas/exportar')
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).splitlines() == ['id_sessao,id_aluno,local,inicio,fim,deteccoes']
+
+
+class TestResumosPresenca:
+    """Testes para os painéis servidos pelos resumos diários"""
+
+    @patch('app.listar_resumo_diario')
+    def test_resumo_diario_com_taxa(self, mock_listar, test_client):
+        """Testa o resumo por dia com a taxa de presença"""
+        from datetime import date
+        mock_listar.return_value = [
+            {'dia': date(2024, 3, 4), 'alunos_presentes': 450, 'alunos_cadastrados': 500, 'atrasados': 12},
+            {'dia': date(2024, 3, 5), 'alunos_presentes': 0, 'alunos_cadastrados': 0, 'atrasados': 0},
+        ]
+
+        response = test_client.get('/api/presencas/resumo/diario?inicio=2024-03-04&fim=2024-03-05')
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert data['dias'][0] == {'dia': '2024-03-04', 'alunos_presentes': 450, 'alunos_cadastrados': 500,
+                                   'atrasados': 12, 'taxa_presenca': 0.9}
+        assert data['dias'][1]['taxa_presenca'] is None
+        mock_listar.assert_called_once_with(date(2024, 3, 4), date(2024, 3, 5))
+
+    def test_periodo_invalido(self, test_client):
+        """Testa a rejeição de datas inválidas e de períodos longos demais"""
+        for consulta in ('inicio=ontem', 'inicio=2024-03-05&fim=2024-03-04', 'inicio=2022-01-01&fim=2024-01-01'):
+            response = test_client.get(f'/api/presencas/resumo/diario?{consulta}')
+            assert response.status_code == 400
+
+    @patch('app.listar_resumo_aluno', return_value=[])
+    def test_resumo_aluno(self, mock_listar, test_client):
+        """Testa o resumo do aluno com o período padrão de 30 dias"""
+        from datetime import date
+        response = test_client.get('/api/presencas/resumo/alunos/7?fim=2024-03-30')
+
+        assert response.status_code == 200
+        mock_listar.assert_called_once_with(7, date(2024, 3, 1), date(2024, 3, 30))
+
+    @patch('app.listar_atrasos')
+    def test_atrasos(self, mock_listar, test_client):
+        """Testa a lista de atrasos do dia"""
+        from datetime import datetime
+        mock_listar.return_value = [{'id_aluno': 3, 'primeira_chegada': datetime(2024, 3, 4, 8, 10)}]
+
+        data = json.loads(test_client.get('/api/presencas/resumo/atrasos?dia=2024-03-04').data)
+
+        assert data['atrasos'] == [{'id_aluno': 3, 'primeira_chegada': '2024-03-04T08:10:00'}]
+
+    @patch('app.listar_resumo_locais', side_effect=RuntimeError('Erro ao conectar ao MySQL'))
+    def test_resumo_sem_banco(self, mock_listar, test_client):
+        """Testa o erro quando o banco está inacessível"""
+        assert test_client.get('/api/presencas/resumo/locais').status_code == 500
+
+
 class TestMonitoramento:
     """Testes para rotas de monitoramento"""
     
@@ -440,6 +622,34 @@ class TestSocketIOEvents:
         # Emite pode retornar None
         assert response is None or True
 
+    def test_callback_frame_envia_bytes(self):
+        """Testa que o frame sai como bytes do JPEG (anexo binário), com o cabeçalho ao lado"""
+        from app import callback_frame
+        _, buffer = cv2.imencode('.jpg', np.zeros((48, 64, 3), dtype=np.uint8))
+
+        with patch('app.socketio.emit') as mock_emit:
+            callback_frame(buffer.tobytes(), camera_id=2)
+
+        evento, dados = mock_emit.call_args[0]
+        assert evento == 'camera_frame'
+        assert isinstance(dados['frame'], bytes)
+        assert dados['frame'] == buffer.tobytes()
+        assert dados['camera_id'] == 2
+        assert dados['formato'] == 'jpeg'
+        assert 'timestamp' in dados
+
+    def test_callback_frame_aceita_buffer_numpy(self):
+        """Testa que o buffer do cv2.imencode é convertido para bytes"""
+        from app import callback_frame
+        _, buffer = cv2.imencode('.jpg', np.zeros((48, 64, 3), dtype=np.uint8))
+
+        with patch('app.socketio.emit') as mock_emit:
+            callback_frame(buffer)
+
+        dados = mock_emit.call_args[0][1]
+        assert dados['frame'] == buffer.tobytes()
+        assert dados['camera_id'] == 0
+
 
 @pytest.mark.slow
 class TestPerformanceRoutes:
@@ -468,7 +678,7 @@ class TestPerformanceRoutes:
         import time
         
         with patch('app.cadastrar_aluno'), \
-             patch('app.reconhecimento.carregar_codificacoes_referencia'):
+             patch('app.reconhecimento.adicionar_aluno'):
             
             data = {
                 'id': 12345,
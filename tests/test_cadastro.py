@@ -2,6 +2,7 @@
 Testes unitários para o módulo cadastro.py
 """
 import pytest
+from datetime import datetime
 import numpy as np
 import cv2
 from unittest.mock import Mock, patch, MagicMock
@@ -11,8 +12,14 @@ from mysql.connector import Error
 from cadastro import (
     conectar_mysql, criar_tabelas_se_nao_existir, cadastrar_aluno,
     listar_alunos, editar_aluno, excluir_aluno, obter_responsavel_por_aluno,
-    listar_cameras_disponiveis
+    listar_cameras_disponiveis, listar_codificacoes, listar_responsaveis, migrar_codificacoes_binarias,
+    obter_versao_galeria,
+    DB_CONFIG, PoolConexoes, estatisticas_banco,
+    gravar_sessoes_presenca, listar_alunos_no_local, arquivar_sessoes_presenca,
+    listar_sessoes_presenca, exportar_sessoes_presenca,
+    atualizar_resumos_diarios, reconstruir_resumos_diarios, listar_atrasos
 )
+from galeria import MODELO_CODIFICACAO, codificacao_para_bytes
 
 
 class TestConexaoBancoDados:
@@ -24,9 +31,10 @@ class TestConexaoBancoDados:
         mock_conn = Mock()
         mock_connect.return_value = mock_conn
         
-        result = conectar_mysql()
+        with patch('cadastro._pool', PoolConexoes(DB_CONFIG, tamanho=2)):
+            result = conectar_mysql()
         
-        assert result == mock_conn
+        assert result.conexao == mock_conn
         mock_connect.assert_called()
     
     @patch('cadastro.mysql.connector.connect')
@@ -40,6 +48,7 @@ class TestConexaoBancoDados:
     def test_criar_tabelas_se_nao_existir(self, mock_database):
         """Testa criação das tabelas no banco"""
         mock_conn, mock_cursor = mock_database
+        mock_cursor.fetchall.return_value = []
         
         criar_tabelas_se_nao_existir(mock_conn)
         
@@ -47,6 +56,139 @@ class TestConexaoBancoDados:
         assert mock_cursor.execute.call_count >= 3  # alunos, presencas, responsaveis
         mock_conn.commit.assert_called_once()
 
+    def test_indice_por_periodo_em_tabelas_antigas(self, mock_database):
+        """Testa que as tabelas de sessões anteriores ao índice por período o recebem"""
+        mock_conn, mock_cursor = mock_database
+        # Só a consulta de índices devolve linhas; a de colunas fica vazia
+        mock_cursor.fetchall.side_effect = lambda: [('PRIMARY',), ('idx_sessao_local_inicio',)] if 'STATISTICS' in mock_cursor.execute.call_args[0][0] else []
+
+        criar_tabelas_se_nao_existir(mock_conn)
+
+        alteracoes = [c[0][0] for c in mock_cursor.execute.call_args_list if c[0][0].startswith('ALTER TABLE')]
+        assert alteracoes == [
+            "ALTER TABLE sessoes_presenca ADD INDEX idx_sessao_inicio (inicio, id_sessao)",
+            "ALTER TABLE sessoes_presenca_arquivo ADD INDEX idx_arquivo_inicio (inicio, id_sessao)",
+        ]
+
+    def test_resumo_diario_antigo_aceita_cadastrados_nulo(self, mock_database):
+        """Testa que o total de cadastrados do resumo diário passa a aceitar NULL em tabelas antigas"""
+        mock_conn, mock_cursor = mock_database
+        mock_cursor.fetchall.side_effect = lambda: (
+            [('alunos_cadastrados', 'NO')] if 'COLUMNS' in mock_cursor.execute.call_args[0][0] else []
+        )
+
+        criar_tabelas_se_nao_existir(mock_conn)
+
+        executados = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert "ALTER TABLE resumo_diario MODIFY alunos_cadastrados INT NULL" in executados
+
+    def test_indice_por_periodo_existente(self, mock_database):
+        """Testa que o índice por período não é recriado"""
+        mock_conn, mock_cursor = mock_database
+        # Só a consulta de índices devolve linhas; a de colunas fica vazia
+        mock_cursor.fetchall.side_effect = lambda: [('idx_sessao_inicio',), ('idx_arquivo_inicio',)] if 'STATISTICS' in mock_cursor.execute.call_args[0][0] else []
+
+        criar_tabelas_se_nao_existir(mock_conn)
+
+        assert not any(c[0][0].startswith('ALTER TABLE') for c in mock_cursor.execute.call_args_list)
+
+
+class TestPoolConexoes:
+    """Testes para o pool de conexões MySQL"""
+    
+    @patch('cadastro.mysql.connector.connect')
+    def test_conexao_dedicada_fora_do_limite(self, mock_connect):
+        """Testa que a conexão dedicada não ocupa vaga do pool e é fechada ao sair do bloco"""
+        mock_conexao = Mock()
+        mock_connect.return_value = mock_conexao
+        pool = PoolConexoes(DB_CONFIG, tamanho=1, timeout=0.01)
+        emprestada = pool.obter()
+        
+        with pool.conexao_dedicada() as conexao:
+            assert conexao is mock_conexao
+        
+        emprestada.close()
+        estatisticas = pool.estatisticas()
+        assert estatisticas['abertas'] == 2
+        assert estatisticas['fechadas'] == 1
+        assert estatisticas['livres'] == 1
+    
+    @patch('cadastro.mysql.connector.connect')
+    def test_reaproveita_conexao(self, mock_connect):
+        """Testa que uma conexão devolvida é reaproveitada sem abrir outra"""
+        mock_connect.return_value = Mock()
+        pool = PoolConexoes(DB_CONFIG, tamanho=2)
+        
+        pool.obter().close()
+        pool.obter().close()
+        
+        assert mock_connect.call_count == 1
+        estatisticas = pool.estatisticas()
+        assert estatisticas['abertas'] == 1
+        assert estatisticas['reaproveitadas'] == 1
+        assert estatisticas['em_uso'] == 0
+        assert estatisticas['livres'] == 1
+    
+    @patch('cadastro.mysql.connector.connect')
+    def test_tamanho_limitado(self, mock_connect):
+        """Testa que o pool não passa do tamanho configurado"""
+        mock_connect.return_value = Mock()
+        pool = PoolConexoes(DB_CONFIG, tamanho=1, timeout=0.05)
+        emprestada = pool.obter()
+        
+        with pytest.raises(RuntimeError, match="nenhuma conexão livre"):
+            pool.obter()
+        
+        emprestada.close()
+        pool.obter().close()
+        assert pool.estatisticas()['esgotado'] == 1
+    
+    @patch('cadastro.mysql.connector.connect')
+    def test_reconecta_conexao_ociosa_derrubada(self, mock_connect):
+        """Testa que uma conexão ociosa que falha no ping é trocada por outra"""
+        derrubada, nova = Mock(), Mock()
+        derrubada.ping.side_effect = Error("MySQL server has gone away")
+        mock_connect.side_effect = [derrubada, nova]
+        pool = PoolConexoes(DB_CONFIG, tamanho=1, intervalo_verificacao=0.0)
+        pool.obter().close()
+        
+        emprestada = pool.obter()
+        
+        assert emprestada.conexao is nova
+        derrubada.close.assert_called()
+        assert pool.estatisticas()['reconexoes'] == 1
+    
+    @patch('cadastro.mysql.connector.connect')
+    def test_descarta_conexao_quebrada_e_desfaz_transacao(self, mock_connect):
+        """Testa rollback de transação pendente e descarte de conexões quebradas na devolução"""
+        pendente, quebrada = Mock(in_transaction=True), Mock()
+        quebrada.is_connected.return_value = False
+        mock_connect.side_effect = [pendente, quebrada]
+        pool = PoolConexoes(DB_CONFIG, tamanho=2)
+        
+        primeira, segunda = pool.obter(), pool.obter()
+        primeira.close()
+        segunda.close()
+        
+        pendente.rollback.assert_called_once()
+        estatisticas = pool.estatisticas()
+        assert estatisticas['livres'] == 1
+        assert estatisticas['fechadas'] == 1
+    
+    @patch('cadastro.mysql.connector.connect')
+    def test_latencia_por_operacao(self, mock_connect):
+        """Testa que o tempo de uso é registrado com o nome da função que pediu a conexão"""
+        mock_connect.return_value = Mock()
+        mock_connect.return_value.cursor.return_value.fetchone.return_value = (1,)
+        
+        with patch('cadastro._pool', PoolConexoes(DB_CONFIG, tamanho=1)):
+            obter_versao_galeria()
+            obter_versao_galeria()
+            estatisticas = estatisticas_banco()
+        
+        assert estatisticas['operacoes']['obter_versao_galeria']['amostras'] == 2
+        assert estatisticas['abertas'] == 1
+
 
 class TestCadastroAluno:
     """Testes para operações de cadastro de alunos"""
@@ -142,6 +284,130 @@ class TestListarAlunos:
         assert result == []
 
 
+class TestListarCodificacoes:
+    """Testes para a leitura das codificações que formam a galeria"""
+    
+    @patch('cadastro.conectar_mysql')
+    def test_listar_codificacoes_binarias_e_legadas(self, mock_connect):
+        """Testa montagem da matriz a partir de linhas binárias e de linhas ainda em JSON"""
+        mock_conn = Mock()
+        mock_cursor = Mock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_connect.return_value = mock_conn
+        
+        binaria = np.arange(128, dtype=np.float32)
+        mock_cursor.fetchall.return_value = [
+            (1, bytearray(codificacao_para_bytes(binaria)), MODELO_CODIFICACAO, None, '119', 'r@x.com'),
+            (2, None, None, '[' + ', '.join(['0.5'] * 128) + ']', None, None),
+        ]
+        
+        ids, matriz, responsaveis = listar_codificacoes()
+        
+        assert ids == ['1', '2']
+        assert responsaveis == {'1': {'telefone': '119', 'email': 'r@x.com'}}
+        assert matriz.shape == (2, 128)
+        assert matriz.dtype == np.float32
+        np.testing.assert_array_equal(matriz[0], binaria)
+        np.testing.assert_allclose(matriz[1], 0.5)
+        mock_conn.close.assert_called()
+    
+    @patch('cadastro.conectar_mysql')
+    def test_listar_responsaveis(self, mock_connect):
+        """Testa leitura só dos contatos, sem as codificações"""
+        mock_conn = Mock()
+        mock_cursor = Mock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_connect.return_value = mock_conn
+        mock_cursor.fetchall.return_value = [(1, '119', 'r@x.com'), (2, None, None)]
+        
+        assert listar_responsaveis() == {'1': {'telefone': '119', 'email': 'r@x.com'}}
+        assert 'codificacao' not in mock_cursor.execute.call_args[0][0]
+        mock_conn.close.assert_called()
+    
+    @patch('cadastro.conectar_mysql')
+    def test_listar_codificacoes_ignora_invalidas(self, mock_connect):
+        """Testa que codificações corrompidas ou de outro modelo são ignoradas"""
+        mock_conn = Mock()
+        mock_cursor = Mock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_connect.return_value = mock_conn
+        
+        valida = codificacao_para_bytes(np.zeros(128))
+        mock_cursor.fetchall.return_value = [
+            (1, valida, 'outro_modelo', None, None, None),
+            (2, valida[:100], MODELO_CODIFICACAO, None, None, None),
+            (3, None, None, 'json_invalido', None, None),
+            (4, valida, MODELO_CODIFICACAO, None, None, None),
+        ]
+        
+        ids, matriz, _responsaveis = listar_codificacoes()
+        
+        assert ids == ['4']
+        assert matriz.shape == (1, 128)
+
+
+class TestMigracaoCodificacoes:
+    """Testes para a migração das codificações JSON para o formato binário"""
+    
+    def test_migracao_em_lotes(self):
+        """Testa conversão lote a lote, com criação das colunas e linhas inválidas preservadas"""
+        mock_conn = Mock()
+        mock_cursor = Mock()
+        mock_conn.cursor.return_value = mock_cursor
+        json_valido = '[' + ', '.join(['0.25'] * 128) + ']'
+        mock_cursor.fetchall.side_effect = [
+            [('Id', 'NO'), ('Nome', 'NO'), ('codificacao_facial', 'NO')],
+            [(1, json_valido), (2, json_valido)],
+            [(3, 'json_invalido')],
+            [],
+        ]
+        
+        convertidos = migrar_codificacoes_binarias(mock_conn, tamanho_lote=2)
+        
+        assert convertidos == 2
+        comandos = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert any('ADD COLUMN codificacao_binaria' in c for c in comandos)
+        assert any('ADD COLUMN modelo_codificacao' in c for c in comandos)
+        assert any('MODIFY codificacao_facial TEXT NULL' in c for c in comandos)
+        # Os lotes seguintes continuam a partir do último ID visto
+        assert mock_cursor.execute.call_args_list[-1][0][1] == (3, 2)
+        atualizacoes = mock_cursor.executemany.call_args[0][1]
+        assert [a[2] for a in atualizacoes] == [1, 2]
+        assert atualizacoes[0][0] == codificacao_para_bytes(np.full(128, 0.25))
+        assert atualizacoes[0][1] == MODELO_CODIFICACAO
+        assert mock_conn.commit.call_count == 2
+
+    def test_tabela_ja_migrada_sem_alter(self):
+        """Testa que uma tabela já migrada não recebe ALTER TABLE (evita bloquear alunos a cada início)"""
+        mock_conn = Mock()
+        mock_cursor = Mock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchall.side_effect = [
+            [('Id', 'NO'), ('codificacao_facial', 'YES'), ('codificacao_binaria', 'YES'), ('modelo_codificacao', 'YES')],
+            [],
+        ]
+
+        assert migrar_codificacoes_binarias(mock_conn) == 0
+        comandos = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert not any(c.startswith('ALTER TABLE') for c in comandos)
+
+
+class TestVersaoGaleria:
+    """Testes para o contador de alterações da galeria"""
+    
+    @patch('cadastro.conectar_mysql')
+    def test_obter_versao_galeria(self, mock_connect):
+        """Testa leitura do contador"""
+        mock_conn = Mock()
+        mock_cursor = Mock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_connect.return_value = mock_conn
+        mock_cursor.fetchone.return_value = (42,)
+        
+        assert obter_versao_galeria() == 42
+        mock_conn.close.assert_called()
+
+
 class TestEditarAluno:
     """Testes para edição de alunos"""
     
@@ -208,6 +474,8 @@ class TestExcluirAluno:
         
         mock_cursor.execute.assert_called()
         mock_conn.commit.assert_called()
+        # A exclusão avança o contador de alterações da galeria na mesma transação
+        assert 'versao_galeria' in mock_cursor.execute.call_args_list[-1][0][0]
     
     @patch('cadastro.conectar_mysql')
     def test_excluir_aluno_inexistente(self, mock_connect):
@@ -257,6 +525,211 @@ class TestResponsaveis:
         assert result is None
 
 
+class TestSessoesPresenca:
+    """Testes para a gravação, consulta e arquivamento das sessões de presença"""
+
+    @pytest.fixture
+    def mock_banco(self):
+        with patch('cadastro.conectar_mysql') as mock_connect:
+            mock_conn = Mock()
+            mock_cursor = Mock()
+            mock_conn.cursor.return_value = mock_cursor
+            mock_connect.return_value = mock_conn
+            yield mock_connect, mock_conn, mock_cursor
+
+    def test_um_comando_para_o_lote(self, mock_banco):
+        """Testa que várias sessões saem num único INSERT que estende as já gravadas"""
+        _, mock_conn, mock_cursor = mock_banco
+        mock_cursor.rowcount = 3
+        inicio, fim = datetime(2024, 1, 1, 8, 0), datetime(2024, 1, 1, 8, 30)
+
+        gravar_sessoes_presenca([(1, 'camera 0', inicio, fim, 10), (2, 'camera 1', inicio, inicio, 1)])
+
+        mock_cursor.execute.assert_called_once()
+        sql, valores = mock_cursor.execute.call_args[0]
+        assert sql.startswith('INSERT IGNORE INTO sessoes_presenca')
+        assert sql.count('(%s, %s, %s, %s, %s)') == 2
+        assert 'ON DUPLICATE KEY UPDATE fim = GREATEST(fim, VALUES(fim))' in sql
+        assert valores == [1, 'camera 0', inicio, fim, 10, 2, 'camera 1', inicio, inicio, 1]
+        mock_conn.commit.assert_called_once()
+        mock_conn.close.assert_called_once()
+
+    def test_lote_vazio(self, mock_banco):
+        """Testa que um lote vazio não abre conexão"""
+        mock_connect, _, _ = mock_banco
+        assert gravar_sessoes_presenca([]) == 0
+        mock_connect.assert_not_called()
+
+    def test_alunos_no_local(self, mock_banco):
+        """Testa que a consulta por sala limita o índice ao dia do início da janela"""
+        _, _, mock_cursor = mock_banco
+        mock_cursor.fetchall.return_value = [(1,), (7,)]
+
+        alunos = listar_alunos_no_local('camera 2', datetime(2024, 3, 4, 8, 0), datetime(2024, 3, 4, 9, 0))
+
+        assert alunos == [1, 7]
+        assert mock_cursor.execute.call_args[0][1] == (
+            'camera 2', datetime(2024, 3, 4), datetime(2024, 3, 4, 9, 0), datetime(2024, 3, 4, 8, 0))
+
+    def test_arquivamento_em_lotes(self, mock_banco):
+        """Testa que as sessões antigas são copiadas e apagadas lote a lote"""
+        _, mock_conn, mock_cursor = mock_banco
+        mock_cursor.fetchall.side_effect = [[(1,), (2,)], [(3,)]]
+
+        movidas = arquivar_sessoes_presenca(datetime(2024, 1, 1), tamanho_lote=2)
+
+        assert movidas == 3
+        comandos = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert sum('INSERT IGNORE INTO sessoes_presenca_arquivo' in c for c in comandos) == 2
+        assert sum(c.startswith('DELETE FROM sessoes_presenca') for c in comandos) == 2
+        assert mock_cursor.execute.call_args_list[-1][0][1] == [3]
+        assert mock_conn.commit.call_count == 2
+
+
+class TestConsultaSessoesPresenca:
+    """Testes para a consulta paginada e a exportação das sessões de presença"""
+
+    @patch('cadastro.conectar_mysql')
+    def test_pagina_seguinte_pela_chave(self, mock_connect):
+        """Testa filtros e paginação por (inicio, id_sessao), sem OFFSET"""
+        mock_conn = Mock()
+        mock_cursor = Mock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_connect.return_value = mock_conn
+        mock_cursor.fetchall.return_value = []
+        apos = (datetime(2024, 3, 4, 8, 5), 41)
+
+        listar_sessoes_presenca(inicio=datetime(2024, 3, 4, 8, 0), id_aluno=7, apos=apos, limite=50)
+
+        sql, parametros = mock_cursor.execute.call_args[0]
+        assert 'OFFSET' not in sql
+        assert sql.endswith('ORDER BY inicio, id_sessao LIMIT %s')
+        assert '(inicio > %s OR (inicio = %s AND id_sessao > %s))' in sql
+        assert parametros == [7, datetime(2024, 3, 4), datetime(2024, 3, 4, 8, 0), apos[0], apos[0], 41, 50]
+
+    def test_exportacao_em_lotes_com_conexao_propria(self):
+        """Testa que a exportação lê em lotes, fora do pool, e fecha a conexão ao terminar"""
+        mock_conexao = Mock()
+        mock_cursor = Mock()
+        mock_conexao.cursor.return_value = mock_cursor
+        mock_cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], [], [(4,)], []]
+
+        with patch('cadastro._pool._abrir', return_value=mock_conexao) as mock_abrir, \
+             patch('cadastro._pool._fechar') as mock_fechar:
+            linhas = exportar_sessoes_presenca(local='camera 1', incluir_arquivo=True, tamanho_lote=2)
+            # Nada é aberto até a primeira linha ser pedida
+            mock_abrir.assert_not_called()
+            assert list(linhas) == [(1,), (2,), (3,), (4,)]
+
+        mock_conexao.cursor.assert_called_with(buffered=False)
+        tabelas = [c[0][0].split(' FROM ')[1].split(' ')[0] for c in mock_cursor.execute.call_args_list]
+        assert tabelas == ['sessoes_presenca_arquivo', 'sessoes_presenca']
+        mock_fechar.assert_called_once_with(mock_conexao)
+
+    def test_exportacao_nao_consumida_nao_abre_conexao(self):
+        """Testa que um iterador descartado sem ser lido não deixa conexão aberta"""
+        with patch('cadastro.mysql.connector.connect') as mock_connect:
+            exportar_sessoes_presenca().close()
+
+        mock_connect.assert_not_called()
+
+    def test_exportacao_interrompida_fecha_a_conexao(self):
+        """Testa que abandonar a exportação no meio descarta a conexão"""
+        mock_conexao = Mock()
+        mock_cursor = Mock()
+        mock_conexao.cursor.return_value = mock_cursor
+        mock_cursor.fetchmany.return_value = [(1,), (2,)]
+        mock_cursor.close.side_effect = mysql.connector.errors.InternalError('Unread result found')
+
+        with patch('cadastro._pool._abrir', return_value=mock_conexao), patch('cadastro._pool._fechar') as mock_fechar:
+            linhas = exportar_sessoes_presenca()
+            next(linhas)
+            linhas.close()
+
+        mock_fechar.assert_called_once_with(mock_conexao)
+
+
+class TestResumosDiarios:
+    """Testes para a manutenção e a consulta dos resumos diários de presença"""
+
+    @pytest.fixture
+    def mock_banco(self):
+        with patch('cadastro.conectar_mysql') as mock_connect:
+            mock_conn = Mock()
+            mock_cursor = Mock()
+            mock_conn.cursor.return_value = mock_cursor
+            mock_connect.return_value = mock_conn
+            yield mock_conn, mock_cursor
+
+    def test_recalcula_so_os_grupos_tocados(self, mock_banco):
+        """Testa que cada dia é recalculado só para os alunos e locais das sessões gravadas"""
+        from datetime import date
+        mock_conn, mock_cursor = mock_banco
+        chaves = {(date(2024, 3, 4), 1, 'camera 0'), (date(2024, 3, 4), 2, 'camera 0'), (date(2024, 3, 5), 1, 'camera 2')}
+
+        assert atualizar_resumos_diarios(chaves) == 2
+
+        chamadas = mock_cursor.execute.call_args_list
+        assert len(chamadas) == 6  # aluno, local e geral de cada dia
+        sql_aluno, parametros_aluno = chamadas[0][0]
+        assert sql_aluno.startswith('INSERT INTO resumo_diario_aluno')
+        assert 'id_aluno IN (%s, %s)' in sql_aluno
+        assert parametros_aluno == [date(2024, 3, 4), datetime(2024, 3, 4), datetime(2024, 3, 5), 1, 2]
+        sql_local, parametros_local = chamadas[1][0]
+        assert 'COUNT(DISTINCT id_aluno)' in sql_local
+        assert parametros_local[-1] == 'camera 0'
+        assert chamadas[2][0][0].startswith('INSERT INTO resumo_diario ')
+        assert mock_conn.commit.call_count == 2
+
+    def test_sem_chaves(self, mock_banco):
+        """Testa que nenhuma chave não abre conexão"""
+        mock_conn, mock_cursor = mock_banco
+        assert atualizar_resumos_diarios(set()) == 0
+        mock_cursor.execute.assert_not_called()
+
+    def test_reconstrucao_inclui_arquivo(self, mock_banco):
+        """Testa que a carga do histórico recalcula o dia inteiro com as sessões arquivadas"""
+        from datetime import date
+        _, mock_cursor = mock_banco
+
+        reconstruir_resumos_diarios(date(2023, 9, 1))
+
+        chamadas = mock_cursor.execute.call_args_list
+        sql_aluno, parametros_aluno = chamadas[0][0]
+        assert 'sessoes_presenca_arquivo' in sql_aluno
+        assert ' IN (' not in sql_aluno
+        # O dia limita cada tabela da união, não só o resultado dela, sempre por parâmetros
+        assert "'2023-09-01" not in sql_aluno
+        assert parametros_aluno == [date(2023, 9, 1)] + [datetime(2023, 9, 1), datetime(2023, 9, 2)] * 3
+        assert sql_aluno.count('%s') == len(parametros_aluno)
+        # O total de cadastrados de hoje não vai para um dia passado; o valor já gravado é mantido
+        sql_resumo = chamadas[2][0][0]
+        assert 'FROM alunos' not in sql_resumo
+        assert 'alunos_cadastrados = VALUES' not in sql_resumo
+
+    def test_atualizacao_grava_cadastrados(self, mock_banco):
+        """Testa que a atualização contínua grava o total de cadastrados do dia"""
+        from datetime import date
+        _, mock_cursor = mock_banco
+
+        atualizar_resumos_diarios({(date(2024, 3, 4), 1, 'camera 0')})
+
+        sql_resumo = mock_cursor.execute.call_args_list[2][0][0]
+        assert '(SELECT COUNT(*) FROM alunos)' in sql_resumo
+        assert 'alunos_cadastrados = VALUES(alunos_cadastrados)' in sql_resumo
+
+    def test_atrasos_pelo_horario_de_entrada(self, mock_banco):
+        """Testa que o atraso é medido contra o horário de entrada do dia"""
+        from datetime import date
+        _, mock_cursor = mock_banco
+        mock_cursor.fetchall.return_value = []
+
+        with patch('cadastro.HORARIO_ENTRADA', '07:45'):
+            listar_atrasos(date(2024, 3, 4))
+
+        assert mock_cursor.execute.call_args[0][1] == (date(2024, 3, 4), datetime(2024, 3, 4, 7, 45))
+
+
 class TestCameras:
     """Testes para operações com câmeras"""
     
@@ -0,0 +1,81 @@
+"""
+Testes unitários para os módulos caixa_frames.py e metricas.py
+"""
+import threading
+import time
+
+from caixa_frames import CaixaUltimoFrame
+from metricas import JanelaMetricas
+
+
+class TestCaixaUltimoFrame:
+    """Testes para a caixa de último frame por câmera"""
+
+    def test_mantem_apenas_ultimo_frame(self):
+        """Testa que publicar sobrescreve o frame anterior da mesma câmera"""
+        caixa = CaixaUltimoFrame()
+        caixa.publicar(0, 'antigo', timestamp=1.0)
+        caixa.publicar(0, 'novo', timestamp=2.0)
+
+        assert caixa.aguardar(timeout=0) == (0, 'novo', 2.0)
+        # O frame já consumido não é entregue de novo
+        assert caixa.aguardar(timeout=0) is None
+        assert caixa.vazia()
+
+    def test_ignora_frames_anteriores_ao_prazo(self):
+        """Testa que frames capturados antes de `apos` não são entregues"""
+        caixa = CaixaUltimoFrame()
+        caixa.publicar(0, 'velho', timestamp=10.0)
+
+        assert caixa.aguardar(apos=20.0, timeout=0.05) is None
+        caixa.publicar(0, 'fresco', timestamp=21.0)
+        assert caixa.aguardar(apos=20.0, timeout=0) == (0, 'fresco', 21.0)
+
+    def test_escolhe_camera_mais_recente(self):
+        """Testa que, entre várias câmeras, o frame mais recente é entregue primeiro"""
+        caixa = CaixaUltimoFrame()
+        caixa.publicar(0, 'a', timestamp=1.0)
+        caixa.publicar(1, 'b', timestamp=3.0)
+        caixa.publicar(2, 'c', timestamp=2.0)
+
+        assert caixa.aguardar(timeout=0)[0] == 1
+        assert caixa.aguardar(timeout=0)[0] == 2
+        caixa.remover(0)
+        assert caixa.aguardar(timeout=0) is None
+
+    def test_acorda_consumidor_ao_publicar(self):
+        """Testa que o consumidor bloqueado acorda assim que um frame é publicado"""
+        caixa = CaixaUltimoFrame()
+        resultado = []
+        consumidor = threading.Thread(target=lambda: resultado.append(caixa.aguardar(timeout=2.0)))
+        consumidor.start()
+
+        time.sleep(0.05)
+        inicio = time.time()
+        caixa.publicar(3, 'frame')
+        consumidor.join()
+
+        assert resultado[0][:2] == (3, 'frame')
+        assert time.time() - inicio < 0.5
+
+
+class TestJanelaMetricas:
+    """Testes para a janela de métricas"""
+
+    def test_resumo(self):
+        """Testa média, p95 e máximo da janela"""
+        janela = JanelaMetricas(tamanho=100)
+        for valor in range(1, 101):
+            janela.registrar(valor / 1000)
+
+        resumo = janela.resumo()
+        assert resumo['amostras'] == 100
+        assert resumo['maximo'] == 0.1
+        assert abs(resumo['media'] - 0.0505) < 1e-3
+        assert 0.09 <= resumo['p95'] <= 0.1
+
+    def test_resumo_vazio(self):
+        """Testa resumo sem amostras"""
+        resumo = JanelaMetricas().resumo()
+        assert resumo['amostras'] == 0
+        assert resumo['media'] is None
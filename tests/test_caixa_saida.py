@@ -0,0 +1,196 @@
+"""
+Testes unitários para o módulo caixa_saida.py
+"""
+import smtplib
+import sqlite3
+import time
+
+import pytest
+
+from caixa_saida import CaixaSaidaEmail, LimiteTaxa, falha_temporaria
+from diario_emails import DiarioEmails
+
+
+@pytest.fixture
+def caixa(servico_smtp_local):
+    caixa = CaixaSaidaEmail(servico_smtp_local, workers=1, espera_inicial=0.01, espera_maxima=0.05,
+                            envios_por_minuto=0)
+    yield caixa
+    caixa.encerrar()
+
+
+class TestLimiteTaxa:
+    """Testes para o limite de envios por provedor"""
+
+    def test_rajada_e_reposicao(self):
+        """Testa que a rajada passa direto e depois os envios seguem a taxa"""
+        limite = LimiteTaxa(por_minuto=60, rajada=2)
+
+        assert limite.reservar(agora=0.0) == 0.0
+        assert limite.reservar(agora=0.0) == 0.0
+        assert limite.reservar(agora=0.0) == pytest.approx(1.0)
+        assert limite.reservar(agora=0.5) == pytest.approx(0.5)
+        assert limite.reservar(agora=1.0) == 0.0
+
+    def test_sem_limite(self):
+        """Testa que taxa zero desativa o limite"""
+        limite = LimiteTaxa(por_minuto=0)
+        assert all(limite.reservar(agora=0.0) == 0.0 for _ in range(100))
+
+
+class TestFalhaTemporaria:
+    """Testes para a classificação dos erros de envio"""
+
+    def test_classificacao(self):
+        """Testa quais erros justificam nova tentativa"""
+        assert falha_temporaria(smtplib.SMTPDataError(451, b'Tente depois'))
+        assert falha_temporaria(smtplib.SMTPServerDisconnected('caiu'))
+        assert falha_temporaria(TimeoutError())
+        assert not falha_temporaria(smtplib.SMTPDataError(554, b'Rejeitado'))
+        assert not falha_temporaria(smtplib.SMTPAuthenticationError(535, b'Senha incorreta'))
+        assert not falha_temporaria(smtplib.SMTPRecipientsRefused({'a@x.com': (550, b'Inexistente')}))
+
+
+class TestCaixaSaidaEmail:
+    """Testes da caixa de saída contra o servidor SMTP local"""
+
+    def test_entrega_com_sessao_reaproveitada(self, caixa, servidor_smtp):
+        """Testa que os e-mails enfileirados saem por uma única sessão autenticada"""
+        for n in range(5):
+            assert caixa.enfileirar('resp@email.com', f'Alerta {n}', 'Corpo') is not None
+
+        assert caixa.aguardar_vazia(timeout=5)
+        assert len(servidor_smtp.mensagens) == 5
+        assert servidor_smtp.conexoes == 1
+        assert servidor_smtp.autenticacoes == 1
+        estatisticas = caixa.estatisticas()
+        assert estatisticas['enviados'] == 5
+        assert estatisticas['sessoes_abertas'] == 1
+
+    def test_enfileirar_nao_espera_o_servidor(self, caixa, servidor_smtp):
+        """Testa que quem enfileira não espera um servidor lento"""
+        servidor_smtp.atraso_saudacao = 0.5
+
+        inicio = time.monotonic()
+        caixa.enfileirar('resp@email.com', 'Alerta', 'Corpo')
+        decorrido = time.monotonic() - inicio
+
+        assert decorrido < 0.1
+        assert caixa.aguardar_vazia(timeout=5)
+        assert len(servidor_smtp.mensagens) == 1
+
+    def test_falha_temporaria_tenta_de_novo(self, caixa, servidor_smtp):
+        """Testa que respostas 4xx voltam para a fila e acabam entregues"""
+        servidor_smtp.respostas = ['451 Tente depois', '421 Ocupado']
+
+        caixa.enfileirar('resp@email.com', 'Alerta', 'Corpo')
+
+        assert caixa.aguardar_vazia(timeout=5)
+        assert len(servidor_smtp.mensagens) == 1
+        estatisticas = caixa.estatisticas()
+        assert estatisticas['novas_tentativas'] == 2
+        assert estatisticas['enviados'] == 1
+
+    def test_falha_permanente_nao_repete(self, caixa, servidor_smtp):
+        """Testa que respostas 5xx descartam o e-mail sem novas tentativas"""
+        servidor_smtp.respostas = ['554 Rejeitado']
+
+        caixa.enfileirar('resp@email.com', 'Alerta', 'Corpo')
+
+        assert caixa.aguardar_vazia(timeout=5)
+        assert servidor_smtp.mensagens == []
+        assert caixa.estatisticas()['falhas'] == 1
+        assert caixa.estatisticas()['novas_tentativas'] == 0
+
+    def test_desiste_apos_max_tentativas(self, caixa, servidor_smtp):
+        """Testa que falhas temporárias seguidas esgotam as tentativas"""
+        caixa.max_tentativas = 3
+        servidor_smtp.respostas = ['451 Tente depois'] * 5
+
+        caixa.enfileirar('resp@email.com', 'Alerta', 'Corpo')
+
+        assert caixa.aguardar_vazia(timeout=5)
+        assert caixa.estatisticas()['falhas'] == 1
+        assert caixa.estatisticas()['novas_tentativas'] == 2
+
+    def test_limite_por_provedor(self, caixa, servidor_smtp):
+        """Testa que o limite de envios por minuto segura os e-mails além da rajada"""
+        caixa.envios_por_minuto = 60  # rajada de 5, depois 1 por segundo
+
+        for n in range(6):
+            caixa.enfileirar('resp@email.com', f'Alerta {n}', 'Corpo')
+
+        assert not caixa.aguardar_vazia(timeout=0.5)
+        assert len(servidor_smtp.mensagens) == 5
+        assert caixa.aguardar_vazia(timeout=3)
+        assert len(servidor_smtp.mensagens) == 6
+
+    def test_fila_cheia_recusa(self, servico_smtp_local):
+        """Testa que com a fila cheia novos e-mails são recusados em vez de bloquear"""
+        caixa = CaixaSaidaEmail(servico_smtp_local, tamanho_maximo=1)
+        caixa.iniciar = lambda: None  # sem workers, a fila não esvazia
+
+        assert caixa.enfileirar('a@email.com', 'Alerta', 'Corpo') is not None
+        assert caixa.enfileirar('b@email.com', 'Alerta', 'Corpo') is None
+        assert caixa.estatisticas()['recusados'] == 1
+
+
+class TestCaixaSaidaDuravel:
+    """Testes da caixa de saída com diário em disco"""
+
+    def _caixa(self, servico, caminho, **kwargs):
+        return CaixaSaidaEmail(servico, workers=1, espera_inicial=0.01, envios_por_minuto=0,
+                               diario=DiarioEmails(caminho, intervalo=0.01), **kwargs)
+
+    def test_pendentes_sao_reenviados_ao_reiniciar(self, servico_smtp_local, servidor_smtp, tmp_path):
+        """Testa que e-mails não entregues antes de encerrar saem na execução seguinte"""
+        caminho = tmp_path / 'caixa_saida.db'
+        servico_smtp_local.smtp_port = 1  # servidor inacessível: tudo fica para nova tentativa
+        primeira = self._caixa(servico_smtp_local, caminho, espera_maxima=60)
+        primeira.espera_inicial = 60
+        ids = [primeira.enfileirar('resp@email.com', f'Alerta {n}', 'Corpo') for n in range(3)]
+        assert primeira.aguardar_vazia(timeout=0.5) is False
+        primeira.encerrar()
+
+        servico_smtp_local.smtp_port = servidor_smtp.porta
+        segunda = self._caixa(servico_smtp_local, caminho)
+        try:
+            segunda.iniciar()
+            # A espera agendada antes de reiniciar continua valendo
+            assert segunda.aguardar_vazia(timeout=0.5) is False
+            assert servidor_smtp.mensagens == []
+        finally:
+            segunda.encerrar()
+
+        with sqlite3.connect(str(caminho)) as conexao:
+            conexao.execute('UPDATE emails SET proxima_tentativa = 0')
+        terceira = self._caixa(servico_smtp_local, caminho)
+        try:
+            terceira.iniciar()
+            assert terceira.aguardar_vazia(timeout=5)
+            assert len(servidor_smtp.mensagens) == 3
+            # A numeração continua depois dos e-mails já gravados
+            assert terceira.enfileirar('resp@email.com', 'Novo', 'Corpo') == max(ids) + 1
+            assert terceira.aguardar_vazia(timeout=5)
+        finally:
+            terceira.encerrar()
+
+        reaberto = DiarioEmails(caminho)
+        reaberto.abrir()
+        assert reaberto.pendentes() == []
+        reaberto.fechar()
+
+    def test_enviado_nao_volta(self, servico_smtp_local, servidor_smtp, tmp_path):
+        """Testa que e-mails entregues não são reenviados ao reiniciar"""
+        caminho = tmp_path / 'caixa_saida.db'
+        caixa = self._caixa(servico_smtp_local, caminho)
+        caixa.enfileirar('resp@email.com', 'Alerta', 'Corpo')
+        assert caixa.aguardar_vazia(timeout=5)
+        caixa.encerrar()
+
+        nova = self._caixa(servico_smtp_local, caminho)
+        nova.iniciar()
+        assert nova.aguardar_vazia(timeout=0.2)
+        nova.encerrar()
+
+        assert len(servidor_smtp.mensagens) == 1
@@ -0,0 +1,169 @@
+"""
+Testes unitários para o módulo cascata_detectores.py
+"""
+import time
+
+import numpy as np
+from unittest.mock import Mock, patch
+
+from cascata_detectores import CascataDetectores, EstagioDeteccao, PiramideImagem, detectar_em_recortes
+
+
+def _estagio(nome, locais=(), nivel='reduzido', duracao=0.0):
+    def detectar(_piramide):
+        if duracao:
+            time.sleep(duracao)
+        return list(locais)
+    return EstagioDeteccao(nome, nivel, Mock(side_effect=detectar))
+
+
+class TestPiramideImagem:
+    """Testes para a pirâmide de imagens compartilhada entre estágios"""
+
+    def test_conversoes_feitas_uma_vez(self):
+        """Testa que redução e conversões de cor são calculadas uma única vez"""
+        frame = np.zeros((40, 60, 3), dtype=np.uint8)
+        piramide = PiramideImagem(frame)
+
+        with patch('cascata_detectores.cv2.cvtColor', wraps=__import__('cv2').cvtColor) as cvt:
+            assert piramide.rgb('reduzido').shape == (20, 30, 3)
+            piramide.rgb('reduzido')
+            assert piramide.cinza_reduzido.shape == (20, 30)
+            piramide.cinza_reduzido
+            assert cvt.call_count == 2
+
+    def test_compartilha_com_pool(self):
+        """Testa que, com pool, cada nível é copiado uma vez para a memória compartilhada"""
+        pool = Mock()
+        pool.compartilhar.side_effect = lambda imagem, chave: ('descritor', chave)
+        piramide = PiramideImagem(np.zeros((40, 60, 3), dtype=np.uint8), pool=pool)
+
+        assert piramide.rgb('completo') == ('descritor', 'completo')
+        piramide.rgb('completo')
+        assert pool.compartilhar.call_count == 1
+
+
+class TestCascataDetectores:
+    """Testes para a cascata adaptativa de detectores"""
+
+    def test_para_no_primeiro_acerto(self):
+        """Testa que a cascata para no primeiro estágio que encontra faces"""
+        estagios = [_estagio('a'), _estagio('b', [(0, 1, 1, 0)], nivel='completo'), _estagio('c')]
+        cascata = CascataDetectores(estagios)
+
+        resultado = cascata.detectar(Mock())
+
+        assert resultado.locais == [(0, 1, 1, 0)]
+        assert resultado.estagio == 'b' and resultado.nivel == 'completo'
+        assert resultado.tentados == ['a', 'b']
+        assert not estagios[2].detectar.called
+
+    def test_pula_estagio_que_nunca_acerta(self):
+        """Testa que um estágio sem acertos é pulado após amostras suficientes, mas reavaliado periodicamente"""
+        estagios = [_estagio('inutil'), _estagio('bom', [(0, 1, 1, 0)])]
+        cascata = CascataDetectores(estagios, min_tentativas=5, periodo_exploracao=10, esquecimento=1.0)
+
+        resultados = [cascata.detectar(Mock(), camera_id=1) for _ in range(10)]
+        assert resultados[-1].tentados == ['bom']
+        assert estagios[0].detectar.call_count == 5
+
+        # Frame de exploração: o estágio pulado volta no fim da fila
+        ativos, pulados = cascata.ordem(1)
+        assert [e.nome for e in ativos] == ['bom', 'inutil'] and pulados == []
+        assert cascata.estatisticas()['1']['estagios']['inutil']['pulos'] == 5
+
+    def test_aprendizado_por_camera(self):
+        """Testa que as estatísticas de uma câmera não afetam a ordem de outra"""
+        estagios = [_estagio('inutil'), _estagio('bom', [(0, 1, 1, 0)])]
+        cascata = CascataDetectores(estagios, min_tentativas=3, periodo_exploracao=0)
+
+        for _ in range(5):
+            cascata.detectar(Mock(), camera_id=0)
+
+        assert [e.nome for e in cascata.ordem(0)[0]] == ['bom']
+        assert [e.nome for e in cascata.ordem(1)[0]] == ['inutil', 'bom']
+
+    def test_reordena_pelo_custo_por_acerto(self):
+        """Testa que estágios maduros são reordenados por latência / taxa de acerto"""
+        lento = _estagio('lento', [(0, 1, 1, 0)], duracao=0.01)
+        rapido = _estagio('rapido', [(0, 1, 1, 0)])
+        cascata = CascataDetectores([lento, rapido], min_tentativas=2, periodo_exploracao=0, esquecimento=1.0)
+        # Força amostras nos dois estágios
+        for _ in range(2):
+            cascata._registrar(0, lento, True, 0.01)
+            cascata._registrar(0, rapido, True, 0.0001)
+
+        assert cascata.detectar(Mock()).tentados == ['rapido']
+
+    def test_orcamento_por_frame(self):
+        """Testa que um estágio não começa se a latência estimada estoura o orçamento"""
+        primeiro = _estagio('primeiro', duracao=0.02)
+        caro = _estagio('caro', [(0, 1, 1, 0)])
+        cascata = CascataDetectores([primeiro, caro], orcamento=0.05)
+        cascata._registrar(0, caro, True, 1.0)
+
+        resultado = cascata.detectar(Mock())
+
+        assert resultado.tentados == ['primeiro']
+        assert resultado.locais == []
+        assert not caro.detectar.called
+
+    def test_cena_vazia_nao_pula_estagios(self):
+        """Testa que, sem nenhum estágio com acertos (cena vazia), nenhum estágio é pulado"""
+        estagios = [_estagio('a'), _estagio('b')]
+        cascata = CascataDetectores(estagios, min_tentativas=3, periodo_exploracao=0, esquecimento=1.0)
+
+        for _ in range(5):
+            cascata.detectar(Mock())
+
+        ativos, pulados = cascata.ordem(0)
+        assert sorted(e.nome for e in ativos) == ['a', 'b'] and pulados == []
+
+    def test_sem_reducao_nao_repete_nivel_completo(self):
+        """Testa que, na escala 1.0, o estágio do nível completo não repete a varredura do reduzido"""
+        estagios = [_estagio('reduzido'), _estagio('completo', [(0, 1, 1, 0)], nivel='completo')]
+        cascata = CascataDetectores(estagios)
+
+        resultado = cascata.detectar(PiramideImagem(np.zeros((40, 60, 3), dtype=np.uint8), escala=1.0))
+
+        assert resultado.tentados == ['reduzido']
+        assert not estagios[1].detectar.called
+        assert cascata.estatisticas()['0']['estagios']['completo']['tentativas'] == 0
+
+        resultado = cascata.detectar(PiramideImagem(np.zeros((40, 60, 3), dtype=np.uint8), escala=0.5))
+        assert resultado.tentados == ['reduzido', 'completo']
+
+
+class TestDeteccaoEmRecortes:
+    """Testes para detecção restrita às regiões de interesse"""
+
+    def test_sem_regioes_usa_nivel_inteiro(self):
+        """Testa que, sem regiões, o detector recebe a imagem inteira do nível"""
+        piramide = PiramideImagem(np.zeros((100, 200, 3), dtype=np.uint8))
+        detector = Mock(return_value=[(1, 2, 3, 4)])
+
+        assert detectar_em_recortes(piramide, 'reduzido', detector) == [(1, 2, 3, 4)]
+        assert detector.call_args[0][0].shape == (50, 100, 3)
+
+    def test_recorta_e_mapeia_de_volta(self):
+        """Testa que o detector só vê o recorte e os locais voltam para coordenadas do nível"""
+        regioes = [{'tipo': 'retangulo', 'x': 0.5, 'y': 0.5, 'largura': 0.5, 'altura': 0.5}]
+        piramide = PiramideImagem(np.zeros((400, 800, 3), dtype=np.uint8), regioes=regioes)
+        # Uma face dentro da região e outra só na margem do recorte (centro fora da região)
+        detector = Mock(return_value=[(30, 60, 70, 20), (0, 10, 10, 0)])
+
+        locais = detectar_em_recortes(piramide, 'reduzido', detector)
+
+        x0, y0, x1, y1 = piramide.recortes('reduzido')[0]
+        assert detector.call_args[0][0].shape == (y1 - y0, x1 - x0, 3)
+        assert (x1 - x0) * (y1 - y0) < 400 * 200
+        assert locais == [(30 + y0, 60 + x0, 70 + y0, 20 + x0)]
+
+    def test_haar_em_cinza(self):
+        """Testa que estágios em tons de cinza recebem o recorte da imagem cinza reduzida"""
+        regioes = [{'tipo': 'retangulo', 'x': 0.0, 'y': 0.0, 'largura': 0.5, 'altura': 1.0}]
+        piramide = PiramideImagem(np.zeros((100, 200, 3), dtype=np.uint8), regioes=regioes)
+        detector = Mock(return_value=[])
+
+        detectar_em_recortes(piramide, 'reduzido', detector, cor='cinza')
+        assert detector.call_args[0][0].ndim == 2
@@ -0,0 +1,48 @@
+"""
+Testes unitários para o módulo detector_movimento.py
+"""
+import numpy as np
+
+from detector_movimento import DetectorMovimento
+
+
+def _cena(valor_quadrado=None):
+    frame = np.full((480, 640, 3), 100, dtype=np.uint8)
+    if valor_quadrado is not None:
+        frame[100:300, 200:400] = valor_quadrado
+    return frame
+
+
+class TestDetectorMovimento:
+    """Testes para o detector de mudança de cena"""
+
+    def test_primeiro_frame_conta_como_movimento(self):
+        """Testa que o primeiro frame inicializa o fundo e conta como mudança"""
+        detector = DetectorMovimento()
+        assert detector.atualizar(_cena(), timestamp=1.0)
+        assert detector.ultimo_movimento == 1.0
+
+    def test_cena_estatica(self):
+        """Testa que frames iguais não geram movimento"""
+        detector = DetectorMovimento()
+        detector.atualizar(_cena(), timestamp=1.0)
+        for t in range(2, 10):
+            assert not detector.atualizar(_cena(), timestamp=float(t))
+        assert detector.estatico_desde(1.5)
+        assert detector.fracao == 0.0
+
+    def test_detecta_mudanca(self):
+        """Testa que um objeto novo na cena é detectado"""
+        detector = DetectorMovimento()
+        detector.atualizar(_cena(), timestamp=1.0)
+        assert detector.atualizar(_cena(250), timestamp=2.0)
+        assert not detector.estatico_desde(1.5)
+        assert detector.fracao > 0.05
+
+    def test_ruido_leve_ignorado(self):
+        """Testa que ruído de sensor abaixo do limiar não conta como movimento"""
+        detector = DetectorMovimento()
+        rng = np.random.default_rng(0)
+        detector.atualizar(_cena(), timestamp=1.0)
+        ruidoso = np.clip(_cena().astype(np.int16) + rng.integers(-8, 9, (480, 640, 3)), 0, 255).astype(np.uint8)
+        assert not detector.atualizar(ruidoso, timestamp=2.0)
@@ -0,0 +1,119 @@
+"""
+Testes unitários para o módulo diario_emails.py
+"""
+import sqlite3
+
+import pytest
+
+from caixa_saida import EmailPendente
+from diario_emails import ENVIADO, FALHOU, PENDENTE, DiarioEmails
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return tmp_path / 'caixa_saida.db'
+
+
+def _estados(caminho):
+    with sqlite3.connect(str(caminho)) as conexao:
+        return dict(conexao.execute('SELECT id, estado FROM emails').fetchall())
+
+
+class TestDiarioEmails:
+    """Testes para o registro durável da caixa de saída"""
+
+    def test_libera_somente_depois_de_gravar(self, caminho):
+        """Testa que o callback de liberação vem depois do commit"""
+        diario = DiarioEmails(caminho, intervalo=0.01)
+        diario.abrir()
+        liberados = []
+
+        def ao_gravar(email):
+            liberados.append((email.id, _estados(caminho).get(email.id)))
+
+        diario.registrar(EmailPendente(1, 'a@email.com', 'Alerta', 'Corpo'), ao_gravar=ao_gravar)
+        diario.descarregar()
+        diario.fechar()
+
+        assert liberados == [(1, PENDENTE)]
+
+    def test_registro_depois_de_fechar(self, caminho):
+        """Testa que um e-mail registrado com o diário fechado ainda é liberado"""
+        diario = DiarioEmails(caminho, intervalo=0.01)
+        diario.abrir()
+        diario.fechar()
+        liberados = []
+
+        diario.registrar(EmailPendente(1, 'a@email.com', 'Alerta', 'Corpo'), ao_gravar=lambda e: liberados.append(e.id))
+
+        assert liberados == [1]
+        assert diario.estatisticas()['aguardando_gravacao'] == 0
+
+    def test_caixa_saida_nao_trava_depois_de_fechar(self, caminho):
+        """Testa que aguardar_vazia não fica preso por um e-mail enfileirado depois de fechar o diário"""
+        from unittest.mock import Mock
+        from caixa_saida import CaixaSaidaEmail
+        servico = Mock()
+        servico.configurado.return_value = False
+        diario = DiarioEmails(caminho, intervalo=0.01)
+        caixa = CaixaSaidaEmail(servico, workers=1, diario=diario)
+        caixa.iniciar()
+        diario.fechar()
+
+        assert caixa.enfileirar('a@email.com', 'Alerta', 'Corpo') is not None
+        assert caixa.aguardar_vazia(timeout=2) is True
+        caixa.encerrar()
+
+    def test_gravacoes_agrupadas(self, caminho):
+        """Testa que muitos registros seguidos são gravados em poucas transações"""
+        diario = DiarioEmails(caminho, intervalo=0.2, tamanho_lote=500)
+        diario.abrir()
+
+        for n in range(1, 1001):
+            diario.registrar(EmailPendente(n, 'a@email.com', f'Alerta {n}', 'Corpo'))
+        diario.fechar()
+
+        assert len(_estados(caminho)) == 1000
+        assert diario.estatisticas()['lotes'] <= 3
+
+    def test_pendentes_sobrevivem_a_reabertura(self, caminho):
+        """Testa que só os e-mails não finalizados voltam, com tentativas e erro"""
+        diario = DiarioEmails(caminho)
+        diario.abrir()
+        for n in (1, 2, 3):
+            diario.registrar(EmailPendente(n, f'{n}@email.com', 'Alerta', 'Corpo', '<p>Corpo</p>'))
+        diario.descarregar()
+        diario.atualizar(1, ENVIADO, 1)
+        diario.atualizar(2, FALHOU, 1, erro='554 Rejeitado')
+        diario.atualizar(3, PENDENTE, 2, proxima_tentativa=123.0, erro='451 Tente depois')
+        diario.fechar()
+
+        reaberto = DiarioEmails(caminho)
+        assert reaberto.abrir() == 3
+        pendentes = reaberto.pendentes()
+        reaberto.fechar()
+
+        assert len(pendentes) == 1
+        assert pendentes[0]['id'] == 3
+        assert pendentes[0]['html'] == '<p>Corpo</p>'
+        assert pendentes[0]['tentativas'] == 2
+        assert pendentes[0]['proxima_tentativa'] == 123.0
+        assert pendentes[0]['ultimo_erro'] == '451 Tente depois'
+
+    def test_retencao_remove_finalizados_antigos(self, caminho):
+        """Testa que enviados antigos saem do diário e pendentes antigos ficam"""
+        diario = DiarioEmails(caminho)
+        diario.abrir()
+        diario.registrar(EmailPendente(1, 'a@email.com', 'Alerta', 'Corpo'))
+        diario.registrar(EmailPendente(2, 'b@email.com', 'Alerta', 'Corpo'))
+        diario.descarregar()
+        diario.atualizar(1, ENVIADO, 1)
+        diario.fechar()
+        with sqlite3.connect(str(caminho)) as conexao:
+            conexao.execute('UPDATE emails SET atualizado_em = 0')
+
+        diario = DiarioEmails(caminho, retencao_dias=7)
+        diario.abrir()
+        diario.fechar()
+
+        assert _estados(caminho) == {2: PENDENTE}
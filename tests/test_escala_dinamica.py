@@ -0,0 +1,45 @@
+"""
+Testes unitários para o módulo escala_dinamica.py
+"""
+from escala_dinamica import PoliticaEscala, TAMANHO_MINIMO_HOG
+
+
+class TestPoliticaEscala:
+    """Testes para a política de escala de trabalho por câmera"""
+
+    def test_escala_inicial_pela_largura(self):
+        """Testa que, sem amostras, a escala leva o frame à largura de trabalho"""
+        politica = PoliticaEscala(largura_inicial=640)
+        assert politica.escala(0, 3840) == 0.25  # 4K: 640 / 3840 arredondado para cima
+        assert politica.escala(0, 640) == 1.0  # 480p não é reduzido
+
+    def test_faces_grandes_reduzem_escala(self):
+        """Testa que faces grandes em fonte 4K permitem trabalhar em resolução bem menor"""
+        politica = PoliticaEscala(min_amostras=10)
+        politica.registrar(0, [400] * 20)
+
+        escala = politica.escala(0, 3840)
+        assert escala < 0.5
+        # A menor face observada continua acima do mínimo do HOG na escala escolhida
+        assert 400 * escala >= TAMANHO_MINIMO_HOG
+
+    def test_faces_pequenas_aumentam_escala(self):
+        """Testa que faces pequenas vistas pelos fallbacks fazem a escala subir"""
+        politica = PoliticaEscala(min_amostras=10, largura_inicial=320)
+        assert politica.escala(0, 1280) == 0.25
+        politica.registrar(0, [120] * 20)
+        assert politica.escala(0, 1280) >= TAMANHO_MINIMO_HOG / 120.0
+
+    def test_limite_pelo_tamanho_minimo_configurado(self):
+        """Testa que a escala não passa do necessário para a menor face configurada"""
+        politica = PoliticaEscala(tamanho_minimo_face=160, min_amostras=10)
+        politica.registrar(0, [30] * 20)
+        assert politica.escala(0, 1920) == 0.5
+
+    def test_cameras_independentes(self):
+        """Testa que o histograma é por câmera"""
+        politica = PoliticaEscala(min_amostras=5)
+        politica.registrar(1, [300] * 10)
+        assert politica.percentil_altura(1) is not None
+        assert politica.percentil_altura(2) is None
+        assert politica.estatisticas()['1']['amostras'] == 10
@@ -0,0 +1,64 @@
+"""
+Testes unitários para o módulo escalonador.py
+"""
+from escalonador import EscalonadorCameras
+
+
+class TestEscalonadorCameras:
+    """Testes para o escalonamento justo entre câmeras"""
+
+    def test_camera_ocupada_nao_monopoliza(self):
+        """Testa que uma câmera publicando sem parar não impede o atendimento das outras"""
+        escalonador = EscalonadorCameras()
+        atendidas = []
+        for passo in range(6):
+            agora = float(passo)
+            # A câmera 0 sempre tem o frame mais recente
+            escalonador.publicar(1, 'b', timestamp=agora)
+            escalonador.publicar(0, 'a', timestamp=agora + 0.5)
+            for _ in range(2):
+                entrada = escalonador.aguardar(timeout=0)
+                if entrada is None:
+                    break
+                atendidas.append(entrada[0])
+                escalonador.concluir(entrada[0], entrada[2], intervalo=1.0)
+
+        assert atendidas.count(0) == atendidas.count(1) == 6
+
+    def test_prazo_da_camera(self):
+        """Testa que frames anteriores ao prazo da câmera não são entregues"""
+        escalonador = EscalonadorCameras()
+        escalonador.publicar(0, 'a', timestamp=10.0)
+        escalonador.concluir(0, *escalonador.aguardar(timeout=0)[2:], intervalo=5.0)
+
+        escalonador.publicar(0, 'a', timestamp=12.0)
+        assert escalonador.aguardar(timeout=0.01) is None
+        escalonador.publicar(0, 'a', timestamp=15.0)
+        assert escalonador.aguardar(timeout=0)[2] == 15.0
+
+    def test_atividade_recente_encurta_intervalo(self):
+        """Testa que câmeras com atividade recente recebem prazo mais curto"""
+        escalonador = EscalonadorCameras(peso_ativo=4.0, janela_atividade=10.0)
+        escalonador.registrar_atividade(1, timestamp=100.0)
+
+        escalonador.concluir(0, 100.0, intervalo=4.0)
+        escalonador.concluir(1, 100.0, intervalo=4.0)
+
+        assert escalonador._pipelines[0].prazo == 104.0
+        assert escalonador._pipelines[1].prazo == 101.0
+
+    def test_estatisticas_por_camera(self):
+        """Testa profundidade, descartes e atraso expostos por câmera"""
+        escalonador = EscalonadorCameras()
+        for t in range(3):
+            escalonador.publicar(2, 'frame', timestamp=float(t))
+
+        estatisticas = escalonador.estatisticas(agora=5.0)['2']
+        assert estatisticas['profundidade'] == 3
+        assert estatisticas['descartados'] == 2
+        assert estatisticas['atraso'] == 5.0
+        assert estatisticas['idade_frame'] == 3.0
+
+        escalonador.aguardar(timeout=0)
+        estatisticas = escalonador.estatisticas(agora=5.0)['2']
+        assert estatisticas['profundidade'] == 0 and estatisticas['atendimentos'] == 1
@@ -438,6 +438,23 @@ describe('App.js - Socket Events', () => {
         
         expect(mockSocket.on).toHaveBeenCalledWith('camera_frame', expect.any(Function));
     });
+
+    test('deve processar evento camera_frame com anexo binário', () => {
+        const data = {
+            camera_id: 0,
+            timestamp: new Date().toISOString(),
+            formato: 'jpeg',
+            frame: new Uint8Array([0xff, 0xd8, 0xff, 0xd9]).buffer
+        };
+
+        // Simula callback do evento
+        const callback = mockSocket.on.mock.calls.find(call => call[0] === 'camera_frame');
+        if (callback) {
+            expect(() => callback[1](data)).not.toThrow();
+        }
+
+        expect(mockSocket.on).toHaveBeenCalledWith('camera_frame', expect.any(Function));
+    });
 });
 
 describe('App.js - Utilitários', () => {
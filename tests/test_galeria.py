@@ -0,0 +1,131 @@
+"""
+Testes unitários para o módulo galeria.py
+"""
+import pytest
+import numpy as np
+
+from galeria import GaleriaFacial, codificacao_para_bytes, matriz_de_bytes
+
+
+class TestGaleriaFacial:
+    """Testes para a galeria vetorizada de codificações"""
+
+    def test_galeria_vazia(self):
+        """Testa galeria sem referências"""
+        galeria = GaleriaFacial()
+
+        assert len(galeria) == 0
+        assert galeria.matriz.shape == (0, 128)
+        resultado = galeria.comparar([np.zeros(128)])
+        assert len(resultado) == 1
+        assert resultado[0].reconhecido == False
+
+    def test_matriz_contigua_float32(self):
+        """Testa que a galeria mantém uma matriz float32 contígua e somente leitura"""
+        codificacoes = [np.random.rand(128) for _ in range(5)]
+        galeria = GaleriaFacial([1, 2, 3, 4, 5], codificacoes)
+
+        assert galeria.matriz.dtype == np.float32
+        assert galeria.matriz.flags['C_CONTIGUOUS']
+        assert not galeria.matriz.flags.writeable
+        assert galeria.ids == ('1', '2', '3', '4', '5')
+        np.testing.assert_allclose(galeria.normas_quadradas, np.sum(galeria.matriz ** 2, axis=1), rtol=1e-5)
+
+    def test_distancias_equivalentes_a_face_distance(self):
+        """Testa que as distâncias batem com o cálculo euclidiano direto"""
+        codificacoes = np.random.rand(20, 128) * 0.2
+        faces = np.random.rand(3, 128) * 0.2
+        galeria = GaleriaFacial(range(20), codificacoes)
+
+        esperado = np.linalg.norm(codificacoes[None, :, :] - faces[:, None, :], axis=2)
+
+        np.testing.assert_allclose(galeria.distancias(faces), esperado, atol=1e-4)
+
+    def test_comparar_escolhe_mais_proxima_e_margem(self):
+        """Testa que a melhor correspondência é a mais próxima e que a margem é calculada"""
+        base = np.zeros(128)
+        galeria = GaleriaFacial(['10', '20', '30'], [base + 0.05, base + 0.01, base + 0.5])
+
+        resultado = galeria.comparar([base], tolerancia=0.6)
+
+        assert resultado[0].id_aluno == '20'
+        assert resultado[0].reconhecido == True
+        assert resultado[0].distancia == pytest.approx(0.01 * np.sqrt(128), abs=1e-4)
+        assert resultado[0].margem == pytest.approx(0.04 * np.sqrt(128), abs=1e-4)
+
+    def test_comparar_fora_da_tolerancia(self):
+        """Testa face distante de todas as referências"""
+        galeria = GaleriaFacial(['1'], [np.zeros(128)])
+
+        resultado = galeria.comparar([np.ones(128)], tolerancia=0.6)
+
+        assert resultado[0].reconhecido == False
+        assert resultado[0].id_aluno == '1'
+        assert resultado[0].margem == float('inf')
+
+    def test_tamanhos_incompativeis(self):
+        """Testa erro quando IDs e codificações não têm o mesmo tamanho"""
+        with pytest.raises(ValueError):
+            GaleriaFacial(['1', '2'], [np.zeros(128)])
+
+    def test_com_aluno_inclui_sem_alterar_original(self):
+        """Testa que incluir um aluno gera nova versão e preserva a galeria anterior"""
+        galeria = GaleriaFacial(['1'], [np.zeros(128)])
+
+        nova = galeria.com_aluno(2, np.ones(128))
+
+        assert nova.ids == ('1', '2')
+        assert len(galeria) == 1
+        assert nova.comparar([np.ones(128)])[0].id_aluno == '2'
+        assert not nova.matriz.flags.writeable
+
+    def test_com_aluno_substitui_codificacao(self):
+        """Testa que um aluno já existente tem só sua linha trocada"""
+        galeria = GaleriaFacial(['1', '2'], [np.zeros(128), np.ones(128)])
+
+        nova = galeria.com_aluno('1', np.full(128, 0.5))
+
+        assert nova.ids == ('1', '2')
+        np.testing.assert_allclose(nova.matriz[0], 0.5)
+        np.testing.assert_allclose(galeria.matriz[0], 0.0)
+        np.testing.assert_allclose(nova.normas_quadradas[0], 128 * 0.25, rtol=1e-5)
+
+    def test_sem_aluno(self):
+        """Testa remoção de um aluno e de um aluno inexistente"""
+        galeria = GaleriaFacial(['1', '2', '3'], [np.zeros(128), np.ones(128), np.full(128, 2.0)])
+
+        nova = galeria.sem_aluno('2')
+
+        assert nova.ids == ('1', '3')
+        np.testing.assert_allclose(nova.matriz[1], 2.0)
+        assert galeria.sem_aluno('99') is galeria
+        assert len(GaleriaFacial(['1'], [np.zeros(128)]).sem_aluno('1')) == 0
+
+    def test_com_aluno_dimensao_invalida(self):
+        """Testa erro ao incluir codificação com dimensão errada"""
+        with pytest.raises(ValueError):
+            GaleriaFacial().com_aluno('1', np.zeros(10))
+
+
+class TestFormatoBinario:
+    """Testes para a serialização binária das codificações"""
+
+    def test_ida_e_volta(self):
+        """Testa que bytes gerados remontam a mesma matriz float32"""
+        codificacoes = np.random.rand(3, 128)
+        buffers = [codificacao_para_bytes(c) for c in codificacoes]
+
+        matriz = matriz_de_bytes(buffers)
+
+        assert all(len(b) == 512 for b in buffers)
+        assert matriz.dtype == np.float32
+        np.testing.assert_array_equal(matriz, codificacoes.astype(np.float32))
+        assert buffers[0][:4] == np.array([codificacoes[0, 0]], dtype='<f4').tobytes()
+
+    def test_matriz_vazia_e_tamanho_invalido(self):
+        """Testa lista vazia e buffer com tamanho errado"""
+        assert matriz_de_bytes([]).shape == (0, 128)
+        with pytest.raises(ValueError):
+            matriz_de_bytes([b'\x00' * 100])
+        with pytest.raises(ValueError):
+            codificacao_para_bytes(np.zeros(64))
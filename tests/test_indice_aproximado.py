@@ -0,0 +1,72 @@
+"""
+Testes unitários para o módulo indice_aproximado.py
+"""
+import pytest
+import numpy as np
+
+from galeria import GaleriaFacial
+from indice_aproximado import IndiceAproximado, construir_indice, TAMANHO_MINIMO_INDICE
+
+
+def _galeria_sintetica(n, semente=0):
+    rng = np.random.default_rng(semente)
+    centros = rng.normal(0.0, 0.09, (50, 128))
+    codificacoes = centros[rng.integers(0, 50, n)] + rng.normal(0.0, 0.04, (n, 128))
+    return GaleriaFacial(range(n), codificacoes)
+
+
+class TestIndiceAproximado:
+    """Testes para o índice IVF sobre a galeria"""
+
+    def test_recall_contra_busca_exata(self):
+        """Testa que o índice encontra o mesmo vizinho que a varredura exata"""
+        galeria = _galeria_sintetica(3000)
+        indice = IndiceAproximado(galeria, n_sondagens=8)
+        rng = np.random.default_rng(1)
+        alvos = rng.choice(len(galeria), 100, replace=False)
+        consultas = galeria.matriz[alvos] + rng.normal(0.0, 0.01, (100, 128)).astype(np.float32)
+
+        exatos = galeria.comparar(consultas)
+        aproximados = indice.comparar(consultas)
+
+        recall = np.mean([a.indice == e.indice for a, e in zip(aproximados, exatos)])
+        assert recall >= 0.95
+        for a, e in zip(aproximados, exatos):
+            if a.indice == e.indice:
+                assert a.distancia == pytest.approx(e.distancia, abs=1e-3)
+
+    def test_listas_cobrem_toda_galeria(self):
+        """Testa que cada aluno pertence a exatamente uma lista"""
+        galeria = _galeria_sintetica(500)
+        indice = IndiceAproximado(galeria, n_listas=10)
+
+        assert indice.deslocamentos[-1] == len(galeria)
+        assert sorted(indice.membros.tolist()) == list(range(len(galeria)))
+
+    def test_reconstruir_reaproveita_centroides(self):
+        """Testa que atualizações da galeria não retreinam o k-means"""
+        galeria = _galeria_sintetica(2500)
+        indice = IndiceAproximado(galeria)
+        nova = GaleriaFacial(list(galeria.ids) + ['novo'], np.vstack([galeria.matriz, np.zeros((1, 128))]))
+
+        reconstruido = indice.reconstruir(nova)
+
+        assert reconstruido.centroides is indice.centroides
+        assert len(reconstruido) == len(galeria) + 1
+        assert reconstruido.comparar([np.zeros(128)])[0].id_aluno == 'novo'
+
+
+class TestConstruirIndice:
+    """Testes para a seleção do índice por configuração"""
+
+    def test_exato_retorna_galeria(self):
+        galeria = _galeria_sintetica(TAMANHO_MINIMO_INDICE)
+        assert construir_indice(galeria, 'exato') is galeria
+
+    def test_aproximado_galeria_pequena_usa_busca_exata(self):
+        galeria = _galeria_sintetica(100)
+        assert construir_indice(galeria, 'aproximado') is galeria
+
+    def test_aproximado_galeria_grande(self):
+        galeria = _galeria_sintetica(TAMANHO_MINIMO_INDICE)
+        assert isinstance(construir_indice(galeria, 'aproximado'), IndiceAproximado)
@@ -0,0 +1,183 @@
+"""
+Testes unitários para o módulo notificacoes.py
+"""
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from notificacoes import AUSENCIA, RETORNO, DespachanteNotificacoes, EventoAlerta, montar_email
+
+
+def _evento(tipo=AUSENCIA, episodio=1, id_aluno='1'):
+    return EventoAlerta(id_aluno, tipo, episodio, 2, datetime(2024, 1, 1, 8, 0))
+
+
+@pytest.fixture
+def despachante():
+    contatos = {'1': {'telefone': None, 'email': 'resp@email.com'}}
+    return DespachanteNotificacoes(contatos.get)
+
+
+class TestDespachanteNotificacoes:
+    """Testes para o despacho e a deduplicação dos alertas"""
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_repeticao_do_episodio_e_descartada(self, mock_enfileirar, despachante):
+        """Testa que o mesmo (aluno, tipo, episódio) gera um único e-mail"""
+        assert despachante.publicar(_evento()) is True
+        assert despachante.publicar(_evento()) is False
+
+        mock_enfileirar.assert_called_once()
+        assert despachante.estatisticas()['repetidos'] == 1
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_episodios_e_tipos_distintos(self, mock_enfileirar, despachante):
+        """Testa que ausência e retorno, e episódios novos, são avisados; episódios antigos não"""
+        despachante.publicar(_evento(AUSENCIA, 1))
+        despachante.publicar(_evento(RETORNO, 1))
+        despachante.publicar(_evento(AUSENCIA, 2))
+        despachante.publicar(_evento(AUSENCIA, 1))
+
+        assert mock_enfileirar.call_count == 3
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_sem_contato(self, mock_enfileirar, despachante):
+        """Testa que aluno sem e-mail do responsável não gera envio"""
+        assert despachante.publicar(_evento(id_aluno='2')) is False
+
+        mock_enfileirar.assert_not_called()
+        assert despachante.estatisticas()['sem_contato'] == 1
+
+    @patch('notificacoes.enfileirar_email', side_effect=[None, 1])
+    def test_caixa_cheia_libera_a_chave(self, mock_enfileirar, despachante):
+        """Testa que, se o e-mail não entrou na caixa de saída, o mesmo episódio pode ser avisado depois"""
+        assert despachante.publicar(_evento()) is False
+        assert despachante.publicar(_evento()) is True
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_esquecer_aluno(self, mock_enfileirar, despachante):
+        """Testa que um aluno removido e recadastrado volta a ser avisado"""
+        despachante.publicar(_evento())
+        despachante.esquecer(1)
+        despachante.publicar(_evento())
+
+        assert mock_enfileirar.call_count == 2
+
+
+class TestMontarEmail:
+    """Testes para o conteúdo dos e-mails"""
+
+    def test_ausencia(self):
+        """Testa assunto, texto puro e HTML do alerta de ausência"""
+        assunto, texto, html = montar_email(_evento())
+
+        assert assunto == 'Alerta de Ausência - Aluno 1'
+        assert 'ausente há 2 verificações consecutivas' in texto
+        assert '<' not in texto
+        assert html.startswith('<html>')
+
+    def test_retorno(self):
+        """Testa o assunto do aviso de retorno"""
+        assert montar_email(_evento(RETORNO))[0] == 'Aluno 1 Retornou'
+
+
+class TestResumoAlertas:
+    """Testes para o modo de resumo por janela"""
+
+    @pytest.fixture
+    def contatos(self):
+        # Alunos 1 e 2 são irmãos (mesmo responsável); o 3 tem outro responsável e o 4 nenhum
+        return {
+            '1': {'telefone': None, 'email': 'familia@email.com'},
+            '2': {'telefone': None, 'email': 'familia@email.com'},
+            '3': {'telefone': None, 'email': 'outro@email.com'},
+        }
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_um_email_por_destinatario(self, mock_enfileirar, contatos):
+        """Testa que os alertas da janela saem num e-mail por responsável"""
+        despachante = DespachanteNotificacoes(contatos.get, janela=60, email_administrador='')
+        for id_aluno in ('1', '2', '3'):
+            assert despachante.publicar(_evento(id_aluno=id_aluno)) is True
+        mock_enfileirar.assert_not_called()
+
+        despachante.descarregar()
+
+        enviados = {chamada[1]['to_email']: chamada[1] for chamada in mock_enfileirar.call_args_list}
+        assert set(enviados) == {'familia@email.com', 'outro@email.com'}
+        assert 'Aluno 1:' in enviados['familia@email.com']['body_text']
+        assert 'Aluno 2:' in enviados['familia@email.com']['body_text']
+        # Alerta único na janela usa o e-mail individual
+        assert enviados['outro@email.com']['subject'] == 'Alerta de Ausência - Aluno 3'
+        assert despachante.estatisticas()['resumos'] == 1
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_resumo_do_administrador(self, mock_enfileirar, contatos):
+        """Testa que o administrador recebe todos os alertas, inclusive de alunos sem contato"""
+        despachante = DespachanteNotificacoes(contatos.get, janela=60, email_administrador='secretaria@escola.com',
+                                              somente_administrador=True)
+        for id_aluno in ('1', '2', '3', '4'):
+            despachante.publicar(_evento(id_aluno=id_aluno))
+
+        despachante.descarregar()
+
+        mock_enfileirar.assert_called_once()
+        chamada = mock_enfileirar.call_args[1]
+        assert chamada['to_email'] == 'secretaria@escola.com'
+        assert '4 alerta(s), 4 aluno(s)' in chamada['subject']
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_resumo_do_administrador_com_responsaveis(self, mock_enfileirar):
+        """Testa que alunos sem contato também entram no resumo do administrador quando os responsáveis recebem e-mail"""
+        contatos = {'1': {'telefone': None, 'email': 'familia@email.com'}}
+        despachante = DespachanteNotificacoes(contatos.get, janela=60, email_administrador='secretaria@escola.com')
+        for id_aluno in ('1', '2', '3'):
+            despachante.publicar(_evento(id_aluno=id_aluno))
+
+        despachante.descarregar()
+
+        enviados = {chamada[1]['to_email']: chamada[1] for chamada in mock_enfileirar.call_args_list}
+        assert set(enviados) == {'familia@email.com', 'secretaria@escola.com'}
+        assert '3 alerta(s), 3 aluno(s)' in enviados['secretaria@escola.com']['subject']
+        assert enviados['familia@email.com']['subject'] == 'Alerta de Ausência - Aluno 1'
+        assert despachante.estatisticas()['sem_contato'] == 2
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_administrador_sem_janela(self, mock_enfileirar):
+        """Testa que, com janela 0, os alertas saem na hora, com uma cópia para o administrador"""
+        contatos = {'1': {'telefone': None, 'email': 'familia@email.com'}}
+        despachante = DespachanteNotificacoes(contatos.get, janela=0, email_administrador='secretaria@escola.com')
+
+        assert despachante.publicar(_evento(id_aluno='1')) is True
+        assert despachante.publicar(_evento(id_aluno='2')) is True
+
+        destinatarios = [chamada[1]['to_email'] for chamada in mock_enfileirar.call_args_list]
+        assert destinatarios == ['familia@email.com', 'secretaria@escola.com', 'secretaria@escola.com']
+        assert mock_enfileirar.call_args_list[0][1]['subject'] == 'Alerta de Ausência - Aluno 1'
+        assert despachante.estatisticas()['aguardando_resumo'] == 0
+        assert despachante._thread is None
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_janela_descarrega_sozinha(self, mock_enfileirar, contatos):
+        """Testa que o fim da janela envia o resumo sem intervenção"""
+        despachante = DespachanteNotificacoes(contatos.get, janela=0.05, email_administrador='')
+        despachante.publicar(_evento(id_aluno='1'))
+        despachante.publicar(_evento(id_aluno='2'))
+
+        limite = time.monotonic() + 2
+        while not mock_enfileirar.called and time.monotonic() < limite:
+            time.sleep(0.01)
+
+        mock_enfileirar.assert_called_once()
+        assert despachante.estatisticas()['aguardando_resumo'] == 0
+
+    @patch('notificacoes.enfileirar_email', return_value=None)
+    def test_falha_no_resumo_libera_chaves(self, mock_enfileirar, contatos):
+        """Testa que, se o resumo não entrou na caixa de saída, os alertas podem ser refeitos"""
+        despachante = DespachanteNotificacoes(contatos.get, janela=60, email_administrador='')
+        despachante.publicar(_evento(id_aluno='1'))
+        despachante.descarregar()
+
+        assert despachante.publicar(_evento(id_aluno='1')) is True
@@ -0,0 +1,111 @@
+"""
+Testes unitários para o módulo pool_reconhecimento.py
+"""
+import pytest
+import numpy as np
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+
+import pool_reconhecimento
+from pool_reconhecimento import PoolReconhecimento, FrameCompartilhado, criar_pool
+
+
+class _ExecutorSincrono:
+    """Executa as tarefas no próprio processo, preservando a passagem por memória compartilhada"""
+
+    def submit(self, funcao, *args):
+        futuro = Future()
+        futuro.set_result(funcao(*args))
+        return futuro
+
+    def shutdown(self, wait=True):
+        pass
+
+
+@pytest.fixture
+def pool_local():
+    """Pool com executor síncrono e face_recognition simulado"""
+    with patch('pool_reconhecimento.ProcessPoolExecutor', return_value=_ExecutorSincrono()):
+        pool = PoolReconhecimento(3)
+    falso = Mock()
+    with patch.object(pool_reconhecimento, '_face_recognition', falso):
+        yield pool, falso
+    pool.encerrar()
+
+
+class TestPoolReconhecimento:
+    """Testes para o pool de detecção/codificação"""
+
+    def test_criar_pool_desabilitado(self):
+        """Testa que nenhum processo é criado com zero workers"""
+        assert criar_pool(0) is None
+
+    def test_compartilhar_imagem(self, pool_local):
+        """Testa que a imagem chega ao worker pela memória compartilhada"""
+        pool, _ = pool_local
+        imagem = np.random.randint(0, 255, (48, 64, 3), dtype=np.uint8)
+
+        descritor = pool.compartilhar(imagem)
+
+        assert isinstance(descritor, FrameCompartilhado)
+        np.testing.assert_array_equal(pool_reconhecimento._anexar(descritor), imagem)
+
+    def test_compartilhar_reaproveita_bloco(self, pool_local):
+        """Testa que frames do mesmo tamanho reutilizam o bloco da thread"""
+        pool, _ = pool_local
+        primeiro = pool.compartilhar(np.zeros((10, 10, 3), dtype=np.uint8))
+        segundo = pool.compartilhar(np.ones((10, 10, 3), dtype=np.uint8))
+
+        assert primeiro.nome_shm == segundo.nome_shm
+        assert pool_reconhecimento._anexar(segundo)[0, 0, 0] == 1
+
+    def test_localizar_faces(self, pool_local):
+        """Testa detecção HOG executada no worker"""
+        pool, falso = pool_local
+        falso.face_locations.return_value = [(1, 2, 3, 4)]
+
+        locais = pool.localizar_faces(np.zeros((20, 20, 3), dtype=np.uint8), upsample=1)
+
+        assert locais == [(1, 2, 3, 4)]
+        assert falso.face_locations.call_args[1]['number_of_times_to_upsample'] == 1
+
+    def test_codificar_faces_preserva_ordem(self, pool_local):
+        """Testa que as faces divididas entre workers voltam na ordem original"""
+        pool, falso = pool_local
+        falso.face_encodings.side_effect = lambda imagem, locais: [np.full(128, l[0]) for l in locais]
+        locais = [(i, 0, 0, 0) for i in range(7)]
+
+        codificacoes = pool.codificar_faces(np.zeros((20, 20, 3), dtype=np.uint8), locais)
+
+        assert falso.face_encodings.call_count == 3
+        assert [c[0] for c in codificacoes] == list(range(7))
+
+    @pytest.mark.skipif(pool_reconhecimento.os.name == 'nt', reason="forkserver só existe em POSIX")
+    def test_workers_nao_sao_fork_do_processo_principal(self):
+        """Testa que os workers saem do forkserver (sem herdar threads e conexões do processo principal)"""
+        with patch('pool_reconhecimento.ProcessPoolExecutor', return_value=_ExecutorSincrono()) as executor:
+            PoolReconhecimento(2).encerrar()
+
+        assert executor.call_args[1]['mp_context'].get_start_method() == 'forkserver'
+
+    def test_criar_pool_no_worker(self):
+        """Testa que o módulo principal reimportado por um worker não cria outro pool"""
+        with patch('pool_reconhecimento.mp.current_process', return_value=Mock(name='processo')) as atual, \
+             patch('pool_reconhecimento.PoolReconhecimento') as classe:
+            atual.return_value.name = 'ForkServerProcess-1'
+            assert criar_pool(2) is None
+        classe.assert_not_called()
+
+    @pytest.mark.slow
+    @pytest.mark.skipif(pool_reconhecimento.os.name == 'nt', reason="forkserver só existe em POSIX")
+    def test_worker_morto_quebra_o_pool(self):
+        """Testa que a morte de um worker real chega ao chamador como BrokenProcessPool"""
+        from concurrent.futures.process import BrokenProcessPool
+        pool = PoolReconhecimento(1)
+        try:
+            with pytest.raises(BrokenProcessPool):
+                pool._executor.submit(pool_reconhecimento.os._exit, 1).result(timeout=30)
+            with pytest.raises(BrokenProcessPool):
+                pool.localizar_faces(np.zeros((20, 20, 3), dtype=np.uint8))
+        finally:
+            pool.encerrar()
@@ -0,0 +1,77 @@
+"""
+Testes unitários para o módulo rastreador_faces.py
+"""
+import numpy as np
+
+from rastreador_faces import RastreadorFaces, iou
+
+
+class TestIoU:
+    """Testes para a interseção sobre união das caixas"""
+
+    def test_iou(self):
+        """Testa caixas iguais, disjuntas e com sobreposição parcial"""
+        caixa = (0, 10, 10, 0)
+        assert iou(caixa, caixa) == 1.0
+        assert iou(caixa, (20, 30, 30, 20)) == 0.0
+        assert abs(iou(caixa, (0, 15, 10, 5)) - 50 / 150) < 1e-9
+
+
+class TestRastreadorFaces:
+    """Testes para o rastreador de faces"""
+
+    def test_mantem_trilha_e_identidade(self):
+        """Testa que a face que se move pouco continua na mesma trilha, sem nova codificação"""
+        rastreador = RastreadorFaces(intervalo_reidentificacao=30)
+        trilha = rastreador.atualizar(0, [(10, 50, 50, 10)], agora=0)[0]
+        assert rastreador.precisa_codificar(trilha, agora=0)
+        rastreador.identificar(trilha, '123', 0.3, agora=0)
+
+        mesma = rastreador.atualizar(0, [(12, 52, 52, 12)], agora=1)[0]
+        assert mesma is trilha and mesma.id_aluno == '123'
+        assert not rastreador.precisa_codificar(mesma, agora=1)
+        # Reconfirmação após o intervalo lento
+        assert rastreador.precisa_codificar(mesma, agora=31)
+
+    def test_nova_trilha_para_face_distante(self):
+        """Testa que uma face sem sobreposição abre nova trilha"""
+        rastreador = RastreadorFaces()
+        a = rastreador.atualizar(0, [(10, 50, 50, 10)], agora=0)[0]
+        trilhas = rastreador.atualizar(0, [(10, 50, 50, 10), (100, 150, 150, 100)], agora=1)
+        assert trilhas[0] is a
+        assert trilhas[1] is not a and trilhas[1].codificada_em is None
+
+    def test_trilha_expira_apos_perdas(self):
+        """Testa que a trilha sobrevive a falhas curtas de detecção e expira depois"""
+        rastreador = RastreadorFaces(max_perdidos=2)
+        trilha = rastreador.atualizar(0, [(10, 50, 50, 10)], agora=0)[0]
+        rastreador.atualizar(0, [], agora=1)
+        rastreador.atualizar(0, [], agora=2)
+        assert rastreador.atualizar(0, [(10, 50, 50, 10)], agora=3)[0] is trilha
+
+        for agora in range(4, 7):
+            rastreador.atualizar(0, [], agora=agora)
+        assert rastreador.trilhas(0) == []
+
+    def test_cameras_independentes_e_invalidacao(self):
+        """Testa que trilhas são por câmera e que a invalidação força nova codificação"""
+        rastreador = RastreadorFaces()
+        trilha = rastreador.atualizar(0, [(10, 50, 50, 10)], agora=0)[0]
+        rastreador.identificar(trilha, '1', agora=0)
+        assert rastreador.atualizar(1, [(10, 50, 50, 10)], agora=0)[0] is not trilha
+
+        rastreador.invalidar_identidades()
+        assert rastreador.precisa_codificar(trilha, agora=0)
+
+    def test_fluxo_optico_acompanha_movimento(self):
+        """Testa que o fluxo óptico desloca a trilha junto com a face antes da associação"""
+        rastreador = RastreadorFaces(iou_minimo=0.3, fluxo_optico=True)
+        rng = np.random.default_rng(0)
+        textura = (rng.random((40, 40)) * 255).astype(np.uint8)
+        anterior = np.zeros((120, 160), dtype=np.uint8)
+        anterior[20:60, 20:60] = textura
+        atual = np.zeros_like(anterior)
+        atual[20:60, 44:84] = textura  # a face andou 24 px: IoU sem previsão < 0.3
+
+        trilha = rastreador.atualizar(0, [(20, 60, 60, 20)], agora=0, cinza=anterior)[0]
+        assert rastreador.atualizar(0, [(20, 84, 60, 44)], agora=1, cinza=atual)[0] is trilha
@@ -6,10 +6,23 @@ import numpy as np
 import cv2
 import threading
 import time
+from concurrent.futures.process import BrokenProcessPool
 from unittest.mock import Mock, patch, MagicMock
-from queue import Queue
 
 from reconhecimento import ReconhecimentoFacial
+from galeria import GaleriaFacial
+from caixa_frames import CaixaUltimoFrame
+from snapshot_galeria import carregar_snapshot
+from notificacoes import AUSENCIA
+
+
+def _semear_galeria(instancia, ids, codificacoes=None):
+    """Publica na instância uma galeria montada aluno a aluno (codificações aleatórias se omitidas)"""
+    galeria = GaleriaFacial()
+    for i, id_aluno in enumerate(ids):
+        codificacao = codificacoes[i] if codificacoes is not None else np.random.rand(128)
+        galeria = galeria.com_aluno(id_aluno, codificacao)
+    instancia._publicar_galeria(galeria)
 
 
 class TestReconhecimentoFacialInit:
@@ -20,13 +33,13 @@ class TestReconhecimentoFacialInit:
         """Testa inicialização da classe"""
         rf = ReconhecimentoFacial()
         
-        assert rf.codificacoes_referencia == []
-        assert rf.nomes_referencia == []
+        assert len(rf.galeria) == 0
+        assert rf.indice is rf.galeria
         assert rf.ausencias_consecutivas == {}
         assert rf.ultima_presenca == {}
         assert rf.email_enviado == {}
         assert rf.monitoramento_ativo == False
-        assert isinstance(rf.frame_queue, Queue)
+        assert isinstance(rf.caixa_frames, CaixaUltimoFrame)
         assert isinstance(rf.lock, type(threading.Lock()))
         
         mock_carregar.assert_called_once()
@@ -46,49 +59,178 @@ class TestReconhecimentoFacialInit:
 class TestCarregarCodificacoes:
     """Testes para carregamento de codificações de referência"""
     
-    @patch('reconhecimento.listar_alunos')
-    @patch('reconhecimento.np.array')
-    def test_carregar_codificacoes_sucesso(self, mock_array, mock_listar, reconhecimento_instance):
+    @patch('reconhecimento.listar_codificacoes')
+    def test_carregar_codificacoes_sucesso(self, mock_listar, reconhecimento_instance):
         """Testa carregamento bem-sucedido das codificações"""
-        # Mock dos dados de alunos
-        mock_listar.return_value = [
-            {'Id': 12345, 'Nome': 'João Silva', 'codificacao_facial': '[0.1, 0.2, 0.3]'},
-            {'Id': 67890, 'Nome': 'Maria Santos', 'codificacao_facial': '[0.4, 0.5, 0.6]'}
-        ]
-        
-        # Mock do numpy array
-        mock_array.side_effect = lambda x: np.array(eval(x))
+        matriz = np.random.rand(2, 128).astype(np.float32)
+        mock_listar.return_value = (['12345', '67890'], matriz, {})
         
         reconhecimento_instance.carregar_codificacoes_referencia()
         
-        assert len(reconhecimento_instance.codificacoes_referencia) == 2
-        assert len(reconhecimento_instance.nomes_referencia) == 2
-        # O código atual usa IDs (string) como nomes de referência
-        assert reconhecimento_instance.nomes_referencia[0] == '12345'
-        assert reconhecimento_instance.nomes_referencia[1] == '67890'
+        assert len(reconhecimento_instance.galeria) == 2
+        # A galeria usa os IDs (string) dos alunos
+        assert reconhecimento_instance.galeria.ids == ('12345', '67890')
+        np.testing.assert_array_equal(reconhecimento_instance.galeria.matriz, matriz)
     
-    @patch('reconhecimento.listar_alunos')
+    @patch('reconhecimento.listar_codificacoes')
     def test_carregar_codificacoes_vazio(self, mock_listar, reconhecimento_instance):
         """Testa carregamento quando não há alunos"""
-        mock_listar.return_value = []
+        mock_listar.return_value = ([], np.empty((0, 128), dtype=np.float32), {})
         
         reconhecimento_instance.carregar_codificacoes_referencia()
         
-        assert reconhecimento_instance.codificacoes_referencia == []
-        assert reconhecimento_instance.nomes_referencia == []
+        assert len(reconhecimento_instance.galeria) == 0
     
-    @patch('reconhecimento.listar_alunos')
-    def test_carregar_codificacoes_erro_json(self, mock_listar, reconhecimento_instance):
-        """Testa tratamento de erro no JSON das codificações"""
-        mock_listar.return_value = [
-            {'Id': 12345, 'Nome': 'João Silva', 'codificacao_facial': 'json_invalido'}
-        ]
-        
-        # Não deve gerar exceção, apenas pular o aluno com erro
+    @patch('reconhecimento.listar_codificacoes')
+    def test_carregar_codificacoes_erro_banco(self, mock_listar, reconhecimento_instance):
+        """Testa que uma falha na leitura mantém a galeria atual"""
+        reconhecimento_instance.adicionar_aluno('1', np.zeros(128))
+        mock_listar.side_effect = RuntimeError("Erro ao conectar ao MySQL")
+        
+        # Não deve gerar exceção
         reconhecimento_instance.carregar_codificacoes_referencia()
         
-        assert len(reconhecimento_instance.codificacoes_referencia) == 0
-        assert len(reconhecimento_instance.nomes_referencia) == 0
+        assert reconhecimento_instance.galeria.ids == ('1',)
+
+
+class TestAlteracoesGaleria:
+    """Testes para inclusão, troca e remoção de um único aluno na galeria"""
+
+    def test_adicionar_aluno_preserva_contadores(self, reconhecimento_instance):
+        """Testa que incluir um aluno não zera as ausências dos demais"""
+        reconhecimento_instance.adicionar_aluno(1, np.zeros(128))
+        reconhecimento_instance.ausencias_consecutivas['1'] = 3
+        indice_anterior = reconhecimento_instance.indice
+
+        reconhecimento_instance.adicionar_aluno(2, np.ones(128))
+
+        assert reconhecimento_instance.galeria.ids == ('1', '2')
+        assert reconhecimento_instance.ausencias_consecutivas == {'1': 3, '2': 0}
+        assert reconhecimento_instance.indice is not indice_anterior
+        assert len(indice_anterior) == 1  # versão anterior continua intacta para quem a usa
+
+    def test_trocar_codificacao(self, reconhecimento_instance):
+        """Testa que adicionar um aluno existente substitui só a codificação dele"""
+        reconhecimento_instance.adicionar_aluno('1', np.zeros(128))
+        reconhecimento_instance.ausencias_consecutivas['1'] = 2
+
+        reconhecimento_instance.adicionar_aluno('1', np.ones(128))
+
+        assert len(reconhecimento_instance.galeria) == 1
+        assert reconhecimento_instance.galeria.comparar([np.ones(128)])[0].distancia == pytest.approx(0.0, abs=1e-3)
+        assert reconhecimento_instance.ausencias_consecutivas['1'] == 2
+
+    def test_remover_aluno(self, reconhecimento_instance):
+        """Testa remoção de um aluno e de seus contadores"""
+        reconhecimento_instance.adicionar_aluno('1', np.zeros(128))
+        reconhecimento_instance.adicionar_aluno('2', np.ones(128))
+        reconhecimento_instance.ausencias_consecutivas['2'] = 4
+
+        reconhecimento_instance.remover_aluno(1)
+
+        assert reconhecimento_instance.galeria.ids == ('2',)
+        assert reconhecimento_instance.ausencias_consecutivas == {'2': 4}
+        assert '1' not in reconhecimento_instance.email_enviado
+
+    def test_contatos_do_responsavel_em_memoria(self, reconhecimento_instance):
+        """Testa que o cache de contatos segue as regras do cadastro e não consulta o banco"""
+        reconhecimento_instance.adicionar_aluno('1', np.zeros(128), resp_telefone='119', resp_email='a@x.com')
+        reconhecimento_instance.adicionar_aluno('2', np.ones(128), resp_email='b@x.com')
+
+        # Responsável novo só com os dois campos; existente aceita atualização parcial
+        assert reconhecimento_instance.obter_responsavel('2') is None
+        reconhecimento_instance.atualizar_responsavel(1, resp_email='c@x.com')
+        assert reconhecimento_instance.obter_responsavel(1) == {'telefone': '119', 'email': 'c@x.com'}
+
+        reconhecimento_instance.remover_aluno('1')
+        assert reconhecimento_instance.obter_responsavel('1') is None
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_alerta_sem_consulta_ao_banco(self, mock_send, reconhecimento_instance):
+        """Testa que o e-mail de ausência usa o contato em memória"""
+        reconhecimento_instance.responsaveis = {'7': {'telefone': None, 'email': 'resp@x.com'}}
+        _semear_galeria(reconhecimento_instance, ['7'])
+
+        with patch('cadastro.conectar_mysql', side_effect=AssertionError("consulta ao banco")):
+            for _ in range(2):
+                reconhecimento_instance._registrar_presenca(set(), [], True)
+
+        assert mock_send.call_args[1]['to_email'] == 'resp@x.com'
+
+    @patch('reconhecimento.listar_codificacoes')
+    def test_recarga_completa_preserva_contadores(self, mock_listar, reconhecimento_instance):
+        """Testa que a recarga completa mantém as ausências de quem continua cadastrado"""
+        reconhecimento_instance.ausencias_consecutivas = {'1': 5, '9': 1}
+        mock_listar.return_value = (['1', '2'], np.stack([np.zeros(128), np.ones(128)]).astype(np.float32), {})
+
+        reconhecimento_instance.carregar_codificacoes_referencia()
+
+        assert reconhecimento_instance.ausencias_consecutivas == {'1': 5, '2': 0}
+
+
+class TestSnapshotGaleriaReconhecimento:
+    """Testes para a carga da galeria a partir do snapshot local"""
+
+    def _instancia(self, diretorio, versao, ids, responsaveis=None):
+        matriz = np.random.rand(len(ids), 128).astype(np.float32)
+        with patch('reconhecimento.DIRETORIO_GALERIA', str(diretorio)), \
+             patch('reconhecimento.obter_versao_galeria', return_value=versao), \
+             patch('reconhecimento.listar_responsaveis', return_value=responsaveis or {}), \
+             patch('reconhecimento.listar_codificacoes', return_value=(ids, matriz, responsaveis or {})) as mock_listar:
+            instancia = ReconhecimentoFacial()
+        return instancia, mock_listar
+
+    def test_snapshot_atual_evita_banco(self, tmp_path):
+        """Testa que um snapshot na versão do banco dispensa a leitura dos alunos"""
+        contato = {'telefone': '11999999999', 'email': 'resp@email.com'}
+        primeira, mock_listar = self._instancia(tmp_path, 3, ['1', '2'], {'1': contato})
+        mock_listar.assert_called_once()
+
+        segunda, mock_listar = self._instancia(tmp_path, 3, ['9'], {'1': contato})
+
+        mock_listar.assert_not_called()
+        assert segunda.galeria.ids == ('1', '2')
+        np.testing.assert_array_equal(segunda.galeria.matriz, primeira.galeria.matriz)
+        # Contatos vêm do banco, não do arquivo
+        assert segunda.obter_responsavel(1) == contato
+        assert all('resp@email.com' not in p.read_text(errors='ignore') for p in tmp_path.iterdir())
+
+    def test_snapshot_com_banco_fora_do_ar(self, tmp_path):
+        """Testa que, sem banco, a galeria vem do snapshot e os contatos em memória são mantidos"""
+        instancia, _ = self._instancia(tmp_path, 3, ['1'], {'1': {'telefone': None, 'email': 'a@x.com'}})
+
+        with patch('reconhecimento.DIRETORIO_GALERIA', str(tmp_path)), \
+             patch('reconhecimento.obter_versao_galeria', side_effect=RuntimeError("sem banco")):
+            instancia.carregar_codificacoes_referencia()
+
+        assert instancia.galeria.ids == ('1',)
+        assert instancia.obter_responsavel('1') == {'telefone': None, 'email': 'a@x.com'}
+
+    def test_snapshot_desatualizado_rele_banco(self, tmp_path):
+        """Testa que o snapshot é descartado quando o contador do banco mudou"""
+        self._instancia(tmp_path, 3, ['1', '2'])
+
+        instancia, mock_listar = self._instancia(tmp_path, 4, ['1', '2', '3'])
+
+        mock_listar.assert_called_once()
+        assert instancia.galeria.ids == ('1', '2', '3')
+
+    def test_alteracao_incremental_regrava_snapshot(self, tmp_path):
+        """Testa que uma inclusão regrava o snapshot só se foi a única alteração no banco"""
+        instancia, _ = self._instancia(tmp_path, 3, ['1'])
+
+        with patch('reconhecimento.DIRETORIO_GALERIA', str(tmp_path)), \
+             patch('reconhecimento.obter_versao_galeria', return_value=4):
+            instancia.adicionar_aluno('2', np.zeros(128))
+        assert carregar_snapshot(tmp_path).galeria.ids == ('1', '2')
+
+        with patch('reconhecimento.DIRETORIO_GALERIA', str(tmp_path)), \
+             patch('reconhecimento.obter_versao_galeria', return_value=7):
+            instancia.adicionar_aluno('3', np.zeros(128))
+        # Outra alteração aconteceu no banco: o snapshot não é regravado com uma versão que não reflete
+        snapshot = carregar_snapshot(tmp_path)
+        assert snapshot.versao == 4
+        assert instancia._versao_galeria is None
 
 
 class TestMonitoramento:
@@ -127,8 +269,7 @@ class TestCapturaFrames:
     """Testes para captura de frames"""
     
     @patch('reconhecimento.cv2.VideoCapture')
-    @patch('reconhecimento.base64.b64encode')
-    def test_capturar_frames_sucesso(self, mock_b64encode, mock_video_capture, reconhecimento_instance):
+    def test_capturar_frames_sucesso(self, mock_video_capture, reconhecimento_instance):
         """Testa captura bem-sucedida de frames"""
         # Setup mocks
         mock_cap = Mock()
@@ -136,8 +277,6 @@ class TestCapturaFrames:
         mock_cap.isOpened.return_value = True
         mock_cap.read.return_value = (True, np.zeros((480, 640, 3), dtype=np.uint8))
         
-        mock_b64encode.return_value = b'encoded_frame'
-        
         # Mock do callback
         callback_frame = Mock()
         reconhecimento_instance.definir_callback_frame(callback_frame)
@@ -154,8 +293,12 @@ class TestCapturaFrames:
         # Executa captura
         reconhecimento_instance._capturar_frames(0)
         
-        # Verifica se o callback foi chamado
+        # Verifica se o callback foi chamado com os bytes do JPEG (sem base64)
         callback_frame.assert_called()
+        frame_jpeg, camera_id = callback_frame.call_args[0]
+        assert isinstance(frame_jpeg, bytes)
+        assert frame_jpeg[:2] == b'\xff\xd8'
+        assert camera_id == 0
     
     @patch('reconhecimento.cv2.VideoCapture')
     def test_capturar_frames_camera_indisponivel(self, mock_video_capture, reconhecimento_instance):
@@ -181,29 +324,24 @@ class TestProcessamentoFrames:
     
     @patch('reconhecimento.face_recognition.face_locations')
     @patch('reconhecimento.face_recognition.face_encodings')
-    @patch('reconhecimento.face_recognition.compare_faces')
-    @patch('reconhecimento.face_recognition.face_distance')
-    def test_processar_frames_reconhecimento_sucesso(self, mock_distance, mock_compare, 
-                                                   mock_encodings, mock_locations, 
+    def test_processar_frames_reconhecimento_sucesso(self, mock_encodings, mock_locations, 
                                                    reconhecimento_instance):
         """Testa processamento bem-sucedido com reconhecimento"""
         # Setup dados de referência
-        reconhecimento_instance.codificacoes_referencia = [np.random.rand(128)]
-        reconhecimento_instance.nomes_referencia = ['João Silva']
+        ref = np.random.rand(128)
+        _semear_galeria(reconhecimento_instance, ['João Silva'], [ref])
         
         # Setup mocks
         mock_locations.return_value = [(50, 150, 150, 50)]  # Uma face detectada
-        mock_encodings.return_value = [np.random.rand(128)]
-        mock_compare.return_value = [True]
-        mock_distance.return_value = [0.3]
+        mock_encodings.return_value = [ref + 0.01]
         
         # Mock callback
         callback_msg = Mock()
         reconhecimento_instance.definir_callback_mensagens(callback_msg)
         
-        # Adiciona frame na fila
+        # Publica frame na caixa da câmera 0
         test_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        reconhecimento_instance.frame_queue.put(test_frame)
+        reconhecimento_instance.caixa_frames.publicar(0, test_frame)
         
         # Simula execução por pouco tempo
         reconhecimento_instance.monitoramento_ativo = True
@@ -228,9 +366,9 @@ class TestProcessamentoFrames:
         callback_msg = Mock()
         reconhecimento_instance.definir_callback_mensagens(callback_msg)
         
-        # Adiciona frame na fila
+        # Publica frame na caixa da câmera 0
         test_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        reconhecimento_instance.frame_queue.put(test_frame)
+        reconhecimento_instance.caixa_frames.publicar(0, test_frame)
         
         reconhecimento_instance.monitoramento_ativo = True
         
@@ -253,8 +391,7 @@ class TestDeteccaoAusencias:
     def test_detectar_ausencias_consecutivas(self, _mock_locations, reconhecimento_instance):
         """Testa detecção de ausências consecutivas via verificar_presenca"""
         # Setup referências com IDs como strings
-        reconhecimento_instance.nomes_referencia = ['123', '456']
-        reconhecimento_instance.codificacoes_referencia = [np.random.rand(128), np.random.rand(128)]
+        _semear_galeria(reconhecimento_instance, ['123', '456'])
         reconhecimento_instance.ausencias_consecutivas = {'123': 1, '456': 0}
         
         # Usa frame preto para não reconhecer ninguém
@@ -265,15 +402,11 @@ class TestDeteccaoAusencias:
         assert reconhecimento_instance.ausencias_consecutivas['123'] == 2
         assert reconhecimento_instance.ausencias_consecutivas['456'] == 1
     
-    @patch('reconhecimento.obter_responsavel_por_aluno')
     @patch('reconhecimento.face_recognition.face_locations', return_value=[])
-    def test_enviar_alerta_ausencia(self, _mock_locations, mock_obter_responsavel, reconhecimento_instance):
+    def test_enviar_alerta_ausencia(self, _mock_locations, reconhecimento_instance):
         """Testa geração de alerta de ausência via verificar_presenca"""
-        mock_obter_responsavel.return_value = {
-            'email': 'responsavel@email.com'
-        }
-        reconhecimento_instance.nomes_referencia = ['123']
-        reconhecimento_instance.codificacoes_referencia = [np.random.rand(128)]
+        reconhecimento_instance.responsaveis = {'123': {'email': 'responsavel@email.com'}}
+        _semear_galeria(reconhecimento_instance, ['123'])
         reconhecimento_instance.ausencias_consecutivas = {'123': 1}
         reconhecimento_instance.email_enviado = {'123': False}
         
@@ -282,20 +415,138 @@ class TestDeteccaoAusencias:
         
         assert any('ALERTA:' in msg for msg in mensagens)
 
+    @patch('reconhecimento.face_recognition.face_locations', return_value=[])
+    def test_sala_vazia_publica_ausencia(self, _mock_locations, reconhecimento_instance):
+        """Testa que duas decisões seguidas num frame sem rostos publicam a ausência"""
+        _semear_galeria(reconhecimento_instance, ['123'])
+        reconhecimento_instance.notificacoes = Mock()
+        reconhecimento_instance.notificacoes.publicar.return_value = True
+
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        for _ in range(2):
+            reconhecimento_instance.verificar_presenca(frame)
+
+        assert reconhecimento_instance.ausencias_consecutivas['123'] == 2
+        evento = reconhecimento_instance.notificacoes.publicar.call_args[0][0]
+        assert evento.id_aluno == '123'
+        assert evento.tipo == AUSENCIA
+        assert reconhecimento_instance.email_enviado['123'] is True
+
+
+class TestAlertasPresenca:
+    """Testes para os eventos de ausência e retorno enviados ao despachante"""
+
+    @pytest.fixture
+    def instancia(self, reconhecimento_instance):
+        _semear_galeria(reconhecimento_instance, ['1', '2'])
+        reconhecimento_instance.responsaveis = {'1': {'telefone': None, 'email': 'resp1@x.com'},
+                                                '2': {'telefone': None, 'email': 'resp2@x.com'}}
+        return reconhecimento_instance
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_um_email_por_ausencia(self, mock_enfileirar, instancia):
+        """Testa que cada ausência gera um único e-mail, mesmo com várias verificações seguidas"""
+        for _ in range(5):
+            instancia._registrar_presenca({'2'}, [], True)
+
+        assert mock_enfileirar.call_count == 1
+        assert mock_enfileirar.call_args[1]['to_email'] == 'resp1@x.com'
+        assert instancia.ausencias_consecutivas == {'1': 5, '2': 0}
+        assert instancia.email_enviado['1'] is True
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_retorno_e_novo_episodio(self, mock_enfileirar, instancia):
+        """Testa o aviso de retorno e que uma nova ausência depois dele volta a ser avisada"""
+        for presentes in ({'2'}, {'2'}, {'1', '2'}, {'2'}, {'2'}):
+            instancia._registrar_presenca(presentes, [], True)
+
+        assuntos = [chamada[1]['subject'] for chamada in mock_enfileirar.call_args_list]
+        assert assuntos == ['Alerta de Ausência - Aluno 1', 'Aluno 1 Retornou', 'Alerta de Ausência - Aluno 1']
+        assert instancia.episodios_ausencia == {'1': 2}
+
+    @patch('notificacoes.enfileirar_email', return_value=1)
+    def test_retorno_sem_ausencia_avisada(self, mock_enfileirar, instancia):
+        """Testa que sem contato a ausência não é avisada e o retorno também não"""
+        instancia.responsaveis = {}
+        for presentes in ({'2'}, {'2'}, {'1', '2'}):
+            _alunos, mensagens = instancia._registrar_presenca(presentes, [], True)
+
+        mock_enfileirar.assert_not_called()
+        assert any('retornou' in mensagem for mensagem in mensagens)
+
+
+class TestFalhasPool:
+    """Testes para a recuperação quando um worker do pool de reconhecimento morre"""
+
+    @pytest.fixture
+    def instancia_com_pool(self, reconhecimento_instance):
+        reconhecimento_instance.adicionar_aluno('1', np.zeros(128))
+        pool = Mock()
+        pool.compartilhar.side_effect = lambda imagem, chave: imagem
+        pool.localizar_faces.side_effect = BrokenProcessPool('worker morreu')
+        reconhecimento_instance.pool = pool
+        return reconhecimento_instance, pool
+
+    @patch('reconhecimento.face_recognition.face_locations', return_value=[])
+    def test_worker_morto_usa_thread_local_e_recria_pool(self, mock_locations, instancia_com_pool):
+        """Testa que o frame é refeito na thread local e que um pool novo é criado"""
+        instancia, pool_quebrado = instancia_com_pool
+        pool_novo = Mock()
+        liberar = threading.Event()
+
+        def criar_pool_lento(_n_workers):
+            liberar.wait(5)
+            return pool_novo
+
+        with patch('reconhecimento.criar_pool', side_effect=criar_pool_lento):
+            _alunos, mensagens, concluido = instancia._identificar_com_pool(np.zeros((480, 640, 3), dtype=np.uint8), 0)
+            # Enquanto o pool novo sobe, o frame foi refeito na thread local
+            assert instancia.pool is None
+            liberar.set()
+            limite = time.monotonic() + 5
+            while instancia.pool is not pool_novo and time.monotonic() < limite:
+                time.sleep(0.01)
+
+        assert concluido is True
+        assert mock_locations.called
+        pool_quebrado.encerrar.assert_called_once()
+        assert instancia.pool is pool_novo
+        assert instancia.obter_metricas()['pool'] == {'ativo': True, 'falhas': 1}
+
+    @patch('reconhecimento.face_recognition.face_locations', return_value=[])
+    def test_thread_de_processamento_sobrevive(self, _mock_locations, instancia_com_pool):
+        """Testa que a falha do worker não encerra a thread de processamento"""
+        instancia, _pool = instancia_com_pool
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        def falhar_uma_vez(*_args):
+            if instancia._identificar_com_pool.call_count == 1:
+                # Próximo frame da câmera chega enquanto o primeiro falha
+                instancia.caixa_frames.publicar(0, frame, time.time())
+                raise RuntimeError('falha')
+            return set(), [], True
+
+        instancia._identificar_com_pool = Mock(side_effect=falhar_uma_vez)
+        instancia.caixa_frames.publicar(0, frame, time.time() - 1)
+
+        instancia.monitoramento_ativo = True
+        threading.Timer(0.3, lambda: setattr(instancia, 'monitoramento_ativo', False)).start()
+        with patch('reconhecimento.INTERVALO_RASTREIO', 0):
+            instancia._processar_frames()
+
+        assert instancia._identificar_com_pool.call_count == 2
+
 
 class TestUtilidades:
     """Testes para funções utilitárias"""
     
     @patch('reconhecimento.face_recognition.face_locations', return_value=[(0,10,10,0)])
     @patch('reconhecimento.face_recognition.face_encodings')
-    @patch('reconhecimento.face_recognition.compare_faces', return_value=[True])
-    @patch('reconhecimento.face_recognition.face_distance', return_value=[0.3])
-    def test_reset_ausencias_presenca_detectada(self, _mock_distance, _mock_compare, mock_enc, _mock_loc, reconhecimento_instance):
+    def test_reset_ausencias_presenca_detectada(self, mock_enc, _mock_loc, reconhecimento_instance):
         """Testa reset de ausências quando presença é detectada via verificar_presenca"""
         # Setup referências com ID '123'
         ref = np.random.rand(128)
-        reconhecimento_instance.codificacoes_referencia = [ref]
-        reconhecimento_instance.nomes_referencia = ['123']
+        _semear_galeria(reconhecimento_instance, ['123'], [ref])
         reconhecimento_instance.ausencias_consecutivas = {'123': 3}
         reconhecimento_instance.email_enviado = {'123': True}
         mock_enc.return_value = [ref]
@@ -306,6 +557,47 @@ class TestUtilidades:
         assert reconhecimento_instance.ausencias_consecutivas['123'] == 0
         assert reconhecimento_instance.email_enviado['123'] == False
     
+    @patch('reconhecimento.face_recognition.face_locations', return_value=[(0,10,10,0), (0,20,20,10)])
+    @patch('reconhecimento.face_recognition.face_encodings')
+    def test_escolhe_referencia_mais_proxima(self, mock_enc, _mock_loc, reconhecimento_instance):
+        """Testa que a face é atribuída à referência mais próxima, não à primeira dentro da tolerância"""
+        base = np.zeros(128)
+        _semear_galeria(reconhecimento_instance, ['111', '222'], [base + 0.04, base + 0.01])
+        mock_enc.return_value = [base]
+        
+        frame = np.zeros((100, 100, 3), dtype=np.uint8)
+        alunos, _msgs = reconhecimento_instance.verificar_presenca(frame)
+        
+        assert alunos == ['222']
+    
+    @patch('reconhecimento.face_recognition.face_locations', return_value=[(0,10,10,0)])
+    @patch('reconhecimento.face_recognition.face_encodings')
+    def test_rastreamento_evita_recodificar(self, mock_enc, _mock_loc, reconhecimento_instance):
+        """Testa que a face rastreada mantém a identidade sem ser codificada de novo"""
+        ref = np.random.rand(128)
+        _semear_galeria(reconhecimento_instance, ['123'], [ref])
+        mock_enc.return_value = [ref]
+        
+        frame = np.zeros((100, 100, 3), dtype=np.uint8)
+        primeiro, _msgs, _ = reconhecimento_instance.identificar_alunos(frame)
+        segundo, _msgs, _ = reconhecimento_instance.identificar_alunos(frame)
+        
+        assert primeiro == segundo == {'123'}
+        assert mock_enc.call_count == 1
+    
+    def test_cena_estatica_reaproveita_passada(self, reconhecimento_instance):
+        """Testa que, sem movimento desde a última passada, a detecção não é refeita"""
+        frame = np.zeros((100, 100, 3), dtype=np.uint8)
+        
+        reconhecimento_instance.registrar_movimento(0, frame, timestamp=1.0)
+        assert not reconhecimento_instance._pode_reaproveitar(0, 2.0)
+        reconhecimento_instance._ultima_passada[0] = (2.0, frozenset({'123'}), True)
+        reconhecimento_instance.registrar_movimento(0, frame, timestamp=3.0)
+        
+        assert reconhecimento_instance._pode_reaproveitar(0, 3.0)
+        # Keep-alive vencido: a detecção completa volta a rodar
+        assert not reconhecimento_instance._pode_reaproveitar(0, 1000.0)
+    
     def test_thread_safety(self, reconhecimento_instance):
         """Testa thread safety das operações"""
         # Este teste verifica se o lock está sendo usado corretamente
@@ -348,8 +640,7 @@ class TestIntegracaoReconhecimento:
         mock_encodings.return_value = [np.random.rand(128)]
         
         # Setup dados de referência
-        reconhecimento_instance.codificacoes_referencia = [np.random.rand(128)]
-        reconhecimento_instance.nomes_referencia = ['João Silva']
+        _semear_galeria(reconhecimento_instance, ['João Silva'])
         
         # Setup callbacks
         callback_msg = Mock()
@@ -378,14 +669,12 @@ class TestPerformance:
     def test_performance_processamento_multiplos_frames(self, reconhecimento_instance):
         """Testa performance com múltiplos frames"""
         # Setup dados de referência
-        reconhecimento_instance.codificacoes_referencia = [np.random.rand(128) for _ in range(10)]
-        reconhecimento_instance.nomes_referencia = [f'Aluno_{i}' for i in range(10)]
+        _semear_galeria(reconhecimento_instance, [f'Aluno_{i}' for i in range(10)])
         
-        # Adiciona múltiplos frames na fila
-        for _ in range(50):
+        # Publica múltiplos frames (a caixa mantém só o mais recente de cada câmera)
+        for i in range(50):
             frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-            if not reconhecimento_instance.frame_queue.full():
-                reconhecimento_instance.frame_queue.put(frame)
+            reconhecimento_instance.caixa_frames.publicar(i % 4, frame)
         
         start_time = time.time()
         
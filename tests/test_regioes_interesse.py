@@ -0,0 +1,75 @@
+"""
+Testes unitários para o módulo regioes_interesse.py
+"""
+import json
+
+import pytest
+
+from regioes_interesse import RegioesInteresse, caixas_recorte, contem, contornos, validar_regioes
+
+RETANGULO = {'tipo': 'retangulo', 'x': 0.5, 'y': 0.0, 'largura': 0.5, 'altura': 0.5}
+TRIANGULO = {'tipo': 'poligono', 'pontos': [[0.0, 0.5], [0.25, 1.0], [0.0, 1.0]]}
+
+
+class TestValidacao:
+    """Testes para validação das regiões"""
+
+    def test_regioes_validas(self):
+        """Testa normalização de retângulo e polígono"""
+        regioes = validar_regioes([RETANGULO, TRIANGULO])
+        assert regioes[0]['largura'] == 0.5
+        assert len(regioes[1]['pontos']) == 3
+
+    @pytest.mark.parametrize('regiao', [
+        {'tipo': 'retangulo', 'x': 0.8, 'y': 0.0, 'largura': 0.5, 'altura': 0.5},
+        {'tipo': 'retangulo', 'x': 'a', 'y': 0.0, 'largura': 0.5, 'altura': 0.5},
+        {'tipo': 'poligono', 'pontos': [[0, 0], [1, 1]]},
+        {'tipo': 'circulo'},
+    ])
+    def test_regioes_invalidas(self, regiao):
+        """Testa rejeição de regiões inválidas"""
+        with pytest.raises(ValueError):
+            validar_regioes([regiao])
+
+
+class TestGeometria:
+    """Testes para recortes e pertinência"""
+
+    def test_caixas_recorte_em_pixels(self):
+        """Testa conversão das regiões para retângulos em pixels, com margem"""
+        caixas = caixas_recorte([RETANGULO, TRIANGULO], 200, 100, margem=0)
+        assert (100, 0, 200, 50) in caixas
+        assert (0, 50, 50, 100) in caixas
+
+    def test_caixas_sobrepostas_sao_fundidas(self):
+        """Testa que regiões sobrepostas geram um único recorte"""
+        outra = {'tipo': 'retangulo', 'x': 0.4, 'y': 0.2, 'largura': 0.3, 'altura': 0.3}
+        assert caixas_recorte([RETANGULO, outra], 200, 100, margem=0) == [(80, 0, 200, 50)]
+
+    def test_contem(self):
+        """Testa pertinência de pontos no polígono"""
+        contornos_regioes = contornos([TRIANGULO], 200, 100)
+        assert contem(contornos_regioes, 5, 95)
+        assert not contem(contornos_regioes, 45, 55)
+
+
+class TestRegioesInteresse:
+    """Testes para a persistência das regiões"""
+
+    def test_definir_persistir_e_remover(self, tmp_path):
+        """Testa que as regiões são gravadas em JSON e recarregadas"""
+        caminho = tmp_path / 'regioes.json'
+        regioes = RegioesInteresse(caminho)
+        regioes.definir(2, [RETANGULO])
+
+        assert json.loads(caminho.read_text())['2'][0]['tipo'] == 'retangulo'
+        assert RegioesInteresse(caminho).obter(2) == [RETANGULO]
+
+        assert regioes.remover(2)
+        assert RegioesInteresse(caminho).obter(2) == []
+
+    def test_arquivo_corrompido(self, tmp_path):
+        """Testa que um arquivo inválido não impede a inicialização"""
+        caminho = tmp_path / 'regioes.json'
+        caminho.write_text('{nao e json')
+        assert RegioesInteresse(caminho).todas() == {}
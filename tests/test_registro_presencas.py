@@ -0,0 +1,268 @@
+"""
+Testes unitários para o módulo registro_presencas.py
+"""
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from registro_presencas import RegistroPresencas, descrever_local
+
+INICIO = datetime(2024, 1, 1, 8, 0)
+
+
+def _em(segundos):
+    return INICIO + timedelta(seconds=segundos)
+
+
+@pytest.fixture(autouse=True)
+def mock_resumos():
+    with patch('registro_presencas.atualizar_resumos_diarios', return_value=1) as mock_atualizar:
+        yield mock_atualizar
+
+
+@pytest.fixture
+def registro(tmp_path):
+    registro = RegistroPresencas(arquivo_pendentes=str(tmp_path / 'presencas.jsonl'), intervalo_gravacao=60,
+                                 tamanho_lote=500, intervalo_minimo=60, intervalo_fechamento=300, retencao_dias=0)
+    registro.iniciar = lambda: None  # gravação só por descarregar(), salvo nos testes da thread
+    return registro
+
+
+class TestSessoesPresenca:
+    """Testes para a formação das sessões em memória"""
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_deteccoes_estendem_a_sessao(self, mock_gravar, registro):
+        """Testa que detecções seguidas do aluno no local viram uma única sessão"""
+        assert registro.registrar('1', 0, _em(0)) is True
+        for segundos in range(5, 125, 5):
+            assert registro.registrar('1', 0, _em(segundos)) is False
+        assert registro.registrar('1', 1, _em(10)) is True
+
+        registro.descarregar(agora=_em(120))
+
+        mock_gravar.assert_called_once_with([(1, 'camera 0', _em(0), _em(120), 25), (1, 'camera 1', _em(10), _em(10), 1)])
+        assert registro.estatisticas()['abertas'] == 2
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_lacuna_encerra_a_sessao(self, mock_gravar, registro):
+        """Testa que uma lacuna maior que o intervalo de fechamento abre outra sessão"""
+        registro.registrar('1', 0, _em(0))
+        registro.registrar('1', 0, _em(60))
+        assert registro.registrar('1', 0, _em(60 + 301)) is True
+
+        registro.descarregar(agora=_em(400))
+
+        sessoes = mock_gravar.call_args[0][0]
+        assert sessoes == [(1, 'camera 0', _em(0), _em(60), 2), (1, 'camera 0', _em(361), _em(361), 1)]
+        assert registro.estatisticas()['fechadas'] == 1
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_sessao_nao_atravessa_o_dia(self, mock_gravar, registro):
+        """Testa que a virada do dia encerra a sessão"""
+        noite = datetime(2024, 1, 1, 23, 59, 0)
+        registro.registrar('1', 0, noite)
+        assert registro.registrar('1', 0, noite + timedelta(minutes=2)) is True
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_sessao_sem_deteccao_sai_da_memoria(self, mock_gravar, registro):
+        """Testa que a gravação encerra as sessões sem detecção recente, gravando o fim exato"""
+        registro.registrar('1', 0, _em(0))
+        registro.descarregar(agora=_em(5))
+        registro.registrar('1', 0, _em(30))
+
+        registro.descarregar(agora=_em(30 + 301))
+
+        assert mock_gravar.call_args_list[-1][0][0] == [(1, 'camera 0', _em(0), _em(30), 2)]
+        assert registro.estatisticas()['abertas'] == 0
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_sessao_aberta_regravada_por_intervalo_minimo(self, mock_gravar, registro):
+        """Testa que uma sessão aberta só é regravada quando o fim avançou o intervalo mínimo"""
+        registro.registrar('1', 0, _em(0))
+        registro.descarregar(agora=_em(0))
+        registro.registrar('1', 0, _em(30))
+        registro.descarregar(agora=_em(30))
+        registro.registrar('1', 0, _em(65))
+        registro.descarregar(agora=_em(65))
+
+        assert mock_gravar.call_count == 2
+        assert mock_gravar.call_args[0][0] == [(1, 'camera 0', _em(0), _em(65), 3)]
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_identificacao_invalida(self, mock_gravar, registro):
+        """Testa que identificações fora do cadastro não viram sessões"""
+        assert registro.registrar('Desconhecido', 0, INICIO) is False
+        assert registro.registrar(None, 0, INICIO) is False
+        registro.descarregar(agora=INICIO)
+
+        mock_gravar.assert_not_called()
+
+    def test_local(self):
+        """Testa o valor gravado na coluna local"""
+        assert descrever_local(2) == 'camera 2'
+        assert descrever_local(None) == 'desconhecido'
+        assert len(descrever_local('x' * 200)) == 90
+
+
+class TestGravacaoSessoes:
+    """Testes para a gravação em lote e a resistência a quedas do banco"""
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_lotes_limitados(self, mock_gravar, registro):
+        """Testa que muitas sessões saem em comandos de no máximo tamanho_lote linhas"""
+        registro.tamanho_lote = 400
+        for id_aluno in range(1000):
+            registro.registrar(id_aluno, 0, INICIO)
+        registro.descarregar(agora=INICIO)
+
+        assert [len(chamada[0][0]) for chamada in mock_gravar.call_args_list] == [400, 400, 200]
+        assert registro.estatisticas()['comandos'] == 3
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_banco_fora_do_ar_guarda_em_arquivo(self, mock_gravar, registro):
+        """Testa que o lote vai para o arquivo na queda do banco e é regravado, antes dos novos, na volta"""
+        mock_gravar.side_effect = RuntimeError('Pool de conexões esgotado')
+        registro.registrar('1', 0, _em(0))
+        registro.registrar('2', 0, _em(0))
+        registro.descarregar(agora=_em(0))
+
+        assert registro.estatisticas()['pendentes_arquivo'] == 2
+        # Um novo registro (outra execução) encontra o arquivo
+        reaberto = RegistroPresencas(arquivo_pendentes=registro.arquivo_pendentes)
+        assert reaberto.estatisticas()['pendentes_arquivo'] == 2
+
+        # Ainda fora do ar: as novas sessões se juntam ao arquivo
+        registro.registrar('3', 0, _em(5))
+        registro.descarregar(agora=_em(5))
+        assert registro.estatisticas()['pendentes_arquivo'] == 3
+
+        mock_gravar.side_effect = None
+        registro.registrar('4', 0, _em(10))
+        registro.descarregar(agora=_em(10))
+
+        lotes = [chamada[0][0] for chamada in mock_gravar.call_args_list[-2:]]
+        assert [linha[0] for linha in lotes[0]] == [1, 2, 3]
+        assert lotes[0][0] == (1, 'camera 0', _em(0), _em(0), 1)
+        assert [linha[0] for linha in lotes[1]] == [4]
+        estatisticas = registro.estatisticas()
+        assert estatisticas['pendentes_arquivo'] == 0
+        assert estatisticas['derramadas'] == 3
+        assert estatisticas['gravadas'] == 4
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_arquivo_parcialmente_regravado(self, mock_gravar, registro):
+        """Testa que, se o banco cai no meio da regravação, só o que faltou fica no arquivo"""
+        registro.tamanho_lote = 2
+        mock_gravar.side_effect = RuntimeError('Banco indisponível')
+        for id_aluno in range(5):
+            registro.registrar(id_aluno, 0, INICIO)
+        registro.descarregar(agora=INICIO)
+        assert registro.estatisticas()['pendentes_arquivo'] == 5
+
+        mock_gravar.side_effect = [None, RuntimeError('Banco indisponível')]
+        registro.descarregar(agora=INICIO)
+
+        assert registro.estatisticas()['pendentes_arquivo'] == 3
+        with open(registro.arquivo_pendentes, encoding='utf-8') as f:
+            assert len(f.readlines()) == 3
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_carga_de_pico(self, mock_gravar, registro):
+        """Testa que 30 câmeras e 1.000 alunos verificados a cada 5 s custam poucos comandos e poucas linhas"""
+        cameras = 30
+        for passo in range(6 * 60):  # 30 minutos de verificações
+            momento = _em(5 * passo)
+            for id_aluno in range(1000):
+                registro.registrar(id_aluno, id_aluno % cameras, momento)
+            registro.descarregar(agora=momento)
+        registro.encerrar()
+
+        estatisticas = registro.estatisticas()
+        # Uma sessão por aluno, regravada uma vez por minuto (e ao encerrar): 2 comandos de 500 linhas cada
+        assert estatisticas['sessoes'] == 1000
+        assert estatisticas['comandos'] <= 2 * 32
+        assert estatisticas['comandos'] / 1800 < 0.1
+        assert mock_gravar.call_args_list[-2][0][0][0] == (0, 'camera 0', INICIO, _em(5 * (6 * 60 - 1)), 6 * 60)
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_resumos_das_sessoes_gravadas(self, mock_gravar, registro, mock_resumos):
+        """Testa que os resumos diários são atualizados para os alunos e locais gravados"""
+        registro.registrar('1', 0, _em(0))
+        registro.registrar('2', 3, _em(0))
+        registro.descarregar(agora=_em(0))
+
+        mock_resumos.assert_called_once_with({(INICIO.date(), 1, 'camera 0'), (INICIO.date(), 2, 'camera 3')})
+
+        # Sem sessões gravadas, nada a atualizar
+        registro.descarregar(agora=_em(5))
+        assert mock_resumos.call_count == 1
+        assert registro.estatisticas()['resumos'] == 1
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_falha_nos_resumos_tenta_de_novo(self, mock_gravar, registro, mock_resumos):
+        """Testa que as chaves de uma atualização de resumos que falhou vão junto na próxima"""
+        mock_resumos.side_effect = [RuntimeError('Banco indisponível'), 1]
+        registro.registrar('1', 0, _em(0))
+        registro.descarregar(agora=_em(0))
+        registro.registrar('2', 0, _em(5))
+        registro.descarregar(agora=_em(5))
+
+        assert mock_resumos.call_args[0][0] == {(INICIO.date(), 1, 'camera 0'), (INICIO.date(), 2, 'camera 0')}
+        assert registro.estatisticas()['falhas_resumo'] == 1
+
+    @patch('registro_presencas.gravar_sessoes_presenca', side_effect=RuntimeError('Banco indisponível'))
+    def test_sessoes_no_arquivo_nao_atualizam_resumos(self, mock_gravar, registro, mock_resumos):
+        """Testa que só sessões efetivamente gravadas no banco entram nos resumos"""
+        registro.registrar('1', 0, _em(0))
+        registro.descarregar(agora=_em(0))
+
+        mock_resumos.assert_not_called()
+
+    @patch('registro_presencas.arquivar_sessoes_presenca', return_value=7)
+    def test_arquivamento(self, mock_arquivar, registro):
+        """Testa que o arquivamento move as sessões além da retenção e só roda de novo no dia seguinte"""
+        registro.retencao_dias = 30
+
+        assert registro.arquivar(agora=INICIO) == 7
+
+        mock_arquivar.assert_called_once_with(INICIO - timedelta(days=30))
+        assert registro.estatisticas()['arquivadas'] == 7
+        assert registro._proximo_arquivamento - time.monotonic() > 23 * 3600
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_thread_grava_pelo_tamanho_e_pelo_tempo(self, mock_gravar, tmp_path):
+        """Testa que a thread grava o lote cheio na hora e as demais sessões ao fim do intervalo"""
+        registro = RegistroPresencas(arquivo_pendentes=str(tmp_path / 'presencas.jsonl'), intervalo_gravacao=0.2,
+                                     tamanho_lote=3, retencao_dias=0)
+        try:
+            agora = datetime.now()
+            for id_aluno in range(3):
+                registro.registrar(id_aluno, 0, agora)
+            limite = time.monotonic() + 2
+            while not mock_gravar.called and time.monotonic() < limite:
+                time.sleep(0.01)
+            assert mock_gravar.call_count == 1
+
+            inicio = time.monotonic()
+            registro.registrar(3, 0, agora)
+            while mock_gravar.call_count < 2 and time.monotonic() < inicio + 2:
+                time.sleep(0.01)
+            assert mock_gravar.call_count == 2
+        finally:
+            registro.encerrar()
+
+    @patch('registro_presencas.gravar_sessoes_presenca')
+    def test_encerrar_grava_e_fecha_as_sessoes(self, mock_gravar, tmp_path):
+        """Testa que encerrar grava as sessões ainda abertas"""
+        registro = RegistroPresencas(arquivo_pendentes=str(tmp_path / 'presencas.jsonl'), intervalo_gravacao=60,
+                                     retencao_dias=0)
+        agora = datetime.now()
+        registro.registrar('1', 0, agora)
+
+        registro.encerrar()
+
+        mock_gravar.assert_called_once_with([(1, 'camera 0', agora, agora, 1)])
+        assert registro.estatisticas()['abertas'] == 0
@@ -0,0 +1,91 @@
+"""
+Testes unitários para o módulo smtp_service.py
+"""
+from email import message_from_bytes
+
+import pytest
+
+from smtp_service import SessaoSMTP
+
+
+class TestEnvioSincrono:
+    """Testes para o envio direto (usado pelo teste de e-mail da interface)"""
+
+    def test_envia_para_o_servidor(self, servico_smtp_local, servidor_smtp):
+        """Testa o envio completo contra o servidor SMTP local"""
+        resultado = servico_smtp_local.send_email('resp@email.com', 'Assunto', 'Corpo', '<p>Corpo</p>')
+
+        assert resultado['success'] is True
+        destinatarios, conteudo = servidor_smtp.mensagens[0]
+        assert destinatarios == ['resp@email.com']
+        mensagem = message_from_bytes(conteudo)
+        assert mensagem['Subject'] == 'Assunto'
+        assert [parte.get_content_type() for parte in mensagem.get_payload()] == ['text/plain', 'text/html']
+        assert servidor_smtp.autenticacoes == 1
+
+    def test_sem_credenciais(self, servico_smtp_local, servidor_smtp):
+        """Testa que sem usuário/senha nada é enviado"""
+        servico_smtp_local.smtp_password = ''
+
+        resultado = servico_smtp_local.send_email('resp@email.com', 'Assunto', 'Corpo')
+
+        assert resultado['success'] is False
+        assert servidor_smtp.conexoes == 0
+
+    def test_erro_do_servidor(self, servico_smtp_local, servidor_smtp):
+        """Testa que a recusa do servidor volta como erro SMTP"""
+        servidor_smtp.respostas = ['554 Rejeitado']
+
+        resultado = servico_smtp_local.send_email('resp@email.com', 'Assunto', 'Corpo')
+
+        assert resultado['success'] is False
+        assert '554' in resultado['smtp_error']
+
+
+class TestSessaoSMTP:
+    """Testes para a sessão SMTP reaproveitada"""
+
+    def _mensagem(self, servico, n):
+        return servico.montar_mensagem('resp@email.com', f'Mensagem {n}', 'Corpo')
+
+    def test_reaproveita_conexao(self, servico_smtp_local, servidor_smtp):
+        """Testa que vários envios usam uma única conexão autenticada"""
+        sessao = SessaoSMTP(servico_smtp_local)
+        for n in range(3):
+            sessao.enviar(self._mensagem(servico_smtp_local, n))
+        sessao.fechar()
+
+        assert len(servidor_smtp.mensagens) == 3
+        assert servidor_smtp.conexoes == 1
+        assert servidor_smtp.autenticacoes == 1
+
+    def test_reconecta_quando_servidor_encerra(self, servico_smtp_local, servidor_smtp):
+        """Testa que a sessão derrubada pelo servidor é reaberta sem perder a mensagem"""
+        servidor_smtp.desconectar_apos_mensagem = True
+        sessao = SessaoSMTP(servico_smtp_local)
+
+        sessao.enviar(self._mensagem(servico_smtp_local, 1))
+        sessao.enviar(self._mensagem(servico_smtp_local, 2))
+
+        assert len(servidor_smtp.mensagens) == 2
+        assert sessao.aberturas == 2
+
+    def test_nova_configuracao_abre_nova_sessao(self, servico_smtp_local, servidor_smtp):
+        """Testa que trocar as credenciais refaz a sessão"""
+        sessao = SessaoSMTP(servico_smtp_local)
+        sessao.enviar(self._mensagem(servico_smtp_local, 1))
+
+        servico_smtp_local.smtp_password = 'nova_senha'
+        sessao.enviar(self._mensagem(servico_smtp_local, 2))
+
+        assert servidor_smtp.autenticacoes == 2
+
+    def test_erro_fecha_sessao(self, servico_smtp_local, servidor_smtp):
+        """Testa que depois de um erro do servidor a sessão é descartada"""
+        servidor_smtp.respostas = ['451 Tente depois']
+        sessao = SessaoSMTP(servico_smtp_local)
+
+        with pytest.raises(Exception):
+            sessao.enviar(self._mensagem(servico_smtp_local, 1))
+
+        assert not sessao.aberta
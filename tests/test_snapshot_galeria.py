@@ -0,0 +1,82 @@
+"""
+Testes unitários para o módulo snapshot_galeria.py
+"""
+import json
+
+import numpy as np
+import pytest
+
+from galeria import GaleriaFacial
+from snapshot_galeria import ARQUIVO_METADADOS, carregar_snapshot, salvar_snapshot
+
+
+@pytest.fixture
+def galeria():
+    return GaleriaFacial(['1', '2', '3'], np.random.rand(3, 128))
+
+
+class TestSnapshotGaleria:
+    """Testes para gravação e leitura do snapshot da galeria"""
+
+    def test_ida_e_volta_mapeada(self, tmp_path, galeria):
+        """Testa que o snapshot volta com a mesma galeria, com a matriz mapeada em memória"""
+        salvar_snapshot(tmp_path, 7, galeria)
+
+        snapshot = carregar_snapshot(tmp_path)
+
+        assert snapshot.versao == 7
+        assert snapshot.galeria.ids == galeria.ids
+        assert snapshot.centroides is None
+        np.testing.assert_array_equal(snapshot.galeria.matriz, galeria.matriz)
+        assert isinstance(snapshot.galeria.matriz.base, np.memmap)
+
+    def test_sem_contatos_dos_responsaveis(self, tmp_path, galeria):
+        """Testa que os metadados gravados em disco não têm dados dos responsáveis"""
+        salvar_snapshot(tmp_path, 1, galeria)
+
+        metadados = json.loads((tmp_path / ARQUIVO_METADADOS).read_text())
+        assert 'responsaveis' not in metadados
+
+    def test_formato_anterior_e_ignorado(self, tmp_path, galeria):
+        """Testa que um snapshot do formato anterior (com contatos) é descartado para ser regravado"""
+        salvar_snapshot(tmp_path, 1, galeria)
+        metadados = json.loads((tmp_path / ARQUIVO_METADADOS).read_text())
+        metadados['formato'] = 1
+        metadados['responsaveis'] = {'1': {'telefone': '11999999999', 'email': 'resp@email.com'}}
+        (tmp_path / ARQUIVO_METADADOS).write_text(json.dumps(metadados))
+
+        assert carregar_snapshot(tmp_path) is None
+
+    def test_snapshot_ausente(self, tmp_path):
+        """Testa diretório sem snapshot"""
+        assert carregar_snapshot(tmp_path / 'inexistente') is None
+
+    def test_nova_versao_remove_arquivos_antigos(self, tmp_path, galeria):
+        """Testa que só os arquivos da versão vigente permanecem"""
+        salvar_snapshot(tmp_path, 1, galeria)
+        salvar_snapshot(tmp_path, 2, galeria.sem_aluno('1'), centroides=np.zeros((2, 128), dtype=np.float32))
+
+        snapshot = carregar_snapshot(tmp_path)
+
+        assert snapshot.versao == 2
+        assert snapshot.galeria.ids == ('2', '3')
+        assert snapshot.centroides.shape == (2, 128)
+        assert sorted(p.name for p in tmp_path.glob('*.npy')) == ['centroides-2.npy', 'galeria-2.npy']
+
+    def test_modelo_diferente_e_ignorado(self, tmp_path, galeria):
+        """Testa que snapshot de outro modelo de codificação não é usado"""
+        salvar_snapshot(tmp_path, 1, galeria)
+        metadados = json.loads((tmp_path / ARQUIVO_METADADOS).read_text())
+        metadados['modelo'] = 'outro_modelo'
+        (tmp_path / ARQUIVO_METADADOS).write_text(json.dumps(metadados))
+
+        assert carregar_snapshot(tmp_path) is None
+
+    def test_snapshot_inconsistente_e_ignorado(self, tmp_path, galeria):
+        """Testa que metadados que não batem com a matriz são rejeitados"""
+        salvar_snapshot(tmp_path, 1, galeria)
+        metadados = json.loads((tmp_path / ARQUIVO_METADADOS).read_text())
+        metadados['ids'].append('4')
+        (tmp_path / ARQUIVO_METADADOS).write_text(json.dumps(metadados))
+
+        assert carregar_snapshot(tmp_path) is None